@@ -85,6 +85,7 @@ def load_arguments(self, _):
         c.argument("source", options_list=["--source", "-s"], help="resource id of the source workspace")
         c.argument("destination", options_list=["--destination", "-d"], help="resource id of the destination workspace")
         c.argument("dry_run", arg_type=get_three_state_flag(), help="preview changes w/o committing")
+        c.argument("incremental", arg_type=get_three_state_flag(), help="only sync dashboards whose content changed since the last incremental sync between the same workspaces, or differs from the destination")
         c.argument("folders", nargs="+", help="space separated folder list which sync command shall handle dashboards underneath")
 
     with self.argument_context("grafana") as c:
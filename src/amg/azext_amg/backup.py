@@ -4,15 +4,16 @@
 # --------------------------------------------------------------------------------------------
 
 import datetime
-from glob import glob
+import io
 import json
 import os
 import random
-import shutil
 import string
 import re
 import tarfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from knack.log import get_logger
 
@@ -22,6 +23,7 @@ from .utils import search_snapshot, get_snapshot
 from .utils import search_folders, get_folder, get_folder_permissions
 from .utils import search_datasource
 from .utils import search_annotations
+from .utils import max_concurrent_requests
 
 logger = get_logger(__name__)
 
@@ -35,56 +37,97 @@ def backup(grafana_name, grafana_url, backup_dir, components, http_headers, **kw
                         'datasources': _save_datasources}
 
     timestamp = datetime.datetime.today().strftime('%Y%m%d%H%M')
-    if components:
-        # Backup only the components that provided via an argument
-        if 'dashboards' in components:  # dashboards won't load if linked library panels don't exist
-            components.insert(0, 'library_panels')
-        for backup_function in components:
-            backup_functions[backup_function](grafana_url, backup_dir, timestamp, http_headers, **kwargs)
-    else:
-        # Backup every component
-        for backup_function in backup_functions.values():
-            backup_function(grafana_url, backup_dir, timestamp, http_headers, **kwargs)
-
-    _archive(grafana_name, backup_dir, timestamp)
-
-
-def _archive(grafana_name, backup_dir, timestamp):
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
     archive_file = f'{backup_dir}/{grafana_name}-{timestamp}.tar.gz'
-    backup_files = []
 
-    for folder_name in ['folders', 'datasources', 'dashboards', 'library_panels', 'alert_channels',
-                        'organizations', 'users', 'snapshots', 'versions', 'annotations']:
-        backup_path = f'{backup_dir}/{folder_name}/{timestamp}'
-
-        for file_path in glob(backup_path):
-            logger.info('backup %s at: %s', folder_name, file_path)
-            backup_files.append(file_path)
-
-    if os.path.exists(archive_file):
-        os.remove(archive_file)
+    with _BackupArchive(archive_file, backup_dir, timestamp) as archive:
+        if components:
+            # Backup only the components that provided via an argument
+            if 'dashboards' in components:  # dashboards won't load if linked library panels don't exist
+                components.insert(0, 'library_panels')
+            for backup_function in components:
+                backup_functions[backup_function](grafana_url, archive, http_headers, **kwargs)
+        else:
+            # Backup every component
+            for backup_function in backup_functions.values():
+                backup_function(grafana_url, archive, http_headers, **kwargs)
 
-    with tarfile.open(archive_file, "w:gz") as tar:
-        for file_path in backup_files:
-            tar.add(file_path)
-            if not os.environ.get("AMG_DEBUG", False):
-                shutil.rmtree(os.path.abspath(os.path.join(file_path, os.pardir)))
-    tar.close()
     logger.warning('Created archive at: %s', archive_file)
 
 
-# Save dashboards
-def _save_dashboards(grafana_url, backup_dir, timestamp, http_headers, **kwargs):
-    folder_path = f'{backup_dir}/dashboards/{timestamp}'
-    log_file = f'dashboards_{timestamp}.txt'
+class _BackupArchive:
+    # Every object is written into the archive as soon as it is fetched, so nothing is staged on disk. The archive
+    # is only moved to its final name once the backup completed.
+    # Members are named {backup_dir}/{component}/{timestamp}/{file} like the files that earlier versions staged on disk
+    # and archived, so existing tooling that reads the archives keeps working. With AMG_DEBUG set the files are also
+    # written to that location on disk, as they used to be kept for troubleshooting.
+    def __init__(self, archive_file, backup_dir, timestamp):
+        self.archive_file = archive_file
+        self.backup_dir = backup_dir
+        self.timestamp = timestamp
+        self._partial_file = archive_file + '.partial'
+        self._keep_files = bool(os.environ.get("AMG_DEBUG", False))
+        self._lock = threading.Lock()
+        self._tar = None
+
+    def __enter__(self):
+        self._tar = tarfile.open(self._partial_file, "w:gz")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._tar.close()
+        if exc_type:
+            os.remove(self._partial_file)
+            return
+        if os.path.exists(self.archive_file):
+            os.remove(self.archive_file)
+        os.replace(self._partial_file, self.archive_file)
+
+    def add_json(self, folder_name, file_name, data, extension):
+        pattern = "^db/|^uid/"
+        if re.match(pattern, file_name):
+            file_name = re.sub(pattern, '', file_name)
+        file_path = f'{self.backup_dir}/{folder_name}/{self.timestamp}/{file_name}.{extension}'
+        self.add_bytes(file_path, json.dumps(data).encode('utf8'))
+        return file_path
+
+    def add_log(self, folder_name, lines):
+        if lines:
+            file_path = f'{self.backup_dir}/{folder_name}/{self.timestamp}/{folder_name}_{self.timestamp}.txt'
+            self.add_bytes(file_path, ''.join(lines).encode('utf8'))
+
+    def add_bytes(self, file_path, content):
+        if self._keep_files:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(content)
+        # the same member name tarfile derives when a file is added from disk
+        member = tarfile.TarInfo(os.path.splitdrive(file_path)[1].replace(os.sep, '/').lstrip('/'))
+        member.size = len(content)
+        member.mtime = time.time()
+        with self._lock:
+            self._tar.addfile(member, io.BytesIO(content))
+
+
+def _run_concurrently(items, save_item):
+    # returns the results of save_item in the order of items
+    with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+        futures = [executor.submit(save_item, item) for item in items]
+        for future in as_completed(futures):
+            future.result()
+    return [future.result() for future in futures]
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
 
+# Save dashboards
+def _save_dashboards(grafana_url, archive, http_headers, **kwargs):
     limit = 5000  # limit is 5000 above V6.2+
     current_page = 1
+    log_lines = []
     while True:
         dashboards = _get_all_dashboards_in_grafana(current_page, limit, grafana_url, http_headers)
+        if len(dashboards) == 0:
+            break
 
         # only include what users want
         folders_to_include = kwargs.get('folders_to_include')
@@ -99,11 +142,10 @@ def _save_dashboards(grafana_url, backup_dir, timestamp, http_headers, **kwargs)
                                                     d.get('folderTitle', '') and 'general' in folders_to_exclude)]
 
         _print_an_empty_line()
-        if len(dashboards) == 0:
-            break
         current_page += 1
-        _get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_headers)
+        log_lines.extend(_get_individual_dashboard_setting_and_save(dashboards, archive, grafana_url, http_headers))
         _print_an_empty_line()
+    archive.add_log('dashboards', log_lines)
 
 
 def _get_all_dashboards_in_grafana(page, limit, grafana_url, http_headers):
@@ -121,38 +163,33 @@ def _get_all_dashboards_in_grafana(page, limit, grafana_url, http_headers):
     return []
 
 
-def _save_dashboard_setting(dashboard_name, file_name, dashboard_settings, folder_path):
-    file_path = _save_json(file_name, dashboard_settings, folder_path, 'dashboard')
+def _save_dashboard_setting(dashboard_name, file_name, dashboard_settings, archive):
+    file_path = archive.add_json('dashboards', file_name, dashboard_settings, 'dashboard')
     logger.warning("Dashboard: \"%s\" is saved", dashboard_name)
     logger.info("    -> %s", file_path)
 
 
-def _get_individual_dashboard_setting_and_save(dashboards, folder_path, log_file, grafana_url, http_headers):
-    file_path = folder_path + '/' + log_file
-    if dashboards:
-        with open(file_path, 'w', encoding="utf8") as f:
-            for board in dashboards:
-                board_uri = "uid/" + board['uid']
-
-                (status, content) = get_dashboard(board_uri, grafana_url, http_headers)
-                if status == 200:
-                    _save_dashboard_setting(
-                        board['title'],
-                        board_uri,
-                        content,
-                        folder_path)
-                    f.write(board_uri + '\t' + board['title'] + '\n')
+def _get_individual_dashboard_setting_and_save(dashboards, archive, grafana_url, http_headers):
+    def save_dashboard(board):
+        board_uri = "uid/" + board['uid']
 
+        (status, content) = get_dashboard(board_uri, grafana_url, http_headers)
+        if status == 200:
+            _save_dashboard_setting(
+                board['title'],
+                board_uri,
+                content,
+                archive)
+            return board_uri + '\t' + board['title'] + '\n'
+        return None
 
-# Save library panels
-def _save_library_panels(grafana_url, backup_dir, timestamp, http_headers, **kwargs):  # pylint: disable=unused-argument
-    folder_path = f'{backup_dir}/library_panels/{timestamp}'
-    log_file = f'library_panels_{timestamp}.txt'
+    return [line for line in _run_concurrently(dashboards, save_dashboard) if line]
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
 
+# Save library panels
+def _save_library_panels(grafana_url, archive, http_headers, **kwargs):  # pylint: disable=unused-argument
     current_page = 1
+    log_lines = []
     while True:
         panels = _get_all_library_panels_in_grafana(current_page, grafana_url, http_headers)
 
@@ -160,8 +197,9 @@ def _save_library_panels(grafana_url, backup_dir, timestamp, http_headers, **kwa
         if len(panels) == 0:
             break
         current_page += 1
-        _get_individual_library_panel_setting_and_save(panels, folder_path, log_file, grafana_url, http_headers)
+        log_lines.extend(_get_individual_library_panel_setting_and_save(panels, archive, grafana_url, http_headers))
         _print_an_empty_line()
+    archive.add_log('library_panels', log_lines)
 
 
 def _get_all_library_panels_in_grafana(page, grafana_url, http_headers):
@@ -176,77 +214,67 @@ def _get_all_library_panels_in_grafana(page, grafana_url, http_headers):
     return []
 
 
-def _save_library_panel_setting(panel_name, file_name, library_panel_settings, folder_path):
-    file_path = _save_json(file_name, library_panel_settings, folder_path, 'library_panel')
+def _save_library_panel_setting(panel_name, file_name, library_panel_settings, archive):
+    file_path = archive.add_json('library_panels', file_name, library_panel_settings, 'library_panel')
     logger.warning("Library Panel: \"%s\" is saved", panel_name)
     logger.info("    -> %s", file_path)
 
 
-def _get_individual_library_panel_setting_and_save(panels, folder_path, log_file, grafana_url, http_headers):
-    file_path = folder_path + '/' + log_file
-    if panels:
-        with open(file_path, 'w', encoding="utf8") as f:
-            for panel in panels:
-                panel_uri = panel['uid']
+def _get_individual_library_panel_setting_and_save(panels, archive, grafana_url, http_headers):
+    def save_library_panel(panel):
+        panel_uri = panel['uid']
 
-                (status, content) = get_library_panel(panel_uri, grafana_url, http_headers)
-                if status == 200:
-                    _save_library_panel_setting(
-                        panel['name'],
-                        panel_uri,
-                        content['result'],
-                        folder_path)
-                    f.write(panel_uri + '\t' + panel['name'] + '\n')
+        (status, content) = get_library_panel(panel_uri, grafana_url, http_headers)
+        if status == 200:
+            _save_library_panel_setting(
+                panel['name'],
+                panel_uri,
+                content['result'],
+                archive)
+            return panel_uri + '\t' + panel['name'] + '\n'
+        return None
 
+    return [line for line in _run_concurrently(panels, save_library_panel) if line]
 
-# Save snapshots
-def _save_snapshots(grafana_url, backup_dir, timestamp, http_headers, **kwargs):  # pylint: disable=unused-argument
-    folder_path = f'{backup_dir}/snapshots/{timestamp}'
-
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
 
-    _get_all_snapshots_and_save(folder_path, grafana_url, http_get_headers=http_headers)
+# Save snapshots
+def _save_snapshots(grafana_url, archive, http_headers, **kwargs):  # pylint: disable=unused-argument
+    _get_all_snapshots_and_save(archive, grafana_url, http_get_headers=http_headers)
     _print_an_empty_line()
 
 
-def _save_snapshot(file_name, snapshot_setting, folder_path):
+def _save_snapshot(file_name, snapshot_setting, archive):
     file_name = file_name.replace('/', '_')
     random_suffix = "".join(random.choice(string.ascii_letters) for _ in range(6))
-    file_path = _save_json(file_name + "_" + random_suffix, snapshot_setting, folder_path, 'snapshot')
+    file_path = archive.add_json('snapshots', file_name + "_" + random_suffix, snapshot_setting, 'snapshot')
     logger.warning("Snapshot: \"%s\" is saved", snapshot_setting.get('dashboard', {}).get("title"))
     logger.info("    -> %s", file_path)
 
 
-def _get_single_snapshot_and_save(snapshot, grafana_url, http_get_headers, folder_path):
+def _get_single_snapshot_and_save(snapshot, grafana_url, http_get_headers, archive):
     (status, content) = get_snapshot(snapshot['key'], grafana_url, http_get_headers)
     if status == 200:
-        _save_snapshot(snapshot['name'], content, folder_path)
+        _save_snapshot(snapshot['name'], content, archive)
     else:
         logger.warning("Getting snapshot %s FAILED, status: %s, msg: %s", snapshot['name'], status, content)
 
 
-def _get_all_snapshots_and_save(folder_path, grafana_url, http_get_headers):
+def _get_all_snapshots_and_save(archive, grafana_url, http_get_headers):
     status_code_and_content = search_snapshot(grafana_url, http_get_headers)
     if status_code_and_content[0] == 200:
         snapshots = status_code_and_content[1]
         logger.info("There are %s snapshots:", len(snapshots))
         for snapshot in snapshots:
             logger.info(snapshot)
-            _get_single_snapshot_and_save(snapshot, grafana_url, http_get_headers, folder_path)
+        _run_concurrently(snapshots, lambda snapshot: _get_single_snapshot_and_save(snapshot, grafana_url,
+                                                                                    http_get_headers, archive))
     else:
         logger.warning("Query snapshot failed, status: %s, msg: %s", status_code_and_content[0],
                        status_code_and_content[1])
 
 
 # Save folders
-def _save_folders(grafana_url, backup_dir, timestamp, http_headers, **kwargs):
-    folder_path = f'{backup_dir}/folders/{timestamp}'
-    log_file = f'folders_{timestamp}.txt'
-
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-
+def _save_folders(grafana_url, archive, http_headers, **kwargs):
     folders = _get_all_folders_in_grafana(grafana_url, http_get_headers=http_headers)
 
     # only include what users want
@@ -260,7 +288,7 @@ def _save_folders(grafana_url, backup_dir, timestamp, http_headers, **kwargs):
         folders = [f for f in folders if f.get('title', '').lower() not in folders_to_exclude]
 
     _print_an_empty_line()
-    _get_individual_folder_setting_and_save(folders, folder_path, log_file, grafana_url, http_get_headers=http_headers)
+    _get_individual_folder_setting_and_save(folders, archive, grafana_url, http_get_headers=http_headers)
     _print_an_empty_line()
 
 
@@ -278,95 +306,85 @@ def _get_all_folders_in_grafana(grafana_url, http_get_headers):
     return []
 
 
-def _save_folder_setting(folder_name, file_name, folder_settings, folder_permissions, folder_path):
-    file_path = _save_json(file_name, folder_settings, folder_path, 'folder')
+def _save_folder_setting(folder_name, file_name, folder_settings, folder_permissions, archive):
+    file_path = archive.add_json('folders', file_name, folder_settings, 'folder')
     logger.warning("Folder: \"%s\" is saved", folder_name)
     logger.info("    -> %s", file_path)
-    file_path = _save_json(file_name, folder_permissions, folder_path, 'folder_permission')
+    file_path = archive.add_json('folders', file_name, folder_permissions, 'folder_permission')
     logger.warning("Folder permissions: %s are saved", folder_name)
     logger.info("    -> %s", file_path)
 
 
-def _get_individual_folder_setting_and_save(folders, folder_path, log_file, grafana_url, http_get_headers):
-    file_path = folder_path + '/' + log_file
-    with open(file_path, 'w+', encoding="utf8") as f:
-        for folder in folders:
-            folder_uri = "uid/" + folder['uid']
-
-            (status_folder_settings, content_folder_settings) = get_folder(folder['uid'], grafana_url, http_get_headers)
-            (status_folder_permissions, content_folder_permissions) = get_folder_permissions(folder['uid'],
-                                                                                             grafana_url,
-                                                                                             http_get_headers)
+def _get_individual_folder_setting_and_save(folders, archive, grafana_url, http_get_headers):
+    def save_folder(folder):
+        folder_uri = "uid/" + folder['uid']
 
-            if status_folder_settings == 200 and status_folder_permissions == 200:
-                _save_folder_setting(
-                    folder['title'],
-                    folder_uri,
-                    content_folder_settings,
-                    content_folder_permissions,
-                    folder_path)
-                f.write(folder_uri + '\t' + folder['title'] + '\n')
+        (status_folder_settings, content_folder_settings) = get_folder(folder['uid'], grafana_url, http_get_headers)
+        (status_folder_permissions, content_folder_permissions) = get_folder_permissions(folder['uid'],
+                                                                                         grafana_url,
+                                                                                         http_get_headers)
 
+        if status_folder_settings == 200 and status_folder_permissions == 200:
+            _save_folder_setting(
+                folder['title'],
+                folder_uri,
+                content_folder_settings,
+                content_folder_permissions,
+                archive)
+            return folder_uri + '\t' + folder['title'] + '\n'
+        return None
 
-# Save annotations
-def _save_annotations(grafana_url, backup_dir, timestamp, http_headers, **kwargs):  # pylint: disable=unused-argument
-    folder_path = f'{backup_dir}/annotations/{timestamp}'
+    archive.add_log('folders', [line for line in _run_concurrently(folders, save_folder) if line])
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
 
-    _get_all_annotations_and_save(folder_path, grafana_url, http_get_headers=http_headers)
+# Save annotations
+def _save_annotations(grafana_url, archive, http_headers, **kwargs):  # pylint: disable=unused-argument
+    _get_all_annotations_and_save(archive, grafana_url, http_get_headers=http_headers)
     _print_an_empty_line()
 
 
-def _save_annotation(file_name, annotation_setting, folder_path):
-    file_path = _save_json(file_name, annotation_setting, folder_path, 'annotation')
+def _save_annotation(file_name, annotation_setting, archive):
+    file_path = archive.add_json('annotations', file_name, annotation_setting, 'annotation')
     logger.warning("Annotation: \"%s\" is saved", annotation_setting.get('text'))
     logger.info("    -> %s", file_path)
 
 
-def _get_all_annotations_and_save(folder_path, grafana_url, http_get_headers):
+def _get_all_annotations_and_save(archive, grafana_url, http_get_headers):
     now = int(round(time.time() * 1000))
     one_month_in_ms = 31 * 24 * 60 * 60 * 1000
 
-    ts_to = now
-    ts_from = now - one_month_in_ms
-    thirteen_months_retention = (now - (13 * one_month_in_ms))
+    # annotations are searched one month at a time, going back as far as the 13 months retention
+    time_ranges = [(now - (month + 1) * one_month_in_ms, now - month * one_month_in_ms) for month in range(12)]
 
-    while ts_from > thirteen_months_retention:
+    def save_annotations_in_range(time_range):
+        ts_from, ts_to = time_range
         status_code_and_content = search_annotations(grafana_url, ts_from, ts_to, http_get_headers)
         if status_code_and_content[0] == 200:
             annotations_batch = status_code_and_content[1]
             logger.info("There are %s annotations:", len(annotations_batch))
             for annotation in annotations_batch:
                 logger.info(annotation)
-                _save_annotation(str(annotation['id']), annotation, folder_path)
+                _save_annotation(str(annotation['id']), annotation, archive)
         else:
             logger.warning("Query annotation FAILED, status: %s, msg: %s", status_code_and_content[0],
                            status_code_and_content[1])
 
-        ts_to = ts_from
-        ts_from = ts_from - one_month_in_ms
+    _run_concurrently(time_ranges, save_annotations_in_range)
 
 
 # Save data sources
-def _save_datasources(grafana_url, backup_dir, timestamp, http_headers, **kwargs):  # pylint: disable=unused-argument
-    folder_path = f'{backup_dir}/datasources/{timestamp}'
-
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-
-    _get_all_datasources_and_save(folder_path, grafana_url, http_get_headers=http_headers)
+def _save_datasources(grafana_url, archive, http_headers, **kwargs):  # pylint: disable=unused-argument
+    _get_all_datasources_and_save(archive, grafana_url, http_get_headers=http_headers)
     _print_an_empty_line()
 
 
-def _save_datasource(file_name, datasource_setting, folder_path):
-    file_path = _save_json(file_name, datasource_setting, folder_path, 'datasource')
+def _save_datasource(file_name, datasource_setting, archive):
+    file_path = archive.add_json('datasources', file_name, datasource_setting, 'datasource')
     logger.warning("Datasource: \"%s\" is saved", datasource_setting['name'])
     logger.info("    -> %s", file_path)
 
 
-def _get_all_datasources_and_save(folder_path, grafana_url, http_get_headers):
+def _get_all_datasources_and_save(archive, grafana_url, http_get_headers):
     status_code_and_content = search_datasource(grafana_url, http_get_headers)
     if status_code_and_content[0] == 200:
         datasources = status_code_and_content[1]
@@ -374,25 +392,11 @@ def _get_all_datasources_and_save(folder_path, grafana_url, http_get_headers):
         for datasource in datasources:
             logger.info(datasource)
             datasource_name = datasource['uid']
-            _save_datasource(datasource_name, datasource, folder_path)
+            _save_datasource(datasource_name, datasource, archive)
     else:
         logger.info("Query datasource FAILED, status: %s, msg: %s", status_code_and_content[0],
                     status_code_and_content[1])
 
 
-def _save_json(file_name, data, folder_path, extension, pretty_print=None):
-    pattern = "^db/|^uid/"
-    if re.match(pattern, file_name):
-        file_name = re.sub(pattern, '', file_name)
-
-    file_path = folder_path + '/' + file_name + '.' + extension
-    with open(file_path, 'w', encoding="utf8") as f:
-        if pretty_print:
-            f.write(json.dumps(data, sort_keys=True, indent=4, separators=(',', ': ')))
-        else:
-            f.write(json.dumps(data))
-    return file_path
-
-
 def _print_an_empty_line():
     logger.info('')
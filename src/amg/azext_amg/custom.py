@@ -23,6 +23,7 @@ logger = get_logger(__name__)
 
 
 grafana_endpoints = {}
+grafana_data_plane_headers = {}
 
 
 def create_grafana(cmd, resource_group_name, grafana_name,
@@ -242,11 +243,7 @@ def backup_grafana(cmd, grafana_name, components=None, directory=None, folders_t
     from .backup import backup
     _health_endpoint_reachable(cmd, grafana_name, resource_group_name=resource_group_name)
 
-    creds = _get_data_plane_creds(cmd, api_key_or_token=None, subscription=None)
-    headers = {
-        "content-type": "application/json",
-        "authorization": "Bearer " + creds[1]
-    }
+    headers = _get_data_plane_headers(cmd, api_key_or_token=None, subscription=None)
 
     backup(grafana_name=grafana_name,
            grafana_url=_get_grafana_endpoint(cmd, resource_group_name, grafana_name, subscription=None),
@@ -260,11 +257,7 @@ def backup_grafana(cmd, grafana_name, components=None, directory=None, folders_t
 def restore_grafana(cmd, grafana_name, archive_file, components=None, remap_data_sources=None,
                     resource_group_name=None):
     _health_endpoint_reachable(cmd, grafana_name, resource_group_name=resource_group_name)
-    creds = _get_data_plane_creds(cmd, api_key_or_token=None, subscription=None)
-    headers = {
-        "content-type": "application/json",
-        "authorization": "Bearer " + creds[1]
-    }
+    headers = _get_data_plane_headers(cmd, api_key_or_token=None, subscription=None)
     from .restore import restore
 
     data_sources = []
@@ -279,7 +272,8 @@ def restore_grafana(cmd, grafana_name, archive_file, components=None, remap_data
             destination_datasources=data_sources)
 
 
-def sync_dashboard(cmd, source, destination, folders_to_include=None, folders_to_exclude=None, dry_run=None):
+def sync_dashboard(cmd, source, destination, folders_to_include=None, folders_to_exclude=None, dry_run=None,
+                   incremental=None):
     # pylint: disable=too-many-locals, too-many-branches, too-many-statements
     if not is_valid_resource_id(source):
         raise ArgumentUsageError(f"'{source}' isn't a valid resource id, please refer to example commands in help")
@@ -314,9 +308,10 @@ def sync_dashboard(cmd, source, destination, folders_to_include=None, folders_to
     source_data_sources = list_data_sources(cmd, source_workspace, source_resource_group,
                                             subscription=source_subscription)
 
-    from .utils import create_datasource_mapping, remap_datasource_uids
+    from .utils import create_datasource_mapping, remap_datasource_uids, max_concurrent_requests
     uid_mapping = create_datasource_mapping(source_data_sources, destination_data_sources)
 
+    # the dashboards of each workspace are listed with a single search
     source_dashboards = list_dashboards(cmd, source_workspace, resource_group_name=source_resource_group,
                                         subscription=source_subscription)
 
@@ -325,32 +320,84 @@ def sync_dashboard(cmd, source, destination, folders_to_include=None, folders_to
         "dashboards_synced": [],
         "dashboards_skipped": [],
     }
-    data_source_missed = set()
+    dashboards_to_fetch = []
     for dashboard in source_dashboards:
-        uid = dashboard["uid"]
-        source_dashboard = show_dashboard(cmd, source_workspace, uid, resource_group_name=source_resource_group,
-                                          subscription=source_subscription)
+        # dashboards in the General folder have no folder in search results
+        folder_title = dashboard.get("folderTitle") or "General"
+        if _is_folder_skipped(folder_title, folders_to_include, folders_to_exclude):
+            summary["dashboards_skipped"].append(folder_title + "/" + dashboard["title"])
+        else:
+            dashboards_to_fetch.append(dashboard)
+
+    synced_dashboards = {}
+    destination_dashboards = {}
+    new_synced_dashboards = {}
+    datasource_mapping_hash = None
+    if incremental:
+        summary["dashboards_unchanged"] = []
+        sync_state = _load_sync_state(cmd, source, destination)
+        destination_dashboards = {d["uid"]: d for d in list_dashboards(cmd, destination_workspace,
+                                                                       resource_group_name=destination_resource_group,
+                                                                       subscription=destination_subscription)}
+        # what was synced before is only trusted while the data sources are remapped the same way
+        datasource_mapping_hash = _get_hash(uid_mapping)
+        if sync_state.get("datasource_mapping") == datasource_mapping_hash:
+            synced_dashboards = sync_state.get("dashboards", {})
+
+    def is_unchanged_since_last_sync(dashboard):
+        synced_dashboard = synced_dashboards.get(dashboard["uid"])
+        folder_title = (dashboard.get("folderTitle") or "General").lower()
+        if (not synced_dashboard or synced_dashboard.get("folder") != folder_title or
+                not (synced_dashboard.get("provisioned") or dashboard["uid"] in destination_dashboards)):
+            return False
+        return _get_dashboard_version(cmd, source_workspace, dashboard, source_resource_group,
+                                      source_subscription) == synced_dashboard.get("version")
+
+    def fetch_source_dashboard(dashboard):
+        # a dashboard whose version at the source is the one synced last time is not fetched at all
+        if incremental and is_unchanged_since_last_sync(dashboard):
+            return None
+        return show_dashboard(cmd, source_workspace, dashboard["uid"], resource_group_name=source_resource_group,
+                              subscription=source_subscription)
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+        fetched_dashboards = list(executor.map(fetch_source_dashboard, dashboards_to_fetch))
+
+    dashboards_to_sync = []
+    data_source_missed = set()
+    for dashboard, source_dashboard in zip(dashboards_to_fetch, fetched_dashboards):
+        if source_dashboard is None:
+            synced_dashboard = synced_dashboards[dashboard["uid"]]
+            dashboard_path = (dashboard.get("folderTitle") or "General") + "/" + dashboard["title"]
+            summary["dashboards_skipped" if synced_dashboard.get("provisioned") else "dashboards_unchanged"].append(
+                dashboard_path)
+            new_synced_dashboards[dashboard["uid"]] = synced_dashboard
+            continue
+
+        uid = source_dashboard["dashboard"]["uid"]
         folder_title = source_dashboard["meta"]["folderTitle"]
         dashboard_path = folder_title + "/" + source_dashboard["dashboard"]["title"]
 
-        should_skip = False
         if source_dashboard["meta"].get("provisioned"):
-            should_skip = True
-        else:
-            if folders_to_include:
-                should_skip = not next((f for f in folders_to_include if folder_title.lower() == f.lower()), None)
-            if not should_skip and folders_to_exclude:
-                should_skip = next((f for f in folders_to_exclude if folder_title.lower() == f.lower()), None)
-
-        if should_skip:
             summary["dashboards_skipped"].append(dashboard_path)
+            if incremental:
+                new_synced_dashboards[uid] = {"version": source_dashboard["dashboard"].get("version"),
+                                              "folder": folder_title.lower(), "provisioned": True}
             continue
 
         # Figure out whether we shall correct the data sources. It is possible the Uids are different
         remap_datasource_uids(source_dashboard.get("dashboard"), uid_mapping, data_source_missed)
-        if not dry_run:
-            delete_dashboard(cmd, destination_workspace, uid, resource_group_name=destination_resource_group,
-                             ignore_error=True, subscription=destination_subscription)
+
+        if incremental:
+            dashboard_hash = _get_dashboard_hash(source_dashboard["dashboard"], folder_title)
+            new_synced_dashboards[uid] = {"hash": dashboard_hash, "folder": folder_title.lower(),
+                                          "version": source_dashboard["dashboard"].get("version")}
+            if _is_dashboard_unchanged(cmd, uid, dashboard_hash, destination_dashboards.get(uid),
+                                       synced_dashboards.get(uid), destination_workspace, destination_resource_group,
+                                       destination_subscription):
+                summary["dashboards_unchanged"].append(dashboard_path)
+                continue
 
         # ensure the folder exists at destination side
         if folder_title.lower() == "general":
@@ -368,17 +415,103 @@ def sync_dashboard(cmd, source, destination, folders_to_include=None, folders_to
                 destination_folders[folder_title.lower()] = folder_id or "dry run dummy"
 
         summary["dashboards_synced"].append(dashboard_path)
-        if not dry_run:
-            logger.warning("Syncing dashboard: %s", dashboard_path)
-            _create_dashboard(cmd, destination_workspace, definition=source_dashboard, overwrite=True,
-                              folder_id=folder_id, resource_group_name=destination_resource_group,
-                              for_sync=True)
+        dashboards_to_sync.append((source_dashboard, folder_id, dashboard_path))
+
+    def sync_single_dashboard(dashboard_to_sync):
+        source_dashboard, folder_id, dashboard_path = dashboard_to_sync
+        logger.warning("Syncing dashboard: %s", dashboard_path)
+        delete_dashboard(cmd, destination_workspace, source_dashboard["dashboard"]["uid"],
+                         resource_group_name=destination_resource_group, ignore_error=True,
+                         subscription=destination_subscription)
+        _create_dashboard(cmd, destination_workspace, definition=source_dashboard, overwrite=True,
+                          folder_id=folder_id, resource_group_name=destination_resource_group,
+                          for_sync=True, subscription=destination_subscription)
+
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+            list(executor.map(sync_single_dashboard, dashboards_to_sync))
+        if incremental:
+            _save_sync_state(cmd, source, destination, {"datasource_mapping": datasource_mapping_hash,
+                                                        "dashboards": new_synced_dashboards})
+
     if data_source_missed:
         logger.warning(("A few data sources used by dashboards are unavailable at destination: \"%s\""
                         ". Please configure them."), ", ".join(data_source_missed))
     return summary
 
 
+def _is_folder_skipped(folder_title, folders_to_include, folders_to_exclude):
+    if folders_to_include and not next((f for f in folders_to_include if folder_title.lower() == f.lower()), None):
+        return True
+    return bool(folders_to_exclude and next((f for f in folders_to_exclude if folder_title.lower() == f.lower()), None))
+
+
+def _get_hash(content):
+    import hashlib
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _get_dashboard_hash(dashboard, folder_title):
+    # id and version are assigned by each workspace, everything else has to match for the dashboards to be the same
+    content = {k: v for k, v in dashboard.items() if k not in ("id", "version")}
+    return _get_hash({"folder": folder_title.lower(), "dashboard": content})
+
+
+def _get_dashboard_version(cmd, grafana_name, dashboard, resource_group_name, subscription):
+    # search results carry no version, the latest entry of the version history is much smaller than the dashboard
+    try:
+        response = _send_request(cmd, resource_group_name, grafana_name, "get",
+                                 f"/api/dashboards/id/{dashboard['id']}/versions?limit=1", subscription=subscription)
+        versions = json.loads(response.content)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.info("Failed to get the version of dashboard %s, it will be fetched: %s", dashboard["uid"], e)
+        return None
+    if isinstance(versions, dict):  # newer Grafana versions return the history in pages
+        versions = versions.get("versions") or []
+    return versions[0].get("version") if versions else None
+
+
+def _is_dashboard_unchanged(cmd, uid, dashboard_hash, destination_dashboard, synced_dashboard,
+                            destination_workspace, destination_resource_group, destination_subscription):
+    if not destination_dashboard:
+        return False
+    if synced_dashboard:
+        return synced_dashboard.get("hash") == dashboard_hash
+    # nothing was recorded for this dashboard yet, so compare against what is at the destination right now
+    existing_dashboard = show_dashboard(cmd, destination_workspace, uid,
+                                        resource_group_name=destination_resource_group,
+                                        subscription=destination_subscription)
+    existing_hash = _get_dashboard_hash(existing_dashboard["dashboard"], existing_dashboard["meta"]["folderTitle"])
+    return existing_hash == dashboard_hash
+
+
+def _get_sync_state_path(cmd, source, destination):
+    import os
+    import hashlib
+    state_key = hashlib.sha256(f"{source.lower()}|{destination.lower()}".encode("utf-8")).hexdigest()
+    return os.path.join(cmd.cli_ctx.config.config_dir, "grafana_dashboard_sync", state_key + ".json")
+
+
+def _load_sync_state(cmd, source, destination):
+    state_path = _get_sync_state_path(cmd, source, destination)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.info("No dashboard sync state loaded from %s: %s", state_path, e)
+        return {}
+
+
+def _save_sync_state(cmd, source, destination, state):
+    import os
+    state_path = _get_sync_state_path(cmd, source, destination)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    temp_path = state_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, state_path)
+
+
 def show_dashboard(cmd, grafana_name, uid, resource_group_name=None, api_key_or_token=None, subscription=None):
     response = _send_request(cmd, resource_group_name, grafana_name, "get", "/api/dashboards/uid/" + uid,
                              api_key_or_token=api_key_or_token, subscription=subscription)
@@ -395,7 +528,7 @@ def list_dashboards(cmd, grafana_name, resource_group_name=None, api_key_or_toke
                                  api_key_or_token=api_key_or_token, subscription=subscription)
         temp = json.loads(response.content)
         dashboards += temp
-        if len(temp) == 0:
+        if len(temp) < limit:  # a page that isn't full is the last one
             break
         current_page += 1
     return dashboards
@@ -949,6 +1082,29 @@ def _get_data_plane_creds(cmd, api_key_or_token, subscription):
     return creds
 
 
+def _get_data_plane_token(cmd, api_key_or_token, subscription):
+    creds = _get_data_plane_creds(cmd, api_key_or_token, subscription)
+    if api_key_or_token:
+        return creds[1], None
+    token_entry = creds[2]
+    if "expires_on" in token_entry:
+        return creds[1], token_entry["expires_on"]
+    # older versions of azure-cli only return the expiration as a local datetime string
+    from datetime import datetime
+    return creds[1], datetime.strptime(token_entry["expiresOn"], "%Y-%m-%d %H:%M:%S.%f").timestamp()
+
+
+def _get_data_plane_headers(cmd, api_key_or_token, subscription):
+    # tokens are shared by all requests sent with the same credentials, and renewed shortly before they expire
+    key = (subscription, api_key_or_token)
+    headers = grafana_data_plane_headers.get(key)
+    if not headers:
+        from .utils import DataPlaneHeaders
+        headers = DataPlaneHeaders(lambda: _get_data_plane_token(cmd, api_key_or_token, subscription))
+        grafana_data_plane_headers[key] = headers
+    return headers
+
+
 def _get_grafana_endpoint(cmd, resource_group_name, grafana_name, subscription):
     endpoint = grafana_endpoints.get(grafana_name)
     if not endpoint:
@@ -962,20 +1118,10 @@ def _send_request(cmd, resource_group_name, grafana_name, http_method, path, bod
                   api_key_or_token=None, subscription=None):
     endpoint = _get_grafana_endpoint(cmd, resource_group_name, grafana_name, subscription)
 
-    creds = _get_data_plane_creds(cmd, api_key_or_token, subscription)
-
-    headers = {
-        "content-type": "application/json",
-        "authorization": "Bearer " + creds[1]
-    }
+    headers = _get_data_plane_headers(cmd, api_key_or_token, subscription)
 
-    # TODO: handle re-try on 429
-    response = requests.request(http_method,
-                                url=endpoint + path,
-                                headers=headers,
-                                json=body,
-                                timeout=60,
-                                verify=(not should_disable_connection_verify()))
+    from .utils import send_grafana_request
+    response = send_grafana_request(http_method, endpoint + path, headers, json_body=body)
     if response.status_code >= 400:
         if raise_for_error_status:
             logger.warning(str(response.content))
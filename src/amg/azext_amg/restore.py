@@ -3,22 +3,30 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import collections
 import json
-from glob import glob
+import os
+import shutil
 import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from azure.cli.core.azclierror import ArgumentUsageError
 from knack.log import get_logger
 
 from .utils import (get_folder_id, send_grafana_post, send_grafana_patch,
-                    send_grafana_get, create_datasource_mapping, remap_datasource_uids)
+                    send_grafana_get, create_datasource_mapping, remap_datasource_uids,
+                    max_concurrent_requests)
 
 logger = get_logger(__name__)
 
 uid_mapping = {}
 
+# Components restored in the same tier don't depend on each other. Folders and data sources are referenced by
+# library panels, which in turn are referenced by dashboards, annotations can be attached to dashboards.
+restore_tiers = [['folder', 'datasource'], ['library_panel'], ['dashboard', 'snapshot'], ['annotation']]
+
 
 def restore(grafana_url, archive_file, components, http_headers, destination_datasources=None):
     try:
@@ -26,64 +34,115 @@ def restore(grafana_url, archive_file, components, http_headers, destination_dat
     except IOError as e:
         raise ArgumentUsageError(f"failed to open {archive_file} as a tar file") from e
 
-    restore_functions = collections.OrderedDict()
-    restore_functions['folder'] = _create_folder
-    restore_functions['dashboard'] = _create_dashboard
-    restore_functions['library_panel'] = _create_library_panel
-    restore_functions['snapshot'] = _create_snapshot
-    restore_functions['annotation'] = _create_annotation
-    restore_functions['datasource'] = _create_datasource
+    restore_functions = {
+        'folder': _create_folder,
+        'dashboard': _create_dashboard,
+        'library_panel': _create_library_panel,
+        'snapshot': _create_snapshot,
+        'annotation': _create_annotation,
+        'datasource': _create_datasource
+    }
 
-    with tarfile.open(name=archive_file, mode='r:gz') as tar:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tar.extractall(tmpdir)
-            tar.close()
-            _restore_components(grafana_url, restore_functions, tmpdir, components, http_headers,
-                                destination_datasources=destination_datasources)
+    _restore_components(grafana_url, restore_functions, archive_file, components, http_headers,
+                        destination_datasources=destination_datasources)
 
 
-def _restore_components(grafana_url, restore_functions, tmpdir, components, http_headers, destination_datasources=None):
+def _restore_components(grafana_url, restore_functions, archive_file, components, http_headers,
+                        destination_datasources=None):
 
     if components:
         exts = [c[:-1] for c in components]
     else:
         exts = list(restore_functions.keys())
 
-    # to re-map data sources, create a mapping from source to destination workspace before transform the dashboards
-    if destination_datasources:
-        if "datasource" in exts:  # first let us skip datasource restoration
-            exts.pop(exts.index("datasource"))
-        datasource_backups = glob(f'{tmpdir}/**/*.datasource', recursive=True)
-        if not datasource_backups:
-            logger.warning('"remap data source" is on, but data sources info wasn\'t archived to transform dashboards')
-
-        source_datasources = []
-        for file_path in datasource_backups:
-            with open(file_path, 'r', encoding="utf8") as f:
-                data = f.read()
-            datasource = json.loads(data)
-            source_datasources.append(datasource)
-
-        global uid_mapping  # pylint: disable=global-statement
-        uid_mapping = create_datasource_mapping(source_datasources, destination_datasources)
-
     if "dashboard" in exts:  # dashboard restoration can't work if linked library panels don't exist
-        exts.insert(0, "library_panel")
-
-    if "folder" in exts:  # make "folder" be the first to restore, so dashboards can be positioned under a right folder
-        exts.insert(0, exts.pop(exts.index("folder")))
+        exts.append("library_panel")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # the archive is decompressed once, the members needed by every tier are spooled to disk by extension
+        index = _index_archive_members(archive_file, exts + ["datasource"] if destination_datasources else exts,
+                                       tmpdir)
+
+        # to re-map data sources, create a mapping from source to destination workspace before transform the
+        # dashboards
+        if destination_datasources:
+            if "datasource" in exts:  # first let us skip datasource restoration
+                exts.remove("datasource")
+            source_datasources = [json.loads(data) for _, data in _read_archive_members(index, ["datasource"])]
+            if not source_datasources:
+                logger.warning('"remap data source" is on, but data sources info wasn\'t archived to transform '
+                               'dashboards')
+
+            global uid_mapping  # pylint: disable=global-statement
+            uid_mapping = create_datasource_mapping(source_datasources, destination_datasources)
+
+        for tier in restore_tiers:
+            tier_exts = [ext for ext in tier if ext in exts]
+            if tier_exts:
+                _restore_tier(grafana_url, restore_functions, index, tier_exts, http_headers)
+
+
+def _index_archive_members(archive_file, exts, tmpdir):
+    # returns the paths of the archived components with one of the given extensions, grouped by extension in archive
+    # order. The archive is read as a stream and the members are written under names of our own, so nothing in the
+    # archive decides where files are written.
+    index = {ext: [] for ext in exts}
+    with tarfile.open(name=archive_file, mode='r|gz') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            ext = next((e for e in exts if member.name.endswith('.' + e)), None)
+            if ext:
+                file_path = os.path.join(tmpdir, f'{len(index[ext])}.{ext}')
+                with open(file_path, 'wb') as f:
+                    shutil.copyfileobj(tar.extractfile(member), f)
+                index[ext].append((member.name, file_path))
+    return index
+
+
+def _read_archive_members(index, exts):
+    # yields (ext, content) of the indexed components with one of the given extensions
+    for ext in exts:
+        for member_name, file_path in index.get(ext, []):
+            logger.info('Restoring %s: %s', ext, member_name)
+            with open(file_path, 'r', encoding='utf8') as f:
+                yield ext, f.read()
+
+
+def _restore_tier(grafana_url, restore_functions, index, exts, http_headers):
+    stats = {ext: {'total': 0, 'succeeded': 0, 'start': time.time(), 'end': time.time()} for ext in exts}
+    stats_lock = threading.Lock()
+    # bounds how many components are held in memory while waiting for their turn to be restored
+    pending = threading.BoundedSemaphore(max_concurrent_requests * 2)
+
+    def restore_component(ext, data):
+        try:
+            succeeded = restore_functions[ext](grafana_url, data, http_headers)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Failed to restore %s: %s", ext, e)
+            succeeded = False
+        finally:
+            pending.release()
+        with stats_lock:
+            stats[ext]['total'] += 1
+            stats[ext]['succeeded'] += 1 if succeeded else 0
+            stats[ext]['end'] = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+        for ext, data in _read_archive_members(index, exts):
+            pending.acquire()  # pylint: disable=consider-using-with
+            executor.submit(restore_component, ext, data)
 
     for ext in exts:
-        for file_path in glob(f'{tmpdir}/**/*.{ext}', recursive=True):
-            logger.info('Restoring %s: %s', ext, file_path)
-            restore_functions[ext](grafana_url, file_path, http_headers)
+        ext_stats = stats[ext]
+        if ext_stats['total']:
+            elapsed = max(ext_stats['end'] - ext_stats['start'], 0.001)
+            logger.warning("Restored %s of %s %s(s) in %.1f seconds (%.1f per second)", ext_stats['succeeded'],
+                           ext_stats['total'], ext.replace('_', ' '), elapsed, ext_stats['total'] / elapsed)
 
 
 # Restore dashboards
-def _create_dashboard(grafana_url, file_path, http_headers):
-    with open(file_path, 'r', encoding="utf8") as f:
-        data = f.read()
-
+def _create_dashboard(grafana_url, data, http_headers):
     content = json.loads(data)
     content['dashboard']['id'] = None
 
@@ -100,13 +159,11 @@ def _create_dashboard(grafana_url, file_path, http_headers):
     dashboard_title = content['dashboard'].get('title', '')
     logger.warning("Create dashboard \"%s\". %s", dashboard_title, "SUCCESS" if result[0] == 200 else "FAILURE")
     logger.info("status: %s, msg: %s", result[0], result[1])
+    return result[0] == 200
 
 
 # Restore Library Panel
-def _create_library_panel(grafana_url, file_path, http_headers):
-    with open(file_path, 'r', encoding="utf8") as f:
-        data = f.read()
-
+def _create_library_panel(grafana_url, data, http_headers):
     payload = json.loads(data)
     payload['id'] = None
     payload['folderId'] = get_folder_id(payload, grafana_url, http_post_headers=http_headers)
@@ -132,13 +189,11 @@ def _create_library_panel(grafana_url, file_path, http_headers):
                                                    json.dumps(patch_payload), http_headers)
     logger.warning("Create library panel \"%s\". %s", panel_name, "SUCCESS" if status == 200 else "FAILURE")
     logger.info("status: %s, msg: %s", status, content)
+    return status == 200
 
 
 # Restore snapshots
-def _create_snapshot(grafana_url, file_path, http_headers):
-    with open(file_path, 'r', encoding="utf8") as f:
-        data = f.read()
-
+def _create_snapshot(grafana_url, data, http_headers):
     snapshot = json.loads(data)
     try:
         snapshot['name'] = snapshot['dashboard']['title']
@@ -148,38 +203,33 @@ def _create_snapshot(grafana_url, file_path, http_headers):
     (status, content) = send_grafana_post(f'{grafana_url}/api/snapshots', json.dumps(snapshot), http_headers)
     logger.warning("Create snapshot \"%s\". %s", snapshot['name'], "SUCCESS" if status == 200 else "FAILURE")
     logger.info("status: %s, msg: %s", status, content)
+    return status == 200
 
 
 # Restore folders
-def _create_folder(grafana_url, file_path, http_headers):
-    with open(file_path, 'r', encoding="utf8") as f:
-        data = f.read()
-
+def _create_folder(grafana_url, data, http_headers):
     folder = json.loads(data)
     result = send_grafana_post(f'{grafana_url}/api/folders', json.dumps(folder), http_headers)
     # 412 means the folder has existed
     logger.warning("Create folder \"%s\". %s", folder.get('title', ''),
                    "SUCCESS" if result[0] in [200, 412] else "FAILURE")
     logger.info("status: %s, msg: %s", result[0], result[1])
+    return result[0] in [200, 412]
 
 
 # Restore annotations
-def _create_annotation(grafana_url, file_path, http_headers):
-    with open(file_path, 'r', encoding="utf8") as f:
-        data = f.read()
-
+def _create_annotation(grafana_url, data, http_headers):
     annotation = json.loads(data)
     result = send_grafana_post(f'{grafana_url}/api/annotations', json.dumps(annotation), http_headers)
     logger.warning("Create annotation \"%s\". %s", annotation['id'], "SUCCESS" if result[0] == 200 else "FAILURE")
     logger.info("status: %s, msg: %s", result[0], result[1])
+    return result[0] == 200
 
 
 # Restore data sources
-def _create_datasource(grafana_url, file_path, http_headers):
-    with open(file_path, 'r', encoding="utf8") as f:
-        data = f.read()
-
+def _create_datasource(grafana_url, data, http_headers):
     datasource = json.loads(data)
     result = send_grafana_post(f'{grafana_url}/api/datasources', json.dumps(datasource), http_headers)
     logger.warning("Create datasource \"%s\". %s", datasource['name'], "SUCCESS" if result[0] == 200 else "FAILURE")
     logger.info("status: %s, msg: %s", result[0], result[1])
+    return result[0] == 200
@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_amg import backup as backup_module
+from azext_amg.backup import _BackupArchive, backup
+
+
+class BackupArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backup_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.backup_dir, ignore_errors=True)
+        self.archive_file = os.path.join(self.backup_dir, 'grafana-202301011200.tar.gz')
+
+    def _members(self, archive_file=None):
+        with tarfile.open(archive_file or self.archive_file, 'r:gz') as tar:
+            return {member.name: tar.extractfile(member).read().decode('utf8') for member in tar if member.isfile()}
+
+    def test_members_keep_the_backup_dir_layout(self):
+        with _BackupArchive(self.archive_file, self.backup_dir, '202301011200') as archive:
+            file_path = archive.add_json('dashboards', 'uid/abc', {'dashboard': {'title': 'A'}}, 'dashboard')
+            archive.add_log('dashboards', ['uid/abc\tA\n'])
+            archive.add_log('folders', [])
+
+        prefix = self.backup_dir.lstrip('/') + '/dashboards/202301011200/'
+        self.assertEqual(file_path, self.backup_dir + '/dashboards/202301011200/abc.dashboard')
+        self.assertEqual(self._members(), {prefix + 'abc.dashboard': '{"dashboard": {"title": "A"}}',
+                                           prefix + 'dashboards_202301011200.txt': 'uid/abc\tA\n'})
+        self.assertEqual(os.listdir(self.backup_dir), ['grafana-202301011200.tar.gz'])
+
+    def test_relative_backup_dir(self):
+        cwd = os.getcwd()
+        os.chdir(self.backup_dir)
+        self.addCleanup(os.chdir, cwd)
+        with _BackupArchive('backup.tar.gz', 'out', '202301011200') as archive:
+            archive.add_json('datasources', 'prometheus', {'name': 'prometheus'}, 'datasource')
+
+        self.assertEqual(list(self._members('backup.tar.gz')), ['out/datasources/202301011200/prometheus.datasource'])
+
+    def test_failed_backup_leaves_no_archive(self):
+        with open(self.archive_file, 'w') as f:
+            f.write('previous backup')
+        with self.assertRaises(ValueError):
+            with _BackupArchive(self.archive_file, self.backup_dir, '202301011200') as archive:
+                archive.add_json('folders', 'uid/f1', {'title': 'f1'}, 'folder')
+                raise ValueError('backup failed')
+
+        self.assertEqual(os.listdir(self.backup_dir), ['grafana-202301011200.tar.gz'])
+        with open(self.archive_file) as f:
+            self.assertEqual(f.read(), 'previous backup')
+
+    def test_debug_keeps_files_on_disk(self):
+        with mock.patch.dict(os.environ, {'AMG_DEBUG': 'true'}):
+            with _BackupArchive(self.archive_file, self.backup_dir, '202301011200') as archive:
+                file_path = archive.add_json('folders', 'uid/f1', {'title': 'f1'}, 'folder')
+
+        with open(file_path, encoding='utf8') as f:
+            self.assertEqual(json.load(f), {'title': 'f1'})
+        self.assertEqual(len(self._members()), 1)
+
+    @mock.patch.object(backup_module, 'get_library_panel')
+    @mock.patch.object(backup_module, 'search_library_panels')
+    @mock.patch.object(backup_module, 'get_dashboard')
+    @mock.patch.object(backup_module, 'search_dashboard')
+    def test_backup_dashboards(self, search_dashboard, get_dashboard, search_library_panels, get_library_panel):
+        pages = {1: [{'uid': 'd{}'.format(i), 'title': 'Dashboard {}'.format(i), 'folderTitle': 'team' if i % 2 else ''}
+                     for i in range(20)]}
+        search_dashboard.side_effect = lambda page, limit, url, headers: (200, pages.get(page, []))
+        get_dashboard.side_effect = lambda uri, url, headers: (200, {'dashboard': {'uid': uri[4:]}})
+        search_library_panels.side_effect = lambda page, url, headers: (200, [{'uid': 'p1', 'name': 'Panel'}] if page == 1 else [])
+        get_library_panel.return_value = (200, {'result': {'uid': 'p1'}})
+
+        backup('grafana', 'https://grafana', self.backup_dir, ['dashboards'], {}, folders_to_include=['team'])
+
+        archive_file = [f for f in os.listdir(self.backup_dir) if f.endswith('.tar.gz')][0]
+        members = self._members(os.path.join(self.backup_dir, archive_file))
+        dashboards = sorted(name.rsplit('/', 1)[1] for name in members if name.endswith('.dashboard'))
+        self.assertEqual(dashboards, sorted('d{}.dashboard'.format(i) for i in range(1, 20, 2)))
+        self.assertEqual([name.rsplit('/', 1)[1] for name in members if name.endswith('.library_panel')], ['p1.library_panel'])
+        # The log lists the dashboards in the order they were returned by the search
+        log = next(content for name, content in members.items() if name.endswith('.txt') and '/dashboards/' in name)
+        self.assertEqual(log.splitlines(), ['uid/d{}\tDashboard {}'.format(i, i) for i in range(1, 20, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_amg import custom
+
+SOURCE = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Dashboard/grafana/source'
+DESTINATION = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Dashboard/grafana/destination'
+
+
+class DashboardSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir, ignore_errors=True)
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.config.config_dir = self.config_dir
+
+        # uid -> (folder, version, panels, provisioned)
+        self.source = {'d1': ['Team', 1, ['cpu'], False],
+                       'd2': ['General', 4, ['memory'], False],
+                       'd3': ['Skipped', 1, ['disk'], False],
+                       'd4': ['Team', 2, ['network'], True]}
+        self.destination = {}
+        self.calls = []
+
+        def list_dashboards(cmd, grafana_name, resource_group_name=None, subscription=None):
+            self.calls.append(('search', grafana_name))
+            if grafana_name == 'destination':
+                return [{'uid': uid, 'title': uid} for uid in self.destination]
+            return [dict({'id': index, 'uid': uid, 'title': uid.upper()}, **({'folderTitle': folder} if folder != 'General' else {}))
+                    for index, (uid, (folder, _, _, _)) in enumerate(sorted(self.source.items()))]
+
+        def show_dashboard(cmd, grafana_name, uid, resource_group_name=None, subscription=None):
+            self.calls.append(('show', grafana_name, uid))
+            if grafana_name == 'destination':
+                return copy.deepcopy(self.destination[uid])
+            folder, version, panels, provisioned = self.source[uid]
+            return {'dashboard': {'uid': uid, 'title': uid.upper(), 'version': version, 'panels': list(panels)},
+                    'meta': {'folderTitle': folder, 'provisioned': provisioned}}
+
+        def send_request(cmd, resource_group_name, grafana_name, http_method, path, subscription=None):
+            self.calls.append(('versions', grafana_name, path))
+            uid = sorted(self.source)[int(path.split('/')[4])]
+            return mock.Mock(content=json.dumps([{'version': self.source[uid][1]}]))
+
+        def create_dashboard(cmd, grafana_name, definition, folder_id=None, **kwargs):
+            self.destination[definition['dashboard']['uid']] = copy.deepcopy(definition)
+
+        patches = {'_health_endpoint_reachable': None,
+                   'list_folders': mock.Mock(return_value=[{'title': 'Team', 'id': 7}]),
+                   'list_data_sources': mock.Mock(return_value=[]),
+                   'list_dashboards': list_dashboards,
+                   'show_dashboard': show_dashboard,
+                   '_send_request': send_request,
+                   'delete_dashboard': None,
+                   '_create_dashboard': create_dashboard,
+                   'create_folder': None}
+        for name, side_effect in patches.items():
+            patcher = mock.patch.object(custom, name, new=side_effect if isinstance(side_effect, mock.Mock) else mock.Mock(side_effect=side_effect))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _sync(self, **kwargs):
+        self.calls = []
+        return custom.sync_dashboard(self.cmd, SOURCE, DESTINATION, folders_to_exclude=['skipped'], incremental=True, **kwargs)
+
+    def _calls(self, kind):
+        return [call for call in self.calls if call[0] == kind]
+
+    def test_incremental_sync(self):
+        summary = self._sync()
+        self.assertEqual(summary['dashboards_synced'], ['Team/D1', 'General/D2'])
+        self.assertEqual(summary['dashboards_skipped'], ['Skipped/D3', 'Team/D4'])
+        self.assertEqual(summary['dashboards_unchanged'], [])
+        self.assertEqual(sorted(self.destination), ['d1', 'd2'])
+        # The skipped folder is filtered out from the search results, before the dashboard is fetched
+        self.assertEqual(self._calls('search'), [('search', 'source'), ('search', 'destination')])
+        self.assertEqual(sorted(call[2] for call in self._calls('show')), ['d1', 'd2', 'd4'])
+
+        # Nothing changed: only the versions are checked, no dashboard is fetched or transferred
+        custom._create_dashboard.reset_mock()
+        summary = self._sync()
+        self.assertEqual(summary['dashboards_unchanged'], ['Team/D1', 'General/D2'])
+        self.assertEqual(summary['dashboards_skipped'], ['Skipped/D3', 'Team/D4'])
+        self.assertEqual(summary['dashboards_synced'], [])
+        self.assertEqual(self._calls('show'), [])
+        self.assertEqual(len(self._calls('versions')), 3)
+        custom._create_dashboard.assert_not_called()
+
+        # A new version is fetched, but only transferred when its content changed
+        self.source['d1'][1] = 2
+        self.source['d2'][1] = 5
+        self.source['d2'][2] = ['memory', 'swap']
+        summary = self._sync()
+        self.assertEqual(summary['dashboards_unchanged'], ['Team/D1'])
+        self.assertEqual(summary['dashboards_synced'], ['General/D2'])
+        self.assertEqual(sorted(call[2] for call in self._calls('show')), ['d1', 'd2'])
+        self.assertEqual(self.destination['d2']['dashboard']['panels'], ['memory', 'swap'])
+
+        # A dashboard that was deleted at the destination is synced again
+        del self.destination['d1']
+        summary = self._sync()
+        self.assertEqual(summary['dashboards_synced'], ['Team/D1'])
+        self.assertIn('d1', self.destination)
+
+    def test_dry_run_keeps_no_state(self):
+        self._sync(dry_run=True)
+        self.assertEqual(self.destination, {})
+
+        summary = self._sync()
+        self.assertEqual(summary['dashboards_synced'], ['Team/D1', 'General/D2'])
+
+    def test_existing_destination_without_state(self):
+        # Dashboards synced before the first incremental sync are compared with the destination's copy
+        self.destination['d1'] = {'dashboard': {'uid': 'd1', 'title': 'D1', 'version': 9, 'panels': ['cpu']},
+                                  'meta': {'folderTitle': 'Team'}}
+
+        summary = self._sync()
+
+        self.assertEqual(summary['dashboards_unchanged'], ['Team/D1'])
+        self.assertEqual(summary['dashboards_synced'], ['General/D2'])
+        self.assertIn(('show', 'destination', 'd1'), self.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
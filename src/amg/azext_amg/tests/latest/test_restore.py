@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from azext_amg import restore as restore_module
+from azext_amg.backup import _BackupArchive
+from azext_amg.restore import restore
+
+
+class RestoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backup_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.backup_dir, ignore_errors=True)
+        self.archive_file = os.path.join(self.backup_dir, 'grafana.tar.gz')
+        with _BackupArchive(self.archive_file, self.backup_dir, '202301011200') as archive:
+            # members are archived in an order that doesn't match their dependencies
+            archive.add_json('dashboards', 'uid/d1', {'dashboard': {'id': 1, 'title': 'D1', 'panels': [
+                {'datasource': {'uid': 'source-prom'}}]}, 'meta': {'folderUid': 'f1'}}, 'dashboard')
+            archive.add_json('annotations', 'a1', {'id': 11, 'text': 'deployed'}, 'annotation')
+            archive.add_json('library_panels', 'p1', {'uid': 'p1', 'name': 'P1', 'meta': {'folderUid': 'f1'}},
+                             'library_panel')
+            archive.add_json('folders', 'uid/f1', {'uid': 'f1', 'title': 'F1'}, 'folder')
+            archive.add_json('folders', 'uid/f1', [], 'folder_permission')
+            archive.add_json('datasources', 'prom', {'uid': 'source-prom', 'name': 'prom', 'type': 'prometheus'},
+                             'datasource')
+            archive.add_json('snapshots', 's1', {'dashboard': {'title': 'S1'}}, 'snapshot')
+
+        self.posts = []
+        self.lock = threading.Lock()
+
+        def send_grafana_post(url, payload, headers):
+            with self.lock:
+                self.posts.append((url.split('/api/', 1)[1], json.loads(payload)))
+            return 200, {}
+
+        for patcher in [mock.patch.object(restore_module, 'send_grafana_post', side_effect=send_grafana_post),
+                        mock.patch.object(restore_module, 'get_folder_id', return_value=5)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _restore(self, components=None, destination_datasources=None, archive_file=None):
+        with mock.patch.object(restore_module.tarfile, 'open', wraps=tarfile.open) as open_archive:
+            restore('https://grafana', archive_file or self.archive_file, components, {},
+                    destination_datasources=destination_datasources)
+        # the archive is decompressed only once whatever the number of tiers
+        self.assertEqual(len([c for c in open_archive.call_args_list if c[1].get('mode') == 'r|gz']), 1)
+        return [url for url, _ in self.posts]
+
+    def test_restore_in_dependency_order(self):
+        urls = self._restore()
+
+        self.assertEqual(sorted(urls[:2]), ['datasources', 'folders'])
+        self.assertEqual(urls[2], 'library-elements')
+        self.assertEqual(sorted(urls[3:5]), ['dashboards/db', 'snapshots'])
+        self.assertEqual(urls[5:], ['annotations'])
+        dashboard = next(payload for url, payload in self.posts if url == 'dashboards/db')
+        self.assertEqual(dashboard['folderId'], 5)
+        self.assertIsNone(dashboard['dashboard']['id'])
+
+    def test_restore_components_with_remapped_data_sources(self):
+        urls = self._restore(['dashboards'], destination_datasources=[{'uid': 'destination-prom', 'name': 'prom',
+                                                                       'type': 'prometheus'}])
+
+        # linked library panels are restored with the dashboards, data sources are only read for the remapping
+        self.assertEqual(urls, ['library-elements', 'dashboards/db'])
+        dashboard = self.posts[1][1]
+        self.assertEqual(dashboard['dashboard']['panels'][0]['datasource']['uid'], 'destination-prom')
+
+    def test_member_names_do_not_decide_where_files_are_written(self):
+        archive_file = os.path.join(self.backup_dir, 'crafted.tar.gz')
+        with tarfile.open(archive_file, 'w:gz') as tar:
+            content = json.dumps({'uid': 'f2', 'title': 'F2'}).encode('utf8')
+            member = tarfile.TarInfo('../../outside.folder')
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+
+        self._restore(['folders'], archive_file=archive_file)
+
+        self.assertEqual(self.posts, [('folders', {'uid': 'f2', 'title': 'F2'})])
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self.backup_dir), 'outside.folder')))
+
+
+if __name__ == '__main__':
+    unittest.main()
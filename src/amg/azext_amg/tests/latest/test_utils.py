@@ -0,0 +1,98 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+from requests.structures import CaseInsensitiveDict
+
+from azext_amg import utils
+from azext_amg.utils import DataPlaneHeaders, get_retry_after, send_grafana_request
+
+
+def _response(status_code, headers=None):
+    response = mock.Mock(status_code=status_code, headers=CaseInsensitiveDict(headers or {}), text='')
+    response.json.return_value = {}
+    return response
+
+
+class SendGrafanaRequestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        for patcher in [mock.patch.object(utils, 'get_session', return_value=self.session),
+                        mock.patch.object(utils.time, 'sleep')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _send(self, http_method, *status_codes, headers=None):
+        self.session.request.side_effect = [_response(status_code, headers) for status_code in status_codes]
+        response = send_grafana_request(http_method, 'https://grafana/api/annotations', {})
+        return response.status_code, self.session.request.call_count
+
+    def test_throttled_requests_are_retried(self):
+        self.assertEqual(self._send('get', 429, 429, 200), (200, 3))
+        self.assertEqual(utils.time.sleep.call_args_list, [mock.call(1), mock.call(2)])
+        self.session.reset_mock()
+        self.assertEqual(self._send('post', 429, 200, headers={'Retry-After': '7'}), (200, 2))
+        utils.time.sleep.assert_called_with(7)
+
+    def test_server_errors_are_only_retried_for_idempotent_requests(self):
+        for status_code in [500, 502, 503, 504]:
+            self.session.reset_mock()
+            self.assertEqual(self._send('get', status_code, 200), (200, 2))
+            self.session.reset_mock()
+            self.assertEqual(self._send('put', status_code, 200), (200, 2))
+            self.session.reset_mock()
+            self.assertEqual(self._send('post', status_code, 200), (status_code, 1))
+            self.session.reset_mock()
+            self.assertEqual(self._send('patch', status_code, 200), (status_code, 1))
+        # the workspace asking to come back later didn't take the request
+        self.session.reset_mock()
+        self.assertEqual(self._send('post', 503, 200, headers={'Retry-After': '1'}), (200, 2))
+        self.session.reset_mock()
+        self.assertEqual(self._send('get', 400, 200), (400, 1))
+
+    def test_retries_are_bounded(self):
+        status_codes = [503] * (utils.max_retries_on_throttling + 2)
+        self.assertEqual(self._send('get', *status_codes), (503, utils.max_retries_on_throttling + 1))
+
+    def test_get_retry_after(self):
+        self.assertEqual(get_retry_after(_response(429, {'Retry-After': '3'}), 0), 3)
+        self.assertEqual(get_retry_after(_response(429, {'Retry-After': '3600'}), 0), utils.max_retry_after_in_seconds)
+        self.assertEqual(get_retry_after(_response(429, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}), 0), 0)
+        self.assertEqual(get_retry_after(_response(429, {'Retry-After': 'soon'}), 2), 4)
+        self.assertEqual(get_retry_after(_response(503), 3), 8)
+
+
+class DataPlaneHeadersTest(unittest.TestCase):
+
+    @mock.patch.object(utils.time, 'time')
+    def test_token_is_reused_until_it_is_about_to_expire(self, now):
+        now.return_value = 1000
+        tokens = iter([('token1', 1000 + utils.token_refresh_window_in_seconds + 60), ('token2', 5000)])
+        get_token = mock.Mock(side_effect=lambda: next(tokens))
+        headers = DataPlaneHeaders(get_token)
+
+        self.assertEqual(headers['authorization'], 'Bearer token1')
+        self.assertEqual(dict(headers), {'content-type': 'application/json', 'authorization': 'Bearer token1'})
+        get_token.assert_called_once()
+
+        now.return_value = 1059
+        self.assertEqual(headers['authorization'], 'Bearer token1')
+        now.return_value = 1061
+        self.assertEqual(headers['authorization'], 'Bearer token2')
+        self.assertEqual(get_token.call_count, 2)
+
+    def test_token_without_expiration_is_not_refreshed(self):
+        get_token = mock.Mock(return_value=('api-key', None))
+        headers = DataPlaneHeaders(get_token)
+        for _ in range(3):
+            self.assertEqual(headers['authorization'], 'Bearer api-key')
+        get_token.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,33 @@
 
 import re
 import json
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 from knack.log import get_logger
+from azure.cli.core.util import should_disable_connection_verify
 
 logger = get_logger(__name__)
 
+# number of requests sent to a Grafana workspace at the same time by backup and restore
+max_concurrent_requests = 8
+max_retries_on_throttling = 5
+max_retry_after_in_seconds = 60
+# access tokens are requested again when they expire within this many seconds
+token_refresh_window_in_seconds = 300
+# throttled requests weren't processed, so they are retried whatever the method
+throttled_status_code = 429
+# server errors are only retried for requests which can be safely sent twice, a POST that failed with one of them
+# may have created an annotation, snapshot or library panel already
+retriable_status_codes = [500, 502, 503, 504]
+idempotent_http_methods = ['get', 'head', 'options', 'put', 'delete']
+
+_session = None
+_session_lock = threading.Lock()
+
 
 def create_datasource_mapping(source_data_sources, destination_data_sources):
     uid_mapping = {}
@@ -146,16 +168,99 @@ def get_folder_id(dashboard, grafana_url, http_post_headers):
         return 0
 
 
-def send_grafana_get(url, http_get_headers):
-
-    r = requests.get(url, headers=http_get_headers)
+class DataPlaneHeaders(Mapping):
+    """Headers of Grafana data plane requests. The bearer token is shared by every request to the workspace and only
+    requested again shortly before it expires.
+
+    :param get_token: function returning a tuple of the token and its expiration in unix time, or None for a token
+        that doesn't expire, such as an API key
+    """
+    def __init__(self, get_token):
+        self._get_token = get_token
+        self._token = None
+        self._expires_on = None
+        self._lock = threading.Lock()
+
+    def _get_headers(self):
+        with self._lock:
+            if self._token is None or (self._expires_on is not None and
+                                       self._expires_on - time.time() < token_refresh_window_in_seconds):
+                self._token, self._expires_on = self._get_token()
+            return {"content-type": "application/json", "authorization": "Bearer " + self._token}
+
+    def __getitem__(self, key):
+        return self._get_headers()[key]
+
+    def __iter__(self):
+        return iter(self._get_headers())
+
+    def __len__(self):
+        return len(self._get_headers())
+
+
+def get_session():
+    # a single session shared by all threads, so connections to the workspace are kept alive and reused
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=max_concurrent_requests, pool_maxsize=max_concurrent_requests)
+            _session = requests.Session()
+            _session.verify = not should_disable_connection_verify()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def get_retry_after(response, attempt):
+    retry_after = response.headers.get('Retry-After')
+    delay = None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+    if delay is None:
+        delay = 2 ** attempt
+    return min(max(delay, 0), max_retry_after_in_seconds)
+
+
+def _should_retry(http_method, response):
+    if response.status_code == throttled_status_code:
+        return True
+    if response.status_code not in retriable_status_codes:
+        return False
+    # a 503 with Retry-After means the workspace didn't take the request, so it is safe to send it again
+    return (http_method.lower() in idempotent_http_methods or
+            (response.status_code == 503 and 'Retry-After' in response.headers))
+
+
+def send_grafana_request(http_method, url, http_headers, json_payload=None, json_body=None):
+    # Grafana throttles busy workspaces with 429, back off as long as it asks us to before trying again.
+    # Transient server errors are retried the same way for requests which can be safely sent twice.
+    attempt = 0
+    while True:
+        r = get_session().request(http_method, url, headers=http_headers, data=json_payload, json=json_body,
+                                  timeout=60)
+        if not _should_retry(http_method, r) or attempt >= max_retries_on_throttling:
+            break
+        delay = get_retry_after(r, attempt)
+        logger.info("request to %s failed with status %s, retry in %s seconds", url, r.status_code, delay)
+        time.sleep(delay)
+        attempt += 1
     log_response(r)
+    return r
+
+
+def send_grafana_get(url, http_get_headers):
+    r = send_grafana_request('get', url, http_get_headers)
     return (r.status_code, r.json())
 
 
 def send_grafana_post(url, json_payload, http_post_headers):
-    r = requests.post(url, headers=http_post_headers, data=json_payload)
-    log_response(r)
+    r = send_grafana_request('post', url, http_post_headers, json_payload)
     try:
         return (r.status_code, r.json())
     except ValueError:
@@ -163,8 +268,7 @@ def send_grafana_post(url, json_payload, http_post_headers):
 
 
 def send_grafana_patch(url, json_payload, http_post_headers):
-    r = requests.patch(url, headers=http_post_headers, data=json_payload)
-    log_response(r)
+    r = send_grafana_request('patch', url, http_post_headers, json_payload)
     try:
         return (r.status_code, r.json())
     except ValueError:
@@ -172,6 +276,5 @@ def send_grafana_patch(url, json_payload, http_post_headers):
 
 
 def send_grafana_put(url, json_payload, http_post_headers):
-    r = requests.put(url, headers=http_post_headers, data=json_payload)
-    log_response(r)
+    r = send_grafana_request('put', url, http_post_headers, json_payload)
     return (r.status_code, r.json())
@@ -0,0 +1,214 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import atexit
+import os
+import shutil
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
+import requests
+from knack.log import get_logger
+from azure.cli.core.azclierror import FileOperationError
+import azext_connectedk8s._constants as consts
+
+logger = get_logger(__name__)
+
+# pylint: disable=line-too-long
+
+
+def get_artifact_cache_dir(*sub_dirs):
+    cache_dir = os.path.join(os.path.expanduser('~'), '.azure', consts.Artifact_Cache_Folder_Name, *sub_dirs)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+@contextmanager
+def artifact_cache_lock(lock_path, timeout=consts.Artifact_Cache_Lock_Timeout, stale_after=consts.Artifact_Cache_Lock_Stale_After):
+    # The lock is an exclusively created file, which works the same way on every OS and across processes.
+    # A lock that is older than stale_after seconds was left behind by a process that died and is taken over.
+    deadline = time.time() + timeout
+    while True:
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(lock_fd, str(os.getpid()).encode())
+            os.close(lock_fd)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_after:
+                    logger.debug("Removing stale artifact cache lock '%s'", lock_path)
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                raise FileOperationError("Timed out waiting for the artifact cache lock '{}'.".format(lock_path),
+                                         recommendation="If no other az connectedk8s command is running, delete the lock file and try again.")
+            time.sleep(consts.Artifact_Cache_Lock_Poll_Interval)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def file_sha256(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def write_checksum(file_path):
+    with open(file_path + consts.Artifact_Cache_Checksum_Extension, 'w') as f:
+        f.write(file_sha256(file_path))
+
+
+def verify_checksum(file_path):
+    # A binary is only reused when it is present and matches the checksum recorded when it was installed.
+    # The checksum is only recorded for binaries that matched the checksum published for their version.
+    checksum_path = file_path + consts.Artifact_Cache_Checksum_Extension
+    if not os.path.isfile(file_path) or not os.path.isfile(checksum_path):
+        return False
+    try:
+        with open(checksum_path) as f:
+            return f.read().strip() == file_sha256(file_path)
+    except OSError:
+        return False
+
+
+def get_published_sha256(checksum_url):
+    # The sha256 published next to a release artifact, as the hex digest optionally followed by the file name.
+    # None is returned whenever it can not be fetched and the caller should not record the artifact in the cache.
+    try:
+        response = requests.get(checksum_url, timeout=consts.DEFAULT_REQUEST_TIMEOUT)
+        if response.status_code == 200 and response.text.split():
+            return response.text.split()[0].lower()
+        logger.debug("Unable to fetch the checksum '%s'. Status code: %s", checksum_url, response.status_code)
+    except requests.RequestException as e:
+        logger.debug("Unable to fetch the checksum '%s'. Exception: %s", checksum_url, str(e))
+    return None
+
+
+def resolve_registry_digest(registry_path):
+    # Resolving the manifest digest of an OCI reference such as 'mcr.microsoft.com/repo/chart:1.0.0'.
+    # None is returned whenever the digest can not be determined and the caller should not use the cache.
+    try:
+        registry, repository_with_tag = registry_path.split('/', 1)
+        repository, tag = repository_with_tag.rsplit(':', 1)
+    except ValueError:
+        return None
+    manifest_url = "https://{}/v2/{}/manifests/{}".format(registry, repository, tag)
+    headers = {'Accept': ', '.join(consts.Artifact_Cache_Manifest_Media_Types)}
+    try:
+        response = requests.head(manifest_url, headers=headers, timeout=consts.DEFAULT_REQUEST_TIMEOUT)
+        if response.status_code == 200:
+            return response.headers.get('Docker-Content-Digest')
+        logger.debug("Unable to resolve the digest of '%s'. Status code: %s", registry_path, response.status_code)
+    except requests.RequestException as e:
+        logger.debug("Unable to resolve the digest of '%s'. Exception: %s", registry_path, str(e))
+    return None
+
+
+def get_cached_chart_path(registry_path, chart_name, fetch_chart):
+    # Returns the path of the chart exported from registry_path, keyed by its registry digest.
+    # fetch_chart(destination) pulls and exports the chart into destination and is only invoked on a cache miss.
+    # Returns None when the digest can not be resolved, so that the caller falls back to an uncached export.
+    # The returned chart holds a shared lease until this invocation exits, so it is not pruned while helm uses it.
+    digest = resolve_registry_digest(registry_path)
+    if not digest:
+        return None
+
+    charts_dir = get_artifact_cache_dir('charts')
+    digest_dir = os.path.join(charts_dir, digest.replace(':', '-'))
+    chart_path = os.path.join(digest_dir, chart_name)
+    with artifact_cache_lock(digest_dir + '.lock'):
+        if os.path.isdir(chart_path):
+            logger.debug("Using cached helm chart '%s' for '%s'", chart_path, registry_path)
+            os.utime(digest_dir)
+        else:
+            populate_cached_chart(charts_dir, digest_dir, chart_path, fetch_chart)
+        add_shared_lease(digest_dir)
+
+    prune_cached_charts(charts_dir)
+    return chart_path
+
+
+def populate_cached_chart(charts_dir, digest_dir, chart_path, fetch_chart):
+    # Must be called with the lock of digest_dir held. The chart is exported next to the cache entry and
+    # moved into place, so a partially exported chart is never visible.
+    if os.path.isdir(digest_dir):
+        # An entry without the chart was left behind by an interrupted export
+        shutil.rmtree(digest_dir, ignore_errors=True)
+    staging_dir = tempfile.mkdtemp(dir=charts_dir, prefix='.staging-')
+    try:
+        fetch_chart(staging_dir)
+        try:
+            os.replace(staging_dir, digest_dir)
+        except OSError:
+            # The entry was populated by an invocation that took the lock over as stale, its chart is used instead
+            if not os.path.isdir(chart_path):
+                raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def add_shared_lease(entry_path):
+    # Must be called with the lock of entry_path held. Every reader of a cache entry records a lease file,
+    # prune_cached_charts keeps an entry as long as it has a lease younger than Artifact_Cache_Lease_Stale_After.
+    # Leases of invocations that died are ignored once they are stale and removed by the next prune.
+    leases_dir = entry_path + consts.Artifact_Cache_Leases_Extension
+    os.makedirs(leases_dir, exist_ok=True)
+    lease_fd, lease_path = tempfile.mkstemp(dir=leases_dir, prefix='{}-'.format(os.getpid()))
+    os.close(lease_fd)
+    atexit.register(release_shared_lease, lease_path)
+    return lease_path
+
+
+def release_shared_lease(lease_path):
+    try:
+        os.remove(lease_path)
+    except OSError:
+        pass
+
+
+def has_active_leases(entry_path, stale_after=consts.Artifact_Cache_Lease_Stale_After):
+    leases_dir = entry_path + consts.Artifact_Cache_Leases_Extension
+    if not os.path.isdir(leases_dir):
+        return False
+    active = False
+    for lease in os.listdir(leases_dir):
+        lease_path = os.path.join(leases_dir, lease)
+        try:
+            if time.time() - os.path.getmtime(lease_path) > stale_after:
+                os.remove(lease_path)
+            else:
+                active = True
+        except OSError:
+            pass
+    return active
+
+
+def prune_cached_charts(charts_dir, max_entries=consts.Artifact_Cache_Max_Charts):
+    # Keeping only the most recently used charts. An entry is only removed while holding its lock and when no
+    # invocation holds a lease on it, entries that are locked or leased are skipped and retried by the next prune.
+    entries = [os.path.join(charts_dir, entry) for entry in os.listdir(charts_dir)
+               if not entry.startswith('.') and not entry.endswith(('.lock', consts.Artifact_Cache_Leases_Extension))]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for stale_entry in entries[max_entries:]:
+        try:
+            with artifact_cache_lock(stale_entry + '.lock', timeout=0):
+                if has_active_leases(stale_entry):
+                    continue
+                shutil.rmtree(stale_entry, ignore_errors=True)
+                shutil.rmtree(stale_entry + consts.Artifact_Cache_Leases_Extension, ignore_errors=True)
+        except FileOperationError:
+            # Another invocation is populating or reading the entry right now
+            pass
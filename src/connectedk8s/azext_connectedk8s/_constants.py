@@ -196,6 +196,13 @@ DNS_Check = "dns_check.txt"
 K8s_Cluster_Info = "k8s_cluster_info.txt"
 Outbound_Network_Connectivity_Check = "outbound_network_connectivity_check.txt"
 Events_of_Incomplete_Diagnoser_Job = "diagnoser_failure_events.txt"
+Diagnoser_Step_Timings = "diagnoser_step_timings.json"
+Diagnoser_Logs_Archive_Extension = ".tar.gz"
+Diagnoser_Logs_Archive_Fault_Type = "Error while compressing the diagnoser logs"
+# Diagnoser log collection tuning
+Diagnoser_Max_Parallel_Workers = 8
+Diagnoser_Log_Stream_Chunk_Size = 64 * 1024
+Diagnoser_Log_Spool_Max_Memory = 4 * 1024 * 1024
 # Connect Precheck Diagnoser constants
 Cluster_Diagnostic_Checks_Job_Registry_Path = "mcr.microsoft.com/azurearck8s/helmchart/stable/clusterdiagnosticchecks:0.1.1"
 Cluster_Diagnostic_Checks_Helm_Install_Failed_Fault_Type = "Error while installing cluster diagnostic checks helm release"
@@ -229,4 +236,18 @@ CSP_Storage_Url_Mooncake = "https://k8sconnectcsp.blob.core.chinacloudapi.cn"
 CSP_Storage_Url_Fairfax = "https://k8sconnectcsp.azureedge.us"
 HELM_STORAGE_URL = "https://k8connecthelm.azureedge.net"
 HELM_VERSION = 'v3.6.3'
+HELM_CHECKSUM_URL = "https://get.helm.sh"
+KUBECTL_STORAGE_URL = "https://dl.k8s.io/release"
+KUBECTL_VERSION = 'v1.25.4'
+Max_Retry_Delay = 30  # seconds
+# Artifact cache constants
+Artifact_Cache_Folder_Name = 'connectedk8s-artifact-cache'
+Artifact_Cache_Checksum_Extension = '.sha256'
+Artifact_Cache_Lock_Timeout = 600  # seconds
+Artifact_Cache_Lock_Stale_After = 900  # seconds
+Artifact_Cache_Lock_Poll_Interval = 0.5  # seconds
+Artifact_Cache_Max_Charts = 5
+Artifact_Cache_Leases_Extension = '.leases'
+Artifact_Cache_Lease_Stale_After = 6 * 60 * 60  # seconds
+Artifact_Cache_Manifest_Media_Types = ['application/vnd.oci.image.manifest.v1+json', 'application/vnd.docker.distribution.manifest.v2+json']
 Download_And_Install_Kubectl_Fault_Type = "Failed to download and install kubectl"
@@ -130,4 +130,6 @@ helps['connectedk8s troubleshoot'] = """
   examples:
   - name: Perform diagnostic checks on an Arc enabled Kubernetes cluster.
     text: az connectedk8s troubleshoot -n clusterName -g resourceGroupName
+  - name: Perform diagnostic checks and save the last hour of at most 10 MB per container of agent logs into a compressed archive.
+    text: az connectedk8s troubleshoot -n clusterName -g resourceGroupName --archive-logs --log-since-seconds 3600 --log-limit-bytes 10485760
 """
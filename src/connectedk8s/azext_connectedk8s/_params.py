@@ -117,3 +117,6 @@ def load_arguments(self, _):
         c.argument('cluster_name', options_list=['--name', '-n'], help='The name of the connected cluster.')
         c.argument('kube_config', options_list=['--kube-config'], help='Path to the kube config file.')
         c.argument('kube_context', options_list=['--kube-context'], help='Kubconfig context from current machine.')
+        c.argument('archive_logs', options_list=['--archive-logs'], arg_type=get_three_state_flag(), help='Stream the diagnoser logs into a compressed .tar.gz archive instead of a folder of text files.')
+        c.argument('log_limit_bytes', options_list=['--log-limit-bytes'], type=int, help='Maximum number of bytes of log to collect from each Arc agent container.')
+        c.argument('log_since_seconds', options_list=['--log-since-seconds'], type=int, help='Only collect Arc agent container logs newer than this many seconds.')
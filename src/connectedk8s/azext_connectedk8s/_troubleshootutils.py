@@ -11,6 +11,11 @@ import os
 import yaml
 import json
 import datetime
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from subprocess import Popen, PIPE, run, STDOUT, call, DEVNULL
 import shutil
 from knack.log import get_logger
@@ -21,6 +26,22 @@ logger = get_logger(__name__)
 # pylint: disable=unused-argument, too-many-locals, too-many-branches, too-many-statements, line-too-long
 
 diagnoser_output = []
+diagnoser_step_timings = {}
+# Steps run by run_diagnostic_steps_in_parallel collect their output here instead of in diagnoser_output
+diagnoser_step_context = threading.local()
+
+
+def reset_diagnoser_state():
+
+    # Clearing what an earlier troubleshoot run in the same process left behind
+    del diagnoser_output[:]
+    diagnoser_step_timings.clear()
+
+
+def record_diagnoser_output(message):
+
+    step_output = getattr(diagnoser_step_context, "output", None)
+    (diagnoser_output if step_output is None else step_output).append(message)
 
 
 def fetch_kubectl_cluster_info(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context):
@@ -127,40 +148,35 @@ def fetch_connected_cluster_resource(filepath_with_timestamp, connected_cluster,
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
-def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available):
+def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available, diagnostic_logs_archive=None, limit_bytes=None, since_seconds=None):
 
-    global diagnoser_output
     try:
         if storage_space_available:
             # To retrieve all of the arc agents pods that are present in the Cluster
             arc_agents_pod_list = corev1_api_instance.list_namespaced_pod(namespace="azure-arc")
+            arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
+            container_log_targets = []
             # Traversing through all agents
             for each_agent_pod in arc_agents_pod_list.items:
                 # Fetching the current Pod name and creating a folder with that name inside the timestamp folder
                 agent_name = each_agent_pod.metadata.name
-                arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
-                try:
-                    os.mkdir(arc_agent_logs_path)
-                except FileExistsError:
-                    pass
                 agent_name_logs_path = os.path.join(arc_agent_logs_path, agent_name)
-                try:
-                    os.mkdir(agent_name_logs_path)
-                except FileExistsError:
-                    pass
+                # The folders are only needed when the logs are written as loose files
+                if diagnostic_logs_archive is None:
+                    os.makedirs(agent_name_logs_path, exist_ok=True)
                 # If the agent is not in Running state we wont be able to get logs of the containers
                 if(each_agent_pod.status.phase != "Running"):
                     continue
                 # Traversing through all of the containers present inside each pods
                 for each_container in each_agent_pod.spec.containers:
-                    # Fetching the Container name
-                    container_name = each_container.name
-                    # Creating a text file with the name of the container and adding that containers logs in it
-                    container_log = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc")
-                    # Path to add the arc agents container logs.
-                    arc_agent_container_logs_path = os.path.join(agent_name_logs_path, container_name + ".txt")
-                    with open(arc_agent_container_logs_path, 'w+') as container_file:
-                        container_file.write(str(container_log))
+                    container_log_targets.append((agent_name, each_container.name, os.path.join(agent_name_logs_path, each_container.name + ".txt")))
+
+            # Fetching the container logs concurrently, each one is streamed instead of being held in memory
+            with ThreadPoolExecutor(max_workers=consts.Diagnoser_Max_Parallel_Workers) as executor:
+                futures = [executor.submit(stream_container_log, corev1_api_instance, agent_name, container_name, "azure-arc", container_log_path, filepath_with_timestamp, diagnostic_logs_archive, limit_bytes, since_seconds)
+                           for agent_name, container_name, container_log_path in container_log_targets]
+                for future in as_completed(futures):
+                    future.result()
 
         return consts.Diagnostic_Check_Passed, storage_space_available
 
@@ -173,20 +189,134 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
         else:
             logger.warning("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Agent_Logs_Failed_Fault_Type, summary="Error occured in arc agents logger")
-            diagnoser_output.append("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
         logger.warning("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
         telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Agent_Logs_Failed_Fault_Type, summary="Error occured in arc agents logger")
-        diagnoser_output.append("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
+        record_diagnoser_output("An exception has occured while trying to fetch the azure arc agents logs from the cluster. Exception: {}".format(str(e)) + "\n")
 
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
+def stream_container_log(corev1_api_instance, pod_name, container_name, namespace, container_log_path, filepath_with_timestamp, diagnostic_logs_archive=None, limit_bytes=None, since_seconds=None):
+
+    # Requesting the raw response so that the log can be consumed chunk by chunk
+    log_kwargs = {"_preload_content": False}
+    if limit_bytes:
+        log_kwargs["limit_bytes"] = limit_bytes
+    if since_seconds:
+        log_kwargs["since_seconds"] = since_seconds
+    log_response = corev1_api_instance.read_namespaced_pod_log(name=pod_name, container=container_name, namespace=namespace, **log_kwargs)
+    try:
+        if diagnostic_logs_archive is not None:
+            # Member name inside the archive mirrors the folder layout of the loose files
+            member_name = os.path.relpath(container_log_path, filepath_with_timestamp)
+            diagnostic_logs_archive.add_stream(member_name, log_response.stream(consts.Diagnoser_Log_Stream_Chunk_Size))
+        else:
+            with open(container_log_path, 'wb') as container_file:
+                for chunk in log_response.stream(consts.Diagnoser_Log_Stream_Chunk_Size):
+                    container_file.write(chunk)
+    finally:
+        log_response.release_conn()
+
+
+class DiagnosticLogsArchive:
+    """Thread-safe writer that streams diagnoser logs into a gzip compressed tarball."""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self._lock = threading.Lock()
+        self._tar = tarfile.open(archive_path, mode="w:gz")
+
+    def add_stream(self, member_name, chunks):
+        # tar headers need the member size up front, so chunks are spooled (in memory until the
+        # threshold is crossed, then on disk) before being appended under the lock
+        with tempfile.SpooledTemporaryFile(max_size=consts.Diagnoser_Log_Spool_Max_Memory) as spool:
+            for chunk in chunks:
+                spool.write(chunk if isinstance(chunk, bytes) else str(chunk).encode())
+            tar_info = tarfile.TarInfo(name=member_name.replace(os.sep, "/"))
+            tar_info.size = spool.tell()
+            tar_info.mtime = int(time.time())
+            spool.seek(0)
+            with self._lock:
+                self._tar.addfile(tar_info, spool)
+
+    def add_bytes(self, member_name, data):
+        self.add_stream(member_name, [data])
+
+    def add_folder(self, folder_path):
+        # Appending the files the other diagnoser steps wrote to the timestamp folder
+        with self._lock:
+            for root, _, files in os.walk(folder_path):
+                for file_name in sorted(files):
+                    file_path = os.path.join(root, file_name)
+                    self._tar.add(file_path, arcname=os.path.relpath(file_path, folder_path).replace(os.sep, "/"))
+
+    def close(self):
+        with self._lock:
+            self._tar.close()
+
+
+def run_diagnostic_steps_in_parallel(diagnostic_steps, max_workers=consts.Diagnoser_Max_Parallel_Workers):
+
+    # diagnostic_steps maps the name of each independent step to a callable without arguments.
+    # The results are returned keyed by the same names and the elapsed time of every step is recorded.
+    # Each step collects its output and timing separately, they are merged in the order of diagnostic_steps
+    # once the pool has finished so that the diagnoser results do not depend on the thread scheduling.
+    step_outputs = {step_name: [] for step_name in diagnostic_steps}
+    step_timings = {}
+
+    def timed_step(step_name, step_function):
+        diagnoser_step_context.output = step_outputs[step_name]
+        start_time = time.perf_counter()
+        try:
+            return step_function()
+        finally:
+            step_timings[step_name] = round(time.perf_counter() - start_time, 3)
+            diagnoser_step_context.output = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {step_name: executor.submit(timed_step, step_name, step_function) for step_name, step_function in diagnostic_steps.items()}
+
+    for step_name in diagnostic_steps:
+        diagnoser_output.extend(step_outputs[step_name])
+        diagnoser_step_timings[step_name] = step_timings[step_name]
+    return {step_name: future.result() for step_name, future in futures.items()}
+
+
+def save_diagnoser_step_timings(filepath_with_timestamp, storage_space_available):
+
+    for step_name, elapsed in sorted(diagnoser_step_timings.items(), key=lambda item: item[1], reverse=True):
+        logger.info("Diagnoser step '%s' took %.3f seconds", step_name, elapsed)
+    try:
+        if storage_space_available and diagnoser_step_timings:
+            with open(os.path.join(filepath_with_timestamp, consts.Diagnoser_Step_Timings), 'w+') as step_timings_file:
+                json.dump(diagnoser_step_timings, step_timings_file, indent=2, sort_keys=True)
+    except Exception as e:
+        logger.debug("Unable to store the diagnoser step timings. Exception: {}".format(str(e)))
+
+
+def finalize_diagnostic_logs_archive(diagnostic_logs_archive, filepath_with_timestamp, storage_space_available):
+
+    # Moves everything that was written to the timestamp folder into the archive and removes the folder.
+    # Returns the path where the diagnoser logs finally reside.
+    try:
+        if storage_space_available:
+            diagnostic_logs_archive.add_folder(filepath_with_timestamp)
+        diagnostic_logs_archive.close()
+        if storage_space_available:
+            shutil.rmtree(filepath_with_timestamp, ignore_errors=True)
+            return diagnostic_logs_archive.archive_path
+    except Exception as e:
+        logger.warning("An exception has occured while trying to compress the diagnoser logs. The uncompressed logs are kept in the diagnostic logs folder. Exception: {}".format(str(e)) + "\n")
+        telemetry.set_exception(exception=e, fault_type=consts.Diagnoser_Logs_Archive_Fault_Type, summary="Error while compressing the diagnoser logs")
+    return filepath_with_timestamp
+
+
 def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context):
 
-    global diagnoser_output
     try:
         # If storage space available then only store the azure-arc events
         if storage_space_available:
@@ -202,7 +332,7 @@ def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_availa
             if response_kubectl_get_events.returncode != 0:
                 telemetry.set_exception(exception=error_kubectl_get_events.decode("ascii"), fault_type=consts.Kubectl_Get_Events_Failed_Fault_Type, summary='Error while doing kubectl get events')
                 logger.warning("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_events.decode("ascii"))
-                diagnoser_output.append("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_events.decode("ascii"))
+                record_diagnoser_output("Error while doing kubectl get events. We were not able to capture events log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_events.decode("ascii"))
                 return consts.Diagnostic_Check_Failed, storage_space_available
 
             # Converting output obtained in json format and fetching the azure-arc events
@@ -227,20 +357,19 @@ def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_availa
         else:
             logger.warning("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Agents_Events_Logs_Failed_Fault_Type, summary="Error occured in arc agents events logger")
-            diagnoser_output.append("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
         logger.warning("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
         telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Agents_Events_Logs_Failed_Fault_Type, summary="Error occured in arc agents events logger")
-        diagnoser_output.append("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
+        record_diagnoser_output("An exception has occured while trying to fetch the events occured in azure-arc namespace from the cluster. Exception: {}".format(str(e)) + "\n")
 
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
 def retrieve_deployments_logs(appv1_api_instance, filepath_with_timestamp, storage_space_available):
 
-    global diagnoser_output
     try:
         if storage_space_available:
             # Creating new Deployment Logs folder in the given timestamp folder
@@ -271,13 +400,13 @@ def retrieve_deployments_logs(appv1_api_instance, filepath_with_timestamp, stora
         else:
             logger.warning("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Deployment_Logs_Failed_Fault_Type, summary="Error occured in deployments logger")
-            diagnoser_output.append("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
         logger.warning("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
         telemetry.set_exception(exception=e, fault_type=consts.Fetch_Arc_Deployment_Logs_Failed_Fault_Type, summary="Error occured in deployments logger")
-        diagnoser_output.append("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
+        record_diagnoser_output("An exception has occured while trying to fetch the azure arc deployment logs from the cluster. Exception: {}".format(str(e)) + "\n")
 
     return consts.Diagnostic_Check_Failed, storage_space_available
 
@@ -897,7 +1026,7 @@ def get_secrets_azure_arc(corev1_api_instance, kubectl_client_location, kube_con
             if response_kubectl_get_secrets.returncode != 0:
                 telemetry.set_exception(exception=error_kubectl_get_secrets.decode("ascii"), fault_type=consts.Kubectl_Get_Secrets_Failed_Fault_Type, summary='Error while doing kubectl get secrets')
                 logger.warning("Error while doing kubectl get secrets for azure-arc namespace. We were not able to capture this log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_secrets.decode("ascii"))
-                diagnoser_output.append("Error while doing kubectl get secrets in azure-arc namespace. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_secrets.decode("ascii"))
+                record_diagnoser_output("Error while doing kubectl get secrets in azure-arc namespace. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_secrets.decode("ascii"))
                 return storage_space_available
 
             # Converting output obtained in json format
@@ -919,13 +1048,13 @@ def get_secrets_azure_arc(corev1_api_instance, kubectl_client_location, kube_con
         else:
             logger.warning("An exception has occured while storing list of secrets in azure arc namespace in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Kubectl_Get_Secrets_Fault_Type, summary="Exception occured while storing azure arc secrets")
-            diagnoser_output.append("An exception has occured while storing azure arc secrets in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing azure arc secrets in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
             logger.warning("An exception has occured while storing list of secrets in azure arc namespace in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Kubectl_Get_Secrets_Fault_Type, summary="Exception occured while storing azure arc secrets")
-            diagnoser_output.append("An exception has occured while storing azure arc secrets in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing azure arc secrets in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     return storage_space_available
 
@@ -945,7 +1074,7 @@ def get_helm_values_azure_arc(corev1_api_instance, helm_client_location, release
             if response_kubectl_get_helmvalues.returncode != 0:
                 telemetry.set_exception(exception=error_kubectl_get_helmvalues.decode("ascii"), fault_type=consts.Helm_Values_Save_Failed_Fault_Type, summary='Error while doing helm get values for azure-arc release')
                 logger.warning("Error while doing helm get values for azure-arc release. We were not able to capture this log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_helmvalues.decode("ascii"))
-                diagnoser_output.append("Error while doing helm get values for azure-arc release. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_helmvalues.decode("ascii"))
+                record_diagnoser_output("Error while doing helm get values for azure-arc release. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_helmvalues.decode("ascii"))
                 return storage_space_available
 
             # Converting output obtained in json format
@@ -986,13 +1115,13 @@ def get_helm_values_azure_arc(corev1_api_instance, helm_client_location, release
         else:
             logger.warning("An exception has occured while storing helm values of azure-arc release in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Helm_Values_Save_Failed_Fault_Type, summary="Exception occured while storing helm values of azure-arc release")
-            diagnoser_output.append("An exception has occured while storing helm values of azure-arc release in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing helm values of azure-arc release in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
             logger.warning("An exception has occured while storing helm values of azure-arc release in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Helm_Values_Save_Failed_Fault_Type, summary="Exception occured while storing helm values of azure-arc release")
-            diagnoser_output.append("An exception has occured while storing helm values of azure-arc release in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing helm values of azure-arc release in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     return storage_space_available
 
@@ -1012,7 +1141,7 @@ def get_metadata_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_
             if response_kubectl_get_metadata_cr.returncode != 0:
                 telemetry.set_exception(exception=error_kubectl_get_metadata_cr.decode("ascii"), fault_type=consts.Metadata_CR_Save_Failed_Fault_Type, summary='Error occured while fetching metadata CR details')
                 logger.warning("Error while doing kubectl describe for clustermetadata CR. We were not able to capture this log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_metadata_cr.decode("ascii"))
-                diagnoser_output.append("Error occured while fetching metadata CR details. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_metadata_cr.decode("ascii"))
+                record_diagnoser_output("Error occured while fetching metadata CR details. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_metadata_cr.decode("ascii"))
                 return storage_space_available
 
             # Converting output obtained in json format
@@ -1034,13 +1163,13 @@ def get_metadata_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_
         else:
             logger.warning("An exception has occured while storing metadata CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Metadata_CR_Save_Failed_Fault_Type, summary="Error occured while storing metadata CR details")
-            diagnoser_output.append("An exception has occured while storing metadata CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing metadata CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
             logger.warning("An exception has occured while storing metadata CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_Metadata_CR_Save_Failed_Fault_Type, summary="Error occured while storing metadata CR details")
-            diagnoser_output.append("An exception has occured while storing metadata CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing metadata CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     return storage_space_available
 
@@ -1060,7 +1189,7 @@ def get_kubeaadproxy_cr_snapshot(corev1_api_instance, kubectl_client_location, k
             if response_kubectl_get_kap_cr.returncode != 0:
                 telemetry.set_exception(exception=error_kubectl_get_kap_cr.decode("ascii"), fault_type=consts.KAP_CR_Save_Failed_Fault_Type, summary='Error occured while fetching KAP CR details')
                 logger.warning("Error while doing kubectl describe for kube-aad-proxy CR. We were not able to capture this log in arc_diganostic_logs folder. Exception: ", error_kubectl_get_kap_cr.decode("ascii"))
-                diagnoser_output.append("Error occured while fetching kube-aad-proxy CR details. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_kap_cr.decode("ascii"))
+                record_diagnoser_output("Error occured while fetching kube-aad-proxy CR details. We were not able to capture this log in arc_diganostic_logs folder. Exception: " + error_kubectl_get_kap_cr.decode("ascii"))
                 return storage_space_available
 
             # Converting output obtained in json format
@@ -1082,13 +1211,13 @@ def get_kubeaadproxy_cr_snapshot(corev1_api_instance, kubectl_client_location, k
         else:
             logger.warning("An exception has occured while storing kube-aad-proxy CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_KAP_CR_Save_Failed_Fault_Type, summary="Exception occured while storing kube-aad-proxy CR details")
-            diagnoser_output.append("An exception has occured while storing kube-aad-proxy CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing kube-aad-proxy CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     # To handle any exception that may occur during the execution
     except Exception as e:
             logger.warning("An exception has occured while storing kube-aad-proxy CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
             telemetry.set_exception(exception=e, fault_type=consts.Fetch_KAP_CR_Save_Failed_Fault_Type, summary="Exception occured while storing kube-aad-proxy CR details")
-            diagnoser_output.append("An exception has occured while storing kube-aad-proxy CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
+            record_diagnoser_output("An exception has occured while storing kube-aad-proxy CR details in the user local machine. Exception: {}".format(str(e)) + "\n")
 
     return storage_space_available
 
@@ -4,6 +4,7 @@
 # --------------------------------------------------------------------------------------------
 
 import os
+import random
 import shutil
 import subprocess
 from subprocess import Popen, PIPE
@@ -24,6 +25,7 @@ from msrest.exceptions import ValidationError as MSRestValidationError
 from kubernetes.client.rest import ApiException
 from azext_connectedk8s._client_factory import resource_providers_client, cf_resource_groups
 import azext_connectedk8s._constants as consts
+import azext_connectedk8s._cacheutils as cacheutils
 from kubernetes import client as kube_client
 from azure.cli.core import get_default_cli
 from azure.cli.core.azclierror import CLIInternalError, ClientRequestError, ArgumentUsageError, ManualInterrupt, AzureResponseError, AzureInternalError, ValidationError
@@ -92,8 +94,21 @@ def validate_custom_token(cmd, resource_group_name, location):
 
 
 def get_chart_path(registry_path, kube_config, kube_context, helm_client_location, chart_folder_name='AzureArcCharts', chart_name='azure-arc-k8sagents'):
-    # Pulling helm chart from registry
     os.environ['HELM_EXPERIMENTAL_OCI'] = '1'
+
+    # Reusing the chart exported by an earlier invocation if the registry digest has not changed.
+    # The cached chart is leased until this invocation exits, so other invocations do not prune it while it is used.
+    def fetch_chart(chart_export_path):
+        pull_helm_chart(registry_path, kube_config, kube_context, helm_client_location, chart_name)
+        export_helm_chart(registry_path, chart_export_path, kube_config, kube_context, helm_client_location, chart_name)
+
+    helm_chart_path = cacheutils.get_cached_chart_path(registry_path, chart_name, fetch_chart)
+    if helm_chart_path is not None:
+        if chart_folder_name == consts.Pre_Onboarding_Helm_Charts_Folder_Name:
+            return helm_chart_path
+        return os.getenv('HELMCHART') if os.getenv('HELMCHART') else helm_chart_path
+
+    # Pulling helm chart from registry
     pull_helm_chart(registry_path, kube_config, kube_context, helm_client_location, chart_name)
 
     # Exporting helm chart after cleanup
@@ -130,7 +145,7 @@ def pull_helm_chart(registry_path, kube_config, kube_context, helm_client_locati
                 telemetry.set_exception(exception=error_helm_chart_pull.decode("ascii"), fault_type=consts.Pull_HelmChart_Fault_Type,
                                         summary="Unable to pull {} helm charts from the registry".format(chart_name))
                 raise CLIInternalError("Unable to pull {} helm chart from the registry '{}': ".format(chart_name, registry_path) + error_helm_chart_pull.decode("ascii"))
-            time.sleep(retry_delay)
+            time.sleep(get_retry_delay(retry_delay, i))
         else:
             break
 
@@ -368,7 +383,13 @@ def send_request_with_retries(cli_ctx, method, url, headers, fault_type, summary
             if i == retry_count - 1:
                 telemetry.set_exception(exception=e, fault_type=fault_type, summary=summary)
                 raise CLIInternalError("Error while fetching helm chart registry path: " + str(e))
-            time.sleep(retry_delay)
+            time.sleep(get_retry_delay(retry_delay, i))
+
+
+def get_retry_delay(retry_delay, attempt):
+    # Exponential backoff with jitter, so that invocations onboarding many clusters at once don't retry in lockstep
+    delay = min(retry_delay * 2 ** attempt, consts.Max_Retry_Delay)
+    return delay / 2 + random.uniform(0, delay / 2)
 
 
 def arm_exception_handler(ex, fault_type, summary, return_if_not_found=False):
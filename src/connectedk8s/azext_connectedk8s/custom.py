@@ -23,7 +23,6 @@ import urllib.request
 import shutil
 from _thread import interrupt_main
 from psutil import process_iter, NoSuchProcess, AccessDenied, ZombieProcess, net_connections
-from azure.cli.core import get_default_cli
 from knack.util import CLIError
 from knack.log import get_logger
 from knack.prompting import prompt_y_n
@@ -49,6 +48,7 @@ import azext_connectedk8s._utils as utils
 import azext_connectedk8s._clientproxyutils as clientproxyutils
 import azext_connectedk8s._troubleshootutils as troubleshootutils
 import azext_connectedk8s._precheckutils as precheckutils
+import azext_connectedk8s._cacheutils as cacheutils
 from glob import glob
 from .vendored_sdks.models import ConnectedCluster, ConnectedClusterIdentity, ConnectedClusterPatch, ListClusterUserCredentialProperties
 from .vendored_sdks.preview_2022_10_01.models import ConnectedCluster as ConnectedClusterPreview
@@ -489,48 +489,74 @@ def install_helm_client():
     download_dir = os.path.dirname(download_location)
     install_location = os.path.expanduser(os.path.join('~', install_location_string))
 
-    # Download compressed halm binary if not already present
-    if not os.path.isfile(download_location):
-        # Creating the helm folder if it doesnt exist
-        if not os.path.exists(download_dir):
-            try:
-                os.makedirs(download_dir)
-            except Exception as e:
-                telemetry.set_exception(exception=e, fault_type=consts.Create_Directory_Fault_Type,
-                                        summary='Unable to create helm directory')
-                raise ClientRequestError("Failed to create helm directory." + str(e))
+    # Reusing the helm binary installed by an earlier invocation if it matches the checksum recorded at install time
+    checksumUri = '{}/{}.sha256sum'.format(consts.HELM_CHECKSUM_URL, os.path.basename(download_location))
+    if cacheutils.verify_checksum(install_location):
+        return install_location
 
-        # Downloading compressed helm client executable
-        logger.warning("Downloading helm client for first time. This can take few minutes...")
+    # Creating the helm folder if it doesnt exist
+    if not os.path.exists(download_dir):
         try:
-            response = urllib.request.urlopen(requestUri)
+            os.makedirs(download_dir, exist_ok=True)
         except Exception as e:
-            telemetry.set_exception(exception=e, fault_type=consts.Download_Helm_Fault_Type,
-                                    summary='Unable to download helm client.')
-            raise CLIInternalError("Failed to download helm client.", recommendation="Please check your internet connection." + str(e))
-
-        responseContent = response.read()
-        response.close()
+            telemetry.set_exception(exception=e, fault_type=consts.Create_Directory_Fault_Type,
+                                    summary='Unable to create helm directory')
+            raise ClientRequestError("Failed to create helm directory." + str(e))
+
+    # Concurrent invocations wait here instead of downloading and extracting over each other
+    with cacheutils.artifact_cache_lock(os.path.join(download_dir, 'install.lock')):
+        if cacheutils.verify_checksum(install_location):
+            return install_location
+
+        # An archive left by an earlier invocation is only extracted again if it matches the published checksum
+        published_sha256 = cacheutils.get_published_sha256(checksumUri)
+        if os.path.isfile(download_location) and (not published_sha256 or cacheutils.file_sha256(download_location) != published_sha256):
+            os.remove(download_location)
+
+        # Download compressed halm binary if not already present
+        if not os.path.isfile(download_location):
+            # Downloading compressed helm client executable
+            logger.warning("Downloading helm client for first time. This can take few minutes...")
+            try:
+                response = urllib.request.urlopen(requestUri)
+            except Exception as e:
+                telemetry.set_exception(exception=e, fault_type=consts.Download_Helm_Fault_Type,
+                                        summary='Unable to download helm client.')
+                raise CLIInternalError("Failed to download helm client.", recommendation="Please check your internet connection." + str(e))
 
-        # Creating the compressed helm binaries
-        try:
-            with open(download_location, 'wb') as f:
-                f.write(responseContent)
-        except Exception as e:
-            telemetry.set_exception(exception=e, fault_type=consts.Create_HelmExe_Fault_Type,
-                                    summary='Unable to create helm executable')
-            raise ClientRequestError("Failed to create helm executable." + str(e), recommendation="Please ensure that you delete the directory '{}' before trying again.".format(download_dir))
+            responseContent = response.read()
+            response.close()
 
-    # Extract compressed helm binary
-    if not os.path.isfile(install_location):
+            # Creating the compressed helm binaries, a partially written file is never left at the final location
+            try:
+                with open(download_location + '.partial', 'wb') as f:
+                    f.write(responseContent)
+                os.replace(download_location + '.partial', download_location)
+            except Exception as e:
+                telemetry.set_exception(exception=e, fault_type=consts.Create_HelmExe_Fault_Type,
+                                        summary='Unable to create helm executable')
+                raise ClientRequestError("Failed to create helm executable." + str(e), recommendation="Please ensure that you delete the directory '{}' before trying again.".format(download_dir))
+
+            if published_sha256 and cacheutils.file_sha256(download_location) != published_sha256:
+                os.remove(download_location)
+                telemetry.set_exception(exception='Checksum mismatch', fault_type=consts.Download_Helm_Fault_Type,
+                                        summary='Downloaded helm client does not match its published checksum')
+                raise ClientRequestError("The downloaded helm client does not match the checksum published at '{}'.".format(checksumUri),
+                                         recommendation="Please try again.")
+
+        # Extract compressed helm binary, its checksum is only recorded when the archive was verified
         try:
             shutil.unpack_archive(download_location, download_dir)
             os.chmod(install_location, os.stat(install_location).st_mode | stat.S_IXUSR)
+            if published_sha256:
+                cacheutils.write_checksum(install_location)
         except Exception as e:
             telemetry.set_exception(exception=e, fault_type=consts.Extract_HelmExe_Fault_Type,
                                     summary='Unable to extract helm executable')
             raise ClientRequestError("Failed to extract helm executable." + str(e), recommendation="Please ensure that you delete the directory '{}' before trying again.".format(download_dir))
 
+    if not published_sha256:
+        logger.warning("Unable to verify the helm client against its published checksum, it will be verified again by the next command.")
     return install_location
 
 
@@ -2191,7 +2217,7 @@ def get_custom_locations_oid(cmd, cl_oid):
         return ""
 
 
-def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=None, kube_context=None, no_wait=False, tags=None):
+def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=None, kube_context=None, no_wait=False, tags=None, archive_logs=False, log_limit_bytes=None, log_since_seconds=None):
 
     try:
 
@@ -2201,6 +2227,8 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         # Setting the intial values as True
         storage_space_available = True
         probable_sufficient_resource_for_agents = True
+        diagnostic_logs_archive = None
+        troubleshootutils.reset_diagnoser_state()
 
         # Setting default values for all checks as True
         diagnostic_checks = {consts.Fetch_Kubectl_Cluster_Info: consts.Diagnostic_Check_Incomplete, consts.Retrieve_Arc_Agents_Event_Logs: consts.Diagnostic_Check_Incomplete, consts.Retrieve_Arc_Agents_Logs: consts.Diagnostic_Check_Incomplete, consts.Retrieve_Deployments_Logs: consts.Diagnostic_Check_Incomplete, consts.Fetch_Connected_Cluster_Resource: consts.Diagnostic_Check_Incomplete, consts.Storing_Diagnoser_Results_Logs: consts.Diagnostic_Check_Incomplete, consts.MSI_Cert_Expiry_Check: consts.Diagnostic_Check_Incomplete, consts.KAP_Security_Policy_Check: consts.Diagnostic_Check_Incomplete, consts.KAP_Cert_Check: consts.Diagnostic_Check_Incomplete, consts.Diagnoser_Check: consts.Diagnostic_Check_Incomplete, consts.MSI_Cert_Check: consts.Diagnostic_Check_Incomplete, consts.Agent_Version_Check: consts.Diagnostic_Check_Incomplete, consts.Arc_Agent_State_Check: consts.Diagnostic_Check_Incomplete}
@@ -2246,6 +2274,10 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         if(diagnostic_folder_status is not True):
             storage_space_available = False
 
+        # Container logs are streamed straight into a compressed archive when requested
+        if archive_logs and storage_space_available:
+            diagnostic_logs_archive = troubleshootutils.DiagnosticLogsArchive(filepath_with_timestamp + consts.Diagnoser_Logs_Archive_Extension)
+
         # To store the cluster-info of the cluster in current-context
         diagnostic_checks[consts.Fetch_Kubectl_Cluster_Info], storage_space_available = troubleshootutils.fetch_kubectl_cluster_info(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context)
 
@@ -2259,15 +2291,17 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         # To verify if arc agents have been added to the cluster
         if arc_agents_pod_list.items:
 
-            # For storing all the agent logs using the CoreV1Api
-            diagnostic_checks[consts.Retrieve_Arc_Agents_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available)
-
-            # For storing all arc agents events logs
-            diagnostic_checks[consts.Retrieve_Arc_Agents_Event_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context)
-
-            # For storing all the deployments logs using the AppsV1Api
+            # Storing the agent logs using the CoreV1Api, the arc agents events logs and the deployments logs using the AppsV1Api.
+            # These steps are independent of each other, so they are run in parallel.
             appv1_api_instance = kube_client.AppsV1Api()
-            diagnostic_checks[consts.Retrieve_Deployments_Logs], storage_space_available = troubleshootutils.retrieve_deployments_logs(appv1_api_instance, filepath_with_timestamp, storage_space_available)
+            log_collection_results = troubleshootutils.run_diagnostic_steps_in_parallel({
+                consts.Retrieve_Arc_Agents_Logs: lambda: troubleshootutils.retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available, diagnostic_logs_archive, log_limit_bytes, log_since_seconds),
+                consts.Retrieve_Arc_Agents_Event_Logs: lambda: troubleshootutils.retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context),
+                consts.Retrieve_Deployments_Logs: lambda: troubleshootutils.retrieve_deployments_logs(appv1_api_instance, filepath_with_timestamp, storage_space_available)
+            })
+            for check_name, (check_result, step_storage_space_available) in log_collection_results.items():
+                diagnostic_checks[check_name] = check_result
+                storage_space_available = storage_space_available and step_storage_space_available
 
             # Check for the azure arc agent states
             diagnostic_checks[consts.Arc_Agent_State_Check], storage_space_available, all_agents_stuck, probable_sufficient_resource_for_agents = troubleshootutils.check_agent_state(corev1_api_instance, filepath_with_timestamp, storage_space_available)
@@ -2320,18 +2354,18 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         # Performing diagnoser container check
         diagnostic_checks[consts.Diagnoser_Check], storage_space_available = troubleshootutils.check_diagnoser_container(corev1_api_instance, batchv1_api_instance, filepath_with_timestamp, storage_space_available, absolute_path, probable_sufficient_resource_for_agents, helm_client_location, kubectl_client_location, release_namespace, diagnostic_checks[consts.KAP_Security_Policy_Check], kube_config, kube_context)
 
-        # saving secrets in azure-arc namespace
-        storage_space_available = troubleshootutils.get_secrets_azure_arc(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
-
-        # saving helm values of azure-arc release
-        storage_space_available = troubleshootutils.get_helm_values_azure_arc(corev1_api_instance, helm_client_location, release_namespace, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
-
-        # saving metadata CR sanpshot
-        storage_space_available = troubleshootutils.get_metadata_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
-
+        # saving secrets in azure-arc namespace, helm values of azure-arc release and metadata CR snapshot.
+        # Each of these shells out to kubectl/helm independently, so they are run in parallel.
+        snapshot_steps = {
+            "get_secrets_azure_arc": lambda: troubleshootutils.get_secrets_azure_arc(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available),
+            "get_helm_values_azure_arc": lambda: troubleshootutils.get_helm_values_azure_arc(corev1_api_instance, helm_client_location, release_namespace, kube_config, kube_context, filepath_with_timestamp, storage_space_available),
+            "get_metadata_cr_snapshot": lambda: troubleshootutils.get_metadata_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+        }
         # saving kube-aad-proxy CR snapshot only in the case private link is disabled
         if connected_cluster.private_link_state == "Disabled":
-            storage_space_available = troubleshootutils.get_kubeaadproxy_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+            snapshot_steps["get_kubeaadproxy_cr_snapshot"] = lambda: troubleshootutils.get_kubeaadproxy_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+        for step_storage_space_available in troubleshootutils.run_diagnostic_steps_in_parallel(snapshot_steps).values():
+            storage_space_available = storage_space_available and step_storage_space_available is not False
 
         # checking cluster connectivity status
         cluster_connectivity_status = connected_cluster.connectivity_status
@@ -2342,6 +2376,13 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         # Adding cli output to the logs
         diagnostic_checks[consts.Storing_Diagnoser_Results_Logs] = troubleshootutils.fetching_cli_output_logs(filepath_with_timestamp, storage_space_available, 1)
 
+        # Reporting how long each of the parallel steps took
+        troubleshootutils.save_diagnoser_step_timings(filepath_with_timestamp, storage_space_available)
+
+        # Moving the remaining diagnoser logs into the archive
+        if diagnostic_logs_archive is not None:
+            filepath_with_timestamp = troubleshootutils.finalize_diagnostic_logs_archive(diagnostic_logs_archive, filepath_with_timestamp, storage_space_available)
+
         # If all the checks passed then display no error found
         all_checks_passed = True
         for checks in diagnostic_checks:
@@ -2362,6 +2403,8 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
     except KeyboardInterrupt:
         try:
             troubleshootutils.fetching_cli_output_logs(filepath_with_timestamp, storage_space_available, 0)
+            if diagnostic_logs_archive is not None:
+                troubleshootutils.finalize_diagnostic_logs_archive(diagnostic_logs_archive, filepath_with_timestamp, storage_space_available)
         except Exception as e:
             pass
         raise ManualInterrupt('Process terminated externally.')
@@ -2371,31 +2414,49 @@ def install_kubectl_client():
     # Return kubectl client path set by user
     try:
 
-        # Fetching the current directory where the cli installs the kubectl executable
+        # Fetching the current directory where the cli installs the kubectl executable, one per version
         home_dir = os.path.expanduser('~')
-        kubectl_filepath = os.path.join(home_dir, '.azure', 'kubectl-client')
-
-        try:
-            os.mkdir(kubectl_filepath)
-        except FileExistsError:
-            pass
+        kubectl_filepath = os.path.join(home_dir, '.azure', 'kubectl-client', consts.KUBECTL_VERSION)
+        os.makedirs(kubectl_filepath, exist_ok=True)
 
         operating_system = platform.system().lower()
         # Setting path depending on the OS being used
         if operating_system == 'windows':
-            kubectl_path = os.path.join(kubectl_filepath, 'kubectl.exe')
+            kubectl_binary = 'kubectl.exe'
         elif operating_system == 'linux' or operating_system == 'darwin':
-            kubectl_path = os.path.join(kubectl_filepath, 'kubectl')
+            kubectl_binary = 'kubectl'
+        kubectl_path = os.path.join(kubectl_filepath, kubectl_binary)
 
-        if os.path.isfile(kubectl_path):
+        if cacheutils.verify_checksum(kubectl_path):
             return kubectl_path
 
-        # Downloading kubectl executable if its not present in the machine
-        logger.warning("Downloading kubectl client for first time. This can take few minutes...")
-        logging.disable(logging.CRITICAL)
-        get_default_cli().invoke(['aks', 'install-cli', '--install-location', kubectl_path])
-        logging.disable(logging.NOTSET)
-        logger.warning("\n")
+        # Concurrent invocations wait here instead of installing kubectl over each other
+        with cacheutils.artifact_cache_lock(os.path.join(kubectl_filepath, 'install.lock')):
+            if cacheutils.verify_checksum(kubectl_path):
+                return kubectl_path
+
+            architecture = 'arm64' if platform.machine().lower() in ('arm64', 'aarch64') else 'amd64'
+            requestUri = f'{consts.KUBECTL_STORAGE_URL}/{consts.KUBECTL_VERSION}/bin/{operating_system}/{architecture}/{kubectl_binary}'
+            published_sha256 = cacheutils.get_published_sha256(requestUri + '.sha256')
+
+            # Downloading kubectl executable, a partially written or unverified file is never left at the final location
+            logger.warning("Downloading kubectl client for first time. This can take few minutes...")
+            response = urllib.request.urlopen(requestUri)
+            responseContent = response.read()
+            response.close()
+            with open(kubectl_path + '.partial', 'wb') as f:
+                f.write(responseContent)
+            if published_sha256 and cacheutils.file_sha256(kubectl_path + '.partial') != published_sha256:
+                os.remove(kubectl_path + '.partial')
+                raise ClientRequestError("The downloaded kubectl client does not match the checksum published at '{}.sha256'.".format(requestUri))
+            os.replace(kubectl_path + '.partial', kubectl_path)
+            os.chmod(kubectl_path, os.stat(kubectl_path).st_mode | stat.S_IXUSR)
+
+            # Recording the checksum so that later invocations can reuse the binary
+            if published_sha256:
+                cacheutils.write_checksum(kubectl_path)
+            else:
+                logger.warning("Unable to verify the kubectl client against its published checksum, it will be downloaded again by the next command.")
         # Return the path of the kubectl executable
         return kubectl_path
 
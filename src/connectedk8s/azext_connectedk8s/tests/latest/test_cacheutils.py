@@ -0,0 +1,176 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import CLIInternalError
+
+import azext_connectedk8s._cacheutils as cacheutils
+import azext_connectedk8s._constants as consts
+from azext_connectedk8s import custom
+
+DIGEST = 'sha256:0123abcd'
+
+
+class CacheUtilsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        self.charts_dir = os.path.join(self.cache_dir, 'charts')
+
+        def get_artifact_cache_dir(*sub_dirs):
+            path = os.path.join(self.cache_dir, *sub_dirs)
+            os.makedirs(path, exist_ok=True)
+            return path
+
+        # Leases are released when the test ends instead of when the test process exits
+        self.released_leases = []
+        for patcher in [mock.patch.object(cacheutils, 'get_artifact_cache_dir', side_effect=get_artifact_cache_dir),
+                        mock.patch.object(cacheutils, 'resolve_registry_digest', return_value=DIGEST),
+                        mock.patch.object(cacheutils.atexit, 'register', side_effect=lambda func, *args: self.released_leases.append((func, args)))]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _fetch_chart(self, destination):
+        os.makedirs(os.path.join(destination, 'chart', 'templates'))
+        with open(os.path.join(destination, 'chart', 'Chart.yaml'), 'w') as f:
+            f.write('name: chart\n')
+
+    def _leases(self, entry_path):
+        leases_dir = entry_path + consts.Artifact_Cache_Leases_Extension
+        return os.listdir(leases_dir) if os.path.isdir(leases_dir) else []
+
+    def test_chart_is_fetched_once_and_leased(self):
+        fetch_chart = mock.Mock(side_effect=self._fetch_chart)
+
+        first = cacheutils.get_cached_chart_path('mcr.microsoft.com/repo/chart:1.0.0', 'chart', fetch_chart)
+        second = cacheutils.get_cached_chart_path('mcr.microsoft.com/repo/chart:1.0.0', 'chart', fetch_chart)
+
+        digest_dir = os.path.join(self.charts_dir, 'sha256-0123abcd')
+        self.assertEqual(first, os.path.join(digest_dir, 'chart'))
+        self.assertEqual(first, second)
+        self.assertTrue(os.path.isfile(os.path.join(first, 'Chart.yaml')))
+        fetch_chart.assert_called_once()
+        # No staging folder or lock file is left behind and every reader holds a lease until it exits
+        self.assertEqual(sorted(os.listdir(self.charts_dir)), ['sha256-0123abcd', 'sha256-0123abcd' + consts.Artifact_Cache_Leases_Extension])
+        self.assertEqual(len(self._leases(digest_dir)), 2)
+        for release, args in self.released_leases:
+            release(*args)
+        self.assertEqual(self._leases(digest_dir), [])
+
+    def test_unresolved_digest_is_not_cached(self):
+        fetch_chart = mock.Mock()
+        with mock.patch.object(cacheutils, 'resolve_registry_digest', return_value=None):
+            self.assertIsNone(cacheutils.get_cached_chart_path('invalid', 'chart', fetch_chart))
+        fetch_chart.assert_not_called()
+
+    def test_existing_entry_is_used(self):
+        digest_dir = os.path.join(self.charts_dir, 'sha256-0123abcd')
+
+        def fetch_chart(destination):
+            # Another invocation populates the entry while this one is exporting
+            self._fetch_chart(destination)
+            self._fetch_chart(digest_dir)
+
+        chart_path = cacheutils.get_cached_chart_path('mcr.microsoft.com/repo/chart:1.0.0', 'chart', fetch_chart)
+
+        self.assertEqual(chart_path, os.path.join(digest_dir, 'chart'))
+        self.assertFalse([entry for entry in os.listdir(self.charts_dir) if entry.startswith('.staging-')])
+
+    def test_incomplete_entry_is_replaced(self):
+        digest_dir = os.path.join(self.charts_dir, 'sha256-0123abcd')
+        os.makedirs(digest_dir)
+        fetch_chart = mock.Mock(side_effect=self._fetch_chart)
+
+        chart_path = cacheutils.get_cached_chart_path('mcr.microsoft.com/repo/chart:1.0.0', 'chart', fetch_chart)
+
+        fetch_chart.assert_called_once()
+        self.assertTrue(os.path.isfile(os.path.join(chart_path, 'Chart.yaml')))
+
+    def test_prune_keeps_leased_and_locked_entries(self):
+        now = time.time()
+        entries = {}
+        for age, name in enumerate(['newest', 'leased', 'stale-lease', 'locked', 'unused']):
+            entries[name] = os.path.join(self.charts_dir, name)
+            self._fetch_chart(entries[name])
+            os.utime(entries[name], (now - age * 60, now - age * 60))
+        cacheutils.add_shared_lease(entries['leased'])
+        stale_lease = cacheutils.add_shared_lease(entries['stale-lease'])
+        stale_time = now - consts.Artifact_Cache_Lease_Stale_After - 60
+        os.utime(stale_lease, (stale_time, stale_time))
+        open(entries['locked'] + '.lock', 'w').close()
+
+        cacheutils.prune_cached_charts(self.charts_dir, max_entries=1)
+
+        remaining = sorted(entry for entry in os.listdir(self.charts_dir) if not entry.endswith(('.lock', consts.Artifact_Cache_Leases_Extension)))
+        self.assertEqual(remaining, ['leased', 'locked', 'newest'])
+        self.assertFalse(os.path.exists(stale_lease))
+
+    def test_get_published_sha256(self):
+        with mock.patch.object(cacheutils.requests, 'get') as get:
+            get.return_value = mock.Mock(status_code=200, text='ABC123  helm-v3.6.3-linux-amd64.tar.gz\n')
+            self.assertEqual(cacheutils.get_published_sha256('https://get.helm.sh/helm.tar.gz.sha256sum'), 'abc123')
+            get.return_value = mock.Mock(status_code=404, text='Not found')
+            self.assertIsNone(cacheutils.get_published_sha256('https://get.helm.sh/helm.tar.gz.sha256sum'))
+            get.side_effect = cacheutils.requests.ConnectionError()
+            self.assertIsNone(cacheutils.get_published_sha256('https://get.helm.sh/helm.tar.gz.sha256sum'))
+
+
+class BinaryInstallTest(unittest.TestCase):
+
+    def setUp(self):
+        self.home_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.home_dir, ignore_errors=True)
+        self.content = b'kubectl binary'
+        self.published_sha256 = hashlib.sha256(self.content).hexdigest()
+        self.urlopen = mock.Mock(side_effect=lambda uri: mock.Mock(read=mock.Mock(return_value=self.content)))
+        for patcher in [mock.patch.dict(os.environ, {'HOME': self.home_dir}),
+                        mock.patch.object(custom.platform, 'system', return_value='Linux'),
+                        mock.patch.object(custom.platform, 'machine', return_value='x86_64'),
+                        mock.patch.object(custom.urllib.request, 'urlopen', new=self.urlopen),
+                        mock.patch.object(cacheutils, 'get_published_sha256', side_effect=lambda url: self.published_sha256)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.kubectl_path = os.path.join(self.home_dir, '.azure', 'kubectl-client', consts.KUBECTL_VERSION, 'kubectl')
+
+    def test_kubectl_is_verified_and_reused(self):
+        self.assertEqual(custom.install_kubectl_client(), self.kubectl_path)
+        self.assertEqual(custom.install_kubectl_client(), self.kubectl_path)
+
+        self.urlopen.assert_called_once_with('{}/{}/bin/linux/amd64/kubectl'.format(consts.KUBECTL_STORAGE_URL, consts.KUBECTL_VERSION))
+        with open(self.kubectl_path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_unverified_kubectl_is_not_reused(self):
+        # A binary installed without a recorded checksum is downloaded again instead of being adopted
+        os.makedirs(os.path.dirname(self.kubectl_path))
+        with open(self.kubectl_path, 'wb') as f:
+            f.write(b'unknown binary')
+        self.published_sha256 = None
+
+        custom.install_kubectl_client()
+        custom.install_kubectl_client()
+
+        self.assertEqual(self.urlopen.call_count, 2)
+        self.assertFalse(os.path.exists(self.kubectl_path + consts.Artifact_Cache_Checksum_Extension))
+
+    def test_kubectl_not_matching_the_published_checksum_is_rejected(self):
+        self.published_sha256 = hashlib.sha256(b'another binary').hexdigest()
+
+        with self.assertRaises(CLIInternalError):
+            custom.install_kubectl_client()
+
+        self.assertEqual(os.listdir(os.path.dirname(self.kubectl_path)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
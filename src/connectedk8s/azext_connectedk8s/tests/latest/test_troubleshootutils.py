@@ -0,0 +1,85 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+from unittest import mock
+
+import azext_connectedk8s._troubleshootutils as troubleshootutils
+
+
+class TroubleshootUtilsTest(unittest.TestCase):
+
+    def setUp(self):
+        troubleshootutils.reset_diagnoser_state()
+        self.addCleanup(troubleshootutils.reset_diagnoser_state)
+
+    def test_parallel_steps_output_follows_step_order(self):
+        # The first step only reports once the last one has finished, so the threads record out of order
+        last_step_done = threading.Event()
+
+        def first_step():
+            last_step_done.wait(5)
+            troubleshootutils.record_diagnoser_output("first")
+            return "first result"
+
+        def second_step():
+            troubleshootutils.record_diagnoser_output("second")
+            return "second result"
+
+        def last_step():
+            troubleshootutils.record_diagnoser_output("last 1")
+            troubleshootutils.record_diagnoser_output("last 2")
+            last_step_done.set()
+            return "last result"
+
+        troubleshootutils.record_diagnoser_output("before")
+        results = troubleshootutils.run_diagnostic_steps_in_parallel({"first": first_step, "second": second_step, "last": last_step}, max_workers=3)
+
+        self.assertEqual(results, {"first": "first result", "second": "second result", "last": "last result"})
+        self.assertEqual(troubleshootutils.diagnoser_output, ["before", "first", "second", "last 1", "last 2"])
+        self.assertEqual(list(troubleshootutils.diagnoser_step_timings), ["first", "second", "last"])
+        # Output recorded outside of the pool goes straight to the diagnoser output again
+        troubleshootutils.record_diagnoser_output("after")
+        self.assertEqual(troubleshootutils.diagnoser_output[-1], "after")
+
+    def test_failed_step_keeps_output_and_timing(self):
+        def failing_step():
+            troubleshootutils.record_diagnoser_output("failing")
+            raise ValueError("step failed")
+
+        with self.assertRaisesRegex(ValueError, "step failed"):
+            troubleshootutils.run_diagnostic_steps_in_parallel({"ok": lambda: True, "failing": failing_step})
+
+        self.assertEqual(troubleshootutils.diagnoser_output, ["failing"])
+        self.assertEqual(set(troubleshootutils.diagnoser_step_timings), {"ok", "failing"})
+
+    def test_reset_diagnoser_state(self):
+        troubleshootutils.run_diagnostic_steps_in_parallel({"step": lambda: troubleshootutils.record_diagnoser_output("step")})
+        output, timings = troubleshootutils.diagnoser_output, troubleshootutils.diagnoser_step_timings
+
+        troubleshootutils.reset_diagnoser_state()
+
+        # The module level objects are cleared in place, so references held elsewhere see the reset too
+        self.assertIs(troubleshootutils.diagnoser_output, output)
+        self.assertEqual(output, [])
+        self.assertEqual(timings, {})
+
+    @mock.patch.object(troubleshootutils, 'telemetry')
+    @mock.patch.object(troubleshootutils, 'logger')
+    @mock.patch.object(troubleshootutils, 'Popen')
+    def test_failed_kubectl_get_events_is_recorded(self, popen, *_):
+        popen.return_value.returncode = 1
+        popen.return_value.communicate.return_value = (b'', b'forbidden')
+
+        result = troubleshootutils.retrieve_arc_agents_event_logs('logs', True, 'kubectl', None, None)
+
+        self.assertEqual(result, (troubleshootutils.consts.Diagnostic_Check_Failed, True))
+        self.assertEqual(len(troubleshootutils.diagnoser_output), 1)
+        self.assertTrue(troubleshootutils.diagnoser_output[0].endswith('Exception: forbidden'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,386 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# pylint: disable=line-too-long, consider-using-f-string, broad-except
+
+import copy
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.cli.core.azclierror import ValidationError, AzureResponseError
+from azure.cli.core.commands.client_factory import get_subscription_id
+from azure.cli.core.util import send_raw_request
+from knack.log import get_logger
+from msrest.exceptions import DeserializationError
+from msrestazure.tools import parse_resource_id, is_valid_resource_id, resource_id
+
+from ._clients import (ContainerAppClient, ManagedEnvironmentClient, DaprComponentClient, PollingAnimation,
+                       CURRENT_API_VERSION, POLLING_TIMEOUT, POLLING_SECONDS, HEADER_AZURE_ASYNC_OPERATION, HEADER_LOCATION)
+from ._utils import (_convert_yaml_to_rest_payload, _get_sdk_models, _populate_secret_values, safe_get,
+                     _FLATTENED_KEY_SEPARATOR)
+from .custom import process_loaded_yaml
+
+logger = get_logger(__name__)
+
+CONTAINER_APP_TYPE = 'Microsoft.App/containerApps'
+MANAGED_ENVIRONMENT_TYPE = 'Microsoft.App/managedEnvironments'
+DAPR_COMPONENT_TYPE = 'Microsoft.App/managedEnvironments/daprComponents'
+# The _sdk_models model of every resource type, in the order they are applied: the apps and the dapr components
+# of an environment are only applied once the environment is
+APPLY_ORDER = [(MANAGED_ENVIRONMENT_TYPE, 'ManagedEnvironment'),
+               (DAPR_COMPONENT_TYPE, 'DaprComponent'),
+               (CONTAINER_APP_TYPE, 'ContainerApp')]
+APPLY_MAX_CONCURRENCY = 8
+YAML_FILE_EXTENSIONS = ('.yaml', '.yml')
+# Values that are sent on create or update but never returned by a GET, as (parent key, key). They are ignored when
+# comparing a spec with the deployed resource.
+WRITE_ONLY_VALUES = [('secrets', 'value'), ('logAnalyticsConfiguration', 'sharedKey'), ('properties', 'daprAIInstrumentationKey'),
+                     ('properties', 'daprAIConnectionString'), ('customDomainConfiguration', 'certificateValue'),
+                     ('customDomainConfiguration', 'certificatePassword')]
+
+ACTION_CREATE = 'Create'
+ACTION_UPDATE = 'Update'
+ACTION_NONE = 'None'
+
+
+class ApplySpec:  # pylint: disable=too-few-public-methods
+    # A resource defined in the yaml files, with its REST payload and the state of its deployment
+
+    def __init__(self, resource_type, name, payload, file_name, environment_name=None):
+        self.resource_type = resource_type
+        self.name = name
+        self.payload = payload
+        self.file_name = file_name
+        self.environment_name = environment_name
+        self.existing = None
+        self.action = None
+        self.status = None
+        self.error = None
+
+    @property
+    def key(self):
+        return (self.resource_type, (self.environment_name or '').lower(), self.name.lower())
+
+    def result(self):
+        result = {'type': self.resource_type, 'name': self.name, 'action': self.action, 'status': self.status}
+        if self.environment_name and self.resource_type == DAPR_COMPONENT_TYPE:
+            result['environment'] = self.environment_name
+        if self.error:
+            result['error'] = self.error
+        return result
+
+
+def load_apply_specs(cmd, paths, resource_group_name, environment=None):
+    """
+    Load the container apps, environments and dapr components defined by the yaml files and the yaml files of the
+    directories in paths. A file can hold several yaml documents. Every error is reported at once.
+    """
+    import yaml
+
+    specs = []
+    errors = []
+    for file_name in _list_yaml_files(paths):
+        try:
+            with open(file_name) as stream:  # pylint: disable=unspecified-encoding
+                documents = list(yaml.safe_load_all(stream.read().replace('\x00', '')))
+        except (yaml.YAMLError, UnicodeDecodeError) as ex:
+            errors.append('{}: {}'.format(file_name, ex))
+            continue
+        for index, document in enumerate(documents):
+            if document is None:
+                continue
+            try:
+                specs.append(_load_apply_spec(cmd, document, file_name, resource_group_name, environment))
+            except (ValidationError, DeserializationError) as ex:
+                errors.append('{} (document {}): {}'.format(file_name, index, ex))
+
+    seen = {}
+    for spec in specs:
+        if spec.key in seen:
+            errors.append('{} {} is defined in both {} and {}'.format(spec.resource_type, spec.name, seen[spec.key], spec.file_name))
+        seen.setdefault(spec.key, spec.file_name)
+    if errors:
+        raise ValidationError('Invalid YAML provided. Please see https://aka.ms/azure-container-apps-yaml for a valid containerapps YAML spec.\n' + '\n'.join(errors))
+    if not specs:
+        raise ValidationError('No container app, environment or dapr component is defined in {}'.format(', '.join(paths)))
+
+    # Dapr components without an environment belong to the environment of the yaml files when there is only one
+    environments = [spec.name for spec in specs if spec.resource_type == MANAGED_ENVIRONMENT_TYPE]
+    for spec in specs:
+        if spec.resource_type == DAPR_COMPONENT_TYPE and not spec.environment_name:
+            if len(environments) != 1:
+                raise ValidationError('The environment of dapr component {} in {} is unknown. Use --environment or define its id.'.format(spec.name, spec.file_name))
+            spec.environment_name = environments[0]
+    return specs
+
+
+def _list_yaml_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(YAML_FILE_EXTENSIONS) and os.path.isfile(os.path.join(path, name))))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise ValidationError('{} does not exist'.format(path))
+    return files
+
+
+def _load_apply_spec(cmd, document, file_name, resource_group_name, environment):
+    if not isinstance(document, dict):
+        raise ValidationError('a yaml mapping is expected')
+    if not document.get('name'):
+        raise ValidationError('name is required')
+    types = {resource_type.lower(): (resource_type, model_name) for resource_type, model_name in APPLY_ORDER}
+    resource_type, model_name = types.get((document.get('type') or CONTAINER_APP_TYPE).lower(), (None, None))
+    if not resource_type:
+        raise ValidationError('type must be one of {}'.format(', '.join(types[t][0] for t in types)))
+
+    environment_name = None
+    if resource_type == CONTAINER_APP_TYPE:
+        document = process_loaded_yaml(document)
+    elif resource_type == DAPR_COMPONENT_TYPE:
+        if is_valid_resource_id(document.get('id') or ''):
+            environment_name = parse_resource_id(document['id'])['name']
+        elif environment:
+            environment_name = parse_resource_id(environment)['name'] if is_valid_resource_id(environment) else environment
+
+    payload = _convert_yaml_to_rest_payload(model_name, document)
+    if resource_type == CONTAINER_APP_TYPE:
+        payload = process_loaded_yaml(payload)
+        if not payload['properties'].get('environmentId'):
+            if not environment:
+                raise ValidationError('environmentId is required. Use --environment or define it in the yaml.')
+            payload['properties']['environmentId'] = environment if is_valid_resource_id(environment) else resource_id(
+                subscription=get_subscription_id(cmd.cli_ctx), resource_group=resource_group_name,
+                namespace='Microsoft.App', type='managedEnvironments', name=environment)
+    _remove_model_readonly_attributes(payload, model_name)
+    if resource_type == DAPR_COMPONENT_TYPE:
+        payload['properties'] = payload.get('properties', {})
+        if not payload['properties'].get('ignoreErrors'):
+            payload['properties']['ignoreErrors'] = False
+    return ApplySpec(resource_type, document['name'], payload, file_name, environment_name)
+
+
+def _remove_model_readonly_attributes(payload, model_name):
+    # Remove the top level attributes the model defines as read-only, such as id or provisioningState
+    model = _get_sdk_models()[model_name]
+    for attribute, validation in model._validation.items():  # pylint: disable=protected-access
+        if not validation.get('readonly'):
+            continue
+        keys = _FLATTENED_KEY_SEPARATOR.split(model._attribute_map[attribute]['key'])  # pylint: disable=protected-access
+        parent = safe_get(payload, *keys[:-1], default=None) if len(keys) > 1 else payload
+        if isinstance(parent, dict):
+            parent.pop(keys[-1], None)
+
+
+def plan_apply_specs(cmd, resource_group_name, specs, force=False):
+    """
+    Compare every spec with the deployed resource from a single list of the resource group per resource type, and
+    set the action needed to deploy it.
+    """
+    resource_types = {spec.resource_type for spec in specs}
+    existing = {}
+    if CONTAINER_APP_TYPE in resource_types:
+        existing[CONTAINER_APP_TYPE] = {(None, app['name'].lower()): app for app in ContainerAppClient.list_by_resource_group(cmd, resource_group_name)}
+    environments = {env['name'].lower(): env for env in ManagedEnvironmentClient.list_by_resource_group(cmd, resource_group_name)}
+    existing[MANAGED_ENVIRONMENT_TYPE] = {(None, name): env for name, env in environments.items()}
+    existing[DAPR_COMPONENT_TYPE] = {}
+    dapr_environments = sorted({spec.environment_name.lower() for spec in specs if spec.resource_type == DAPR_COMPONENT_TYPE} & set(environments))
+    with ThreadPoolExecutor(max_workers=APPLY_MAX_CONCURRENCY) as executor:
+        for environment_name, components in zip(dapr_environments, executor.map(lambda name: DaprComponentClient.list(cmd, resource_group_name, name), dapr_environments)):
+            for component in components:
+                existing[DAPR_COMPONENT_TYPE][(environment_name, component['name'].lower())] = component
+
+        for spec in specs:
+            scope = spec.environment_name.lower() if spec.resource_type == DAPR_COMPONENT_TYPE else None
+            spec.existing = existing[spec.resource_type].get((scope, spec.name.lower()))
+            if spec.resource_type != DAPR_COMPONENT_TYPE and not spec.payload.get('location'):
+                spec.payload['location'] = _get_location(spec, specs, environments)
+
+        # Secret values of the apps aren't returned by a GET, they are read to fill the ones the yaml leaves out
+        # and to find the ones that changed
+        apps_with_secrets = [spec for spec in specs if spec.resource_type == CONTAINER_APP_TYPE and spec.existing
+                             and safe_get(spec.payload, 'properties', 'configuration', 'secrets', default=None)]
+        for spec, secrets in zip(apps_with_secrets, executor.map(
+                lambda s: ContainerAppClient.list_secrets(cmd, resource_group_name, s.name).get('value', []), apps_with_secrets)):
+            _populate_secret_values(spec.payload, secrets)
+            spec.existing = copy.deepcopy(spec.existing)
+            _populate_secret_values(spec.existing, secrets)
+
+    for spec in specs:
+        if spec.existing is None:
+            spec.action = ACTION_CREATE
+        elif force or _spec_differs_from_existing(spec):
+            spec.action = ACTION_UPDATE
+        else:
+            spec.action = ACTION_NONE
+    return specs
+
+
+def _get_location(spec, specs, environments):
+    # New apps and environments are created in the location of the deployed resource or of their environment
+    if spec.existing:
+        return spec.existing['location']
+    if spec.resource_type == CONTAINER_APP_TYPE:
+        environment_id = spec.payload['properties']['environmentId']
+        environment_name = parse_resource_id(environment_id)['name'].lower()
+        for other in specs:
+            if other.resource_type == MANAGED_ENVIRONMENT_TYPE and other.name.lower() == environment_name and other.payload.get('location'):
+                return other.payload['location']
+        environment = environments.get(environment_name)
+        if environment and environment['id'].lower() == environment_id.lower():
+            return environment['location']
+    return None
+
+
+def _spec_differs_from_existing(spec):
+    # Apps and environments are updated with a PATCH, so the properties left out of their yaml keep their deployed
+    # value. Dapr components are replaced with a PUT, which removes the properties left out of their yaml.
+    if spec.resource_type == DAPR_COMPONENT_TYPE:
+        return _spec_differs(spec.payload.get('properties'), (spec.existing or {}).get('properties'), 'properties', replaced=True)
+    return _spec_differs(spec.payload, spec.existing)
+
+
+def _spec_differs(desired, existing, parent_key=None, replaced=False):
+    """
+    Whether a value of the desired payload differs from the deployed resource. Only the properties of the yaml are
+    compared, unless replaced is set: then a deployed property the yaml leaves out differs as well.
+    """
+    if isinstance(desired, dict):
+        if not isinstance(existing, dict):
+            return True
+        if replaced and any(key not in desired and value not in (None, '', [], {}) for key, value in existing.items()):
+            return True
+        for key, value in desired.items():
+            if value is None:
+                continue
+            if key not in existing or existing[key] is None:
+                if (parent_key, key) in WRITE_ONLY_VALUES:
+                    continue
+                return True
+            if _spec_differs(value, existing[key], key, replaced):
+                return True
+        return False
+    if isinstance(desired, list):
+        if not isinstance(existing, list) or len(desired) != len(existing):
+            return True
+        return any(_spec_differs(value, existing_value, parent_key, replaced) for value, existing_value in zip(desired, existing))
+    if isinstance(desired, str) and isinstance(existing, str):
+        if parent_key == 'location':
+            return desired.replace(' ', '').lower() != existing.replace(' ', '').lower()
+        if parent_key and parent_key.lower().endswith('id') and is_valid_resource_id(desired):
+            return desired.lower() != existing.lower()
+    return desired != existing
+
+
+def run_apply_specs(cmd, resource_group_name, specs):
+    """
+    Send the specs that changed, environments first, then dapr components and apps. The requests of a resource type
+    are sent concurrently and their long running operations are polled together.
+    """
+    failed_environments = set()
+    for resource_type, _ in APPLY_ORDER:
+        tier = [spec for spec in specs if spec.resource_type == resource_type and spec.action != ACTION_NONE]
+        for spec in tier:
+            environment_name = spec.environment_name if resource_type == DAPR_COMPONENT_TYPE else \
+                parse_resource_id(safe_get(spec.payload, 'properties', 'environmentId', default='') or '').get('name')
+            if resource_type != MANAGED_ENVIRONMENT_TYPE and (environment_name or '').lower() in failed_environments:
+                spec.status = 'Skipped'
+                spec.error = 'Environment {} failed to deploy'.format(environment_name)
+        tier = [spec for spec in tier if spec.status is None]
+        if not tier:
+            continue
+
+        with ThreadPoolExecutor(max_workers=APPLY_MAX_CONCURRENCY) as executor:
+            operations = [operation for operation in executor.map(lambda spec: _begin_request(cmd, resource_group_name, spec), tier) if operation]
+            _wait_for_operations(cmd, operations, executor)
+
+        for spec in tier:
+            if spec.status == 'Failed':
+                logger.error('%s %s failed: %s', spec.action, spec.name, spec.error)
+                if resource_type == MANAGED_ENVIRONMENT_TYPE:
+                    failed_environments.add(spec.name.lower())
+            else:
+                logger.warning('%s %s: %s', spec.action, spec.name, spec.status)
+
+    for spec in specs:
+        if spec.action == ACTION_NONE:
+            spec.status = 'Unchanged'
+    failures = [spec for spec in specs if spec.status in ('Failed', 'Skipped')]
+    if failures:
+        raise AzureResponseError('Failed to apply {}'.format(', '.join(spec.name for spec in failures)))
+    return [spec.result() for spec in specs]
+
+
+def _get_resource_url(cmd, resource_group_name, spec):
+    management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
+    sub_id = get_subscription_id(cmd.cli_ctx)
+    if spec.resource_type == DAPR_COMPONENT_TYPE:
+        path = 'managedEnvironments/{}/daprComponents/{}'.format(spec.environment_name, spec.name)
+    elif spec.resource_type == MANAGED_ENVIRONMENT_TYPE:
+        path = 'managedEnvironments/{}'.format(spec.name)
+    else:
+        path = 'containerApps/{}'.format(spec.name)
+    return "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/{}?api-version={}".format(
+        management_hostname.strip('/'), sub_id, resource_group_name, path, CURRENT_API_VERSION)
+
+
+def _begin_request(cmd, resource_group_name, spec):
+    # Returns the operation to wait for, None if the request failed. Existing apps and environments are patched, as
+    # by `containerapp update --yaml`, while new resources and dapr components are put.
+    request_url = _get_resource_url(cmd, resource_group_name, spec)
+    method = "PATCH" if spec.action == ACTION_UPDATE and spec.resource_type != DAPR_COMPONENT_TYPE else "PUT"
+    try:
+        r = send_raw_request(cmd.cli_ctx, method, request_url, body=json.dumps(spec.payload))
+    except Exception as ex:
+        spec.status = 'Failed'
+        spec.error = str(ex)
+        return None
+    return spec, r.headers.get(HEADER_AZURE_ASYNC_OPERATION) or r.headers.get(HEADER_LOCATION), request_url
+
+
+def _wait_for_operations(cmd, operations, executor):
+    pending = list(operations)
+    end = time.time() + POLLING_TIMEOUT
+    animation = PollingAnimation()
+    while pending:
+        animation.tick()
+        states = list(executor.map(lambda operation: _get_operation_state(cmd, *operation), pending))
+        for (spec, _, _), (state, error) in zip(list(pending), states):
+            if state.lower() in ('succeeded', 'failed', 'canceled'):
+                spec.status = 'Succeeded' if state.lower() == 'succeeded' else 'Failed'
+                spec.error = error
+        pending = [operation for operation in pending if operation[0].status is None]
+        if pending and time.time() > end:
+            for spec, _, _ in pending:
+                spec.status = 'Failed'
+                spec.error = 'Timed out waiting for the operation to complete'
+            break
+        if pending:
+            time.sleep(POLLING_SECONDS)
+    animation.flush()
+
+
+def _get_operation_state(cmd, spec, operation_url, request_url):  # pylint: disable=unused-argument
+    # The state of the asynchronous operation when the service returned one, else the provisioning state of the
+    # resource. Resources without a provisioning state, such as dapr components, are done once created.
+    try:
+        if operation_url:
+            r = send_raw_request(cmd.cli_ctx, "GET", operation_url)
+            # The location of an operation result answers 202 until the operation is done, then returns the resource
+            if r.status_code == 202:
+                return 'InProgress', None
+            body = r.json() if r.content else {}
+            if 'status' in body or 'error' in body:
+                error = json.dumps(body['error']) if body.get('error') else None
+                return body.get('status') or 'InProgress', error
+        else:
+            body = send_raw_request(cmd.cli_ctx, "GET", request_url).json()
+        return safe_get(body, 'properties', 'provisioningState', default=None) or 'Succeeded', None
+    except Exception as ex:
+        return 'Failed', str(ex)
@@ -143,6 +143,26 @@ helps['containerapp browse'] = """
           az containerapp browse -n MyContainerapp -g MyResourceGroup
 """
 
+helps['containerapp apply'] = """
+    type: command
+    short-summary: Create or update the container apps, environments and dapr components defined by yaml files.
+    long-summary: |
+        Every yaml document defines one resource of the resource group, identified by its name and its type:
+        Microsoft.App/containerApps (the default), Microsoft.App/managedEnvironments or
+        Microsoft.App/managedEnvironments/daprComponents. The resources are compared with the ones deployed in the
+        resource group, and only the ones that are new or whose yaml differs are sent, concurrently. Environments are
+        applied first, then dapr components and apps. Existing apps and environments are updated with the properties
+        of their yaml only, the properties left out keep their deployed value. Existing dapr components are replaced
+        by their yaml, the properties left out are removed.
+    examples:
+    - name: Apply a directory of yaml files to a resource group.
+      text: |
+          az containerapp apply -g MyResourceGroup --yaml ./apps
+    - name: Show what would change, with the apps and dapr components that don't define an environment in MyContainerappEnv.
+      text: |
+          az containerapp apply -g MyResourceGroup --yaml ./apps ./components.yaml --environment MyContainerappEnv --dry-run
+"""
+
 helps['containerapp up'] = """
     type: command
     short-summary: Create or update a container app as well as any associated resources (ACR, resource group, container apps environment, GitHub Actions, etc.)
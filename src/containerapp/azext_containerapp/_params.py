@@ -116,6 +116,11 @@ def load_arguments(self, _):
         c.argument('transport', arg_type=get_enum_type(['auto', 'http', 'http2', 'tcp']), help="The transport protocol used for ingress traffic.")
         c.argument('exposed_port', type=int, help="Additional exposed port. Only supported by tcp transport protocol. Must be unique per environment if the app ingress is external.")
 
+    with self.argument_context('containerapp apply') as c:
+        c.argument('yaml', nargs='+', help='Space-separated paths of .yaml files, or of directories of .yaml files, defining container apps, environments and dapr components. A file can hold several yaml documents separated by "---".')
+        c.argument('dry_run', arg_type=get_three_state_flag(), help='Show the resources that would be created or updated without changing them.')
+        c.argument('force', arg_type=get_three_state_flag(), help='Update every resource, including the ones that match their yaml. Use it to apply changes that a GET does not return, such as the values of dapr component secrets.')
+
     with self.argument_context('containerapp create') as c:
         c.argument('traffic_weights', nargs='*', options_list=['--traffic-weight'], help="A list of revision weight(s) for the container app. Space-separated values in 'revision_name=weight' format. For latest revision, use 'latest=weight'")
         c.argument('workload_profile_name', options_list=['--workload-profile-name', '-w'], help="Name of the workload profile to run the app on.", is_preview=True)
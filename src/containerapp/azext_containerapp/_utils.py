@@ -7,6 +7,7 @@
 import time
 import json
 import platform
+import re
 
 from urllib.parse import urlparse
 from datetime import datetime
@@ -34,6 +35,11 @@ from ._models import (ContainerAppCustomDomainEnvelope as ContainerAppCustomDoma
 
 logger = get_logger(__name__)
 
+# Splits the keys of flattened attributes in the _attribute_map of models, such as "properties.template"
+_FLATTENED_KEY_SEPARATOR = re.compile(r"(?<!\\)\.")
+_SDK_MODELS = None
+_SDK_MODELS_DESERIALIZER = None
+
 
 def register_provider_if_needed(cmd, rp_name):
     if not _is_resource_provider_registered(cmd, rp_name):
@@ -808,39 +814,75 @@ def _add_or_update_tags(containerapp_def, tags):
             containerapp_def['tags'][key] = tags[key]
 
 
-def _object_to_dict(obj):
-
-    def default_handler(x):
-        if isinstance(x, datetime):
-            return x.isoformat()
-        return x.__dict__
-
-    return json.loads(json.dumps(obj, default=default_handler))
-
-
-def _to_camel_case(snake_str):
-    components = snake_str.split('_')
-    return components[0] + ''.join(x.title() for x in components[1:])
-
-
-def _convert_object_from_snake_to_camel_case(o):
-    if isinstance(o, list):
-        return [_convert_object_from_snake_to_camel_case(i) if isinstance(i, (dict, list)) else i for i in o]
-    return {
-        _to_camel_case(a): _convert_object_from_snake_to_camel_case(b) if isinstance(b, (dict, list)) else b for a, b in o.items()
-    }
-
-
-def _remove_additional_attributes(o):
-    if isinstance(o, list):
-        for i in o:
-            _remove_additional_attributes(i)
-    elif isinstance(o, dict):
-        if "additionalProperties" in o:
-            del o["additionalProperties"]
-
-        for key in o:
-            _remove_additional_attributes(o[key])
+def _get_sdk_models():
+    # _sdk_models is only needed by the --yaml commands, so it's imported on first use and its classes are
+    # collected once per process
+    global _SDK_MODELS  # pylint: disable=global-statement
+    if _SDK_MODELS is None:
+        from . import _sdk_models
+        _SDK_MODELS = {name: value for name, value in vars(_sdk_models).items() if isinstance(value, type)}
+    return _SDK_MODELS
+
+
+def _get_sdk_models_deserializer():
+    global _SDK_MODELS_DESERIALIZER  # pylint: disable=global-statement
+    if _SDK_MODELS_DESERIALIZER is None:
+        from msrest import Deserializer
+        _SDK_MODELS_DESERIALIZER = Deserializer(_get_sdk_models())
+    return _SDK_MODELS_DESERIALIZER
+
+
+def _convert_yaml_to_rest_payload(model_name, yaml_object):
+    """
+    Convert a loaded yaml object to the REST payload of the _sdk_models model model_name. Like deserializing the yaml
+    into the model and serializing it back, only the attributes defined by the models are kept and the values are
+    converted to their types, but no model object is created. Attributes missing from the yaml are left out.
+    Raises DeserializationError if a value can't be converted to its type.
+    """
+    return _convert_yaml_value(yaml_object, model_name, _get_sdk_models(), _get_sdk_models_deserializer())
+
+
+def _convert_yaml_value(value, data_type, models, deserializer):
+    from msrest.exceptions import DeserializationError
+
+    if value is None:
+        return None
+    if data_type.startswith('['):
+        if not isinstance(value, (list, set)):
+            raise DeserializationError("Cannot deserialize as {} an object of type {}".format(data_type, type(value)))
+        return [_convert_yaml_value(item, data_type[1:-1], models, deserializer) for item in value]
+    if data_type.startswith('{'):
+        if not isinstance(value, dict):
+            raise DeserializationError("Cannot deserialize as {} an object of type {}".format(data_type, type(value)))
+        # The keys are names chosen by the user (tags, identities...) and are kept as they are
+        return {key: _convert_yaml_value(item, data_type[1:-1], models, deserializer) for key, item in value.items()}
+
+    model = models.get(data_type)
+    if not hasattr(model, '_attribute_map'):
+        value = deserializer.deserialize_data(value, data_type)
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    if not isinstance(value, dict):
+        raise DeserializationError("Unable to deserialize to object: {}".format(data_type))
+    payload = {}
+    for attribute in model._attribute_map.values():  # pylint: disable=protected-access
+        keys = [key.replace('\\.', '.') for key in _FLATTENED_KEY_SEPARATOR.split(attribute['key'])]
+        # Flattened attributes such as "properties.template" are read from the top level when the object doesn't have
+        # "properties", as msrest does
+        data = value
+        for key in keys[:-1]:
+            data = data.get(key, value)
+            if data is None:
+                break
+            if not isinstance(data, dict):
+                raise DeserializationError("Unable to deserialize to object: {}".format(data_type))
+        if data is None or data.get(keys[-1]) is None:
+            continue
+        target = payload
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = _convert_yaml_value(data[keys[-1]], attribute['type'], models, deserializer)
+    return payload
 
 
 def _remove_readonly_attributes(containerapp_def):
@@ -894,25 +936,6 @@ def _populate_secret_values(containerapp_def, secret_values):
         index += 1
 
 
-def _remove_dapr_readonly_attributes(daprcomponent_def):
-    unneeded_properties = [
-        "id",
-        "name",
-        "type",
-        "systemData",
-        "provisioningState",
-        "latestRevisionName",
-        "latestRevisionFqdn",
-        "customDomainVerificationId",
-        "outboundIpAddresses",
-        "fqdn"
-    ]
-
-    for unneeded_property in unneeded_properties:
-        if unneeded_property in daprcomponent_def:
-            del daprcomponent_def[unneeded_property]
-
-
 def update_nested_dictionary(orig_dict, new_dict):
     # Recursively update a nested dictionary. If the value is a list, replace the old list with new list
     from collections.abc import Mapping
@@ -5,7 +5,6 @@
 # pylint: disable=line-too-long, consider-using-f-string, logging-format-interpolation, inconsistent-return-statements, broad-except, bare-except, too-many-statements, too-many-locals, too-many-boolean-expressions, too-many-branches, too-many-nested-blocks, pointless-statement, expression-not-assigned, unbalanced-tuple-unpacking, unsupported-assignment-operation
 
 import threading
-import sys
 import time
 from urllib.parse import urlparse
 import requests
@@ -60,11 +59,11 @@ from ._models import (
 
 from ._utils import (_validate_subscription_registered, _ensure_location_allowed,
                      parse_secret_flags, store_as_secret_and_return_secret_ref, parse_env_var_flags,
-                     _generate_log_analytics_if_not_provided, _get_existing_secrets, _convert_object_from_snake_to_camel_case,
-                     _object_to_dict, _add_or_update_secrets, _remove_additional_attributes, _remove_readonly_attributes,
+                     _generate_log_analytics_if_not_provided, _get_existing_secrets, _convert_yaml_to_rest_payload,
+                     _add_or_update_secrets, _remove_readonly_attributes,
                      _add_or_update_env_vars, _add_or_update_tags, _update_revision_weights, _append_label_weights,
                      _get_app_from_revision, raise_missing_token_suggestion, _infer_acr_credentials, _remove_registry_secret, _remove_secret,
-                     _ensure_identity_resource_id, _remove_dapr_readonly_attributes, _remove_env_vars, _validate_traffic_sum,
+                     _ensure_identity_resource_id, _remove_env_vars, _validate_traffic_sum,
                      _update_revision_env_secretrefs, _get_acr_cred, safe_get, await_github_action, repo_url_to_name,
                      validate_container_app_name, _update_weights, get_vnet_location, register_provider_if_needed,
                      generate_randomized_cert_name, _get_name, load_cert_file, check_cert_name_availability,
@@ -138,20 +137,6 @@ def load_yaml_file(file_name):
         raise ValidationError('Error parsing {} ({})'.format(file_name, str(ex))) from ex
 
 
-def create_deserializer():
-    from ._sdk_models import ContainerApp  # pylint: disable=unused-import
-    from msrest import Deserializer
-    import inspect
-
-    sdkClasses = inspect.getmembers(sys.modules["azext_containerapp._sdk_models"])
-    deserializer = {}
-
-    for sdkClass in sdkClasses:
-        deserializer[sdkClass[0]] = sdkClass[1]
-
-    return Deserializer(deserializer)
-
-
 def update_containerapp_yaml(cmd, name, resource_group_name, file_name, from_revision=None, no_wait=False):
     yaml_containerapp = process_loaded_yaml(load_yaml_file(file_name))
     if type(yaml_containerapp) != dict:  # pylint: disable=unidiomatic-typecheck
@@ -182,23 +167,13 @@ def update_containerapp_yaml(cmd, name, resource_group_name, file_name, from_rev
 
     containerapp_def = None
 
-    # Deserialize the yaml into a ContainerApp object. Need this since we're not using SDK
+    # Convert the yaml into the payload of a ContainerApp. Need this since we're not using SDK
     try:
-        deserializer = create_deserializer()
-        containerapp_def = deserializer('ContainerApp', yaml_containerapp)
+        containerapp_def = _convert_yaml_to_rest_payload('ContainerApp', yaml_containerapp)
     except DeserializationError as ex:
         raise ValidationError('Invalid YAML provided. Please see https://aka.ms/azure-container-apps-yaml for a valid containerapps YAML spec.') from ex
 
-    # Remove tags before converting from snake case to camel case, then re-add tags. We don't want to change the case of the tags. Need this since we're not using SDK
-    tags = None
-    if yaml_containerapp.get('tags'):
-        tags = yaml_containerapp.get('tags')
-        del yaml_containerapp['tags']
-
-    containerapp_def = _convert_object_from_snake_to_camel_case(_object_to_dict(containerapp_def))
-    containerapp_def['tags'] = tags
-
-    # After deserializing, some properties may need to be moved under the "properties" attribute. Need this since we're not using SDK
+    # After converting, some properties may need to be moved under the "properties" attribute. Need this since we're not using SDK
     containerapp_def = process_loaded_yaml(containerapp_def)
 
     # Change which revision we update from
@@ -207,8 +182,7 @@ def update_containerapp_yaml(cmd, name, resource_group_name, file_name, from_rev
         _update_revision_env_secretrefs(r["properties"]["template"]["containers"], name)
         containerapp_def["properties"]["template"] = r["properties"]["template"]
 
-    # Remove "additionalProperties" and read-only attributes that are introduced in the deserialization. Need this since we're not using SDK
-    _remove_additional_attributes(containerapp_def)
+    # Remove read-only attributes. Need this since we're not using SDK
     _remove_readonly_attributes(containerapp_def)
 
     secret_values = list_secrets(cmd=cmd, name=name, resource_group_name=resource_group_name, show_values=True)
@@ -256,35 +230,19 @@ def create_containerapp_yaml(cmd, name, resource_group_name, file_name, no_wait=
     elif yaml_containerapp.get('type').lower() != "microsoft.app/containerapps":
         raise ValidationError('Containerapp type must be \"Microsoft.App/ContainerApps\"')
 
-    # Deserialize the yaml into a ContainerApp object. Need this since we're not using SDK
+    # Convert the yaml into the payload of a ContainerApp. Need this since we're not using SDK
     containerapp_def = None
     try:
-        deserializer = create_deserializer()
-
-        containerapp_def = deserializer('ContainerApp', yaml_containerapp)
+        containerapp_def = _convert_yaml_to_rest_payload('ContainerApp', yaml_containerapp)
     except DeserializationError as ex:
         raise ValidationError('Invalid YAML provided. Please see https://aka.ms/azure-container-apps-yaml for a valid containerapps YAML spec.') from ex
 
-    # Remove tags before converting from snake case to camel case, then re-add tags. We don't want to change the case of the tags. Need this since we're not using SDK
-    tags = None
-    if yaml_containerapp.get('tags'):
-        tags = yaml_containerapp.get('tags')
-        del yaml_containerapp['tags']
-
-    containerapp_def = _convert_object_from_snake_to_camel_case(_object_to_dict(containerapp_def))
-    containerapp_def['tags'] = tags
-
-    # After deserializing, some properties may need to be moved under the "properties" attribute. Need this since we're not using SDK
+    # After converting, some properties may need to be moved under the "properties" attribute. Need this since we're not using SDK
     containerapp_def = process_loaded_yaml(containerapp_def)
 
-    # Remove "additionalProperties" and read-only attributes that are introduced in the deserialization. Need this since we're not using SDK
-    _remove_additional_attributes(containerapp_def)
+    # Remove read-only attributes. Need this since we're not using SDK
     _remove_readonly_attributes(containerapp_def)
 
-    # Remove extra workloadProfileName introduced in deserialization
-    if "workloadProfileName" in containerapp_def:
-        del containerapp_def["workloadProfileName"]
-
     # Validate managed environment
     if not containerapp_def["properties"].get('environmentId'):
         raise RequiredArgumentMissingError('environmentId is required. This can be retrieved using the `az containerapp env show -g MyResourceGroup -n MyContainerappEnvironment --query id` command. Please see https://aka.ms/azure-container-apps-yaml for a valid containerapps YAML spec.')
@@ -332,6 +290,20 @@ def create_containerapp_yaml(cmd, name, resource_group_name, file_name, no_wait=
         handle_raw_exception(e)
 
 
+def apply_containerapp(cmd, resource_group_name, yaml, managed_env=None, dry_run=False, force=False):
+    from ._apply_utils import load_apply_specs, plan_apply_specs, run_apply_specs
+
+    _validate_subscription_registered(cmd, CONTAINER_APPS_RP)
+
+    specs = load_apply_specs(cmd, yaml, resource_group_name, managed_env)
+    specs = plan_apply_specs(cmd, resource_group_name, specs, force=force)
+    if dry_run:
+        for spec in specs:
+            spec.status = 'DryRun'
+        return [spec.result() for spec in specs]
+    return run_apply_specs(cmd, resource_group_name, specs)
+
+
 def create_containerapp(cmd,
                         name,
                         resource_group_name,
@@ -2710,22 +2682,17 @@ def create_or_update_dapr_component(cmd, resource_group_name, environment_name,
     if type(yaml_containerapp) != dict:  # pylint: disable=unidiomatic-typecheck
         raise ValidationError('Invalid YAML provided. Please see https://aka.ms/azure-container-apps-yaml for a valid containerapps YAML spec.')
 
-    # Deserialize the yaml into a DaprComponent object. Need this since we're not using SDK
+    # Convert the yaml into the payload of a DaprComponent. Need this since we're not using SDK
     daprcomponent_def = None
     try:
-        deserializer = create_deserializer()
-
-        daprcomponent_def = deserializer('DaprComponent', yaml_containerapp)
+        daprcomponent_def = _convert_yaml_to_rest_payload('DaprComponent', yaml_containerapp)
     except DeserializationError as ex:
         raise ValidationError('Invalid YAML provided. Please see https://aka.ms/azure-container-apps-yaml for a valid containerapps YAML spec.') from ex
 
-    daprcomponent_def = _convert_object_from_snake_to_camel_case(_object_to_dict(daprcomponent_def))
-
-    # Remove "additionalProperties" and read-only attributes that are introduced in the deserialization. Need this since we're not using SDK
-    _remove_additional_attributes(daprcomponent_def)
-    _remove_dapr_readonly_attributes(daprcomponent_def)
+    # The yaml defines the properties of the component, read-only attributes are dropped with the rest of the envelope
+    daprcomponent_def = daprcomponent_def.get("properties", {})
 
-    if not daprcomponent_def["ignoreErrors"]:
+    if not daprcomponent_def.get("ignoreErrors"):
         daprcomponent_def["ignoreErrors"] = False
 
     dapr_component_envelope = {}
@@ -0,0 +1,209 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import ValidationError, AzureResponseError
+
+from azext_containerapp import _apply_utils
+
+ENV_ID = '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.App/managedEnvironments/env'
+
+SPECS = """
+name: env
+type: Microsoft.App/managedEnvironments
+location: eastus
+properties:
+  zoneRedundant: false
+---
+name: statestore
+type: Microsoft.App/managedEnvironments/daprComponents
+componentType: state.azure.blobstorage
+version: v1
+secrets: [{name: key, value: abc}]
+"""
+
+APPS = """
+name: app{index}
+properties:
+  managedEnvironmentId: {env_id}
+  configuration:
+    secrets: [{{name: pwd}}]
+    ingress: {{external: true, targetPort: 80}}
+  template:
+    containers: [{{name: web, image: nginx:{tag}}}]
+"""
+
+
+def _deployed_app(index, tag):
+    return {'id': ENV_ID.replace('managedEnvironments/env', 'containerApps/app{}'.format(index)), 'name': 'app{}'.format(index),
+            'location': 'East US',
+            'properties': {'environmentId': ENV_ID.upper(), 'provisioningState': 'Succeeded',
+                           'configuration': {'secrets': [{'name': 'pwd'}], 'activeRevisionsMode': 'Single',
+                                             'ingress': {'external': True, 'targetPort': 80, 'transport': 'Auto'}},
+                           'template': {'containers': [{'name': 'web', 'image': 'nginx:{}'.format(tag), 'resources': {'cpu': 0.5}}]}}}
+
+
+class ContainerappApplyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.cloud.endpoints.resource_manager = 'https://management.azure.com/'
+        patcher = mock.patch.object(_apply_utils, 'get_subscription_id', return_value='sub')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _write(self, file_name, content):
+        with open(os.path.join(self.folder, file_name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _write_specs(self):
+        self._write('env.yaml', SPECS)
+        for index, tag in enumerate(['1', '2', '1']):
+            self._write('app{}.yml'.format(index), APPS.format(index=index, env_id=ENV_ID, tag=tag))
+        self._write('README.md', 'not a spec')
+
+    @mock.patch.object(_apply_utils, 'DaprComponentClient')
+    @mock.patch.object(_apply_utils, 'ManagedEnvironmentClient')
+    @mock.patch.object(_apply_utils, 'ContainerAppClient')
+    def test_plan(self, app_client, env_client, dapr_client):
+        self._write_specs()
+        app_client.list_by_resource_group.return_value = [_deployed_app(0, '1'), _deployed_app(1, '1')]
+        app_client.list_secrets.return_value = {'value': [{'name': 'pwd', 'value': 's3cr3t'}]}
+        env_client.list_by_resource_group.return_value = [{'id': ENV_ID, 'name': 'env', 'location': 'eastus',
+                                                           'properties': {'zoneRedundant': False}}]
+        dapr_client.list.return_value = []
+
+        specs = _apply_utils.load_apply_specs(self.cmd, [self.folder], 'rg')
+        specs = _apply_utils.plan_apply_specs(self.cmd, 'rg', specs)
+
+        actions = {spec.name: spec.action for spec in specs}
+        self.assertEqual(actions, {'env': 'None', 'statestore': 'Create', 'app0': 'None', 'app1': 'Update', 'app2': 'Create'})
+        app_client.list_by_resource_group.assert_called_once_with(self.cmd, 'rg')
+        dapr_client.list.assert_called_once_with(self.cmd, 'rg', 'env')
+        apps = {spec.name: spec for spec in specs}
+        # Secret values left out of the yaml are read from the deployed app, new apps are created next to their environment
+        self.assertEqual(apps['app1'].payload['properties']['configuration']['secrets'], [{'name': 'pwd', 'value': 's3cr3t'}])
+        self.assertEqual(apps['app2'].payload['location'], 'eastus')
+        self.assertEqual(apps['statestore'].environment_name, 'env')
+
+        specs = _apply_utils.plan_apply_specs(self.cmd, 'rg', specs, force=True)
+        self.assertEqual(apps['app0'].action, 'Update')
+
+    def test_load_reports_all_errors(self):
+        self._write('apps.yaml', """
+name: app0
+properties: {environmentId: %s}
+---
+properties: {environmentId: %s}
+---
+name: app0
+type: Microsoft.App/containerApps
+properties: {environmentId: %s}
+---
+name: component
+type: Microsoft.App/managedEnvironments/daprComponents
+scopes: app0
+""" % (ENV_ID, ENV_ID, ENV_ID))
+
+        with self.assertRaises(ValidationError) as e:
+            _apply_utils.load_apply_specs(self.cmd, [self.folder], 'rg')
+        self.assertIn('(document 1): name is required', str(e.exception))
+        self.assertIn('(document 3)', str(e.exception))
+        self.assertIn('containerApps app0 is defined in both', str(e.exception))
+
+    @mock.patch('time.sleep')
+    @mock.patch.object(_apply_utils, 'send_raw_request')
+    def test_run(self, send_raw_request, _):
+        self._write_specs()
+        specs = _apply_utils.load_apply_specs(self.cmd, [self.folder], 'rg')
+        for spec in specs:
+            spec.action = 'None' if spec.name == 'app0' else 'Create'
+        polls = {}
+
+        def send(cli_ctx, method, url, body=None):
+            response = mock.Mock(headers={})
+            if method == 'PUT':
+                self.assertNotIn('app0', url)
+                if 'app2' in url:
+                    raise Exception('Bad request')
+                if 'containerApps' in url:
+                    response.headers = {'azure-asyncoperation': url + '/operation'}
+                return response
+            polls[url] = polls.get(url, 0) + 1
+            if url.endswith('/operation'):
+                response.json.return_value = {'status': 'Succeeded' if polls[url] > 1 else 'InProgress'}
+            else:
+                response.json.return_value = {'properties': {'provisioningState': 'Succeeded'}}
+            return response
+
+        send_raw_request.side_effect = send
+        with self.assertRaisesRegex(AzureResponseError, 'app2'):
+            _apply_utils.run_apply_specs(self.cmd, 'rg', specs)
+
+        status = {spec.name: spec.status for spec in specs}
+        self.assertEqual(status, {'env': 'Succeeded', 'statestore': 'Succeeded', 'app0': 'Unchanged', 'app1': 'Succeeded', 'app2': 'Failed'})
+        put_urls = [call[0][2] for call in send_raw_request.call_args_list if call[0][1] == 'PUT']
+        self.assertIn('managedEnvironments/env?', put_urls[0])
+        self.assertIn('managedEnvironments/env/daprComponents/statestore?', put_urls[1])
+        dapr_body = json.loads([call for call in send_raw_request.call_args_list if call[0][1] == 'PUT'][1][1]['body'])
+        self.assertEqual(dapr_body['properties']['componentType'], 'state.azure.blobstorage')
+
+    @mock.patch('time.sleep')
+    @mock.patch.object(_apply_utils, 'send_raw_request')
+    def test_run_updates(self, send_raw_request, _):
+        self._write_specs()
+        specs = [spec for spec in _apply_utils.load_apply_specs(self.cmd, [self.folder], 'rg') if spec.name != 'app2']
+        for spec in specs:
+            spec.action = 'Update'
+        polls = {}
+
+        def send(cli_ctx, method, url, body=None):
+            response = mock.Mock(headers={}, status_code=200)
+            if method in ('PUT', 'PATCH'):
+                if 'containerApps' in url:
+                    response.headers = {'location': url + '/result'}
+                return response
+            polls[url] = polls.get(url, 0) + 1
+            # The location of an operation result answers 202 until the operation is done
+            if url.endswith('/result') and polls[url] == 1:
+                response.status_code = 202
+            response.json.return_value = {'properties': {'provisioningState': 'Succeeded'}}
+            return response
+
+        send_raw_request.side_effect = send
+        _apply_utils.run_apply_specs(self.cmd, 'rg', specs)
+
+        self.assertTrue(all(spec.status == 'Succeeded' for spec in specs))
+        methods = {call[0][2].split('?')[0].rsplit('/', 1)[1]: call[0][1] for call in send_raw_request.call_args_list
+                   if call[0][1] != 'GET'}
+        # Existing apps and environments keep the properties left out of their yaml, dapr components are replaced
+        self.assertEqual(methods, {'env': 'PATCH', 'statestore': 'PUT', 'app0': 'PATCH', 'app1': 'PATCH'})
+        self.assertTrue(all(count == 2 for url, count in polls.items() if url.endswith('/result')))
+
+    def test_dapr_component_differs_when_property_is_left_out(self):
+        self._write('env.yaml', SPECS)
+        spec = [spec for spec in _apply_utils.load_apply_specs(self.cmd, [self.folder], 'rg') if spec.name == 'statestore'][0]
+        deployed = {'id': ENV_ID + '/daprComponents/statestore', 'name': 'statestore',
+                    'properties': {'componentType': 'state.azure.blobstorage', 'version': 'v1', 'ignoreErrors': False,
+                                   'secrets': [{'name': 'key'}], 'metadata': [], 'scopes': None}}
+        spec.existing = deployed
+        self.assertFalse(_apply_utils._spec_differs_from_existing(spec))
+
+        deployed['properties']['scopes'] = ['app0']
+        self.assertTrue(_apply_utils._spec_differs_from_existing(spec))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import json
+import unittest
+from datetime import datetime
+
+import yaml
+from msrest import Deserializer
+from msrest.exceptions import DeserializationError
+
+from azext_containerapp.custom import process_loaded_yaml
+from azext_containerapp._utils import _convert_yaml_to_rest_payload, _get_sdk_models, clean_null_values
+
+CONTAINERAPP_YAML = """
+name: app
+type: Microsoft.App/containerApps
+location: eastus
+tags: {team: core}
+properties:
+  managedEnvironmentId: /subscriptions/sub/resourceGroups/rg/providers/Microsoft.App/managedEnvironments/env
+  configuration:
+    activeRevisionsMode: Single
+    secrets: [{name: pwd, value: s3cr3t}]
+    ingress:
+      external: true
+      targetPort: "80"
+      traffic: [{latestRevision: true, weight: 100}]
+    unknownSetting: 1
+  template:
+    containers:
+      - name: web
+        image: nginx
+        env: [{name: A, value: "1"}, {name: B, secretRef: pwd}]
+        resources: {cpu: 0.5, memory: 1Gi}
+        probes: [{type: Liveness, httpGet: {path: /, port: 80}}]
+    scale:
+      minReplicas: 1
+      rules: [{name: http, http: {metadata: {concurrentRequests: "50"}}}]
+"""
+
+
+def _to_camel_case(snake_str):
+    components = snake_str.split('_')
+    return components[0] + ''.join(x.title() for x in components[1:])
+
+
+def _convert_object_from_snake_to_camel_case(o):
+    if isinstance(o, list):
+        return [_convert_object_from_snake_to_camel_case(i) if isinstance(i, (dict, list)) else i for i in o]
+    return {
+        _to_camel_case(a): _convert_object_from_snake_to_camel_case(b) if isinstance(b, (dict, list)) else b for a, b in o.items()
+    }
+
+
+def _remove_additional_attributes(o):
+    if isinstance(o, list):
+        for i in o:
+            _remove_additional_attributes(i)
+    elif isinstance(o, dict):
+        if "additionalProperties" in o:
+            del o["additionalProperties"]
+
+        for key in o:
+            _remove_additional_attributes(o[key])
+
+
+def _round_trip(model_name, yaml_object):
+    # The reference conversion: the --yaml commands used to deserialize the yaml into the model and serialize it back
+    def default_handler(x):
+        if isinstance(x, datetime):
+            return x.isoformat()
+        return x.__dict__
+
+    model = Deserializer(_get_sdk_models())(model_name, copy.deepcopy(yaml_object))
+    payload = _convert_object_from_snake_to_camel_case(json.loads(json.dumps(model, default=default_handler)))
+    _remove_additional_attributes(payload)
+    return payload
+
+
+class ContainerappYamlConversionTest(unittest.TestCase):
+
+    def test_convert_containerapp_yaml(self):
+        yaml_containerapp = process_loaded_yaml(yaml.safe_load(CONTAINERAPP_YAML))
+        payload = _convert_yaml_to_rest_payload('ContainerApp', copy.deepcopy(yaml_containerapp))
+
+        self.assertEqual(payload['properties']['configuration']['ingress']['targetPort'], 80)
+        self.assertNotIn('unknownSetting', payload['properties']['configuration'])
+        self.assertEqual(payload['tags'], {'team': 'core'})
+        self.assertEqual(clean_null_values(process_loaded_yaml(payload)),
+                         clean_null_values(process_loaded_yaml(_round_trip('ContainerApp', yaml_containerapp))))
+
+    def test_convert_dapr_component_yaml(self):
+        yaml_component = yaml.safe_load("""
+componentType: state.azure.blobstorage
+version: v1
+metadata: [{name: accountName, value: acc}]
+scopes: [app1]
+""")
+        payload = _convert_yaml_to_rest_payload('DaprComponent', yaml_component)
+
+        self.assertEqual(list(payload), ['properties'])
+        self.assertEqual(payload['properties'], clean_null_values(_round_trip('DaprComponent', yaml_component)))
+
+    def test_convert_invalid_yaml(self):
+        for invalid in [{'properties': {'template': {'containers': 'web'}}},
+                        {'properties': {'configuration': {'ingress': {'external': 'maybe'}}}}]:
+            with self.assertRaises(DeserializationError):
+                _convert_yaml_to_rest_payload('ContainerApp', invalid)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -844,6 +844,48 @@ helps['cosmosdb mongodb collection redistribute-partition-throughput'] = """
                az cosmosdb mongodb collection redistribute-partition-throughput --account-name account_name --database-name db_name --name container_name  --resource-group rg_name --target-partition-info 8=1200 6=1200' --source-partition-info 9'
 """
 
+helps['cosmosdb sql container rebalance-partition-throughput'] = """
+    type: command
+    short-summary: "Rebalances the partition throughput of a sql container according to the usage of its physical partitions."
+    long-summary: |
+        The throughput of the sql container is split among its physical partitions in proportion to the RU/s they consumed over
+        the last --lookback minutes, as reported by the NormalizedRUConsumption metric of Azure Monitor, or in proportion
+        to --partition-weights. Every partition keeps at least --min-throughput RU/s, and at most --max-skew times an even
+        share when given. The total throughput of the sql container doesn't change. Without --name, every sql container of the database
+        is rebalanced in parallel.
+    examples:
+      - name: Shows the planned partition throughput for a sql container without applying it
+        text: |-
+               az cosmosdb sql container rebalance-partition-throughput --account-name account_name --database-name db_name --name container_name  --resource-group rg_name --dry-run
+      - name: Rebalances the partition throughput of every sql container of a database based on the last 3 hours of usage
+        text: |-
+               az cosmosdb sql container rebalance-partition-throughput --account-name account_name --database-name db_name --resource-group rg_name --lookback 180 --max-skew 4
+      - name: Rebalances the partition throughput for a sql container with explicit weights
+        text: |-
+               az cosmosdb sql container rebalance-partition-throughput --account-name account_name --database-name db_name --name container_name  --resource-group rg_name --partition-weights 0=3 1=1
+"""
+
+helps['cosmosdb mongodb collection rebalance-partition-throughput'] = """
+    type: command
+    short-summary: "Rebalances the partition throughput of a mongodb collection according to the usage of its physical partitions."
+    long-summary: |
+        The throughput of the mongodb collection is split among its physical partitions in proportion to the RU/s they consumed over
+        the last --lookback minutes, as reported by the NormalizedRUConsumption metric of Azure Monitor, or in proportion
+        to --partition-weights. Every partition keeps at least --min-throughput RU/s, and at most --max-skew times an even
+        share when given. The total throughput of the mongodb collection doesn't change. Without --name, every mongodb collection of the database
+        is rebalanced in parallel.
+    examples:
+      - name: Shows the planned partition throughput for a mongodb collection without applying it
+        text: |-
+               az cosmosdb mongodb collection rebalance-partition-throughput --account-name account_name --database-name db_name --name container_name  --resource-group rg_name --dry-run
+      - name: Rebalances the partition throughput of every mongodb collection of a database based on the last 3 hours of usage
+        text: |-
+               az cosmosdb mongodb collection rebalance-partition-throughput --account-name account_name --database-name db_name --resource-group rg_name --lookback 180 --max-skew 4
+      - name: Rebalances the partition throughput for a mongodb collection with explicit weights
+        text: |-
+               az cosmosdb mongodb collection rebalance-partition-throughput --account-name account_name --database-name db_name --name container_name  --resource-group rg_name --partition-weights 0=3 1=1
+"""
+
 # in-account restore of a deleted sql database
 helps['cosmosdb sql database restore'] = """
     type: command
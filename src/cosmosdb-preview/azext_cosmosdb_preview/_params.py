@@ -25,7 +25,8 @@ from azext_cosmosdb_preview.actions import (
     AddSqlContainerAction,
     CreateTargetPhysicalPartitionThroughputInfoAction,
     CreateSourcePhysicalPartitionThroughputInfoAction,
-    CreatePhysicalPartitionIdListAction)
+    CreatePhysicalPartitionIdListAction,
+    CreatePhysicalPartitionWeightsAction)
 
 from azext_cosmosdb_preview.vendored_sdks.azure_mgmt_cosmosdb.models import (
     ContinuousTier
@@ -454,6 +455,19 @@ def load_arguments(self, _):
         c.argument('target_partition_info', nargs='+', action=CreateTargetPhysicalPartitionThroughputInfoAction, required=False, help="information about desired target physical partition throughput eg: '0=1200 1=1200'")
         c.argument('source_partition_info', nargs='+', action=CreateSourcePhysicalPartitionThroughputInfoAction, required=False, help="space separated source physical partition ids eg: 1 2")
 
+    # Sql container and mongodb collection partition rebalance throughput
+    for scope, container_arg, container_help in [('cosmosdb sql container', 'container_name', 'Name of the CosmosDB container'),
+                                                 ('cosmosdb mongodb collection', 'collection_name', 'Name of the CosmosDB collection')]:
+        with self.argument_context('{} rebalance-partition-throughput'.format(scope)) as c:
+            c.argument('account_name', account_name_type, id_part=None, required=True, help='Name of the CosmosDB database account')
+            c.argument('database_name', database_name_type, required=True, help='Name of the CosmosDB database name')
+            c.argument(container_arg, options_list=['--name', '-n'], required=False, help='{}. Rebalances every one of the database if not specified'.format(container_help))
+            c.argument('partition_weights', nargs='+', action=CreatePhysicalPartitionWeightsAction, required=False, help="relative weights of the physical partitions used instead of their measured usage, partitions not listed have a weight of 1 eg: 0=3 1=1")
+            c.argument('min_throughput', type=int, help='minimum throughput in RU/s given to every physical partition')
+            c.argument('max_skew', type=float, help='maximum throughput of a physical partition, as a multiple of an even share of the container throughput')
+            c.argument('lookback', type=int, help='number of minutes of usage the plan is based on')
+            c.argument('dry_run', arg_type=get_three_state_flag(), help='show the planned throughput of every physical partition without applying it')
+
     # SQL database restore
     with self.argument_context('cosmosdb sql database restore') as c:
         c.argument('account_name', account_name_type, id_part=None, required=True)
@@ -257,3 +257,24 @@ class CreatePhysicalPartitionIdListAction(argparse._AppendAction):
         for item in values:
             namespace.physical_partition_ids.append(
                 PhysicalPartitionId(id=item))
+
+
+# pylint: disable=protected-access, too-few-public-methods
+class CreatePhysicalPartitionWeightsAction(argparse._AppendAction):
+    def __call__(self, parser, namespace, values, option_string=None):
+        if namespace.partition_weights is None:
+            namespace.partition_weights = {}
+        usage = 'usage error: --partition-weights [PhysicalPartitionId1=Weight1 PhysicalPartitionId2=Weight2 ...]'
+        if not values:
+            raise CLIError(usage)
+        for item in values:
+            kvp = item.split('=', 1)
+            if len(kvp) != 2:
+                raise CLIError(usage)
+            try:
+                weight = float(kvp[1])
+            except ValueError as ex:
+                raise CLIError(usage) from ex
+            if weight < 0:
+                raise CLIError('usage error: the weight of physical partition {} must not be negative'.format(kvp[0]))
+            namespace.partition_weights[kvp[0]] = weight
@@ -221,6 +221,14 @@ def load_command_table(self, _):
     with self.command_group('cosmosdb mongodb collection', cosmosdb_mongo_sdk, client_factory=cf_mongo_db_resources) as g:
         g.custom_command('redistribute-partition-throughput', 'cli_begin_redistribute_mongo_container_partition_throughput', is_preview=True)
 
+    # Rebalance partition throughput for Sql containers
+    with self.command_group('cosmosdb sql container', cosmosdb_sql_sdk, client_factory=cf_sql_resources) as g:
+        g.custom_command('rebalance-partition-throughput', 'cli_begin_rebalance_sql_container_partition_throughput', is_preview=True)
+
+    # Rebalance partition throughput for Mongo collection
+    with self.command_group('cosmosdb mongodb collection', cosmosdb_mongo_sdk, client_factory=cf_mongo_db_resources) as g:
+        g.custom_command('rebalance-partition-throughput', 'cli_begin_rebalance_mongo_container_partition_throughput', is_preview=True)
+
     with self.command_group('cosmosdb sql database', cosmosdb_sql_sdk, client_factory=cf_sql_resources) as g:
         g.custom_command('restore', 'cli_cosmosdb_sql_database_restore', is_preview=True)
 
@@ -1803,6 +1803,225 @@ def cli_begin_redistribute_mongo_container_partition_throughput(client,
     return async_partition_redistribute_throughput_result.result()
 
 
+PARTITION_THROUGHPUT_USAGE_METRIC = 'NormalizedRUConsumption'
+PARTITION_THROUGHPUT_MAX_CONCURRENCY = 8
+
+
+# pylint: disable=too-many-locals
+def cli_begin_rebalance_sql_container_partition_throughput(cmd,
+                                                           client,
+                                                           resource_group_name,
+                                                           account_name,
+                                                           database_name,
+                                                           container_name=None,
+                                                           partition_weights=None,
+                                                           min_throughput=100,
+                                                           max_skew=None,
+                                                           lookback=60,
+                                                           dry_run=False):
+    if container_name:
+        container_names = [container_name]
+    else:
+        container_names = [container.name for container in client.list_sql_containers(resource_group_name, account_name, database_name)]
+
+    def retrieve(name):
+        return cli_begin_retrieve_sql_container_partition_throughput(client, resource_group_name, account_name, database_name, name, all_partitions=True)
+
+    def redistribute(name, target_partition_info, source_partition_info):
+        return cli_begin_redistribute_sql_container_partition_throughput(client, resource_group_name, account_name, database_name, name,
+                                                                         target_partition_info=target_partition_info,
+                                                                         source_partition_info=source_partition_info)
+
+    return _rebalance_partition_throughput(cmd, resource_group_name, account_name, database_name, container_names, retrieve, redistribute,
+                                           partition_weights, min_throughput, max_skew, lookback, dry_run)
+
+
+# pylint: disable=too-many-locals
+def cli_begin_rebalance_mongo_container_partition_throughput(cmd,
+                                                             client,
+                                                             resource_group_name,
+                                                             account_name,
+                                                             database_name,
+                                                             collection_name=None,
+                                                             partition_weights=None,
+                                                             min_throughput=100,
+                                                             max_skew=None,
+                                                             lookback=60,
+                                                             dry_run=False):
+    if collection_name:
+        collection_names = [collection_name]
+    else:
+        collection_names = [collection.name for collection in client.list_mongo_db_collections(resource_group_name, account_name, database_name)]
+
+    def retrieve(name):
+        return cli_begin_retrieve_mongo_container_partition_throughput(client, resource_group_name, account_name, database_name, name, all_partitions=True)
+
+    def redistribute(name, target_partition_info, source_partition_info):
+        return cli_begin_redistribute_mongo_container_partition_throughput(client, resource_group_name, account_name, database_name, name,
+                                                                           target_partition_info=target_partition_info,
+                                                                           source_partition_info=source_partition_info)
+
+    return _rebalance_partition_throughput(cmd, resource_group_name, account_name, database_name, collection_names, retrieve, redistribute,
+                                           partition_weights, min_throughput, max_skew, lookback, dry_run)
+
+
+def _rebalance_partition_throughput(cmd, resource_group_name, account_name, database_name, container_names, retrieve, redistribute,
+                                    partition_weights, min_throughput, max_skew, lookback, dry_run):
+    from concurrent.futures import ThreadPoolExecutor
+
+    if max_skew is not None and max_skew < 1:
+        raise InvalidArgumentValueError('--max-skew must be at least 1.')
+    if not container_names:
+        raise CLIError("(NotFound) Database '{}' has no containers.".format(database_name))
+
+    usage = None
+    if not partition_weights:
+        # A single query returns the usage of every physical partition of the containers
+        usage = _get_partition_throughput_usage(cmd, resource_group_name, account_name, database_name,
+                                                container_names[0] if len(container_names) == 1 else None, lookback)
+
+    def rebalance(container_name):
+        # pylint: disable=broad-except
+        try:
+            return _rebalance_container_partition_throughput(container_name, retrieve, redistribute, partition_weights,
+                                                             usage.get(container_name.lower(), {}) if usage is not None else None,
+                                                             min_throughput, max_skew, dry_run)
+        except Exception as ex:
+            logger.warning("Failed to rebalance the partition throughput of '%s': %s", container_name, ex)
+            return {'name': container_name, 'status': 'Failed', 'error': str(ex), 'partitions': []}
+
+    with ThreadPoolExecutor(max_workers=min(PARTITION_THROUGHPUT_MAX_CONCURRENCY, len(container_names))) as executor:
+        results = list(executor.map(rebalance, container_names))
+
+    if len(results) == 1:
+        if results[0]['status'] == 'Failed':
+            raise CLIError(results[0]['error'])
+        return results[0]
+    return results
+
+
+def _rebalance_container_partition_throughput(container_name, retrieve, redistribute, partition_weights, usage,
+                                              min_throughput, max_skew, dry_run):
+    from azext_cosmosdb_preview.vendored_sdks.azure_mgmt_cosmosdb.models import PhysicalPartitionThroughputInfoResource
+
+    partitions = retrieve(container_name).resource.physical_partition_throughput_info
+    ids = [partition.id for partition in partitions]
+    current = [int(partition.throughput) for partition in partitions]
+
+    if partition_weights:
+        # Partitions without a weight keep a weight of 1
+        weights = [float(partition_weights.get(partition_id, 1)) for partition_id in ids]
+    else:
+        # The RU/s consumed by each partition: its normalized RU consumption is a percentage of its throughput
+        weights = [usage.get(partition_id, 0) / 100 * throughput for partition_id, throughput in zip(ids, current)]
+        if not any(weights):
+            logger.warning("No usage of the physical partitions of '%s' was reported, its throughput is distributed evenly.", container_name)
+
+    planned = _plan_partition_throughput(sum(current), weights, min_throughput, max_skew)
+    changes = [{
+        'id': partition_id,
+        'currentThroughput': current_throughput,
+        'weight' if partition_weights else 'consumedThroughput': round(weight, 2),
+        'plannedThroughput': planned_throughput,
+        'change': planned_throughput - current_throughput
+    } for partition_id, current_throughput, weight, planned_throughput in zip(ids, current, weights, planned)]
+
+    result = {'name': container_name, 'status': 'Planned', 'partitions': changes}
+    if dry_run:
+        return result
+    if planned == current:
+        result['status'] = 'Unchanged'
+        return result
+
+    # The partitions that gain throughput are the targets and are given their planned throughput, which the service
+    # takes from the partitions that give away throughput, the sources
+    target_partition_info = [PhysicalPartitionThroughputInfoResource(id=change['id'], throughput=change['plannedThroughput'])
+                             for change in changes if change['change'] > 0]
+    source_partition_info = [PhysicalPartitionThroughputInfoResource(id=change['id'], throughput=0)
+                             for change in changes if change['change'] < 0]
+    redistribute(container_name, target_partition_info, source_partition_info)
+    result['status'] = 'Applied'
+    return result
+
+
+def _plan_partition_throughput(total, weights, min_throughput, max_skew=None):
+    """
+    Splits the total throughput among the partitions proportionally to their weights, giving every partition at least
+    min_throughput and, with max_skew, at most max_skew times the even share. Returns whole RU/s that add up to total.
+    """
+    count = len(weights)
+    if count * min_throughput > total:
+        raise InvalidArgumentValueError('The throughput of {} RU/s is not enough to give {} physical partitions {} RU/s each.'.format(total, count, min_throughput))
+    max_throughput = max(max_skew * total / count, min_throughput) if max_skew else float('inf')
+
+    # Water-filling: partitions whose proportional share crosses a bound are fixed at that bound, and the remaining
+    # throughput is shared again among the others, until no share crosses a bound.
+    planned = [0.0] * count
+    free = list(range(count))
+    remaining = total
+    while free:
+        weight_total = sum(weights[i] for i in free)
+        shares = [remaining * weights[i] / weight_total if weight_total else remaining / len(free) for i in free]
+        below = [(i, min_throughput - share) for i, share in zip(free, shares) if share < min_throughput]
+        above = [(i, share - max_throughput) for i, share in zip(free, shares) if share > max_throughput]
+        if not below and not above:
+            for i, share in zip(free, shares):
+                planned[i] = share
+            break
+        # Fixing the bound that is crossed by more throughput first keeps the other side feasible
+        if sum(delta for _, delta in below) >= sum(delta for _, delta in above):
+            fixed, bound = {i for i, _ in below}, min_throughput
+        else:
+            fixed, bound = {i for i, _ in above}, max_throughput
+        for i in fixed:
+            planned[i] = bound
+        remaining -= bound * len(fixed)
+        free = [i for i in free if i not in fixed]
+
+    # Round down and give the RU/s left over to the largest fractions
+    rounded = [int(share) for share in planned]
+    by_fraction = sorted(range(count), key=lambda i: planned[i] - rounded[i], reverse=True)
+    for i in by_fraction[:int(round(total - sum(rounded)))]:
+        rounded[i] += 1
+    return rounded
+
+
+def _get_partition_throughput_usage(cmd, resource_group_name, account_name, database_name, container_name, lookback):
+    """
+    Returns the average normalized RU consumption of the physical partitions over the last lookback minutes, as
+    {container name (lower case): {physical partition id: percentage}}.
+    """
+    import datetime
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client, get_subscription_id
+    from azure.cli.core.profiles import ResourceType
+
+    monitor_client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_MONITOR)
+    resource_uri = '/subscriptions/{}/resourceGroups/{}/providers/Microsoft.DocumentDB/databaseAccounts/{}'.format(
+        get_subscription_id(cmd.cli_ctx), resource_group_name, account_name)
+    end_time = datetime.datetime.utcnow()
+    start_time = end_time - datetime.timedelta(minutes=lookback)
+    metric_filter = "DatabaseName eq '{}' and CollectionName eq '{}' and PhysicalPartitionId eq '*'".format(
+        database_name, container_name or '*')
+
+    metrics = monitor_client.metrics.list(resource_uri,
+                                          timespan='{}/{}'.format(start_time.isoformat(), end_time.isoformat()),
+                                          interval=datetime.timedelta(minutes=1),
+                                          metricnames=PARTITION_THROUGHPUT_USAGE_METRIC,
+                                          aggregation='Maximum',
+                                          top=10000,
+                                          filter=metric_filter)
+
+    usage = {}
+    for metric in metrics.value:
+        for timeseries in metric.timeseries:
+            dimensions = {value.name.value.lower(): value.value for value in timeseries.metadatavalues}
+            values = [point.maximum for point in timeseries.data if point.maximum is not None]
+            if values and 'physicalpartitionid' in dimensions:
+                container_usage = usage.setdefault(dimensions.get('collectionname', container_name or '').lower(), {})
+                container_usage[dimensions['physicalpartitionid']] = sum(values) / len(values)
+    return usage
+
+
 def cli_cosmosdb_gremlin_database_restore(cmd,
                                           client,
                                           resource_group_name,
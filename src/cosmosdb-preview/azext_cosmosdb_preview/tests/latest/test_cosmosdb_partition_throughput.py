@@ -0,0 +1,145 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import random
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from azext_cosmosdb_preview.custom import (_get_partition_throughput_usage, _plan_partition_throughput,
+                                           _rebalance_container_partition_throughput)
+
+
+def _timeseries(container, partition_id, maximums):
+    metadatavalues = [SimpleNamespace(name=SimpleNamespace(value='CollectionName'), value=container),
+                      SimpleNamespace(name=SimpleNamespace(value='PhysicalPartitionId'), value=partition_id)]
+    return SimpleNamespace(metadatavalues=metadatavalues,
+                           data=[SimpleNamespace(maximum=maximum) for maximum in maximums])
+
+
+class PartitionThroughputPlanTest(unittest.TestCase):
+
+    def test_proportional_to_weights(self):
+        self.assertEqual(_plan_partition_throughput(1000, [1, 1, 2], 100), [250, 250, 500])
+
+    def test_even_without_weights(self):
+        self.assertEqual(_plan_partition_throughput(1200, [0, 0, 0], 100), [400, 400, 400])
+
+    def test_min_throughput(self):
+        self.assertEqual(_plan_partition_throughput(1000, [0, 1, 10], 100), [100, 100, 800])
+        with self.assertRaises(InvalidArgumentValueError):
+            _plan_partition_throughput(500, [1, 1, 1, 1, 1, 1], 100)
+
+    def test_max_skew(self):
+        # At most 1.5 times the even share of 1000 RU/s, the rest is shared by the other partitions by weight
+        self.assertEqual(_plan_partition_throughput(4000, [10, 1, 1, 2], 100, max_skew=1.5), [1500, 625, 625, 1250])
+        # The max bound is never below the min throughput
+        self.assertEqual(_plan_partition_throughput(400, [1, 0, 0, 0], 100, max_skew=1), [100, 100, 100, 100])
+
+    def test_both_bounds(self):
+        # Two partitions are capped at twice the even share and three are raised to the min throughput
+        self.assertEqual(_plan_partition_throughput(6000, [100, 50, 1, 0, 0, 0], 400, max_skew=2),
+                         [2000, 2000, 800, 400, 400, 400])
+
+    def test_total_is_conserved(self):
+        generator = random.Random(7)
+        for _ in range(200):
+            count = generator.randint(1, 20)
+            min_throughput = generator.choice([100, 400])
+            total = count * min_throughput + generator.randint(0, 50000)
+            weights = [generator.choice([0, generator.random() * 1000]) for _ in range(count)]
+            max_skew = generator.choice([None, 1, 1.5, 3])
+
+            planned = _plan_partition_throughput(total, weights, min_throughput, max_skew)
+
+            self.assertEqual(sum(planned), total)
+            self.assertTrue(all(isinstance(throughput, int) for throughput in planned))
+            # Rounding moves a partition by less than 1 RU/s away from its bounds
+            self.assertTrue(all(throughput >= min_throughput for throughput in planned))
+            if max_skew:
+                max_throughput = max(max_skew * total / count, min_throughput)
+                self.assertTrue(all(throughput < max_throughput + 1 for throughput in planned))
+
+
+class PartitionThroughputRebalanceTest(unittest.TestCase):
+
+    def setUp(self):
+        partitions = [SimpleNamespace(id=partition_id, throughput=400.0) for partition_id in '012']
+        self.retrieve = mock.Mock(return_value=SimpleNamespace(
+            resource=SimpleNamespace(physical_partition_throughput_info=partitions)))
+        self.redistribute = mock.Mock()
+
+    def _rebalance(self, partition_weights=None, usage=None, dry_run=False):
+        return _rebalance_container_partition_throughput('container', self.retrieve, self.redistribute,
+                                                         partition_weights, usage, 100, None, dry_run)
+
+    def test_usage_weighting(self):
+        # The normalized RU consumption is a percentage of the throughput of each partition
+        result = self._rebalance(usage={'0': 100, '1': 50})
+
+        self.assertEqual(result['status'], 'Applied')
+        self.assertEqual([(change['consumedThroughput'], change['plannedThroughput']) for change in result['partitions']],
+                         [(400, 733), (200, 367), (0, 100)])
+        name, targets, sources = self.redistribute.call_args[0]
+        self.assertEqual(name, 'container')
+        # A partition that gives away throughput is only a source
+        self.assertEqual([(target.id, target.throughput) for target in targets], [('0', 733)])
+        self.assertEqual([source.id for source in sources], ['1', '2'])
+
+    def test_partition_weights(self):
+        result = self._rebalance(partition_weights={'0': '0', '1': '0'})
+
+        self.assertEqual([change['plannedThroughput'] for change in result['partitions']], [100, 100, 1000])
+        _, targets, sources = self.redistribute.call_args[0]
+        self.assertEqual([(target.id, target.throughput) for target in targets], [('2', 1000)])
+        self.assertEqual([(source.id, source.throughput) for source in sources], [('0', 0), ('1', 0)])
+
+    def test_dry_run_and_unchanged(self):
+        result = self._rebalance(usage={'0': 10, '1': 10, '2': 10}, dry_run=True)
+        self.assertEqual(result['status'], 'Planned')
+        result = self._rebalance(usage={})
+        self.assertEqual(result['status'], 'Unchanged')
+        self.redistribute.assert_not_called()
+
+
+class PartitionThroughputUsageTest(unittest.TestCase):
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', return_value='sub')
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client')
+    def test_metric_parsing(self, get_client, _):
+        metrics = get_client.return_value.metrics.list
+        metrics.return_value = SimpleNamespace(value=[SimpleNamespace(timeseries=[
+            _timeseries('Orders', '0', [40, None, 60]),
+            _timeseries('Orders', '1', [None]),
+            _timeseries('customers', '0', [5]),
+            SimpleNamespace(metadatavalues=[SimpleNamespace(name=SimpleNamespace(value='CollectionName'), value='x')],
+                            data=[SimpleNamespace(maximum=100)])])])
+
+        usage = _get_partition_throughput_usage(mock.Mock(), 'rg', 'account', 'db', None, 30)
+
+        self.assertEqual(usage, {'orders': {'0': 50}, 'customers': {'0': 5}})
+        args, kwargs = metrics.call_args
+        self.assertEqual(args[0], '/subscriptions/sub/resourceGroups/rg/providers/Microsoft.DocumentDB/databaseAccounts/account')
+        self.assertEqual(kwargs['filter'], "DatabaseName eq 'db' and CollectionName eq '*' and PhysicalPartitionId eq '*'")
+        self.assertEqual(kwargs['aggregation'], 'Maximum')
+
+    @mock.patch('azure.cli.core.commands.client_factory.get_subscription_id', return_value='sub')
+    @mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client')
+    def test_single_container_without_dimension(self, get_client, _):
+        get_client.return_value.metrics.list.return_value = SimpleNamespace(value=[SimpleNamespace(timeseries=[
+            SimpleNamespace(metadatavalues=[SimpleNamespace(name=SimpleNamespace(value='physicalPartitionId'),
+                                                            value='3')],
+                            data=[SimpleNamespace(maximum=20)])])])
+
+        usage = _get_partition_throughput_usage(mock.Mock(), 'rg', 'account', 'db', 'Orders', 30)
+
+        self.assertEqual(usage, {'orders': {'3': 20}})
+        self.assertIn("CollectionName eq 'Orders'", get_client.return_value.metrics.list.call_args[1]['filter'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -53,6 +53,19 @@ class ImageCopyCommandsLoader(AzCommandsLoader):
             c.argument('export_as_snapshot', options_list=['--export-as-snapshot'], action='store_true', default=False,
                        help='Include this switch to export the copies as snapshots instead of images.')
             c.argument('tags', tags_type)
+            c.argument('engine', options_list=['--engine'], choices=['cli', 'sdk'], default='cli', is_preview=True,
+                       help='How the copy steps are run. "cli" runs every step as an az command in its own process, '
+                       '"sdk" calls the Azure SDK in-process, copies the target locations in parallel threads '
+                       'sharing the same clients and reports the time spent in each location.')
+            c.argument('replication_plan', options_list=['--replication-plan'], choices=['direct', 'hub'],
+                       default='direct', is_preview=True,
+                       help='How the image is copied to the target locations, only with --engine sdk. "direct" copies '
+                       'it from the source to every location. "hub" copies it from the source to the first target '
+                       'location of every geography, which is then copied to the other locations of its geography.')
+            c.argument('state_file', options_list=['--state-file'], is_preview=True,
+                       help='Path of a file where the progress of the copy is saved, only with --engine sdk. If the '
+                       'copy is interrupted or fails, running the same command again resumes it. The file is '
+                       'deleted once the copy is finished.')
             c.ignore('_subscription')
 
 
@@ -18,4 +18,14 @@ helps['image copy'] = """
           text: >
             az image copy --source-resource-group mySources-rg --source-object-name myVm \\
                 --source-type vm --target-location uksouth northeurope --target-resource-group "images-repo-rg"
+        - name: Copy an image to several regions in-process, without starting an az process for every step.
+          text: >
+            az image copy --source-resource-group mySources-rg --source-object-name myImage \\
+                --target-location uksouth northeurope westus2 --target-resource-group "images-repo-rg" --engine sdk
+        - name: Copy an image to regions across geographies through one hub region per geography, saving the progress to resume the copy if it is interrupted.
+          text: >
+            az image copy --source-resource-group mySources-rg --source-object-name myImage \\
+                --target-location eastus westus2 centralus northeurope westeurope uksouth \\
+                --target-resource-group "images-repo-rg" --engine sdk --replication-plan hub \\
+                --state-file image-copy-state.json
 """
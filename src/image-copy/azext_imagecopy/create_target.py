@@ -10,6 +10,7 @@ from knack.util import CLIError
 from knack.log import get_logger
 
 from azext_imagecopy.cli_utils import run_cli_command, prepare_cli_command, get_storage_account_id_from_blob_path
+from azext_imagecopy.sdk_utils import create_snapshot_sdk, get_extension_tags, timed_step
 
 logger = get_logger(__name__)
 
@@ -164,6 +165,72 @@ def create_target_image(location, transient_resource_group_name, source_type, so
         run_cli_command(cli_cmd)
 
 
+def create_target_storage_account_sdk(clients, location, transient_resource_group_name, storage_account_name=None):
+    # Creates the storage account the snapshot is copied to in the target location, or gets the one created by an
+    # interrupted run when storage_account_name is given. Returns the account name, blob endpoint and key.
+    if storage_account_name is None:
+        logger.warning(
+            "%s - Creating target storage account (can be slow sometimes)", location)
+        storage_account_name = location.lower() + get_random_string(STORAGE_ACCOUNT_NAME_LENGTH - len(location))
+        storage_account_model, sku_model = clients.storage_models('StorageAccountCreateParameters', 'Sku')
+        storage_account = clients.storage.storage_accounts.begin_create(
+            transient_resource_group_name, storage_account_name,
+            storage_account_model(sku=sku_model(name='Standard_LRS'), kind='StorageV2', location=location,
+                                  tags=get_extension_tags())).result()
+    else:
+        storage_account = clients.storage.storage_accounts.get_properties(transient_resource_group_name,
+                                                                          storage_account_name)
+
+    keys = clients.storage.storage_accounts.list_keys(transient_resource_group_name, storage_account_name).keys
+    return storage_account_name, storage_account.primary_endpoints.blob, keys[0].value
+
+
+def create_target_image_from_blob_sdk(clients, location, transient_resource_group_name, target_blob_path,
+                                      source_type, source_object_name, source_os_disk_snapshot_name, source_os_type,
+                                      target_resource_group_name, tags, target_name, export_as_snapshot,
+                                      hyper_v_generation, timings):
+    # Creates the snapshot, and unless export_as_snapshot is set the final image, from the blob copied to the
+    # target location. The time spent in every step is recorded in timings.
+    hyper_v_generation = 'V1' if hyper_v_generation is None else hyper_v_generation
+
+    logger.warning(
+        "%s - Creating snapshot in target region from the copied blob", location)
+    target_snapshot_name = source_os_disk_snapshot_name + '-' + location
+    if export_as_snapshot:
+        snapshot_resource_group_name = target_resource_group_name
+    else:
+        snapshot_resource_group_name = transient_resource_group_name
+
+    source_storage_account_id = get_storage_account_id_from_blob_path(target_blob_path,
+                                                                      transient_resource_group_name,
+                                                                      clients.subscription)
+    with timed_step(timings, 'snapshot'):
+        target_snapshot = create_snapshot_sdk(clients, snapshot_resource_group_name, target_snapshot_name, location,
+                                              target_blob_path, source_storage_account_id, hyper_v_generation)
+
+    if export_as_snapshot:
+        logger.warning("%s - Skipping image creation", location)
+        return
+
+    logger.warning("%s - Creating final image", location)
+    if target_name is None:
+        target_image_name = source_object_name
+        if source_type != 'image':
+            target_image_name += '-image'
+        target_image_name += '-' + location
+    else:
+        target_image_name = target_name
+
+    with timed_step(timings, 'image'):
+        image_model, storage_profile_model, os_disk_model, sub_resource_model = clients.compute_models(
+            'Image', 'ImageStorageProfile', 'ImageOSDisk', 'SubResource', operation_group='images')
+        image = image_model(
+            location=location, tags=get_extension_tags(tags), hyper_v_generation=hyper_v_generation,
+            storage_profile=storage_profile_model(os_disk=os_disk_model(
+                os_type=source_os_type, os_state='Generalized', snapshot=sub_resource_model(id=target_snapshot.id))))
+        clients.compute.images.begin_create_or_update(target_resource_group_name, target_image_name, image).result()
+
+
 def wait_for_blob_copy_operation(blob_name, target_container_name, target_storage_account_name,
                                  azure_pool_frequency, location, subscription, only_show_errors=None):
     copy_status = "pending"
@@ -10,7 +10,10 @@ from azure.cli.core.azclierror import ResourceNotFoundError, ArgumentUsageError
 from knack.log import get_logger
 
 from azext_imagecopy.cli_utils import run_cli_command, prepare_cli_command, get_storage_account_id_from_blob_path
-from azext_imagecopy.create_target import create_target_image
+from azext_imagecopy.create_target import create_target_image, create_target_image_from_blob_sdk
+from azext_imagecopy.replication import (ImageReplication, ReplicationState, get_location_geographies,
+                                         plan_replication)
+from azext_imagecopy.sdk_utils import ImageCopyClients, create_resource_group_sdk, create_snapshot_sdk
 
 logger = get_logger(__name__)
 
@@ -21,22 +24,26 @@ logger = get_logger(__name__)
 def imagecopy(cmd, source_resource_group_name, source_object_name, target_location,
               target_resource_group_name, temporary_resource_group_name='image-copy-rg',
               source_type='image', cleanup=False, parallel_degree=-1, tags=None, target_name=None,
-              target_subscription=None, export_as_snapshot='false', timeout=3600):
+              target_subscription=None, export_as_snapshot='false', timeout=3600, engine='cli',
+              replication_plan='direct', state_file=None):
+    if engine == 'sdk':
+        return imagecopy_sdk(cmd, source_resource_group_name, source_object_name, target_location,
+                             target_resource_group_name, temporary_resource_group_name, source_type, cleanup,
+                             parallel_degree, tags, target_name, target_subscription, export_as_snapshot, timeout,
+                             replication_plan, state_file)
+    if replication_plan != 'direct' or state_file:
+        raise ArgumentUsageError('--replication-plan and --state-file are only supported with --engine sdk.')
+
     only_show_errors = cmd.cli_ctx.only_show_errors
     if cleanup:
-        # If --cleanup is set, forbid using an existing temporary resource group name.
-        # It is dangerous to clean up an existing resource group.
         cli_cmd = prepare_cli_command(['group', 'exists', '-n', temporary_resource_group_name],
                                       output_as_json=False,
                                       only_show_errors=only_show_errors)
         cmd_output = run_cli_command(cli_cmd)
-        if 'true' in cmd_output:
-            raise ArgumentUsageError('You already have an resource group named {temporary_resource_group_name}, the existing resource group cannot be used as --temporary-resource-group-name when --cleanup is set. Please delete the resouce group or specify a new resource group by --temporary-resource-group-name.'.format(temporary_resource_group_name=temporary_resource_group_name))
+        _validate_temporary_resource_group(temporary_resource_group_name, 'true' in cmd_output)
 
-    if not target_subscription:
-        from azure.cli.core.commands.client_factory import get_subscription_id
-        target_subscription = get_subscription_id(cmd.cli_ctx)
-    logger.debug('subscription id - %s', target_subscription)
+    _validate_timeout(timeout)
+    target_subscription = _get_target_subscription(cmd, target_subscription)
 
     # get the os disk id from source vm/image
     logger.warning("Getting OS disk ID of the source VM/image")
@@ -53,50 +60,20 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
         logger.warning(
             "Data disks in the source detected, but are ignored by this extension!")
 
-    source_os_disk_id = None
-    source_os_disk_type = None
-
     # get the os disk id from source image
-    try:
-        source_os_disk_id = json_cmd_output['storageProfile']['osDisk']['managedDisk']['id']
-        if source_os_disk_id is None:
-            raise TypeError
-        else:
-            try:
-                cli_cmd = prepare_cli_command(['disk', 'show', '--ids', source_os_disk_id],
-                                              output_as_json=False,
-                                              only_show_errors=only_show_errors)
-                run_cli_command(cli_cmd)
-            except:
-                raise ResourceNotFoundError('Unable to find the source OS disk. Please make sure the source OS disk is not deleted.\n '
-                                            'If you deleted the source disk where the image was created (or chose to delete the VM while creating the image). Please refer to https://github.com/Azure/azure-cli/issues/25431 for temporary solution.')
-        source_os_disk_type = "DISK"
-        logger.debug("found %s: %s", source_os_disk_type, source_os_disk_id)
-    except TypeError:
+    os_disk = json_cmd_output['storageProfile']['osDisk']
+    source_os_disk_type, source_os_disk_id = _get_source_os_disk(
+        (os_disk.get('managedDisk') or {}).get('id'), os_disk.get('blobUri'), (os_disk.get('snapshot') or {}).get('id'))
+    if source_os_disk_type == "DISK":
         try:
-            source_os_disk_id = json_cmd_output['storageProfile']['osDisk']['blobUri']
-            if source_os_disk_id is None:
-                raise TypeError
-            source_os_disk_type = "BLOB"
-            logger.debug("found %s: %s", source_os_disk_type,
-                         source_os_disk_id)
-        except TypeError:
-            try:  # images created by e.g. image-copy extension
-                source_os_disk_id = json_cmd_output['storageProfile']['osDisk']['snapshot']['id']
-                if source_os_disk_id is None:
-                    raise TypeError
-                source_os_disk_type = "SNAPSHOT"
-                logger.debug("found %s: %s", source_os_disk_type,
-                             source_os_disk_id)
-            except TypeError:
-                pass
-
-    if source_os_disk_type is None or source_os_disk_id is None:
-        logger.error(
-            'Unable to locate a supported OS disk type in the provided source object')
-        raise CLIError('Invalid OS Disk Source Type')
-
-    source_os_type = json_cmd_output['storageProfile']['osDisk']['osType']
+            cli_cmd = prepare_cli_command(['disk', 'show', '--ids', source_os_disk_id],
+                                          output_as_json=False,
+                                          only_show_errors=only_show_errors)
+            run_cli_command(cli_cmd)
+        except Exception:  # pylint: disable=broad-except
+            raise _source_os_disk_not_found_error()
+
+    source_os_type = os_disk['osType']
     logger.debug("source_os_disk_type: %s. source_os_disk_id: %s. source_os_type: %s",
                  source_os_disk_type, source_os_disk_id, source_os_type)
 
@@ -130,10 +107,6 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
     # Get SAS URL for the snapshotName
     logger.warning(
         "Getting sas url for the source snapshot with timeout: %d seconds", timeout)
-    if timeout < 3600:
-        logger.error("Timeout should be greater than 3600 seconds")
-        raise CLIError('Invalid Timeout')
-
     cli_cmd = prepare_cli_command(['snapshot', 'grant-access',
                                    '--name', source_os_disk_snapshot_name,
                                    '--resource-group', source_resource_group_name,
@@ -167,12 +140,7 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
     pool = None
     try:
 
-        # try to get a handle on arm's 409s
-        azure_pool_frequency = 5
-        if target_locations_count >= 5:
-            azure_pool_frequency = 15
-        elif target_locations_count >= 3:
-            azure_pool_frequency = 10
+        azure_pool_frequency = _get_azure_pool_frequency(target_locations_count)
 
         if (target_locations_count == 1) or (parallel_degree == 1):
             # Going to copy to targets one-by-one
@@ -246,6 +214,176 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
     logger.warning('Image copy finished')
 
 
+# pylint: disable=too-many-statements
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-branches
+def imagecopy_sdk(cmd, source_resource_group_name, source_object_name, target_location,
+                  target_resource_group_name, temporary_resource_group_name, source_type, cleanup,
+                  parallel_degree, tags, target_name, target_subscription, export_as_snapshot, timeout,
+                  replication_plan='direct', state_file=None):
+    # Same flow as imagecopy, but every step calls the compute, storage and resource SDK clients in-process instead
+    # of spawning an `az` process, and the target locations are copied by threads sharing the same clients.
+    # With a state file, the progress is saved so that running the same command again resumes an interrupted copy.
+    from azure.core.exceptions import ResourceNotFoundError as SdkResourceNotFoundError
+    from msrestazure.tools import parse_resource_id
+
+    _validate_timeout(timeout)
+    target_subscription = _get_target_subscription(cmd, target_subscription)
+
+    source_clients = ImageCopyClients(cmd.cli_ctx)
+    target_clients = ImageCopyClients(cmd.cli_ctx, target_subscription)
+
+    state = ReplicationState(state_file)
+    if cleanup and not state.resumed:
+        _validate_temporary_resource_group(
+            temporary_resource_group_name,
+            target_clients.resource.resource_groups.check_existence(temporary_resource_group_name))
+
+    logger.warning("Getting OS disk ID of the source VM/image")
+    if source_type == 'vm':
+        source_object = source_clients.compute.virtual_machines.get(source_resource_group_name, source_object_name)
+    else:
+        source_object = source_clients.compute.images.get(source_resource_group_name, source_object_name)
+
+    if source_object.storage_profile.data_disks:
+        logger.warning(
+            "Data disks in the source detected, but are ignored by this extension!")
+
+    os_disk = source_object.storage_profile.os_disk
+    source_os_disk_type, source_os_disk_id = _get_source_os_disk(
+        os_disk.managed_disk and os_disk.managed_disk.id, getattr(os_disk, 'blob_uri', None),
+        getattr(os_disk, 'snapshot', None) and os_disk.snapshot.id)
+    source_storage_account_id = None
+    if source_os_disk_type == "DISK":
+        source_os_disk = parse_resource_id(source_os_disk_id)
+        try:
+            source_clients.compute.disks.get(source_os_disk['resource_group'], source_os_disk['name'])
+        except SdkResourceNotFoundError:
+            raise _source_os_disk_not_found_error()
+    elif source_os_disk_type == "BLOB":
+        source_storage_account_id = get_storage_account_id_from_blob_path(source_os_disk_id,
+                                                                          source_resource_group_name,
+                                                                          target_subscription)
+
+    source_os_type = os_disk.os_type
+    hyper_v_generation = getattr(source_object, 'hyper_v_generation', None)
+    logger.debug("source_os_disk_id: %s. source_os_type: %s", source_os_disk_id, source_os_type)
+
+    target_location = [location.strip() for location in target_location]
+    state.begin(source_object.id, target_location)
+
+    source_os_disk_snapshot_name = source_object_name + '_os_disk_snapshot'
+    if not state.source.get('snapshot'):
+        logger.warning("Creating source snapshot")
+        create_snapshot_sdk(source_clients, source_resource_group_name, source_os_disk_snapshot_name,
+                            source_object.location, source_os_disk_id, source_storage_account_id, hyper_v_generation)
+        state.update_source(snapshot=source_os_disk_snapshot_name)
+
+    # The access is granted again when resuming, as the SAS url of the interrupted run may have expired
+    logger.warning(
+        "Getting sas url for the source snapshot with timeout: %d seconds", timeout)
+    grant_access_data = source_clients.compute_models('GrantAccessData', operation_group='snapshots')
+    source_os_disk_snapshot_url = source_clients.compute.snapshots.begin_grant_access(
+        source_resource_group_name, source_os_disk_snapshot_name,
+        grant_access_data(access='Read', duration_in_seconds=timeout)).result().access_sas
+    logger.debug("source os disk snapshot url: %s",
+                 source_os_disk_snapshot_url)
+
+    create_resource_group_sdk(target_clients, temporary_resource_group_name, target_location[0])
+    create_resource_group_sdk(target_clients, target_resource_group_name, target_location[0])
+
+    target_locations_count = len(target_location)
+    logger.warning("Target location count: %s", target_locations_count)
+
+    azure_pool_frequency = _get_azure_pool_frequency(target_locations_count)
+
+    geographies = None
+    if replication_plan == 'hub':
+        geographies = get_location_geographies(target_clients, target_location)
+    plan = plan_replication(target_location, geographies)
+    for location, hub in plan.items():
+        if hub:
+            logger.warning("%s - Will be copied from the %s hub", location, hub)
+
+    def create_target(location, blob_url, timings):
+        create_target_image_from_blob_sdk(target_clients, location, temporary_resource_group_name, blob_url,
+                                          source_type, source_object_name, source_os_disk_snapshot_name,
+                                          source_os_type, target_resource_group_name, tags, target_name,
+                                          export_as_snapshot, hyper_v_generation, timings)
+
+    max_workers = target_locations_count if parallel_degree == -1 else min(parallel_degree, target_locations_count)
+    logger.warning("Starting copy process for all locations")
+    replication = ImageReplication(target_clients, state, plan, source_os_disk_snapshot_url,
+                                   source_os_disk_snapshot_name + '.vhd', temporary_resource_group_name,
+                                   create_target, max(max_workers, 1), azure_pool_frequency, timeout)
+    failures = replication.run()
+
+    # Keep the transient resources of a failed copy so that it can be resumed.
+    if failures and state_file:
+        raise CLIError('Image copy failed in: {}. Run the same command again to resume the copy from {}.'.format(
+            ', '.join(failures), state_file))
+
+    if cleanup:
+        logger.warning('Deleting transient resources')
+        target_clients.resource.resource_groups.begin_delete(temporary_resource_group_name)
+        source_clients.compute.snapshots.begin_revoke_access(source_resource_group_name,
+                                                             source_os_disk_snapshot_name).result()
+        source_clients.compute.snapshots.begin_delete(source_resource_group_name,
+                                                      source_os_disk_snapshot_name).result()
+
+    if failures:
+        raise CLIError('Image copy failed in: {}'.format(', '.join(failures)))
+    state.delete()
+    logger.warning('Image copy finished')
+
+
+def _validate_timeout(timeout):
+    if timeout < 3600:
+        logger.error("Timeout should be greater than 3600 seconds")
+        raise CLIError('Invalid Timeout')
+
+
+def _validate_temporary_resource_group(temporary_resource_group_name, exists):
+    # If --cleanup is set, forbid using an existing temporary resource group name.
+    # It is dangerous to clean up an existing resource group.
+    if exists:
+        raise ArgumentUsageError('You already have an resource group named {temporary_resource_group_name}, the existing resource group cannot be used as --temporary-resource-group-name when --cleanup is set. Please delete the resouce group or specify a new resource group by --temporary-resource-group-name.'.format(temporary_resource_group_name=temporary_resource_group_name))
+
+
+def _get_target_subscription(cmd, target_subscription):
+    if not target_subscription:
+        from azure.cli.core.commands.client_factory import get_subscription_id
+        target_subscription = get_subscription_id(cmd.cli_ctx)
+    logger.debug('subscription id - %s', target_subscription)
+    return target_subscription
+
+
+def _get_source_os_disk(managed_disk_id, blob_uri, snapshot_id):
+    # The OS disk of the source is a managed disk, a blob, or a snapshot for images created by e.g. this extension.
+    for source_os_disk_type, source_os_disk_id in [("DISK", managed_disk_id), ("BLOB", blob_uri),
+                                                   ("SNAPSHOT", snapshot_id)]:
+        if source_os_disk_id:
+            logger.debug("found %s: %s", source_os_disk_type, source_os_disk_id)
+            return source_os_disk_type, source_os_disk_id
+    logger.error(
+        'Unable to locate a supported OS disk type in the provided source object')
+    raise CLIError('Invalid OS Disk Source Type')
+
+
+def _source_os_disk_not_found_error():
+    return ResourceNotFoundError('Unable to find the source OS disk. Please make sure the source OS disk is not deleted.\n '
+                                 'If you deleted the source disk where the image was created (or chose to delete the VM while creating the image). Please refer to https://github.com/Azure/azure-cli/issues/25431 for temporary solution.')
+
+
+def _get_azure_pool_frequency(target_locations_count):
+    # try to get a handle on arm's 409s
+    if target_locations_count >= 5:
+        return 15
+    if target_locations_count >= 3:
+        return 10
+    return 5
+
+
 def create_resource_group(resource_group_name, location, subscription=None, only_show_errors=None):
     # check if target resource group exists
     cli_cmd = prepare_cli_command(['group', 'exists',
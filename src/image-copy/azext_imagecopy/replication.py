@@ -0,0 +1,282 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from azure.cli.core.azclierror import ArgumentUsageError
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from knack.log import get_logger
+
+from azext_imagecopy.create_target import create_target_storage_account_sdk
+from azext_imagecopy.sdk_utils import format_timings, timed_step
+
+logger = get_logger(__name__)
+
+TARGET_CONTAINER_NAME = 'snapshots'
+
+# Status of a target location in the state file, in the order they are reached.
+STATUS_PENDING = 'pending'
+STATUS_ACCOUNT_CREATED = 'account_created'
+STATUS_COPYING = 'copying'
+STATUS_COPIED = 'copied'
+STATUS_DONE = 'done'
+
+
+def get_location_geographies(clients, locations):
+    # Maps every location to the geography group ARM reports for it, e.g. 'US', 'Europe' or 'Asia Pacific'.
+    # Locations without metadata are their own group.
+    geographies = {}
+    for location in clients.subscriptions.subscriptions.list_locations(clients.subscription):
+        metadata = getattr(location, 'metadata', None)
+        if metadata is not None and metadata.geography_group:
+            geographies[location.name.lower()] = metadata.geography_group
+    return {location: geographies.get(location.lower(), location) for location in locations}
+
+
+def plan_replication(locations, geographies=None):
+    # Returns an OrderedDict of location -> the location its blob is copied from, None being the source.
+    # Without geographies every location copies from the source. Otherwise the first location of every geography
+    # is its hub, which copies from the source, and the other locations of the geography copy from their hub.
+    plan = OrderedDict()
+    hubs = {}
+    for location in locations:
+        if geographies is None:
+            plan[location] = None
+            continue
+        geography = geographies[location]
+        plan[location] = hubs.get(geography)
+        hubs.setdefault(geography, location)
+    return plan
+
+
+class ReplicationState:
+    # The progress of a copy. With a path, it is saved after every change so that an interrupted run can be resumed
+    # by running the same command again.
+
+    def __init__(self, path=None):
+        self.path = path
+        self.data = {'source': {}, 'locations': {}}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    @property
+    def resumed(self):
+        return bool(self.data['source'])
+
+    @property
+    def source(self):
+        return self.data['source']
+
+    def begin(self, source_id, locations):
+        # Starts tracking a copy of source_id to locations. When resuming, the state must belong to the same copy.
+        if not self.resumed:
+            self.data = {'source': {'id': source_id},
+                         'locations': {location: {'status': STATUS_PENDING} for location in locations}}
+            return
+        if self.source.get('id', '').lower() != source_id.lower() or \
+                sorted(self.data['locations']) != sorted(locations):
+            raise ArgumentUsageError('The state file {} belongs to a copy of {} to {}. Use another --state-file '
+                                     'or delete it to start over.'.format(self.path, self.source.get('id'),
+                                                                          ', '.join(self.data['locations'])))
+        logger.warning("Resuming the copy from %s", self.path)
+
+    def location(self, location):
+        with self._lock:
+            return dict(self.data['locations'].setdefault(location, {'status': STATUS_PENDING}))
+
+    def update_source(self, **values):
+        with self._lock:
+            self.data['source'].update(values)
+            self._save()
+
+    def update_location(self, location, **values):
+        with self._lock:
+            self.data['locations'].setdefault(location, {'status': STATUS_PENDING}).update(values)
+            self._save()
+
+    def delete(self):
+        if self.path and os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        if not self.path:
+            return
+        # The state is swapped in with a rename so that an interruption never leaves a truncated file behind.
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.image_copy_state')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class ImageReplication:
+    # Copies the source blob to every target location following a plan from plan_replication.
+    # Storage accounts and the snapshots and images created from the copied blobs are handled by a thread pool,
+    # while a single loop starts the blob copies once their source is available and polls all of them.
+
+    def __init__(self, clients, state, plan, source_url, blob_name, transient_resource_group_name,
+                 create_target, max_workers, poll_interval, timeout):
+        # create_target(location, blob_url, timings) creates the snapshot and the image from the copied blob.
+        self.clients = clients
+        self.state = state
+        self.plan = plan
+        self.source_url = source_url
+        self.blob_name = blob_name
+        self.transient_resource_group_name = transient_resource_group_name
+        self.create_target = create_target
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.timings = {location: {} for location in plan}
+        self.failures = OrderedDict()
+        self._blobs = {}
+
+    def run(self):
+        # Returns an OrderedDict of the locations that failed to their error.
+        start = time.perf_counter()
+        remaining = [location for location in self.plan if self.state.location(location)['status'] != STATUS_DONE]
+        # Hubs that are already done are still needed as the source of the locations that are not.
+        needed = set(remaining) | {self.plan[location] for location in remaining if self.plan[location]}
+        waiting = []
+        copying = {}
+        progress = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            preparing = {executor.submit(self._prepare_location, location): location
+                         for location in self.plan if location in needed}
+            creating = {}
+            while preparing or creating or copying or waiting:
+                if preparing or creating:
+                    done, _ = wait(list(preparing) + list(creating), return_when=FIRST_COMPLETED,
+                                   timeout=self.poll_interval if copying else None)
+                else:
+                    done = set()
+                    time.sleep(self.poll_interval)
+
+                for future in done:
+                    if future in preparing:
+                        location = preparing.pop(future)
+                        if self._succeeded(location, future) and location in remaining:
+                            waiting.append(location)
+                    else:
+                        location = creating.pop(future)
+                        if self._succeeded(location, future):
+                            self.state.update_location(location, status=STATUS_DONE)
+                            self.timings[location]['total'] = time.perf_counter() - start
+                            logger.warning(format_timings(location, self.timings[location]))
+
+                for location in list(waiting):
+                    if self.state.location(location)['status'] == STATUS_COPIED:
+                        waiting.remove(location)
+                        creating[executor.submit(self._create_target, location)] = location
+                        continue
+                    started = self._start_copy(location)
+                    if started is not None:
+                        waiting.remove(location)
+                        if started:
+                            copying[location] = time.perf_counter()
+
+                for location in list(copying):
+                    # pylint: disable=broad-except
+                    try:
+                        copy = self._blobs[location][0].get_blob_properties().copy
+                    except Exception as ex:
+                        copying.pop(location)
+                        self._fail(location, ex)
+                        continue
+                    if copy.status == 'pending':
+                        copied, total = copy.progress.split('/')
+                        current_progress = int(int(copied) / int(total) * 100)
+                        if progress.get(location) != current_progress:
+                            logger.warning("%s - Copy progress: %d%%", location, current_progress)
+                        progress[location] = current_progress
+                        continue
+                    self.timings[location]['copy'] = time.perf_counter() - copying.pop(location)
+                    if copy.status != 'success':
+                        self._fail(location, 'The copy operation didn\'t succeed. Last status: {}. {}'.format(
+                            copy.status, copy.status_description or ''))
+                        continue
+                    logger.warning("%s - Copy time: %.1fs", location, self.timings[location]['copy'])
+                    self.state.update_location(location, status=STATUS_COPIED)
+                    creating[executor.submit(self._create_target, location)] = location
+        return self.failures
+
+    def _succeeded(self, location, future):
+        # pylint: disable=broad-except
+        try:
+            future.result()
+            return True
+        except Exception as ex:
+            self._fail(location, ex)
+            return False
+
+    def _fail(self, location, error):
+        logger.error("%s - Copy failed: %s", location, error)
+        self.failures[location] = error
+
+    def _prepare_location(self, location):
+        entry = self.state.location(location)
+        with timed_step(self.timings[location], 'storage account'):
+            account_name, blob_endpoint, account_key = create_target_storage_account_sdk(
+                self.clients, location, self.transient_resource_group_name, entry.get('storage_account'))
+            if entry['status'] == STATUS_PENDING:
+                self.state.update_location(location, status=STATUS_ACCOUNT_CREATED, storage_account=account_name)
+
+            blob_service_client = self.clients.blob_service_client(blob_endpoint, account_key)
+            try:
+                logger.warning(
+                    "%s - Creating container in the target storage account", location)
+                blob_service_client.create_container(TARGET_CONTAINER_NAME)
+            except ResourceExistsError:
+                pass
+        self._blobs[location] = (blob_service_client.get_blob_client(TARGET_CONTAINER_NAME, self.blob_name),
+                                 account_key)
+
+    def _start_copy(self, location):
+        # Returns True when the copy is running, False when it failed to start and None while the hub it copies
+        # from isn't ready yet.
+        status = self.state.location(location)['status']
+        blob_client, _ = self._blobs[location]
+        if status == STATUS_COPYING:
+            try:
+                copy_status = blob_client.get_blob_properties().copy.status
+            except ResourceNotFoundError:
+                copy_status = None
+            if copy_status in ('pending', 'success'):
+                logger.warning("%s - Resuming the copy to the target storage account", location)
+                return True
+
+        hub = self.plan[location]
+        if hub is None:
+            source_url = self.source_url
+        elif hub in self.failures:
+            self._fail(location, 'The copy to {}, which {} is copied from, failed.'.format(hub, location))
+            return False
+        elif hub in self._blobs and self.state.location(hub)['status'] in (STATUS_COPIED, STATUS_DONE):
+            # When resuming, the hub may be copied already while its storage account is still being looked up
+            hub_blob_client, hub_account_key = self._blobs[hub]
+            source_url = self.clients.blob_read_url(hub_blob_client, hub_account_key, self.timeout)
+        else:
+            return None
+
+        logger.warning("%s - Copying blob to target storage account from %s", location, hub or 'the source')
+        # pylint: disable=broad-except
+        try:
+            blob_client.start_copy_from_url(source_url)
+        except Exception as ex:
+            self._fail(location, ex)
+            return False
+        self.state.update_location(location, status=STATUS_COPYING, copied_from=hub)
+        return True
+
+    def _create_target(self, location):
+        self.create_target(location, self._blobs[location][0].url, self.timings[location])
@@ -0,0 +1,124 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import threading
+import time
+from contextlib import contextmanager
+
+from azure.cli.core.commands.client_factory import get_mgmt_service_client, get_subscription_service_client
+from azure.cli.core.profiles import ResourceType, get_sdk
+
+from knack.log import get_logger
+logger = get_logger(__name__)
+
+EXTENSION_TAGS = {'created_by': 'image-copy-extension'}
+
+
+class ImageCopyClients:
+    # The management clients of one subscription. They are created on first use and then shared by all the
+    # regions copied in parallel, so the credentials and the connection pool are only set up once.
+
+    def __init__(self, cli_ctx, subscription=None):
+        self.cli_ctx = cli_ctx
+        self.subscription = subscription
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self, resource_type):
+        with self._lock:
+            if resource_type not in self._clients:
+                if resource_type == ResourceType.MGMT_RESOURCE_SUBSCRIPTIONS:
+                    self._clients[resource_type] = get_subscription_service_client(self.cli_ctx)
+                else:
+                    self._clients[resource_type] = get_mgmt_service_client(self.cli_ctx, resource_type,
+                                                                           subscription_id=self.subscription)
+            return self._clients[resource_type]
+
+    @property
+    def compute(self):
+        return self._get_client(ResourceType.MGMT_COMPUTE)
+
+    @property
+    def storage(self):
+        return self._get_client(ResourceType.MGMT_STORAGE)
+
+    @property
+    def resource(self):
+        return self._get_client(ResourceType.MGMT_RESOURCE_RESOURCES)
+
+    @property
+    def subscriptions(self):
+        return self._get_client(ResourceType.MGMT_RESOURCE_SUBSCRIPTIONS)
+
+    def compute_models(self, *names, operation_group):
+        return get_sdk(self.cli_ctx, ResourceType.MGMT_COMPUTE, *names, mod='models', operation_group=operation_group)
+
+    def storage_models(self, *names):
+        return get_sdk(self.cli_ctx, ResourceType.MGMT_STORAGE, *names, mod='models')
+
+    def resource_models(self, *names):
+        return get_sdk(self.cli_ctx, ResourceType.MGMT_RESOURCE_RESOURCES, *names, mod='models')
+
+    def blob_service_client(self, account_url, account_key):
+        t_blob_service = get_sdk(self.cli_ctx, ResourceType.DATA_STORAGE_BLOB,
+                                 '_blob_service_client#BlobServiceClient')
+        return t_blob_service(account_url=account_url, credential=account_key)
+
+    def blob_read_url(self, blob_client, account_key, timeout):
+        # A read-only SAS url of the blob, used as the source of the copies fanned out from it.
+        generate_blob_sas, t_blob_permissions = get_sdk(self.cli_ctx, ResourceType.DATA_STORAGE_BLOB,
+                                                        '_shared_access_signature#generate_blob_sas',
+                                                        '_models#BlobSasPermissions')
+        sas_token = generate_blob_sas(blob_client.account_name, blob_client.container_name, blob_client.blob_name,
+                                      account_key=account_key, permission=t_blob_permissions(read=True),
+                                      expiry=datetime.datetime.utcnow() + datetime.timedelta(seconds=timeout))
+        return blob_client.url + '?' + sas_token
+
+
+def get_extension_tags(tags=None):
+    extension_tags = dict(EXTENSION_TAGS)
+    if tags:
+        extension_tags.update(tags)
+    return extension_tags
+
+
+def create_resource_group_sdk(clients, resource_group_name, location):
+    if clients.resource.resource_groups.check_existence(resource_group_name):
+        return
+
+    logger.warning("Creating resource group: %s", resource_group_name)
+    resource_group = clients.resource_models('ResourceGroup')
+    clients.resource.resource_groups.create_or_update(
+        resource_group_name, resource_group(location=location, tags=get_extension_tags()))
+
+
+def create_snapshot_sdk(clients, resource_group_name, snapshot_name, location, source, source_storage_account_id=None,
+                        hyper_v_generation=None):
+    # Mirrors `az snapshot create --source`: a blob uri is imported, a disk or a snapshot id is copied.
+    snapshot_model, creation_data_model = clients.compute_models('Snapshot', 'CreationData',
+                                                                 operation_group='snapshots')
+    if source_storage_account_id:
+        creation_data = creation_data_model(create_option='Import', source_uri=source,
+                                            storage_account_id=source_storage_account_id)
+    else:
+        creation_data = creation_data_model(create_option='Copy', source_resource_id=source)
+    snapshot = snapshot_model(location=location, creation_data=creation_data, hyper_v_generation=hyper_v_generation,
+                              tags=get_extension_tags())
+    return clients.compute.snapshots.begin_create_or_update(resource_group_name, snapshot_name, snapshot).result()
+
+
+@contextmanager
+def timed_step(timings, step):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = time.perf_counter() - start
+
+
+def format_timings(location, timings):
+    steps = ', '.join('{0}: {1:.1f}s'.format(step, seconds) for step, seconds in timings.items() if step != 'total')
+    return "{0} - Total time: {1:.1f}s ({2})".format(location, timings.get('total', 0), steps)
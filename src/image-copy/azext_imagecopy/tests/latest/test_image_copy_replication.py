@@ -0,0 +1,187 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import ArgumentUsageError
+
+from azext_imagecopy.replication import (ImageReplication, ReplicationState, get_location_geographies,
+                                         plan_replication)
+
+LOCATIONS = ['eastus', 'westus2', 'northeurope', 'centralus', 'uksouth']
+GEOGRAPHIES = {'eastus': 'US', 'westus2': 'US', 'centralus': 'US', 'northeurope': 'Europe', 'uksouth': 'UK'}
+
+
+class ImageCopyReplicationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.folder, 'state.json')
+        self.copies = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _mock_clients(self, pending_polls=1):
+        # Every blob copy reports 'pending' pending_polls times before it succeeds.
+        clients = mock.Mock()
+        clients.storage.storage_accounts.begin_create.return_value.result.return_value.primary_endpoints.blob = \
+            'https://account.blob.core.windows.net/'
+        clients.storage.storage_accounts.list_keys.return_value.keys = [mock.Mock(value='key')]
+        clients.storage_models.side_effect = lambda *names: [mock.Mock() for _ in names]
+        clients.blob_read_url.side_effect = lambda blob_client, key, timeout: blob_client.url + '?sas'
+
+        def blob_service_client(account_url, account_key):
+            service = mock.Mock()
+            service.get_blob_client.side_effect = lambda container, blob: self._mock_blob(pending_polls)
+            return service
+
+        clients.blob_service_client.side_effect = blob_service_client
+        return clients
+
+    def _mock_blob(self, pending_polls):
+        blob_client = mock.Mock()
+        polls = []
+
+        def start_copy_from_url(source_url):
+            self.copies[blob_client.url] = source_url
+
+        def get_blob_properties():
+            polls.append(None)
+            status = 'pending' if len(polls) <= pending_polls else 'success'
+            return mock.Mock(copy=mock.Mock(status=status, progress='1/2'))
+
+        blob_client.start_copy_from_url.side_effect = start_copy_from_url
+        blob_client.get_blob_properties.side_effect = get_blob_properties
+        return blob_client
+
+    def _run(self, clients, plan, state, create_target=None):
+        create_target = create_target or mock.Mock()
+        replication = ImageReplication(clients, state, plan, 'https://source/snapshot?sas', 'image.vhd', 'tmp-rg',
+                                       create_target, 4, 0, 3600)
+        # The blob urls identify the locations the copies go to.
+        original_prepare = replication._prepare_location
+
+        def prepare_location(location):
+            original_prepare(location)
+            replication._blobs[location][0].url = location
+        replication._prepare_location = prepare_location
+        return replication.run(), create_target
+
+    def test_plan_replication(self):
+        self.assertEqual(list(plan_replication(LOCATIONS).values()), [None] * 5)
+        self.assertEqual(dict(plan_replication(LOCATIONS, GEOGRAPHIES)),
+                         {'eastus': None, 'westus2': 'eastus', 'northeurope': None, 'centralus': 'eastus',
+                          'uksouth': None})
+
+    def test_get_location_geographies(self):
+        clients = mock.Mock()
+        locations = [mock.Mock(metadata=mock.Mock(geography_group=group)) for group in ('US', 'Europe', None)]
+        for location, name in zip(locations, ['EastUS', 'northeurope', 'newregion']):
+            location.name = name
+        clients.subscriptions.subscriptions.list_locations.return_value = locations
+        self.assertEqual(get_location_geographies(clients, ['eastus', 'northeurope', 'newregion']),
+                         {'eastus': 'US', 'northeurope': 'Europe', 'newregion': 'newregion'})
+
+    def test_hub_replication(self):
+        state = ReplicationState(self.state_file)
+        state.begin('image-id', LOCATIONS)
+        failures, create_target = self._run(self._mock_clients(), plan_replication(LOCATIONS, GEOGRAPHIES), state)
+
+        self.assertEqual(failures, {})
+        self.assertEqual(self.copies, {
+            'eastus': 'https://source/snapshot?sas', 'northeurope': 'https://source/snapshot?sas',
+            'uksouth': 'https://source/snapshot?sas', 'westus2': 'eastus?sas', 'centralus': 'eastus?sas'})
+        self.assertEqual(sorted(call[0][0] for call in create_target.call_args_list), sorted(LOCATIONS))
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        self.assertEqual({entry['status'] for entry in saved['locations'].values()}, {'done'})
+        self.assertEqual(saved['locations']['westus2']['copied_from'], 'eastus')
+
+    def test_failed_hub_fails_its_locations(self):
+        clients = self._mock_clients()
+        create_storage_account = clients.storage.storage_accounts.begin_create
+
+        def begin_create(resource_group, name, parameters):
+            if name.startswith('eastus'):
+                raise ValueError('quota exceeded')
+            return create_storage_account.return_value
+        create_storage_account.side_effect = begin_create
+
+        state = ReplicationState()
+        state.begin('image-id', LOCATIONS)
+        failures, create_target = self._run(clients, plan_replication(LOCATIONS, GEOGRAPHIES), state)
+        self.assertEqual(sorted(failures), ['centralus', 'eastus', 'westus2'])
+        self.assertEqual(sorted(call[0][0] for call in create_target.call_args_list), ['northeurope', 'uksouth'])
+
+    def test_resume_replication(self):
+        plan = plan_replication(LOCATIONS, GEOGRAPHIES)
+        state = ReplicationState(self.state_file)
+        state.begin('image-id', LOCATIONS)
+        state.update_source(snapshot='image_os_disk_snapshot')
+        def create_target(location, blob_url, timings):
+            if location == 'westus2':
+                raise ValueError('image quota exceeded')
+        failures, _ = self._run(self._mock_clients(), plan, state, create_target)
+        self.assertEqual(list(failures), ['westus2'])
+
+        resumed = ReplicationState(self.state_file)
+        self.assertTrue(resumed.resumed)
+        resumed.begin('IMAGE-ID', list(reversed(LOCATIONS)))
+        self.assertEqual(resumed.location('westus2')['status'], 'copied')
+        self.copies.clear()
+        clients = self._mock_clients()
+        failures, create_target = self._run(clients, plan, resumed)
+
+        self.assertEqual(failures, {})
+        self.assertEqual(self.copies, {})
+        self.assertEqual([call[0][0] for call in create_target.call_args_list], ['westus2'])
+        # Only the storage accounts of westus2 and of the eastus hub it was copied from are looked up again.
+        get_properties = clients.storage.storage_accounts.get_properties
+        self.assertEqual(sorted(call[0][1] for call in get_properties.call_args_list),
+                         [resumed.location('eastus')['storage_account'], resumed.location('westus2')['storage_account']])
+        clients.storage.storage_accounts.begin_create.assert_not_called()
+
+        with self.assertRaises(ArgumentUsageError):
+            ReplicationState(self.state_file).begin('another-image-id', LOCATIONS)
+
+    def test_resume_waits_for_the_hub_storage_account(self):
+        plan = plan_replication(['eastus', 'westus2'], GEOGRAPHIES)
+        state = ReplicationState()
+        state.begin('image-id', ['eastus', 'westus2'])
+        state.update_location('eastus', status='done', storage_account='eastusaccount')
+        state.update_location('westus2', status='account_created', storage_account='westus2account')
+        replication = ImageReplication(self._mock_clients(), state, plan, 'https://source/snapshot?sas', 'image.vhd',
+                                       'tmp-rg', mock.Mock(), 4, 0, 3600)
+        # The hub is looked up only after westus2 tried to start its copy
+        hub_ready = threading.Event()
+        original_prepare, original_start_copy = replication._prepare_location, replication._start_copy
+
+        def prepare_location(location):
+            if location == 'eastus':
+                hub_ready.wait(10)
+            original_prepare(location)
+            replication._blobs[location][0].url = location
+
+        def start_copy(location):
+            started = original_start_copy(location)
+            hub_ready.set()
+            return started
+
+        replication._prepare_location, replication._start_copy = prepare_location, start_copy
+        failures = replication.run()
+
+        self.assertEqual(failures, {})
+        self.assertEqual(self.copies, {'westus2': 'eastus?sas'})
+
+
+if __name__ == '__main__':
+    unittest.main()
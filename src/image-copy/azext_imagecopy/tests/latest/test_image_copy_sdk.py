@@ -0,0 +1,84 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+from knack.util import CLIError
+
+from azext_imagecopy import custom
+
+SOURCE_DISK_ID = '/subscriptions/sub/resourceGroups/source-rg/providers/Microsoft.Compute/disks/osdisk'
+
+
+class ImageCopySdkTests(unittest.TestCase):
+
+    def _mock_clients(self, subscription=None):
+        clients = mock.Mock(subscription=subscription)
+        clients.compute_models.side_effect = lambda *names, **_: \
+            mock.Mock() if len(names) == 1 else [mock.Mock() for _ in names]
+        clients.storage_models.side_effect = lambda *names: [mock.Mock() for _ in names]
+        clients.resource_models.return_value = mock.Mock()
+        clients.resource.resource_groups.check_existence.return_value = False
+        clients.storage.storage_accounts.begin_create.return_value.result.return_value.primary_endpoints.blob = \
+            'https://account.blob.core.windows.net/'
+        clients.storage.storage_accounts.list_keys.return_value.keys = [mock.Mock(value='key')]
+        blob_client = clients.blob_service_client.return_value.get_blob_client.return_value
+        blob_client.url = 'https://account.blob.core.windows.net/snapshots/image_os_disk_snapshot.vhd'
+        blob_client.get_blob_properties.return_value.copy.status = 'success'
+        return clients
+
+    @mock.patch('azext_imagecopy.custom.ImageCopyClients')
+    def test_imagecopy_sdk(self, mock_clients_cls):
+        source_clients, target_clients = self._mock_clients(), self._mock_clients('target-sub')
+        mock_clients_cls.side_effect = [source_clients, target_clients]
+        source_image = source_clients.compute.images.get.return_value
+        source_image.storage_profile.data_disks = []
+        source_image.storage_profile.os_disk.managed_disk.id = SOURCE_DISK_ID
+        source_image.storage_profile.os_disk.os_type = 'Linux'
+        source_image.hyper_v_generation = 'V2'
+
+        with self.assertLogs('cli.azext_imagecopy', level='WARNING') as logs:
+            custom.imagecopy(mock.Mock(), 'source-rg', 'image', ['eastus', ' westus '], 'target-rg',
+                             target_subscription='target-sub', export_as_snapshot=False, cleanup=True,
+                             engine='sdk')
+
+        source_clients.compute.disks.get.assert_called_once_with('source-rg', 'osdisk')
+        self.assertEqual(source_clients.compute.snapshots.begin_create_or_update.call_count, 1)
+        images = target_clients.compute.images.begin_create_or_update.call_args_list
+        self.assertEqual(sorted(call[0][1] for call in images), ['image-eastus', 'image-westus'])
+        self.assertEqual(target_clients.storage.storage_accounts.begin_create.call_count, 2)
+        target_clients.resource.resource_groups.begin_delete.assert_called_once_with('image-copy-rg')
+        self.assertEqual(len([log for log in logs.output if 'Total time' in log]), 2)
+
+    @mock.patch('azext_imagecopy.custom.ImageCopyClients')
+    def test_imagecopy_sdk_reports_failed_locations(self, mock_clients_cls):
+        source_clients, target_clients = self._mock_clients(), self._mock_clients('target-sub')
+        mock_clients_cls.side_effect = [source_clients, target_clients]
+        source_image = source_clients.compute.images.get.return_value
+        source_image.storage_profile.os_disk.managed_disk.id = SOURCE_DISK_ID
+        create_storage_account = target_clients.storage.storage_accounts.begin_create
+
+        def begin_create(resource_group, name, parameters):
+            if name.startswith('westus'):
+                raise ValueError('quota exceeded')
+            return create_storage_account.return_value
+
+        create_storage_account.side_effect = begin_create
+
+        with self.assertRaisesRegex(CLIError, 'westus'):
+            custom.imagecopy(mock.Mock(), 'source-rg', 'image', ['eastus', 'westus'], 'target-rg',
+                             target_subscription='target-sub', export_as_snapshot=False, engine='sdk')
+        self.assertEqual(target_clients.compute.images.begin_create_or_update.call_count, 1)
+
+    def test_get_source_os_disk(self):
+        self.assertEqual(custom._get_source_os_disk(SOURCE_DISK_ID, 'https://blob', None), ('DISK', SOURCE_DISK_ID))
+        self.assertEqual(custom._get_source_os_disk(None, 'https://blob', None), ('BLOB', 'https://blob'))
+        self.assertEqual(custom._get_source_os_disk(None, None, 'snapshot-id'), ('SNAPSHOT', 'snapshot-id'))
+        with self.assertRaisesRegex(CLIError, 'Invalid OS Disk Source Type'):
+            custom._get_source_os_disk(None, None, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -104,6 +104,29 @@ helps[
           --account-key my-account-key
 """
 
+helps[
+    "k8s-configuration flux rollout"
+] = """
+    type: command
+    short-summary: Create or replace a Flux v2 Kubernetes configuration on many clusters at once.
+    long-summary: |-
+        Clusters are validated and updated concurrently, then polled together until every cluster has finished
+        creating the configuration. A summary of the provisioning and compliance state of each cluster is returned.
+    examples:
+      - name: Roll a Flux v2 Kubernetes configuration out to every cluster tagged with env=prod
+        text: |-
+          az k8s-configuration flux rollout --cluster-tag env=prod \\
+          --name myconfig --scope cluster --namespace my-namespace \\
+          --kind git --url https://github.com/Azure/arc-k8s-demo \\
+          --branch main --kustomization name=my-kustomization --output table
+      - name: Roll a Flux v2 Kubernetes configuration out to a list of clusters without waiting
+        text: |-
+          az k8s-configuration flux rollout --name myconfig --no-wait \\
+          --cluster-ids /subscriptions/{subscription}/resourceGroups/{rg}/providers/Microsoft.Kubernetes/connectedClusters/cluster1 \\
+          /subscriptions/{subscription}/resourceGroups/{rg}/providers/Microsoft.ContainerService/managedClusters/cluster2 \\
+          --kind git --url https://github.com/Azure/arc-k8s-demo --branch main
+"""
+
 helps[
     "k8s-configuration flux update"
 ] = """
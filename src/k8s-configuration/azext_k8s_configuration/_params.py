@@ -235,6 +235,36 @@ def load_arguments(self, _):
             help="The client ID of the managed identity for authentication with Azure Blob",
         )
 
+    with self.argument_context("k8s-configuration flux rollout") as c:
+        c.argument(
+            "cluster_ids",
+            arg_group="Clusters",
+            options_list=["--cluster-ids"],
+            nargs="+",
+            help="Space-separated resource IDs of the clusters to roll the configuration out to",
+        )
+        c.argument(
+            "cluster_tag",
+            arg_group="Clusters",
+            help="Roll the configuration out to every cluster with this tag, in 'key[=value]' format",
+        )
+        c.argument(
+            "resource_group_name",
+            arg_group="Clusters",
+            options_list=["--resource-group", "-g"],
+            help="Only look for clusters matching --cluster-tag in this resource group",
+        )
+        c.argument(
+            "max_concurrency",
+            type=int,
+            help="Maximum number of clusters to validate and update at the same time. Default: {}".format(consts.FLUX_ROLLOUT_MAX_CONCURRENCY),
+        )
+        c.argument(
+            "rollout_timeout",
+            type=int,
+            help="Maximum time in seconds to wait for all clusters to finish creating the configuration. Default: {}".format(consts.FLUX_ROLLOUT_TIMEOUT),
+        )
+
     with self.argument_context("k8s-configuration flux update") as c:
         c.argument(
             "yes", options_list=["--yes", "-y"], help="Do not prompt for confirmation"
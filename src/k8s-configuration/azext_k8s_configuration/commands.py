@@ -13,6 +13,7 @@ from .format import (
     fluxconfig_deployed_object_list_table_format,
     fluxconfig_deployed_object_show_table_format,
     fluxconfig_list_table_format,
+    fluxconfig_rollout_table_format,
     fluxconfig_show_table_format,
     fluxconfig_kustomization_list_table_format,
     fluxconfig_kustomization_show_table_format,
@@ -39,6 +40,12 @@ def load_command_table(self, _):
     ) as g:
         g.custom_command("create", "create_config", supports_no_wait=True)
         g.custom_command("update", "update_config", supports_no_wait=True)
+        g.custom_command(
+            "rollout",
+            "rollout_config",
+            supports_no_wait=True,
+            table_transformer=fluxconfig_rollout_table_format,
+        )
         g.custom_command(
             "list", "list_configs", table_transformer=fluxconfig_list_table_format
         )
@@ -296,3 +296,14 @@ DF_RM_ENDPOINT = "https://api-dogfood.resources.windows-int.net/"
 
 FLUX_EXTENSION_RELEASETRAIN = "FLUX_EXTENSION_RELEASETRAIN"
 FLUX_EXTENSION_VERSION = "FLUX_EXTENSION_VERSION"
+
+FLUX_ROLLOUT_MAX_CONCURRENCY = 10
+FLUX_ROLLOUT_REQUESTS_PER_SECOND = 10
+FLUX_ROLLOUT_POLL_INTERVAL = 15
+FLUX_ROLLOUT_TIMEOUT = 30 * 60
+FLUX_ROLLOUT_TERMINAL_STATES = ("Succeeded", "Failed", "Canceled")
+FLUX_ROLLOUT_CLUSTER_TYPES = {
+    "microsoft.kubernetes/connectedclusters": CONNECTED_CLUSTER_TYPE,
+    "microsoft.containerservice/managedclusters": MANAGED_CLUSTER_TYPE,
+    "microsoft.hybridcontainerservice/provisionedclusters": PROVISIONED_CLUSTER_TYPE,
+}
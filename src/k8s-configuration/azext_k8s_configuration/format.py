@@ -50,6 +50,22 @@ def __get_fluxconfig_table_row(result):
     )
 
 
+def fluxconfig_rollout_table_format(results):
+    return [
+        OrderedDict(
+            [
+                ("clusterName", result["clusterName"]),
+                ("resourceGroup", result["resourceGroup"]),
+                ("clusterType", result["clusterType"]),
+                ("provisioningState", result["provisioningState"]),
+                ("complianceState", result["complianceState"]),
+                ("error", result["error"]),
+            ]
+        )
+        for result in results
+    ]
+
+
 def fluxconfig_kustomization_list_table_format(results):
     return [__get_fluxconfig_kustomization_table_row(k, v) for k, v in results.items()]
 
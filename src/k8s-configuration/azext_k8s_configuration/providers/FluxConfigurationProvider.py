@@ -6,9 +6,12 @@
 # pylint: disable=unused-argument
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from azure.cli.core.azclierror import (
     DeploymentError,
+    InvalidArgumentValueError,
     ResourceNotFoundError,
     ValidationError,
     UnrecognizedArgumentError,
@@ -19,6 +22,7 @@ from azure.cli.core.commands.client_factory import get_subscription_id
 
 from azure.core.exceptions import HttpResponseError
 from knack.log import get_logger
+from msrestazure.tools import is_valid_resource_id, parse_resource_id
 
 from ..confirm import user_confirmation_factory
 from .._client_factory import (
@@ -27,6 +31,7 @@ from .._client_factory import (
     k8s_configuration_sourcecontrol_client,
 )
 from ..utils import (
+    RateLimiter,
     get_cluster_rp_api_version,
     get_data_from_key_or_file,
     parse_dependencies,
@@ -172,8 +177,12 @@ def create_config(
     cluster_rp, _ = get_cluster_rp_api_version(cluster_type=cluster_type, cluster_rp=cluster_resource_provider)
     validate_cc_registration(cmd)
 
-    factory = source_kind_generator_factory(
+    flux_configuration = _build_flux_configuration(
         kind,
+        scope,
+        namespace,
+        suspend,
+        kustomization,
         url=url,
         bucket_name=bucket_name,
         timeout=timeout,
@@ -206,6 +215,33 @@ def create_config(
         mi_client_id=mi_client_id,
     )
 
+    _validate_source_control_config_not_installed(
+        cmd, resource_group_name, cluster_rp, cluster_type, cluster_name
+    )
+    _validate_extension_install(
+        cmd, resource_group_name, cluster_rp, cluster_type, cluster_name, no_wait
+    )
+
+    logger.warning(
+        "Creating the flux configuration '%s' in the cluster. This may take a few minutes...",
+        name,
+    )
+
+    return sdk_no_wait(
+        no_wait,
+        client.begin_create_or_update,
+        resource_group_name,
+        cluster_rp,
+        cluster_type,
+        cluster_name,
+        name,
+        flux_configuration,
+    )
+
+
+def _build_flux_configuration(kind, scope, namespace, suspend, kustomization, **kwargs):
+    factory = source_kind_generator_factory(kind, **kwargs)
+
     # This update func is a generated update function that modifies
     # the FluxConfiguration object with the appropriate source kind
     update_func = factory.generate_update_func()
@@ -219,7 +255,10 @@ def create_config(
 
     # Get the protected settings and validate the private key value
     protected_settings = get_protected_settings(
-        ssh_private_key, ssh_private_key_file, https_key, bucket_secret_key
+        kwargs.get("ssh_private_key"),
+        kwargs.get("ssh_private_key_file"),
+        kwargs.get("https_key"),
+        kwargs.get("bucket_secret_key"),
     )
     if protected_settings and consts.SSH_PRIVATE_KEY_KEY in protected_settings:
         validate_private_key(protected_settings["sshPrivateKey"])
@@ -231,30 +270,256 @@ def create_config(
         kustomizations=kustomization,
         configuration_protected_settings=protected_settings,
     )
-    flux_configuration = update_func(flux_configuration)
+    return update_func(flux_configuration)
 
-    _validate_source_control_config_not_installed(
-        cmd, resource_group_name, cluster_rp, cluster_type, cluster_name
-    )
-    _validate_extension_install(
-        cmd, resource_group_name, cluster_rp, cluster_type, cluster_name, no_wait
+
+def rollout_config(
+    cmd,
+    client,
+    name,
+    url=None,
+    cluster_ids=None,
+    cluster_tag=None,
+    resource_group_name=None,
+    bucket_name=None,
+    scope="cluster",
+    namespace="default",
+    kind=consts.GIT,
+    timeout=None,
+    sync_interval=None,
+    branch=None,
+    tag=None,
+    semver=None,
+    commit=None,
+    local_auth_ref=None,
+    ssh_private_key=None,
+    ssh_private_key_file=None,
+    https_user=None,
+    https_key=None,
+    https_ca_cert=None,
+    https_ca_cert_file=None,
+    known_hosts=None,
+    known_hosts_file=None,
+    bucket_access_key=None,
+    bucket_secret_key=None,
+    bucket_insecure=False,
+    suspend=False,
+    kustomization=None,
+    no_wait=False,
+    container_name=None,
+    sp_tenant_id=None,
+    sp_client_id=None,
+    sp_client_cert=None,
+    sp_client_cert_password=None,
+    sp_client_secret=None,
+    sp_client_cert_send_chain=False,
+    account_key=None,
+    sas_token=None,
+    mi_client_id=None,
+    max_concurrency=None,
+    rollout_timeout=None,
+):
+    """Create or replace a Flux v2 Kubernetes configuration on many clusters at once."""
+
+    clusters = _get_rollout_clusters(cmd, cluster_ids, cluster_tag, resource_group_name)
+    if not clusters:
+        raise ResourceNotFoundError("Error! No clusters were found to roll the flux configuration out to.")
+
+    validate_cc_registration(cmd)
+
+    # The configuration is the same on every cluster, so it's built and validated once
+    flux_configuration = _build_flux_configuration(
+        kind,
+        scope,
+        namespace,
+        suspend,
+        kustomization,
+        url=url,
+        bucket_name=bucket_name,
+        timeout=timeout,
+        sync_interval=sync_interval,
+        branch=branch,
+        tag=tag,
+        semver=semver,
+        commit=commit,
+        local_auth_ref=local_auth_ref,
+        ssh_private_key=ssh_private_key,
+        ssh_private_key_file=ssh_private_key_file,
+        https_user=https_user,
+        https_key=https_key,
+        https_ca_cert=https_ca_cert,
+        https_ca_cert_file=https_ca_cert_file,
+        known_hosts=known_hosts,
+        known_hosts_file=known_hosts_file,
+        bucket_access_key=bucket_access_key,
+        bucket_secret_key=bucket_secret_key,
+        bucket_insecure=bucket_insecure,
+        container_name=container_name,
+        account_key=account_key,
+        sas_token=sas_token,
+        sp_tenant_id=sp_tenant_id,
+        sp_client_id=sp_client_id,
+        sp_client_cert=sp_client_cert,
+        sp_client_cert_password=sp_client_cert_password,
+        sp_client_secret=sp_client_secret,
+        sp_client_cert_send_chain=sp_client_cert_send_chain,
+        mi_client_id=mi_client_id,
     )
 
+    source_control_client = k8s_configuration_sourcecontrol_client(cmd.cli_ctx)
+    extension_client = k8s_configuration_extension_client(cmd.cli_ctx)
+    rate_limiter = RateLimiter(consts.FLUX_ROLLOUT_REQUESTS_PER_SECOND)
+
+    def start(cluster):
+        resource_group, cluster_rp, cluster_type, cluster_name = cluster
+        rate_limiter.wait()
+        _validate_source_control_config_not_installed(
+            cmd, resource_group, cluster_rp, cluster_type, cluster_name, source_control_client
+        )
+        rate_limiter.wait()
+        # A missing flux extension has to be installed before the configuration can be created
+        _validate_extension_install(
+            cmd, resource_group, cluster_rp, cluster_type, cluster_name, False, extension_client
+        )
+        rate_limiter.wait()
+        # Creation isn't polled here, all clusters are tracked together once every request has been accepted
+        sdk_no_wait(
+            True,
+            client.begin_create_or_update,
+            resource_group,
+            cluster_rp,
+            cluster_type,
+            cluster_name,
+            name,
+            flux_configuration,
+        )
+
     logger.warning(
-        "Creating the flux configuration '%s' in the cluster. This may take a few minutes...",
+        "Rolling out the flux configuration '%s' to %d clusters. This may take a few minutes...",
         name,
+        len(clusters),
     )
+    results = {cluster: {"provisioningState": None, "complianceState": None, "error": None} for cluster in clusters}
+    max_workers = max_concurrency or consts.FLUX_ROLLOUT_MAX_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(clusters))) as executor:
+        futures = {cluster: executor.submit(start, cluster) for cluster in clusters}
+        for cluster, future in futures.items():
+            try:
+                future.result()
+                results[cluster]["provisioningState"] = consts.CREATING
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.debug("Couldn't start the rollout on cluster '%s'. Error: %s", cluster[3], ex)
+                results[cluster]["provisioningState"] = "Failed"
+                results[cluster]["error"] = str(getattr(ex, "message", None) or ex)
+
+    if not no_wait:
+        _wait_for_rollout(client, name, results, rate_limiter, max_workers,
+                          rollout_timeout or consts.FLUX_ROLLOUT_TIMEOUT)
+
+    summary = [
+        {
+            "clusterName": cluster_name,
+            "resourceGroup": resource_group,
+            "clusterType": cluster_type,
+            **results[(resource_group, cluster_rp, cluster_type, cluster_name)],
+        }
+        for resource_group, cluster_rp, cluster_type, cluster_name in clusters
+    ]
+    failed = [row for row in summary if row["provisioningState"] not in (consts.SUCCEEDED, consts.CREATING)]
+    if failed:
+        logger.warning(
+            "The flux configuration '%s' couldn't be rolled out to %d of %d clusters.", name, len(failed), len(summary)
+        )
+    return summary
 
-    return sdk_no_wait(
-        no_wait,
-        client.begin_create_or_update,
-        resource_group_name,
-        cluster_rp,
-        cluster_type,
-        cluster_name,
-        name,
-        flux_configuration,
-    )
+
+def _get_rollout_clusters(cmd, cluster_ids, cluster_tag, resource_group_name):
+    # Returns (resource_group, cluster_rp, cluster_type, cluster_name) for every cluster targeted by the rollout
+    if not cluster_ids and not cluster_tag:
+        raise RequiredArgumentMissingError(
+            "Error! Either --cluster-ids or --cluster-tag is required to select the clusters to roll out to."
+        )
+
+    subscription_id = get_subscription_id(cmd.cli_ctx)
+    resource_ids = list(cluster_ids or [])
+    if cluster_tag:
+        tag_name, _, tag_value = cluster_tag.partition("=")
+        resource_filter = "tagName eq '{}'".format(tag_name)
+        if tag_value:
+            resource_filter += " and tagValue eq '{}'".format(tag_value)
+        resources_client = cf_resources(cmd.cli_ctx, subscription_id)
+        if resource_group_name:
+            resources = resources_client.list_by_resource_group(resource_group_name, filter=resource_filter)
+        else:
+            resources = resources_client.list(filter=resource_filter)
+        # ARM can't filter on tags and types at the same time, so the cluster types are filtered here
+        resource_ids.extend(
+            resource.id for resource in resources if resource.type.lower() in consts.FLUX_ROLLOUT_CLUSTER_TYPES
+        )
+
+    clusters = []
+    for resource_id in resource_ids:
+        if not is_valid_resource_id(resource_id):
+            raise InvalidArgumentValueError("Error! '{}' is not a valid cluster resource ID.".format(resource_id))
+        parts = parse_resource_id(resource_id)
+        if parts["subscription"].lower() != subscription_id.lower():
+            raise InvalidArgumentValueError(
+                "Error! Cluster '{}' is not in the current subscription '{}'.".format(resource_id, subscription_id)
+            )
+        resource_type = "{}/{}".format(parts["namespace"], parts["type"]).lower()
+        if resource_type not in consts.FLUX_ROLLOUT_CLUSTER_TYPES:
+            raise InvalidArgumentValueError(
+                "Error! '{}' is not a connectedClusters, managedClusters or provisionedClusters resource.".format(
+                    resource_id
+                )
+            )
+        cluster_rp, _ = get_cluster_rp_api_version(parts["type"], parts["namespace"])
+        cluster = (parts["resource_group"], cluster_rp, parts["type"], parts["name"])
+        if cluster not in clusters:
+            clusters.append(cluster)
+    return clusters
+
+
+def _wait_for_rollout(client, name, results, rate_limiter, max_workers, timeout):
+    # Polls every cluster that is still creating in a single loop until all of them reach a terminal state
+    def refresh(cluster):
+        resource_group, cluster_rp, cluster_type, cluster_name = cluster
+        rate_limiter.wait()
+        try:
+            config = client.get(resource_group, cluster_rp, cluster_type, cluster_name, name)
+        except HttpResponseError as ex:
+            # The configuration can briefly be missing right after the create request was accepted
+            if ex.status_code == 404:
+                return
+            raise
+        results[cluster]["provisioningState"] = config.provisioning_state
+        results[cluster]["complianceState"] = config.compliance_state
+
+    deadline = time.monotonic() + timeout
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            pending = [
+                cluster for cluster, result in results.items()
+                if result["provisioningState"] not in consts.FLUX_ROLLOUT_TERMINAL_STATES
+            ]
+            if not pending:
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    "Timed out waiting for %d clusters to finish creating the flux configuration '%s'.",
+                    len(pending),
+                    name,
+                )
+                break
+            logger.warning("Waiting for %d of %d clusters...", len(pending), len(results))
+            time.sleep(consts.FLUX_ROLLOUT_POLL_INTERVAL)
+            for cluster, future in [(cluster, executor.submit(refresh, cluster)) for cluster in pending]:
+                try:
+                    future.result()
+                except Exception as ex:  # pylint: disable=broad-except
+                    logger.debug("Couldn't get the status on cluster '%s'. Error: %s", cluster[3], ex)
+                    results[cluster]["provisioningState"] = "Failed"
+                    results[cluster]["error"] = str(getattr(ex, "message", None) or ex)
 
 
 def update_config(
@@ -707,10 +972,11 @@ def delete_config(
 
 
 def _validate_source_control_config_not_installed(
-    cmd, resource_group_name, cluster_rp, cluster_type, cluster_name
+    cmd, resource_group_name, cluster_rp, cluster_type, cluster_name, source_control_client=None
 ):
     # Validate if we are able to install the flux configuration
-    source_control_client = k8s_configuration_sourcecontrol_client(cmd.cli_ctx)
+    if source_control_client is None:
+        source_control_client = k8s_configuration_sourcecontrol_client(cmd.cli_ctx)
     configs = source_control_client.list(
         resource_group_name, cluster_rp, cluster_type, cluster_name
     )
@@ -722,10 +988,11 @@ def _validate_source_control_config_not_installed(
 
 
 def _validate_extension_install(
-    cmd, resource_group_name, cluster_rp, cluster_type, cluster_name, no_wait
+    cmd, resource_group_name, cluster_rp, cluster_type, cluster_name, no_wait, extension_client=None
 ):
     # Validate if the extension is installed, if not, install it
-    extension_client = k8s_configuration_extension_client(cmd.cli_ctx)
+    if extension_client is None:
+        extension_client = k8s_configuration_extension_client(cmd.cli_ctx)
     extensions = extension_client.list(
         resource_group_name, cluster_rp, cluster_type, cluster_name
     )
@@ -0,0 +1,74 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import DeploymentError, InvalidArgumentValueError, RequiredArgumentMissingError
+from azext_k8s_configuration import consts
+from azext_k8s_configuration.providers import FluxConfigurationProvider as provider
+from azext_k8s_configuration.vendored_sdks.v2022_07_01.models import FluxConfiguration
+
+SUBSCRIPTION = "00000000-0000-0000-0000-000000000000"
+CONNECTED_CLUSTER = "/subscriptions/{}/resourceGroups/rg1/providers/Microsoft.Kubernetes/connectedClusters/c1".format(SUBSCRIPTION)
+MANAGED_CLUSTER = "/subscriptions/{}/resourceGroups/rg2/providers/Microsoft.ContainerService/managedClusters/c2".format(SUBSCRIPTION)
+
+
+@mock.patch.object(provider, "get_subscription_id", return_value=SUBSCRIPTION)
+class TestFluxRollout(unittest.TestCase):
+    def setUp(self):
+        self.cmd = mock.Mock()
+
+    def test_get_rollout_clusters(self, _):
+        resources = [
+            mock.Mock(id=MANAGED_CLUSTER, type="Microsoft.ContainerService/managedClusters"),
+            mock.Mock(id="/subscriptions/{}/resourceGroups/rg2/providers/Microsoft.Compute/virtualMachines/vm".format(SUBSCRIPTION),
+                      type="Microsoft.Compute/virtualMachines"),
+        ]
+        with mock.patch.object(provider, "cf_resources") as cf_resources:
+            cf_resources.return_value.list.return_value = resources
+            clusters = provider._get_rollout_clusters(self.cmd, [CONNECTED_CLUSTER, MANAGED_CLUSTER], "env=prod", None)
+        cf_resources.return_value.list.assert_called_once_with(filter="tagName eq 'env' and tagValue eq 'prod'")
+        self.assertEqual(clusters, [
+            ("rg1", consts.CONNECTED_CLUSTER_RP, "connectedClusters", "c1"),
+            ("rg2", consts.MANAGED_CLUSTER_RP, "managedClusters", "c2"),
+        ])
+
+    def test_get_rollout_clusters_invalid(self, _):
+        with self.assertRaises(RequiredArgumentMissingError):
+            provider._get_rollout_clusters(self.cmd, None, None, None)
+        with self.assertRaises(InvalidArgumentValueError):
+            provider._get_rollout_clusters(self.cmd, ["c1"], None, None)
+        with self.assertRaises(InvalidArgumentValueError):
+            provider._get_rollout_clusters(self.cmd, [CONNECTED_CLUSTER.replace(SUBSCRIPTION, "other")], None, None)
+
+    @mock.patch.object(provider.time, "sleep")
+    @mock.patch.object(provider, "validate_cc_registration")
+    @mock.patch.object(provider, "k8s_configuration_extension_client")
+    @mock.patch.object(provider, "k8s_configuration_sourcecontrol_client")
+    @mock.patch.object(provider, "_validate_extension_install")
+    @mock.patch.object(provider, "_validate_source_control_config_not_installed")
+    def test_rollout_config(self, validate_scc, validate_extension, *_):
+        validate_scc.side_effect = [None, DeploymentError("scc installed")]
+        creating, succeeded = FluxConfiguration(), FluxConfiguration()
+        creating.provisioning_state = consts.CREATING
+        succeeded.provisioning_state = consts.SUCCEEDED
+        succeeded.compliance_state = "Compliant"
+        client = mock.Mock()
+        client.get.side_effect = [creating, succeeded]
+
+        results = provider.rollout_config(self.cmd, client, "config", url="https://github.com/Azure/arc-k8s-demo",
+                                          branch="main", cluster_ids=[CONNECTED_CLUSTER, MANAGED_CLUSTER],
+                                          max_concurrency=1)
+
+        self.assertEqual(validate_extension.call_count, 1)
+        client.begin_create_or_update.assert_called_once()
+        self.assertIs(client.begin_create_or_update.call_args[1]["polling"], False)
+        self.assertEqual(client.get.call_count, 2)
+        self.assertEqual([(r["clusterName"], r["provisioningState"], r["complianceState"]) for r in results], [
+            ("c1", consts.SUCCEEDED, "Compliant"),
+            ("c2", "Failed", None),
+        ])
+        self.assertEqual(results[1]["error"], "scc installed")
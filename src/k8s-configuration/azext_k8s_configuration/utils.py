@@ -6,6 +6,8 @@
 import base64
 import json
 import re
+import threading
+import time
 from datetime import timedelta
 from typing import Tuple
 from azure.cli.core.azclierror import (
@@ -154,3 +156,20 @@ def has_prune_enabled(config):
             if kustomization.prune:
                 return True
     return False
+
+
+class RateLimiter:
+    """Spaces out calls made from several threads so that at most `rate` of them start every second."""
+
+    def __init__(self, rate):
+        self._interval = 1.0 / rate if rate else 0
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self._interval
+        if delay > 0:
+            time.sleep(delay)
@@ -62,11 +62,16 @@ helps['quantum job list'] = """
 helps['quantum job output'] = """
     type: command
     short-summary: Get the results of running a Q# job.
+    long-summary: When several job ids are given, the command waits for all of them and returns the results of each job, which are downloaded as soon as the job has succeeded.
     examples:
       - name: Print the results of a successful Azure Quantum job.
         text: |-
             az quantum job output -g MyResourceGroup -w MyWorkspace -l MyLocation \\
                 -j yyyyyyyy-yyyy-yyyy-yyyy-yyyyyyyyyyyy -o table
+      - name: Wait for a list of jobs and write all of their results to a file.
+        text: |-
+            az quantum job output -g MyResourceGroup -w MyWorkspace -l MyLocation \\
+                -j @job_ids.txt --output-file results.json
 """
 
 helps['quantum job show'] = """
@@ -114,6 +119,10 @@ helps['quantum job wait'] = """
         text: |-
             az quantum job wait -g MyResourceGroup -w MyWorkspace -l MyLocation \\
                 -j yyyyyyyy-yyyy-yyyy-yyyy-yyyyyyyyyyyy --max-poll-wait-secs 60 -o table
+      - name: Wait for completion of several jobs.
+        text: |-
+            az quantum job wait -g MyResourceGroup -w MyWorkspace -l MyLocation \\
+                -j yyyyyyyy-yyyy-yyyy-yyyy-yyyyyyyyyyyy zzzzzzzz-zzzz-zzzz-zzzz-zzzzzzzzzzzz -o table
 """
 
 helps['quantum job cancel'] = """
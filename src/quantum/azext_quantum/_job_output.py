@@ -0,0 +1,166 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_DELIMITER = re.compile(r'[ \t\n\r,\]}]')
+
+
+class JobOutputCache:
+    """
+    Least recently used cache of downloaded job results, bounded by the total size of the cached files.
+    """
+
+    def __init__(self, folder, max_size):
+        self.folder = folder
+        self.max_size = max_size
+        self._in_use = set()
+        self._lock = threading.Lock()
+
+    def _path(self, job_id):
+        return os.path.join(self.folder, re.sub(r'[^\w.-]', '_', job_id))
+
+    def contains(self, job_id):
+        return os.path.exists(self._path(job_id))
+
+    def get(self, job_id, download):
+        """
+        Return the path of the cached results of the job, calling download(path) to fetch them if not cached.
+        """
+        path = self._path(job_id)
+        with self._lock:
+            # Files returned by this cache aren't evicted until the command completes
+            self._in_use.add(path)
+
+        if os.path.exists(path):
+            logger.debug("Using existing blob from %s", path)
+            os.utime(path)  # Mark it as recently used
+            return path
+
+        logger.debug("Downloading job results blob into %s", path)
+        os.makedirs(self.folder, exist_ok=True)
+        # Download next to the cached path and move it in place once complete, so an interrupted download isn't reused.
+        fd, download_path = tempfile.mkstemp(dir=self.folder, suffix='.download')
+        os.close(fd)
+        try:
+            download(download_path)
+            os.replace(download_path, path)
+        finally:
+            if os.path.exists(download_path):
+                os.remove(download_path)
+
+        self._evict()
+        return path
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.folder):
+                if name.endswith('.download'):
+                    continue
+                path = os.path.join(self.folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                if path in self._in_use:
+                    continue
+                try:
+                    os.remove(path)
+                    logger.debug("Evicted %s from the job results cache", path)
+                    total_size -= size
+                except OSError:
+                    pass
+
+
+def read_json_array_item(json_file, index):
+    """
+    Read the element at index of the JSON array in json_file. The elements before it are decoded and dropped one at a
+    time, so the document is never loaded as a whole. Raises IndexError with the number of elements if the array has
+    no such element, and ValueError if the document isn't an array.
+    """
+    reader = _JsonStreamReader(json_file)
+    if reader.next_char() != '[':
+        raise ValueError("The JSON document isn't an array")
+    reader.pos += 1
+    if reader.next_char() == ']':
+        raise IndexError(0)
+
+    count = 0
+    while True:
+        value = reader.decode()
+        if count == index:
+            return value
+        count += 1
+        char = reader.next_char()
+        reader.pos += 1
+        if char == ']':
+            raise IndexError(count)
+        if char != ',':
+            raise ValueError(f"Expecting ',' delimiter after element {count - 1} of the JSON array")
+
+
+class _JsonStreamReader:
+    """
+    Decodes JSON values one after the other from a file, keeping only the part of the file being decoded in memory.
+    """
+
+    def __init__(self, json_file):
+        self._file = json_file
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._eof = False
+        self.pos = 0
+
+    def _read(self):
+        # Drop the decoded part of the buffer and append the next chunk. The chunks grow with the value being decoded,
+        # so that decoding it again after every chunk stays linear.
+        chunk = self._file.read(max(CHUNK_SIZE, len(self._buffer) - self.pos))
+        self._buffer = self._buffer[self.pos:] + chunk
+        self.pos = 0
+        self._eof = not chunk
+        return not self._eof
+
+    def next_char(self):
+        # Skip whitespace and return the next character, or '' at the end of the file
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self._buffer, self.pos).end()
+            if self.pos < len(self._buffer):
+                return self._buffer[self.pos]
+            if not self._read():
+                return ''
+
+    def decode(self):
+        self.next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self.pos)
+            except ValueError:
+                # The value may continue in the next chunk
+                if self._read():
+                    continue
+                raise
+            if isinstance(value, (int, float)) and not self._eof and not _JSON_DELIMITER.match(self._buffer, end):
+                # A number at the end of the buffer may continue in the next chunk
+                self._read()
+                continue
+            self.pos = end
+            return value
@@ -39,6 +39,7 @@ def load_arguments(self, _):
     project_type = CLIArgumentType(help='The location of the Q# project to submit. Defaults to current folder.')
     job_name_type = CLIArgumentType(help='A friendly name to give to this run of the program.')
     job_id_type = CLIArgumentType(options_list=['--job-id', '-j'], help='Job unique identifier in GUID format.')
+    job_ids_type = CLIArgumentType(options_list=['--job-id', '-j'], nargs='+', help='Job unique identifiers in GUID format. Separate multiple ids with spaces, or pass `@{file}` with one id per line.')
     job_params_type = CLIArgumentType(options_list=['--job-params'], help='Job parameters passed to the target as a list of key=value pairs, json string, or `@{file}` with json content.', action=JobParamsAction, nargs='+')
     target_capability_type = CLIArgumentType(options_list=['--target-capability'], help='Target-capability parameter passed to the compiler.')
     shots_type = CLIArgumentType(help='The number of times to run the Q# program on the given target.')
@@ -57,6 +58,7 @@ def load_arguments(self, _):
     job_output_format_type = CLIArgumentType(help='The expected job output format. Ignored on Q# jobs.')
     entry_point_type = CLIArgumentType(help='The entry point for the QIR program or circuit. Required for QIR. Ignored on Q# jobs.')
     item_type = CLIArgumentType(help='The item index in a batching job.')
+    output_file_type = CLIArgumentType(help='If specified, the results of the jobs are written to this JSON file instead of being displayed.')
     skip_autoadd_type = CLIArgumentType(help='If specified, the plans that offer free credits will not automatically be added.')
 
     with self.argument_context('quantum workspace') as c:
@@ -88,6 +90,13 @@ def load_arguments(self, _):
         c.argument('max_poll_wait_secs', max_poll_wait_secs_type)
         c.argument('item', item_type)
 
+    with self.argument_context('quantum job wait') as c:
+        c.argument('job_id', job_ids_type)
+
+    with self.argument_context('quantum job output') as c:
+        c.argument('job_id', job_ids_type)
+        c.argument('output_file', output_file_type)
+
     with self.argument_context('quantum job submit') as c:
         c.argument('job_params', job_params_type)
         c.argument('target_capability', target_capability_type)
@@ -5,6 +5,7 @@
 
 # pylint: disable=line-too-long
 
+import json
 import logging
 
 from collections import OrderedDict
@@ -31,6 +32,9 @@ def transform_targets(providers):
 
 
 def transform_job(result):
+    if isinstance(result, list):
+        return [transform_job(job) for job in result]
+
     transformed_result = OrderedDict([
         ('Name', result['name']),
         ('Id', result['id']),
@@ -151,6 +155,15 @@ def transform_output(results):
 
         return table
 
+    elif isinstance(results, list) and len(results) > 0 and 'result' in results[0] and 'error' in results[0]:
+        # Results of several jobs
+        return [OrderedDict([
+            ('Job ID', result['id']),
+            ('Name', result['name']),
+            ('Status', result['status']),
+            ('Result', json.dumps(result['result']) if result['error'] is None else result['error']['message'])
+        ]) for result in results]
+
     elif 'errorData' in results:
         notFound = 'Not found'
         errorData = results['errorData']
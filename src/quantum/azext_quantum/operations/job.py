@@ -10,7 +10,9 @@ import io
 import json
 import logging
 import os
+import re
 import uuid
+from collections import OrderedDict
 import knack.log
 
 from azure.cli.command_modules.storage.operations.account import show_storage_account_connection_string
@@ -18,6 +20,7 @@ from azure.cli.core.azclierror import (FileOperationError, AzureInternalError,
                                        InvalidArgumentValueError, AzureResponseError,
                                        RequiredArgumentMissingError)
 
+from .._job_output import JobOutputCache, read_json_array_item
 from .._storage import create_container, upload_blob
 
 from .._client_factory import cf_jobs, _get_data_credentials
@@ -26,6 +29,14 @@ from .target import TargetInfo, get_provider
 
 
 MINIMUM_MAX_POLL_WAIT_SECS = 1
+# When at least this many jobs are waited for, their status is polled by listing the jobs of the workspace instead of
+# getting each job.
+JOB_LIST_POLL_THRESHOLD = 20
+OUTPUT_DOWNLOAD_CONCURRENCY = 8
+# Downloaded job results are cached in the CLI config folder, up to this total size. Change it with
+# `az config set quantum.output_cache_size_mb=<size>`.
+OUTPUT_CACHE_FOLDER_NAME = 'job_outputs'
+DEFAULT_OUTPUT_CACHE_SIZE_MB = 1024
 DEFAULT_SHOTS = 500
 QIO_DEFAULT_TIMEOUT = 100
 
@@ -517,57 +528,58 @@ def _parse_blob_url(url):
     }
 
 
-def _validate_item(provided_value, num_items):
+def _validate_item(provided_value, num_items=None):
     valid_item = 0
     error_message = f"--item parameter is not valid: {provided_value}"
-    error_recommendation = f"Must be a non-negative number less than {num_items}"
+    error_recommendation = "Must be a non-negative number" + ("" if num_items is None else f" less than {num_items}")
 
     try:
         valid_item = int(provided_value)
     except ValueError as e:
         raise InvalidArgumentValueError(error_message, error_recommendation) from e
 
-    if valid_item >= num_items:
+    if valid_item < 0 or (num_items is not None and valid_item >= num_items):
         raise InvalidArgumentValueError(error_message, error_recommendation)
 
     return valid_item
 
 
-def output(cmd, job_id, resource_group_name, workspace_name, location, item=None):
-    """
-    Get the results of running a Q# job.
-    """
-    import tempfile
+def _get_job_ids(job_id):
+    # --job-id takes several job ids separated by spaces, commas or new lines, e.g. loaded from a file with @file.
+    import builtins  # list has been overriden as a function above
+    values = [job_id] if isinstance(job_id, str) else job_id
+    job_ids = [value_id for value in values for value_id in re.split(r'[\s,]+', value) if value_id]
+    if not job_ids:
+        raise RequiredArgumentMissingError("The following argument is required: --job-id")
+    return builtins.list(OrderedDict.fromkeys(job_ids))
+
+
+def _download_job_output(cmd, job, path):
     from azure.cli.command_modules.storage._client_factory import blob_data_service_factory
 
-    path = os.path.join(tempfile.gettempdir(), job_id)
-    info = WorkspaceInfo(cmd, resource_group_name, workspace_name, location)
-    client = cf_jobs(cmd.cli_ctx, info.subscription, info.resource_group, info.name, info.location)
-    job = client.get(job_id)
+    args = _parse_blob_url(job.output_data_uri)
+    blob_service = blob_data_service_factory(cmd.cli_ctx, args)
+    blob_service.get_blob_to_path(args['container'], args['blob'], path)
 
-    if os.path.exists(path):
-        logger.debug("Using existing blob from %s", path)
-    else:
-        logger.debug("Downloading job results blob into %s", path)
 
-        if job.status != "Succeeded":
-            return job  # If "-o table" is specified, this allows transform_output() in commands.py
-            #             to format the output, so the error info is shown. If "-o json" or no "-o"
-            #             parameter is specified, then the full JSON job output is displayed, being
-            #             consistent with other commands.
+def _get_output_cache(cmd):
+    folder = os.path.join(cmd.cli_ctx.config.config_dir, 'quantum', OUTPUT_CACHE_FOLDER_NAME)
+    max_size_mb = cmd.cli_ctx.config.getint('quantum', 'output_cache_size_mb', fallback=DEFAULT_OUTPUT_CACHE_SIZE_MB)
+    return JobOutputCache(folder, max_size_mb * 1024 * 1024)
 
-        args = _parse_blob_url(job.output_data_uri)
-        blob_service = blob_data_service_factory(cmd.cli_ctx, args)
-        blob_service.get_blob_to_path(args['container'], args['blob'], path)
 
+def _read_job_output(job, path, item=None, echo=print):
+    """
+    Parse the results blob of a job. For simulator jobs, the output of the program is passed to echo.
+    """
     with open(path) as json_file:
-        lines = [line.strip() for line in json_file.readlines()]
-
         # Receiving an empty response is valid.
-        if len(lines) == 0:
+        if not json_file.read(1):
             return
+        json_file.seek(0)
 
         if job.target.startswith("microsoft.simulator") and job.target != "microsoft.simulator.resources-estimator":
+            lines = [line.strip() for line in json_file.readlines()]
             result_start_line = len(lines) - 1
             is_result_string = lines[-1].endswith('"')
             if is_result_string:
@@ -578,24 +590,97 @@ def output(cmd, job_id, resource_group_name, workspace_name, location, item=None
 
             # Print the job output and then the result of the operation as a histogram.
             # If the result is a string, trim the quotation marks.
-            print('\n'.join(lines[:result_start_line]))
             raw_result = ' '.join(lines[result_start_line:])
             result = raw_result[1:-1] if is_result_string else raw_result
-            print('_' * len(result) + '\n')
+            if echo:
+                echo('\n'.join(lines[:result_start_line]))
+                echo('_' * len(result) + '\n')
 
             json_string = '{ "histogram" : { "' + result + '" : 1 } }'
-            data = json.loads(json_string)
-        else:
-            json_file.seek(0)  # Reset the file pointer before loading
-            data = json.load(json_file)
+            return json.loads(json_string)
+
+        # Consider item if it's a batch job, otherwise ignore. Only the requested item of the batch is loaded.
+        if item:
+            index = _validate_item(item)
+            try:
+                return read_json_array_item(json_file, index)
+            except IndexError as e:
+                _validate_item(item, e.args[0])
+            except ValueError:
+                json_file.seek(0)  # Not a batch job, reset the file pointer before loading
+
+        return json.load(json_file)
+
+
+def output(cmd, job_id, resource_group_name, workspace_name, location, item=None, output_file=None,
+           max_poll_wait_secs=5):
+    """
+    Get the results of running a Q# job.
+    """
+    job_ids = _get_job_ids(job_id)
+    info = WorkspaceInfo(cmd, resource_group_name, workspace_name, location)
+    client = cf_jobs(cmd.cli_ctx, info.subscription, info.resource_group, info.name, info.location)
+    if len(job_ids) > 1 or output_file:
+        return _output_jobs(cmd, client, job_ids, item, output_file, max_poll_wait_secs)
+
+    job_id = job_ids[0]
+    cache = _get_output_cache(cmd)
+    job = client.get(job_id)
+
+    if not cache.contains(job_id):
+        if job.status != "Succeeded":
+            return job  # If "-o table" is specified, this allows transform_output() in commands.py
+            #             to format the output, so the error info is shown. If "-o json" or no "-o"
+            #             parameter is specified, then the full JSON job output is displayed, being
+            #             consistent with other commands.
+
+    path = cache.get(job_id, lambda path: _download_job_output(cmd, job, path))
+    return _read_job_output(job, path, item)
+
+
+def _output_jobs(cmd, client, job_ids, item, output_file, max_poll_wait_secs):
+    """
+    Wait for the jobs and collect their results, downloading the results of each job as soon as it has succeeded.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = _get_output_cache(cmd)
+
+    def job_result(job):
+        path = cache.get(job.id, lambda path: _download_job_output(cmd, job, path))
+        return _read_job_output(job, path, item, echo=None)
 
-        # Consider item if it's a batch job, otherwise ignore
-        import builtins  # list has been overriden as a function above
-        if item and isinstance(data, builtins.list):
-            item = _validate_item(item, len(data))
-            return data[item]
+    downloads = {}
 
-        return data
+    def on_completed(job_id, job):
+        if job.status == "Succeeded":
+            downloads[job_id] = executor.submit(job_result, job)
+
+    with ThreadPoolExecutor(max_workers=OUTPUT_DOWNLOAD_CONCURRENCY) as executor:
+        jobs = _wait_for_jobs(client, job_ids, max_poll_wait_secs, on_completed)
+
+    results = []
+    for job_id, job in zip(job_ids, jobs):
+        result = OrderedDict([('id', job_id), ('name', job.name), ('status', job.status), ('target', job.target),
+                              ('result', None), ('error', None)])
+        if job_id in downloads:
+            try:
+                result['result'] = downloads[job_id].result()
+            except Exception as e:  # pylint: disable=broad-except
+                result['error'] = {'code': 'OutputDownloadFailed', 'message': str(e)}
+        elif job.error_data is not None:
+            result['error'] = {'code': job.error_data.code, 'message': job.error_data.message}
+        results.append(result)
+
+    failed = len([result for result in results if result['error']])
+    if failed:
+        knack_logger.warning("%d of %d jobs have no results.", failed, len(results))
+    if not output_file:
+        return results
+
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    knack_logger.warning("Results of %d jobs written to %s", len(results), output_file)
 
 
 def _validate_max_poll_wait_secs(max_poll_wait_secs):
@@ -614,33 +699,69 @@ def _validate_max_poll_wait_secs(max_poll_wait_secs):
     return valid_max_poll_wait_secs
 
 
-def wait(cmd, job_id, resource_group_name, workspace_name, location, max_poll_wait_secs=5):
+def _get_jobs(client, job_ids):
     """
-    Place the CLI in a waiting state until the job finishes running.
+    Get the current state of the jobs, by listing the jobs of the workspace when there are many of them.
+    """
+    jobs = {}
+    if len(job_ids) >= JOB_LIST_POLL_THRESHOLD:
+        requested = {job_id.lower(): job_id for job_id in job_ids}
+        for job in client.list():
+            if job.id.lower() in requested:
+                jobs[requested[job.id.lower()]] = job
+    for job_id in job_ids:
+        if job_id not in jobs:
+            jobs[job_id] = client.get(job_id)
+    return jobs
+
+
+def _wait_for_jobs(client, job_ids, max_poll_wait_secs=5, on_completed=None):
+    """
+    Poll the jobs in a single loop until all of them have completed and return them in the order of job_ids.
+    on_completed(job_id, job) is called as soon as each job completes.
     """
     import time
 
-    info = WorkspaceInfo(cmd, resource_group_name, workspace_name, location)
-    client = cf_jobs(cmd.cli_ctx, info.subscription, info.resource_group, info.name, info.location)
-
-    # TODO: LROPoller...
     wait_indicators_used = False
     poll_wait = 0.2
     max_poll_wait_secs = _validate_max_poll_wait_secs(max_poll_wait_secs)
-    job = client.get(job_id)
+    pending = job_ids
+    completed = {}
+
+    while True:
+        jobs = _get_jobs(client, pending)
+        for job_id, job in jobs.items():
+            if _has_completed(job):
+                completed[job_id] = job
+                if on_completed:
+                    on_completed(job_id, job)
+        pending = [job_id for job_id in pending if job_id not in completed]
+        if not pending:
+            break
 
-    while not _has_completed(job):
         print('.', end='', flush=True)
         wait_indicators_used = True
         time.sleep(poll_wait)
-        job = client.get(job_id)
         poll_wait = max_poll_wait_secs if poll_wait >= max_poll_wait_secs else poll_wait * 1.5
 
     if wait_indicators_used:
         # Insert a new line if we had to display wait indicators.
         print()
 
-    return job
+    return [completed[job_id] for job_id in job_ids]
+
+
+def wait(cmd, job_id, resource_group_name, workspace_name, location, max_poll_wait_secs=5):
+    """
+    Place the CLI in a waiting state until the job finishes running.
+    """
+    job_ids = _get_job_ids(job_id)
+    info = WorkspaceInfo(cmd, resource_group_name, workspace_name, location)
+    client = cf_jobs(cmd.cli_ctx, info.subscription, info.resource_group, info.name, info.location)
+
+    # TODO: LROPoller...
+    jobs = _wait_for_jobs(client, job_ids, max_poll_wait_secs)
+    return jobs if len(jobs) > 1 else jobs[0]
 
 
 def job_show(cmd, job_id, resource_group_name, workspace_name, location):
@@ -3,10 +3,13 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import io
 import json
 import os
 import pytest
+import tempfile
 import unittest
+from unittest import mock
 
 from azure.cli.testsdk.scenario_tests import AllowLargeResponse, live_only
 from azure.cli.testsdk import ScenarioTest
@@ -14,10 +17,11 @@ from azure.cli.core.azclierror import InvalidArgumentValueError, AzureInternalEr
 
 from .utils import get_test_subscription_id, get_test_resource_group, get_test_workspace, get_test_workspace_location, issue_cmd_with_param_missing, get_test_workspace_storage, get_test_workspace_random_name
 from ..._client_factory import _get_data_credentials
+from ..._job_output import JobOutputCache, read_json_array_item
 from ...commands import transform_output
 from ...operations.workspace import WorkspaceInfo, DEPLOYMENT_NAME_PREFIX
 from ...operations.target import TargetInfo
-from ...operations.job import _generate_submit_args, _parse_blob_url, _validate_max_poll_wait_secs, build, _convert_numeric_params
+from ...operations.job import _generate_submit_args, _parse_blob_url, _validate_max_poll_wait_secs, build, _convert_numeric_params, _get_job_ids, _wait_for_jobs, _read_job_output, JOB_LIST_POLL_THRESHOLD
 
 TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
 
@@ -259,6 +263,95 @@ class QuantumJobsScenarioTest(ScenarioTest):
         _convert_numeric_params(test_job_params)
         assert test_job_params == {"string1": "string_value1", "metadata": {"meta1": "meta_value1", "meta2": "2"}, "integer1": 1}
 
+    def test_get_job_ids(self):
+        assert _get_job_ids("job1") == ["job1"]
+        assert _get_job_ids(["job1", "job2,job3", "job1\njob4\n"]) == ["job1", "job2", "job3", "job4"]
+
+    @mock.patch("time.sleep")
+    def test_wait_for_jobs(self, mock_sleep):
+        def job(job_id, status):
+            return mock.Mock(id=job_id, status=status)
+
+        statuses = {"job1": ["Executing", "Succeeded"], "job2": ["Failed"]}
+        client = mock.Mock()
+        client.get.side_effect = lambda job_id: job(job_id, statuses[job_id].pop(0))
+        completed = []
+
+        jobs = _wait_for_jobs(client, ["job1", "job2"], on_completed=lambda job_id, job: completed.append(job_id))
+        assert [j.status for j in jobs] == ["Succeeded", "Failed"]
+        assert completed == ["job2", "job1"]
+        assert client.get.call_count == 3
+        client.list.assert_not_called()
+
+        # Many jobs are polled by listing the jobs of the workspace, with a get for the ones that aren't listed
+        job_ids = [f"job{i}" for i in range(JOB_LIST_POLL_THRESHOLD)]
+        client = mock.Mock()
+        client.list.return_value = [job(job_id.upper(), "Succeeded") for job_id in job_ids[1:]] + [job("other", "Executing")]
+        client.get.return_value = job(job_ids[0], "Cancelled")
+        jobs = _wait_for_jobs(client, job_ids)
+        assert [j.status for j in jobs] == ["Cancelled"] + ["Succeeded"] * (len(job_ids) - 1)
+        client.get.assert_called_once_with(job_ids[0])
+
+    def test_read_json_array_item(self):
+        batch = [{"reportData": {"groups": []}, "value": i, "text": "a, \\\"b\\\" ]"} for i in range(5)] + [12.5]
+        document = json.dumps(batch, indent=2)
+        for index, item in enumerate(batch):
+            assert read_json_array_item(io.StringIO(document), index) == item
+
+        with pytest.raises(IndexError) as e:
+            read_json_array_item(io.StringIO(document), 6)
+        assert e.value.args == (6,)
+        with pytest.raises(IndexError) as e:
+            read_json_array_item(io.StringIO(" [ ] "), 0)
+        assert e.value.args == (0,)
+        with pytest.raises(ValueError):
+            read_json_array_item(io.StringIO('{"histogram": {}}'), 0)
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "output")
+            with open(path, "w") as f:
+                f.write(document)
+            job = mock.Mock(target="microsoft.estimator")
+            assert _read_job_output(job, path, item="2") == batch[2]
+            with pytest.raises(InvalidArgumentValueError) as e:
+                _read_job_output(job, path, item="6")
+            assert e.value.recommendations == ["Must be a non-negative number less than 6"]
+            with pytest.raises(InvalidArgumentValueError):
+                _read_job_output(job, path, item="-1")
+
+            with open(path, "w") as f:
+                f.write('{"histogram": {"0": 1}}')
+            assert _read_job_output(job, path, item="2") == {"histogram": {"0": 1}}
+
+    def test_job_output_cache(self):
+        def download(content):
+            def write(path):
+                with open(path, "w") as f:
+                    f.write(content)
+            return write
+
+        with tempfile.TemporaryDirectory() as folder:
+            cache = JobOutputCache(folder, max_size=10)
+            path1 = cache.get("job1", download("12345"))
+            path2 = cache.get("job2", download("12345"))
+            os.utime(path1, (0, 0))
+            os.utime(path2, (1, 1))
+            assert cache.contains("job1") and cache.get("job1", None) == path1
+
+            # The files used by this cache are kept, the least recently used of the others are evicted
+            path3 = cache.get("job3", download("12345"))
+            assert sorted(os.listdir(folder)) == ["job1", "job2", "job3"]
+            os.utime(path1, (5, 5))
+            os.utime(path3, (2, 2))
+            JobOutputCache(folder, max_size=10).get("job4", download("12345"))
+            assert sorted(os.listdir(folder)) == ["job1", "job4"]
+
+            def fail(path):
+                raise OSError("download failed")
+            with pytest.raises(OSError):
+                cache.get("job5", fail)
+            assert sorted(os.listdir(folder)) == ["job1", "job4"]
+
     @live_only()
     def test_submit(self):
         test_location = get_test_workspace_location()
@@ -11,39 +11,58 @@ from azure.cli.core.azclierror import InvalidArgumentValueError
 class ScheduleQueryConditionAction(argparse._AppendAction):
 
     def __call__(self, parser, namespace, values, option_string=None):
-        # antlr4 is not available everywhere, restrict the import scope so that commands
-        # that do not need it don't fail when it is absent
-        import antlr4
-
-        from azext_scheduled_query.grammar.scheduled_query import (
-            ScheduleQueryConditionLexer, ScheduleQueryConditionParser, ScheduleQueryConditionValidator)
-
-        usage = 'usage error: --condition {avg,min,max,total,count} ["METRIC COLUMN" from]\n' \
-                '                         "QUERY_PLACEHOLDER" {=,!=,>,>=,<,<=} THRESHOLD\n' \
-                '                         [resource id RESOURCEID]\n' \
-                '                         [where DIMENSION {includes,excludes} VALUE [or VALUE ...]\n' \
-                '                         [and   DIMENSION {includes,excludes} VALUE [or VALUE ...] ...]]\n' \
-                '                         [at least MinTimeToFail violations out of EvaluationPeriod aggregated points]'
-        string_val = ' '.join(values)
-
-        lexer = ScheduleQueryConditionLexer(antlr4.InputStream(string_val))
-        stream = antlr4.CommonTokenStream(lexer)
-        parser = ScheduleQueryConditionParser(stream)
-        tree = parser.expression()
-
-        try:
-            validator = ScheduleQueryConditionValidator()
-            walker = antlr4.ParseTreeWalker()
-            walker.walk(validator, tree)
-            scheduled_query_condition = validator.result()
-            for item in ['time_aggregation', 'threshold', 'operator']:
-                if not getattr(scheduled_query_condition, item, None):
-                    raise InvalidArgumentValueError(usage)
-        except (AttributeError, TypeError, KeyError) as e:
-            raise InvalidArgumentValueError(usage) from e
+        scheduled_query_condition = parse_condition_argument(' '.join(values), getattr(parser, 'cli_ctx', None))
         super().__call__(parser, namespace, scheduled_query_condition, option_string)
 
 
+def parse_condition_argument(string_val, cli_ctx=None):
+    usage = 'usage error: --condition {avg,min,max,total,count} ["METRIC COLUMN" from]\n' \
+            '                         "QUERY_PLACEHOLDER" {=,!=,>,>=,<,<=} THRESHOLD\n' \
+            '                         [resource id RESOURCEID]\n' \
+            '                         [where DIMENSION {includes,excludes} VALUE [or VALUE ...]\n' \
+            '                         [and   DIMENSION {includes,excludes} VALUE [or VALUE ...] ...]]\n' \
+            '                         [at least MinTimeToFail violations out of EvaluationPeriod aggregated points]'
+    try:
+        if _use_antlr_parser(cli_ctx):
+            scheduled_query_condition = _parse_condition_with_antlr(string_val)
+        else:
+            from azext_scheduled_query._condition_parser import parse_condition
+            scheduled_query_condition = parse_condition(string_val)
+        for item in ['time_aggregation', 'threshold', 'operator']:
+            if not getattr(scheduled_query_condition, item, None):
+                raise InvalidArgumentValueError(usage)
+    except (AttributeError, TypeError, KeyError, ValueError) as e:
+        raise InvalidArgumentValueError(usage) from e
+    return scheduled_query_condition
+
+
+def _use_antlr_parser(cli_ctx):
+    # The ANTLR generated parser can still be selected with `az config set scheduled_query.use_antlr_parser=true`
+    # or the AZURE_SCHEDULED_QUERY_USE_ANTLR_PARSER environment variable.
+    if cli_ctx is None:
+        return False
+    return cli_ctx.config.getboolean('scheduled_query', 'use_antlr_parser', fallback=False)
+
+
+def _parse_condition_with_antlr(string_val):
+    # antlr4 is not available everywhere, restrict the import scope so that commands
+    # that do not need it don't fail when it is absent
+    import antlr4
+
+    from azext_scheduled_query.grammar.scheduled_query import (
+        ScheduleQueryConditionLexer, ScheduleQueryConditionParser, ScheduleQueryConditionValidator)
+
+    lexer = ScheduleQueryConditionLexer(antlr4.InputStream(string_val))
+    stream = antlr4.CommonTokenStream(lexer)
+    parser = ScheduleQueryConditionParser(stream)
+    tree = parser.expression()
+
+    validator = ScheduleQueryConditionValidator()
+    walker = antlr4.ParseTreeWalker()
+    walker.walk(validator, tree)
+    return validator.result()
+
+
 class ScheduleQueryConditionQueryAction(argparse.Action):
 
     def __call__(self, parser, namespace, values, option_string=None):
@@ -0,0 +1,295 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# A hand-written recursive-descent parser for the --condition argument.
+# It accepts the language described by grammar/scheduled_query/ScheduleQueryCondition.g4 and builds the same
+# Condition as ScheduleQueryConditionValidator, without having to load the antlr4 runtime and generated parser.
+
+import re
+
+op_conversion = {
+    '=': 'Equals',
+    '!=': 'NotEquals',
+    '>': 'GreaterThan',
+    '>=': 'GreaterThanOrEqual',
+    '<': 'LessThan',
+    '<=': 'LessThanOrEqual'
+}
+
+agg_conversion = {
+    'avg': 'Average',
+    'min': 'Minimum',
+    'max': 'Maximum',
+    'total': 'Total',
+    'count': 'Count'
+}
+
+dim_op_conversion = {
+    'includes': 'Include',
+    'excludes': 'Exclude'
+}
+
+WHITESPACE = 'WHITESPACE'
+NEWLINE = 'NEWLINE'
+OPERATOR = 'OPERATOR'
+NUMBER = 'NUMBER'
+QUOTE = 'QUOTE'
+WORD = 'WORD'
+EOF = 'EOF'
+
+# Implicit tokens of the grammar, they win over every other token of the same length.
+_LITERALS = {'/', '.', '_', '\\', ':', '%', '-', ',', '|', '&', '(', ')', '==', '\\"', "\\'", '*', '~'}
+
+# Keywords are matched case-insensitively.
+_KEYWORDS = {'where': 'WHERE', 'from': 'COMESFROM', 'resource': 'RESOURCE', 'id': 'COLUMN', 'at': 'AT',
+             'least': 'LEAST', 'out': 'OUT', 'of': 'OF', 'violations': 'VIOLATIONS', 'aggregated': 'AGGREGATED',
+             'points': 'POINTS', 'and': 'AND', 'includes': 'INCLUDES', 'excludes': 'EXCLUDES', 'or': 'OR'}
+
+_OPERATORS = {'<', '<=', '=', '>=', '>', '!='}
+
+_TWO_CHARACTER_TOKENS = {token for token in _LITERALS | _OPERATORS if len(token) == 2}
+
+_NUMBER_PATTERN = re.compile(r'[0-9]+([.,][0-9]+)?')
+_WHITESPACE_PATTERN = re.compile(r'[ \t]+')
+_NEWLINE_PATTERN = re.compile(r'(\r?\n|\r)+')
+_WORD_PATTERN = re.compile(r'[a-zA-Z0-9_]+')
+
+_METRIC_TOKENS = {WORD, WHITESPACE, '.', '/', '_', '\\', ':', '%', '-', ',', '|'}
+_RESOURCE_ID_TOKENS = _METRIC_TOKENS
+_QUERY_TOKENS = {WORD, WHITESPACE, NUMBER, OPERATOR, 'AND', 'OR', '&', '.', '/', '(', ')', '_', '\\', ':', '%', '-',
+                 ',', '|', '==', '\\"', "\\'"}
+_DIM_VALUE_TOKENS = {NUMBER, WORD, '-', '.', '*', WHITESPACE, ':', '~', ',', '|', '%', '_'}
+
+
+class ConditionParseError(ValueError):
+    pass
+
+
+def tokenize(text):
+    # Returns a list of (type, text) tuples, following the ANTLR lexer rules: the longest match wins, and on a tie
+    # the rule that is defined first in the grammar wins, which puts literals before keywords and NUMBER before WORD.
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        word = _WORD_PATTERN.match(text, pos)
+        if word:
+            value = word.group()
+            number = _NUMBER_PATTERN.match(text, pos)
+            if number and len(number.group()) >= len(value):
+                token = (NUMBER, number.group())
+            elif value == '_':
+                token = (value, value)
+            else:
+                token = (_KEYWORDS.get(value.lower(), WORD), value)
+        elif text[pos] in ' \t':
+            token = (WHITESPACE, _WHITESPACE_PATTERN.match(text, pos).group())
+        elif text[pos] in '\r\n':
+            token = (NEWLINE, _NEWLINE_PATTERN.match(text, pos).group())
+        else:
+            value = text[pos:pos + 2] if text[pos:pos + 2] in _TWO_CHARACTER_TOKENS else text[pos]
+            if value in _LITERALS:
+                token = (value, value)
+            elif value in _OPERATORS:
+                token = (OPERATOR, value)
+            elif value in '\'"':
+                token = (QUOTE, value)
+            else:
+                raise ConditionParseError(f"unexpected character '{value}' at position {pos}")
+        tokens.append(token)
+        pos += len(token[1])
+    return tokens
+
+
+class ConditionParser:
+
+    def __init__(self, text):
+        self._tokens = tokenize(text)
+        self._pos = 0
+        self.parameters = {}
+
+    def parse(self):
+        # expression : aggregation (metric_with_quote comes_from)? query_with_quote WHITESPACE operator threshold
+        #              (WHITESPACE resource_column)? (WHITESPACE dimensions)* (WHITESPACE falling_period)? NEWLINE*
+        self._aggregation()
+        self._metric_with_quote()
+        self._query_with_quote()
+        self._expect(WHITESPACE)
+        self._operator()
+        self.parameters['threshold'] = self._expect(NUMBER)
+        if self._peek() == WHITESPACE and self._peek(1) == 'RESOURCE':
+            self._resource_column()
+        if self._peek() == WHITESPACE and self._peek(1) == 'WHERE':
+            self._dimensions()
+        if self._peek() == WHITESPACE and self._peek(1) == 'AT':
+            self._falling_period()
+        while self._peek() == NEWLINE:
+            self._pos += 1
+        # The expression isn't anchored to the end of the input, so like the generated parser, whatever follows
+        # a complete condition is ignored unless it starts like one of the optional parts that could follow.
+        if self._peek() == WHITESPACE and 'failing_periods' not in self.parameters and self._peek(-1) != NEWLINE:
+            raise self._error()
+        return self.parameters
+
+    def result(self):
+        from azext_scheduled_query.vendored_sdks.azure_mgmt_scheduled_query.models import (
+            Condition, ConditionFailingPeriods, Dimension)
+        parameters = self.parse()
+        parameters['dimensions'] = [Dimension(**dim) for dim in parameters.get('dimensions', [])]
+        if 'failing_periods' in parameters:
+            parameters['failing_periods'] = ConditionFailingPeriods(**parameters['failing_periods'])
+        return Condition(**parameters)
+
+    def _peek(self, offset=0):
+        if self._pos + offset < len(self._tokens):
+            return self._tokens[self._pos + offset][0]
+        return EOF
+
+    def _error(self):
+        if self._pos < len(self._tokens):
+            return ConditionParseError(f"unexpected '{self._tokens[self._pos][1]}'")
+        return ConditionParseError("unexpected end of condition")
+
+    def _expect(self, *token_types):
+        if self._peek() not in token_types:
+            raise self._error()
+        self._pos += 1
+        return self._tokens[self._pos - 1][1]
+
+    def _keyword(self, token_type):
+        # Keywords are always followed by whitespace, except 'points' which ends the falling period.
+        self._expect(token_type)
+        self._expect(WHITESPACE)
+
+    def _repeat(self, token_types, stop_tokens=()):
+        # Consumes one or more tokens of token_types. Whitespace that is followed by one of stop_tokens is left
+        # to the rule that follows, as the ANTLR prediction would.
+        start = self._pos
+        while self._peek() in token_types:
+            if self._peek() == WHITESPACE and self._peek(1) in stop_tokens:
+                break
+            self._pos += 1
+        if self._pos == start:
+            raise self._error()
+        return ''.join(text for _, text in self._tokens[start:self._pos])
+
+    def _aggregation(self):
+        aggregation = self._expect(WORD)
+        self._expect(WHITESPACE)
+        if aggregation not in agg_conversion:
+            raise ConditionParseError(f"unknown aggregation '{aggregation}'")
+        self.parameters['time_aggregation'] = agg_conversion[aggregation]
+
+    def _metric_with_quote(self):
+        # The metric is optional and only recognized by the 'from' following it, so backtrack when it's missing.
+        start = self._pos
+        try:
+            if self._peek() == QUOTE:
+                self._pos += 1
+                metric = self._repeat(_METRIC_TOKENS)
+                self._expect(QUOTE)
+            else:
+                metric = self._repeat(_METRIC_TOKENS, stop_tokens=('COMESFROM',))
+            self._expect(WHITESPACE)
+            self._keyword('COMESFROM')
+        except ConditionParseError:
+            self._pos = start
+            return
+        self.parameters['metric_measure_column'] = metric.strip()
+
+    def _query_with_quote(self):
+        self._expect(QUOTE)
+        start = self._pos
+        while self._peek() in _QUERY_TOKENS or self._peek() == 'WHERE':
+            if self._peek() == 'WHERE':
+                self._keyword('WHERE')
+            else:
+                self._pos += 1
+        if self._pos == start:
+            raise self._error()
+        query = ''.join(text for _, text in self._tokens[start:self._pos]).strip()
+        self._expect(QUOTE)
+        self.parameters['query'] = query.replace("\\\"", "\"").replace("\\\'", "\'")
+
+    def _operator(self):
+        operator = self._expect(OPERATOR)
+        self._expect(WHITESPACE)
+        self.parameters['operator'] = op_conversion[operator]
+
+    def _resource_column(self):
+        self._expect(WHITESPACE)
+        self._keyword('RESOURCE')
+        self._keyword('COLUMN')
+        resource_id = self._repeat(_RESOURCE_ID_TOKENS, stop_tokens=('WHERE', 'AT'))
+        self.parameters['resource_id_column'] = resource_id.strip()
+
+    def _dimensions(self):
+        self._expect(WHITESPACE)
+        self._keyword('WHERE')
+        self.parameters['dimensions'] = [self._dimension()]
+        while self._peek() in ('AND', ','):
+            self._pos += 1
+            self._expect(WHITESPACE)
+            self.parameters['dimensions'].append(self._dimension())
+        if self._peek() == WHITESPACE and self._peek(1) == 'WHERE':
+            raise ConditionParseError("dimensions can only be specified by a single 'where' clause")
+
+    def _dimension(self):
+        name = self._expect(WORD)
+        self._expect(WHITESPACE)
+        operator = self._expect('INCLUDES', 'EXCLUDES')
+        self._expect(WHITESPACE)
+        return {
+            'name': name,
+            'operator': dim_op_conversion[operator.lower()],
+            'values': [x for x in self._dim_values().strip().split(' ') if x not in ['', 'or']]
+        }
+
+    def _starts_dimension(self, offset):
+        return (self._peek(offset) == WORD and self._peek(offset + 1) == WHITESPACE and
+                self._peek(offset + 2) in ('INCLUDES', 'EXCLUDES') and self._peek(offset + 3) == WHITESPACE)
+
+    def _dim_values(self):
+        # dim_values : dim_value ((OR | ',') WHITESPACE dim_value)*
+        # ',' and whitespace are valid inside a value too, so a ',' only separates dimensions when it is followed
+        # by the name and operator of the next one.
+        start = self._pos
+        while True:
+            token_type = self._peek()
+            if token_type == ',' and self._pos > start and self._peek(1) == WHITESPACE and self._starts_dimension(2):
+                break
+            if token_type == WHITESPACE and self._peek(1) in ('WHERE', 'AT'):
+                break
+            if token_type == 'OR':
+                if self._pos == start or self._peek(1) != WHITESPACE or \
+                        self._peek(2) not in _DIM_VALUE_TOKENS - {WHITESPACE}:
+                    raise self._error()
+            elif token_type not in _DIM_VALUE_TOKENS:
+                break
+            self._pos += 1
+        if self._pos == start:
+            raise self._error()
+        return ''.join(text for _, text in self._tokens[start:self._pos])
+
+    def _falling_period(self):
+        self._expect(WHITESPACE)
+        self._keyword('AT')
+        self._keyword('LEAST')
+        min_times = self._expect(NUMBER)
+        self._expect(WHITESPACE)
+        self._keyword('VIOLATIONS')
+        self._keyword('OUT')
+        self._keyword('OF')
+        evaluation_period = self._expect(NUMBER)
+        self._expect(WHITESPACE)
+        self._keyword('AGGREGATED')
+        self._expect('POINTS')
+        self.parameters['failing_periods'] = {
+            'min_failing_periods_to_alert': int(float(min_times)),
+            'number_of_evaluation_periods': int(float(evaluation_period))
+        }
+
+
+def parse_condition(text):
+    return ConditionParser(text).result()
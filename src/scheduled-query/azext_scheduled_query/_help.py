@@ -68,6 +68,30 @@ parameters:
         Dimensions can be queried by adding the 'where' keyword and multiple dimensions can be queried by combining them with the 'and' keyword.
 """
 
+helps['monitor scheduled-query apply'] = """
+type: command
+short-summary: Create or update scheduled queries from a file.
+long-summary: |
+    The file contains a list of rules, each of which is a mapping of the options of `az monitor scheduled-query create`
+    without the leading dashes, plus `name` and an optional `resource-group`. `condition` is a single condition or a list
+    of conditions. All rules are validated before any of them is applied. Rules are applied concurrently, and a rule whose
+    definition in Azure already matches the file is left untouched. A rule that fails doesn't stop the others, and the
+    command fails once all rules were applied if any of them failed.
+examples:
+  - name: Create or update the rules defined in rules.yaml.
+    text: |
+        # rules.yaml
+        # - name: high-cpu
+        #   scopes: /subscriptions/{sub}/resourceGroups/{rg}/providers/Microsoft.Compute/virtualMachines/{vm}
+        #   condition: avg "Perf_1" > 90 resource id _ResourceId
+        #   condition-query:
+        #     Perf_1: Perf | where CounterName == 'Percent Processor Time'
+        #   action-groups: [/subscriptions/{sub}/resourceGroups/{rg}/providers/microsoft.insights/actionGroups/{ag}]
+        #   severity: 1
+        #   window-size: 10m
+        az monitor scheduled-query apply -g {rg} --file rules.yaml
+"""
+
 helps['monitor scheduled-query list'] = """
     type: command
     short-summary: List all scheduled queries.
@@ -49,3 +49,8 @@ def load_arguments(self, _):
         c.argument('check_workspace_alerts_storage', options_list=['--check-ws-alerts-storage', '--cwas'],
                    arg_type=get_three_state_flag(),
                    help="The flag which indicates whether this scheduled query rule should be stored in the customer's storage.")
+
+    with self.argument_context('monitor scheduled-query apply') as c:
+        c.argument('rule_file', options_list=['--file', '-f'], help='YAML or JSON file with the list of rules to create or update.')
+        c.argument('resource_group_name', help='Resource group of the rules that do not set `resource-group` in the file.')
+        c.argument('max_concurrency', type=int, help='Maximum number of rules that are applied at the same time.')
@@ -21,3 +21,4 @@ def load_command_table(self, _):
         g.custom_command('list', 'list_scheduled_query')
         g.show_command('show', 'get')
         g.generic_update_command('update', custom_func_name='update_scheduled_query')
+        g.custom_command('apply', 'apply_scheduled_queries')
@@ -3,7 +3,41 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-from azure.cli.core.azclierror import InvalidArgumentValueError
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.cli.core.azclierror import AzureResponseError, InvalidArgumentValueError
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# Options of `az monitor scheduled-query create` that can be set for a rule in the file of `apply`.
+rule_file_options = ['name', 'resource_group', 'scopes', 'condition', 'condition_query', 'action_groups',
+                     'custom_properties', 'disabled', 'description', 'tags', 'location', 'severity', 'window_size',
+                     'evaluation_frequency', 'target_resource_type', 'mute_actions_duration', 'auto_mitigate',
+                     'skip_query_validation', 'check_ws_alerts_storage']
+
+# The parts of a rule that the file of `apply` defines, in the REST layout. A nested mapping lists the managed keys
+# of an object, a list holds the managed keys of its items and None marks a value. They are compared in full, so a
+# description, action group or dimension removed from the file updates the rule. Values the service fills in on its
+# own and flags that only change how the request is validated, such as skipQueryValidation, aren't compared.
+rule_file_managed_properties = {
+    'location': None,
+    'tags': None,
+    'properties': {
+        'description': None, 'severity': None, 'enabled': None, 'scopes': None, 'evaluationFrequency': None,
+        'windowSize': None, 'targetResourceTypes': None, 'muteActionsDuration': None, 'autoMitigate': None,
+        'actions': {'actionGroups': None, 'customProperties': None},
+        'criteria': {'allOf': [{'query': None, 'timeAggregation': None, 'metricMeasureColumn': None,
+                                'resourceIdColumn': None, 'operator': None, 'threshold': None,
+                                'dimensions': [{'name': None, 'operator': None, 'values': None}],
+                                'failingPeriods': {'numberOfEvaluationPeriods': None,
+                                                   'minFailingPeriodsToAlert': None}}]}
+    }
+}
+
+max_retries_on_throttling = 5
+max_retry_after_in_seconds = 60
 
 
 def _build_criteria(condition, condition_query):
@@ -45,6 +79,17 @@ def create_scheduled_query(client,
                            auto_mitigate=True,
                            skip_query_validation=False,
                            check_workspace_alerts_storage=False):
+    parameters = _build_rule_parameters(scopes, condition, action_groups, custom_properties, condition_query,
+                                        disabled, description, tags, location, severity, window_size,
+                                        evaluation_frequency, target_resource_type, mute_actions_duration,
+                                        auto_mitigate, skip_query_validation, check_workspace_alerts_storage)
+    return client.create_or_update(resource_group_name=resource_group_name, rule_name=rule_name, parameters=parameters)
+
+
+def _build_rule_parameters(scopes, condition, action_groups, custom_properties, condition_query, disabled,
+                           description, tags, location, severity, window_size, evaluation_frequency,
+                           target_resource_type, mute_actions_duration, auto_mitigate, skip_query_validation,
+                           check_workspace_alerts_storage):
     criteria = _build_criteria(condition, condition_query)
     parameters = {}
     actions = {}
@@ -70,7 +115,7 @@ def create_scheduled_query(client,
     parameters['auto_mitigate'] = auto_mitigate
     parameters['skip_query_validation'] = skip_query_validation
     parameters['check_workspace_alerts_storage_configured'] = check_workspace_alerts_storage
-    return client.create_or_update(resource_group_name=resource_group_name, rule_name=rule_name, parameters=parameters)
+    return parameters
 
 
 def list_scheduled_query(client, resource_group_name=None):
@@ -119,3 +164,203 @@ def update_scheduled_query(cmd,
         if auto_mitigate is not None:
             c.set_param('auto_mitigate', auto_mitigate)
     return instance
+
+
+def apply_scheduled_queries(cmd, client, rule_file, resource_group_name=None, max_concurrency=8):
+    rules = _load_rule_file(cmd, rule_file, resource_group_name)
+    serialize = client._serialize  # pylint: disable=protected-access
+
+    def apply_rule(rule):
+        rule_resource_group, rule_name, parameters = rule
+        result = {'name': rule_name, 'resourceGroup': rule_resource_group}
+        # pylint: disable=broad-except
+        try:
+            result['status'] = _apply_rule(client, serialize, rule_resource_group, rule_name, parameters)
+        except Exception as e:
+            logger.error("Failed to apply scheduled query rule '%s' in resource group '%s': %s",
+                         rule_name, rule_resource_group, str(e))
+            result['status'] = 'Failed'
+            result['error'] = str(e)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        results = list(executor.map(apply_rule, rules))
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    logger.warning("Applied %d scheduled query rules: %s", len(results),
+                   ', '.join(f'{count} {status.lower()}' for status, count in sorted(summary.items())))
+    failures = [result for result in results if result['status'] == 'Failed']
+    if failures:
+        raise AzureResponseError('Failed to apply scheduled query rules: ' + ', '.join(
+            f"{result['name']} (resource group {result['resourceGroup']})" for result in failures))
+    return results
+
+
+def _load_rule_file(cmd, rule_file, resource_group_name):
+    # Reads and validates every rule before anything is sent, so that a typo in the last rule of a large file
+    # doesn't leave the rules before it half applied.
+    import yaml
+    from azure.cli.command_modules.monitor.actions import get_period_type
+    from azure.cli.core.azclierror import FileOperationError
+    from ._actions import parse_condition_argument
+
+    try:
+        with open(rule_file, 'r', encoding='utf-8-sig') as f:
+            content = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        raise FileOperationError(f"Couldn't read scheduled query rules from {rule_file}: {str(e)}") from e
+    if isinstance(content, dict):
+        content = content.get('rules')
+    if not isinstance(content, list):
+        raise InvalidArgumentValueError(f'{rule_file} must contain a list of rules, or a "rules" list.')
+
+    rules = []
+    errors = []
+    resource_group_locations = {}
+    for index, definition in enumerate(content):
+        try:
+            if not isinstance(definition, dict):
+                raise InvalidArgumentValueError('a rule must be a mapping of options to values')
+            options = {key.replace('-', '_'): value for key, value in definition.items()}
+            unknown_options = [key for key in options if key not in rule_file_options]
+            if unknown_options:
+                raise InvalidArgumentValueError(f"unknown options {', '.join(unknown_options)}")
+            rule_name = options.pop('name', None)
+            rule_resource_group = options.pop('resource_group', resource_group_name)
+            if not rule_name or not rule_resource_group or not options.get('scopes') or \
+                    not options.get('condition'):
+                raise InvalidArgumentValueError('name, resource-group, scopes and condition are required')
+
+            conditions = options.pop('condition')
+            if isinstance(conditions, str):
+                conditions = [conditions]
+            options['condition'] = [parse_condition_argument(condition, cmd.cli_ctx) for condition in conditions]
+            if isinstance(options['scopes'], str):
+                options['scopes'] = [options['scopes']]
+            options['check_workspace_alerts_storage'] = options.pop('check_ws_alerts_storage', False)
+            for option in ['window_size', 'evaluation_frequency']:
+                options[option] = get_period_type()(str(options.get(option, '5m')))
+            if options.get('mute_actions_duration') is not None:
+                options['mute_actions_duration'] = get_period_type(as_timedelta=True)(
+                    str(options['mute_actions_duration']))
+            if 'location' not in options:
+                if rule_resource_group not in resource_group_locations:
+                    resource_group_locations[rule_resource_group] = _get_resource_group_location(
+                        cmd, rule_resource_group)
+                options['location'] = resource_group_locations[rule_resource_group]
+
+            parameters = _build_rule_parameters(
+                options['scopes'], options['condition'], options.get('action_groups'),
+                options.get('custom_properties'), options.get('condition_query'), options.get('disabled', False),
+                options.get('description'), options.get('tags'), options['location'],
+                int(options.get('severity', 2)), options['window_size'], options['evaluation_frequency'],
+                options.get('target_resource_type'), options.get('mute_actions_duration'),
+                options.get('auto_mitigate', True), options.get('skip_query_validation', False),
+                options['check_workspace_alerts_storage'])
+            rules.append((rule_resource_group, rule_name, parameters))
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(f"rule {index} ({definition.get('name') if isinstance(definition, dict) else ''}): "
+                          f"{str(e)}")
+
+    seen = set()
+    for rule_resource_group, rule_name, _ in rules:
+        key = (rule_resource_group.lower(), rule_name.lower())
+        if key in seen:
+            errors.append(f"rule '{rule_name}' in resource group '{rule_resource_group}' is defined more than once")
+        seen.add(key)
+
+    if errors:
+        raise InvalidArgumentValueError(f'{rule_file} contains invalid rules:\n' + '\n'.join(errors))
+    return rules
+
+
+def _get_resource_group_location(cmd, resource_group_name):
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+    from azure.cli.core.profiles import ResourceType
+    resource_client = get_mgmt_service_client(cmd.cli_ctx, ResourceType.MGMT_RESOURCE_RESOURCES)
+    return resource_client.resource_groups.get(resource_group_name).location
+
+
+def _apply_rule(client, serialize, resource_group_name, rule_name, parameters):
+    from azure.core.exceptions import ResourceNotFoundError
+    desired = serialize.body(parameters, 'ScheduledQueryRuleResource')
+    try:
+        existing = _call_with_backoff(lambda: client.get(resource_group_name=resource_group_name,
+                                                         rule_name=rule_name))
+    except ResourceNotFoundError:
+        existing = None
+
+    if existing is not None and _is_same_definition(desired, serialize.body(existing, 'ScheduledQueryRuleResource')):
+        logger.info("Scheduled query rule '%s' is up to date.", rule_name)
+        return 'Unchanged'
+
+    _call_with_backoff(lambda: client.create_or_update(resource_group_name=resource_group_name, rule_name=rule_name,
+                                                       parameters=parameters))
+    return 'Created' if existing is None else 'Updated'
+
+
+def _is_same_definition(desired, existing, managed=None):
+    # A managed value missing on either side is compared as empty.
+    managed = rule_file_managed_properties if managed is None else managed
+    if isinstance(managed, dict):
+        if not isinstance(desired or {}, dict) or not isinstance(existing or {}, dict):
+            return False
+        desired, existing = desired or {}, existing or {}
+        for key, managed_value in managed.items():
+            if key == 'location':
+                if not _is_same_location(desired.get(key), existing.get(key)):
+                    return False
+            elif not (_is_same_definition(desired.get(key), existing.get(key), managed_value) if managed_value
+                      else _is_same_value(desired.get(key), existing.get(key))):
+                return False
+        return True
+    # a list of objects
+    if not isinstance(desired or [], list) or not isinstance(existing or [], list):
+        return False
+    desired, existing = desired or [], existing or []
+    return len(desired) == len(existing) and \
+        all(_is_same_definition(d, e, managed[0]) for d, e in zip(desired, existing))
+
+
+def _is_same_value(desired, existing):
+    if desired in (None, '', [], {}) or existing in (None, '', [], {}):
+        return desired in (None, '', [], {}) and existing in (None, '', [], {})
+    if isinstance(desired, dict):
+        return isinstance(existing, dict) and desired.keys() == existing.keys() and \
+            all(_is_same_value(value, existing[key]) for key, value in desired.items())
+    if isinstance(desired, list):
+        return isinstance(existing, list) and len(desired) == len(existing) and \
+            all(_is_same_value(d, e) for d, e in zip(desired, existing))
+    if isinstance(desired, str) and isinstance(existing, str) and desired.lower().startswith('/subscriptions/'):
+        return desired.lower() == existing.lower()
+    return desired == existing
+
+
+def _is_same_location(desired, existing):
+    if isinstance(desired, str) and isinstance(existing, str):
+        return desired.replace(' ', '').lower() == existing.replace(' ', '').lower()
+    return desired == existing
+
+
+def _call_with_backoff(func):
+    from azure.core.exceptions import HttpResponseError
+    for attempt in range(max_retries_on_throttling + 1):
+        try:
+            return func()
+        except HttpResponseError as e:
+            if e.status_code != 429 or attempt == max_retries_on_throttling:
+                raise
+            retry_after = _get_retry_after(e.response, attempt)
+            logger.debug("Request was throttled, retrying in %s seconds.", retry_after)
+            time.sleep(retry_after)
+    return None
+
+
+def _get_retry_after(response, attempt):
+    try:
+        retry_after = int(response.headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = 2 ** attempt
+    return min(max(retry_after, 1), max_retry_after_in_seconds)
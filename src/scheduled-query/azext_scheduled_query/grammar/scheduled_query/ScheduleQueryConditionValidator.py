@@ -5,30 +5,9 @@
 # pylint: disable=all
 from .ScheduleQueryConditionListener import ScheduleQueryConditionListener
 from azext_scheduled_query.vendored_sdks.azure_mgmt_scheduled_query.models import ConditionFailingPeriods
+from azext_scheduled_query._condition_parser import op_conversion, agg_conversion, dim_op_conversion
 
 
-op_conversion = {
-    '=': 'Equals',
-    '!=': 'NotEquals',
-    '>': 'GreaterThan',
-    '>=': 'GreaterThanOrEqual',
-    '<': 'LessThan',
-    '<=': 'LessThanOrEqual'
-}
-
-agg_conversion = {
-    'avg': 'Average',
-    'min': 'Minimum',
-    'max': 'Maximum',
-    'total': 'Total',
-    'count': 'Count'
-}
-
-dim_op_conversion = {
-    'includes': 'Include',
-    'excludes': 'Exclude'
-}
-
 # This class defines a complete listener for a parse tree produced by MetricAlertConditionParser.
 class ScheduleQueryConditionValidator(ScheduleQueryConditionListener):
 
@@ -0,0 +1,189 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import AzureResponseError, InvalidArgumentValueError
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from msrest import Deserializer, Serializer
+
+from azext_scheduled_query import custom
+from azext_scheduled_query.vendored_sdks.azure_mgmt_scheduled_query import models
+
+RULES = """
+rules:
+  - name: rule1
+    scopes: /subscriptions/sub/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm
+    condition: avg "Perf" > 90
+    location: eastus
+  - name: rule2
+    resource-group: rg2
+    scopes: [/subscriptions/sub/resourceGroups/rg2]
+    condition:
+      - count "Placeholder" > 1 at least 1 violations out of 2 aggregated points
+    condition-query:
+      Placeholder: Heartbeat | where Computer == 'vm'
+    target-resource-type: Microsoft.Compute/virtualMachines
+    window-size: 10m
+    severity: 1
+"""
+
+
+class ScheduledQueryApplyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.config.getboolean.return_value = False
+        client_models = {k: v for k, v in models.__dict__.items() if isinstance(v, type)}
+        self.client = mock.Mock()
+        self.client._serialize = Serializer(client_models)
+        self.deserialize = Deserializer(client_models)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _write_rules(self, content):
+        rule_file = os.path.join(self.folder, 'rules.yaml')
+        with open(rule_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return rule_file
+
+    @mock.patch.object(custom, '_get_resource_group_location', return_value='westus')
+    def test_load_rule_file(self, mock_location):
+        rules = custom._load_rule_file(self.cmd, self._write_rules(RULES), 'rg')
+
+        self.assertEqual([(rg, name) for rg, name, _ in rules], [('rg', 'rule1'), ('rg2', 'rule2')])
+        rule2 = rules[1][2]
+        self.assertEqual(rule2['location'], 'westus')
+        self.assertEqual(rule2['severity'], 1)
+        self.assertEqual(rule2['window_size'], 'PT10M')
+        self.assertEqual(rule2['target_resource_types'], ['Microsoft.Compute/virtualMachines'])
+        self.assertEqual(rule2['criteria'].all_of[0].query, "Heartbeat | where Computer == 'vm'")
+        self.assertEqual(rule2['criteria'].all_of[0].failing_periods.number_of_evaluation_periods, 2)
+        mock_location.assert_called_once_with(self.cmd, 'rg2')
+
+    def test_load_rule_file_reports_all_errors(self):
+        rule_file = self._write_rules("""
+- name: rule1
+  scopes: [scope]
+  condition: avg "Perf" >
+  location: eastus
+- name: rule2
+  scopes: [scope]
+  condition: avg "Perf" > 1
+  location: eastus
+  colour: red
+- name: rule2
+  scopes: [scope]
+  condition: avg "Perf" > 1
+  location: eastus
+""")
+        with self.assertRaises(InvalidArgumentValueError) as e:
+            custom._load_rule_file(self.cmd, rule_file, 'rg')
+        self.assertIn('rule 0 (rule1)', str(e.exception))
+        self.assertIn('rule 1 (rule2): unknown options colour', str(e.exception))
+        self.assertNotIn('defined more than once', str(e.exception))
+
+    @mock.patch.object(custom, '_get_resource_group_location', return_value='westus')
+    def test_apply_rule(self, _):
+        rules = custom._load_rule_file(self.cmd, self._write_rules(RULES), 'rg')
+        _, _, parameters = rules[0]
+        existing = self.deserialize('ScheduledQueryRuleResource',
+                                    self.client._serialize.body(parameters, 'ScheduledQueryRuleResource'))
+        existing.location = 'East US'
+        existing.scopes = [existing.scopes[0].upper()]
+
+        self.client.get.return_value = existing
+        self.assertEqual(custom._apply_rule(self.client, self.client._serialize, 'rg', 'rule1', parameters),
+                         'Unchanged')
+        self.client.create_or_update.assert_not_called()
+
+        existing.criteria.all_of[0].threshold = 80
+        self.assertEqual(custom._apply_rule(self.client, self.client._serialize, 'rg', 'rule1', parameters),
+                         'Updated')
+
+        self.client.get.side_effect = ResourceNotFoundError('not found')
+        self.assertEqual(custom._apply_rule(self.client, self.client._serialize, 'rg', 'rule1', parameters),
+                         'Created')
+        self.assertEqual(self.client.create_or_update.call_count, 2)
+
+    @mock.patch.object(custom, '_get_resource_group_location', return_value='westus')
+    @mock.patch.object(custom, '_apply_rule')
+    def test_apply_fails_when_a_rule_fails(self, apply_rule, _):
+        def apply(client, serialize, rule_resource_group, rule_name, parameters):
+            if rule_name == 'rule2':
+                raise HttpResponseError('bad query')
+            return 'Created'
+        apply_rule.side_effect = apply
+
+        with self.assertRaises(AzureResponseError) as e:
+            custom.apply_scheduled_queries(self.cmd, self.client, self._write_rules(RULES), 'rg')
+
+        self.assertEqual(str(e.exception), 'Failed to apply scheduled query rules: rule2 (resource group rg2)')
+        # the other rules are still applied
+        self.assertEqual(apply_rule.call_count, 2)
+
+        apply_rule.side_effect = None
+        apply_rule.return_value = 'Unchanged'
+        results = custom.apply_scheduled_queries(self.cmd, self.client, self._write_rules(RULES), 'rg')
+        self.assertEqual([result['status'] for result in results], ['Unchanged', 'Unchanged'])
+
+    @mock.patch.object(custom, '_get_resource_group_location', return_value='westus')
+    def test_is_same_definition(self, _):
+        rules = custom._load_rule_file(self.cmd, self._write_rules(RULES), 'rg')
+        desired = self.client._serialize.body(rules[1][2], 'ScheduledQueryRuleResource')
+        existing = copy.deepcopy(desired)
+        # values the service fills in on its own and write-only flags aren't compared
+        existing['id'] = '/subscriptions/sub/resourceGroups/rg2/providers/Microsoft.Insights/scheduledQueryRules/rule2'
+        existing['properties'].update({'isWorkspaceAlertsStorageConfigured': False, 'skipQueryValidation': None,
+                                       'checkWorkspaceAlertsStorageConfigured': None, 'description': '',
+                                       'createdWithApiVersion': '2021-08-01', 'muteActionsDuration': None})
+        existing['tags'] = {}
+        self.assertTrue(custom._is_same_definition(desired, existing))
+
+        # removing something from the file updates the rule
+        for path, value in [(('properties', 'description'), 'old description'),
+                            (('properties', 'actions', 'actionGroups'), ['/subscriptions/sub/actionGroups/ag']),
+                            (('properties', 'actions', 'customProperties'), {'team': 'core'}),
+                            (('properties', 'muteActionsDuration'), 'PT30M'),
+                            (('tags',), {'env': 'prod'})]:
+            changed = copy.deepcopy(existing)
+            parent = changed
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = value
+            self.assertFalse(custom._is_same_definition(desired, changed), msg=path)
+
+        changed = copy.deepcopy(existing)
+        changed['properties']['criteria']['allOf'][0]['dimensions'] = [
+            {'name': 'Computer', 'operator': 'Include', 'values': ['vm']}]
+        self.assertFalse(custom._is_same_definition(desired, changed))
+        changed['properties']['criteria']['allOf'].append(copy.deepcopy(desired['properties']['criteria']['allOf'][0]))
+        self.assertFalse(custom._is_same_definition(desired, changed))
+
+    @mock.patch('time.sleep')
+    def test_call_with_backoff(self, mock_sleep):
+        throttled = HttpResponseError('throttled')
+        throttled.status_code = 429
+        throttled.response = mock.Mock(headers={'Retry-After': '7'})
+        func = mock.Mock(side_effect=[throttled, throttled, 'result'])
+
+        self.assertEqual(custom._call_with_backoff(func), 'result')
+        mock_sleep.assert_has_calls([mock.call(7), mock.call(7)])
+
+        failed = HttpResponseError('failed')
+        failed.status_code = 400
+        with self.assertRaises(HttpResponseError):
+            custom._call_with_backoff(mock.Mock(side_effect=failed))
+
+
+if __name__ == '__main__':
+    unittest.main()
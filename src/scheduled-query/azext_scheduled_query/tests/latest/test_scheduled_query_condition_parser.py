@@ -0,0 +1,178 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+import timeit
+import unittest
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+from azext_scheduled_query._actions import ScheduleQueryConditionAction, _parse_condition_with_antlr
+from azext_scheduled_query._condition_parser import parse_condition, tokenize
+
+try:
+    import antlr4  # pylint: disable=unused-import
+    ANTLR_AVAILABLE = True
+except ImportError:
+    ANTLR_AVAILABLE = False
+
+
+CONDITIONS = [
+    'avg "Perf" > 90',
+    'count "Perf" <= 1.5',
+    'min "Perf" != 1,5',
+    'max "T" = 01',
+    'total  "T"  >=  1',
+    "avg 'Perf' < 1",
+    'avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\"" > 70 resource id resourceId',
+    'avg cpu time from "T" > 1',
+    "avg 'a.b/c' from \"T\" > 1",
+    'avg "T" from "T" > 1',
+    'count "diagnostics | where Category == \\"A\\"| where SubscriptionId contains \\"111\\" | '
+    'summarize count() by bin(TimeGenerated, 1m)" > 1',
+    'count "a(b), c: d-e % f & g \\\' h" > 1',
+    'count "x where  y or z and 1.5" > 1',
+    'avg "T" > 1 resource id a b.c',
+    'avg "T" > 1 RESOURCE ID x where a includes b',
+    'avg "T" > 1 where a includes b',
+    'avg "T" > 1 where a Includes b  c',
+    'avg "T" > 1 where a includes b, c',
+    'avg "T" > 1 where a includes b, c excludes d',
+    'avg "T" > 1 where a includes b,or c',
+    'avg "T" > 1 where a includes b or c, d and e excludes f',
+    'avg "T" > 1 where a includes * or 1.5 or x-y:z~w|q%r_s',
+    'avg "T" > 1 where a excludes b or c, d and e includes , count excludes \\of',
+    'avg "T" > 1 at least 1 violations out of 2 aggregated points',
+    'avg "T" > 1 AT LEAST 1.1 violations out of 10.1 aggregated points\n',
+    'avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\" and C>=D && E<<F" > 70 '
+    'resource id resourceId where ApiName includes GetBlob or PutBlob and DpiName excludes CCC '
+    'at least 1.1 violations out of 10.1 aggregated points',
+    'avg "T" > 1/',
+    'avg "T" > 1 at least 1 violations out of 2 aggregated points trailing',
+]
+
+INVALID_CONDITIONS = [
+    '',
+    'avg',
+    'AVG "T" > 1',
+    'median "T" > 1',
+    'avg "T" 1',
+    'avg "T" > x',
+    'avg "T" >',
+    'avg T > 1',
+    'avg "" > 1',
+    'avg "T + 1" > 1',
+    'avg "T | where id == 5" > 1',
+    'avg "T" > 1 junk',
+    'avg "T" > 1 resource id',
+    'avg "T" > 1 where a includes b or',
+    'avg "T" > 1 where a includes or b',
+    'avg "T" > 1 where a includes b and',
+    'avg "T" > 1 where a includes b where c includes d',
+    'avg "T" > 1 at least 1 violations out of 2 aggregated',
+    'avg "T" > 1 at least 1,5 violations out of 2 aggregated points',
+]
+
+
+class ScheduledQueryConditionParserTest(unittest.TestCase):
+
+    def call_condition(self, value):
+        from argparse import Namespace
+        ns = Namespace()
+        ScheduleQueryConditionAction('--condition', 'condition').__call__(None, ns, value.split(' '), '--condition')
+        return ns.condition[0]
+
+    def _subprocess_env(self):
+        return dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    def _summarize(self, condition):
+        failing_periods = condition.failing_periods
+        return (condition.time_aggregation, condition.metric_measure_column, condition.query, condition.operator,
+                condition.threshold, condition.resource_id_column,
+                [(d.name, d.operator, d.values) for d in condition.dimensions],
+                (failing_periods.min_failing_periods_to_alert, failing_periods.number_of_evaluation_periods)
+                if failing_periods else None)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('avg "a\\"b" >= 1.5'),
+                         [('WORD', 'avg'), ('WHITESPACE', ' '), ('QUOTE', '"'), ('WORD', 'a'), ('\\"', '\\"'),
+                          ('WORD', 'b'), ('QUOTE', '"'), ('WHITESPACE', ' '), ('OPERATOR', '>='),
+                          ('WHITESPACE', ' '), ('NUMBER', '1.5')])
+        self.assertEqual([t for t, _ in tokenize('order _ _a == = 12 12a where Where')],
+                         ['WORD', 'WHITESPACE', '_', 'WHITESPACE', 'WORD', 'WHITESPACE', '==', 'WHITESPACE',
+                          'OPERATOR', 'WHITESPACE', 'NUMBER', 'WHITESPACE', 'WORD', 'WHITESPACE', 'WHERE',
+                          'WHITESPACE', 'WHERE'])
+
+    def test_condition_action(self):
+        condition = self.call_condition('avg "% Processor Time" from "Perf | where ObjectName == \\"Processor\\"" '
+                                        '> 70 resource id resourceId where ApiName includes GetBlob or PutBlob '
+                                        'and DpiName excludes CCC at least 1.1 violations out of 10.1 aggregated '
+                                        'points')
+        self.assertEqual(condition.time_aggregation, 'Average')
+        self.assertEqual(condition.metric_measure_column, '% Processor Time')
+        self.assertEqual(condition.query, 'Perf | where ObjectName == "Processor"')
+        self.assertEqual(condition.operator, 'GreaterThan')
+        self.assertEqual(condition.threshold, '70')
+        self.assertEqual(condition.resource_id_column, 'resourceId')
+        self.assertEqual([(d.name, d.operator, d.values) for d in condition.dimensions],
+                         [('ApiName', 'Include', ['GetBlob', 'PutBlob']), ('DpiName', 'Exclude', ['CCC'])])
+        self.assertEqual(condition.failing_periods.min_failing_periods_to_alert, 1)
+        self.assertEqual(condition.failing_periods.number_of_evaluation_periods, 10)
+
+    def test_condition_action_invalid(self):
+        for value in INVALID_CONDITIONS:
+            with self.assertRaises(InvalidArgumentValueError, msg=value):
+                self.call_condition(value)
+
+    @unittest.skipUnless(ANTLR_AVAILABLE, 'antlr4 is not installed')
+    def test_condition_parser_parity(self):
+        for value in CONDITIONS:
+            self.assertEqual(self._summarize(parse_condition(value)),
+                             self._summarize(_parse_condition_with_antlr(value)), msg=value)
+
+    def test_condition_parser_does_not_import_antlr(self):
+        script = 'import sys\n' \
+                 'from azext_scheduled_query._condition_parser import parse_condition\n' \
+                 'parse_condition(\'avg "T" > 1 where a includes b\')\n' \
+                 'assert "antlr4" not in sys.modules\n'
+        subprocess.run([sys.executable, '-c', script], check=True, env=self._subprocess_env())
+
+
+
+@unittest.skipUnless(ANTLR_AVAILABLE and os.environ.get('SCHEDULED_QUERY_PARSER_BENCHMARK'),
+                     'install antlr4 and set SCHEDULED_QUERY_PARSER_BENCHMARK to compare the condition parsers')
+class ScheduledQueryConditionParserBenchmark(unittest.TestCase):
+    # Compares the import and parse times of the ANTLR and hand-written condition parsers. Timings are only
+    # reported, run with `SCHEDULED_QUERY_PARSER_BENCHMARK=1 python -m pytest -s -k Benchmark`.
+
+    def _import_time(self, module):
+        script = f'import time\nstart = time.perf_counter()\nimport {module}\nprint(time.perf_counter() - start)'
+        times = []
+        for _ in range(3):
+            output = subprocess.run([sys.executable, '-c', script], check=True, stdout=subprocess.PIPE,
+                                    env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))).stdout
+            times.append(float(output))
+        return min(times)
+
+    def test_benchmark(self):
+        import_times = {
+            'antlr4': self._import_time('antlr4'),
+            'antlr parser': self._import_time('azext_scheduled_query.grammar.scheduled_query'),
+            'hand-written parser': self._import_time('azext_scheduled_query._condition_parser')
+        }
+        parse_times = {
+            'antlr parser': min(timeit.repeat(lambda: [_parse_condition_with_antlr(c) for c in CONDITIONS],
+                                              number=20, repeat=5)) / 20,
+            'hand-written parser': min(timeit.repeat(lambda: [parse_condition(c) for c in CONDITIONS],
+                                                     number=20, repeat=5)) / 20
+        }
+        print(f'Import time in seconds: {import_times}')
+        print(f'Time in seconds to parse {len(CONDITIONS)} conditions: {parse_times}')
+
+
+if __name__ == '__main__':
+    unittest.main()
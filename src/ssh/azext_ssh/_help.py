@@ -55,6 +55,10 @@ helps['ssh vm'] = """
         - name: Open RDP connection over SSH. Useful for connecting via RDP to Arc Servers with no public IP address. Currently only supported for Windows clients.
           text: |
             az ssh vm --resource-group myResourceGroup --name myVM --local-user username --rdp
+
+        - name: Reuse a cached AAD certificate and key pair across connections. Useful for automation that opens many short SSH sessions.
+          text: |
+            az ssh vm --resource-group myResourceGroup --name myVM --use-cert-cache
 """
 
 helps['ssh config'] = """
@@ -102,6 +106,12 @@ helps['ssh config'] = """
         - name: Give the Resource Type of the target. Useful when there is an Azure VM and an Arc Server with the same name in the same resource group. Resource type can be either "Microsoft.HybridCompute" for Arc Servers or "Microsoft.Compute" for Azure Virtual Machines.
           text: |
             az ssh config --resource-type [Microsoft.Compute|Microsoft.HybridCompute] --resource-group myResourceGroup --name myVM --file ./myconfig
+
+        - name: Create a config with an entry for every Azure VM and Arc Server in a resource group, or for every one of them in the subscription with a given tag. All entries share a single AAD issued certificate.
+          text: |
+            az ssh config --resource-group myResourceGroup --file ./sshconfig
+            az ssh config --tag env=dev --file ./sshconfig
+            ssh -F ./sshconfig myResourceGroup-myVM
 """
 
 helps['ssh cert'] = """
@@ -37,6 +37,10 @@ def load_arguments(self, _):
                          'Default to .clientsshproxy folder in user\'s home directory if not provided.'))
         c.argument('winrdp', options_list=['--winrdp', '--rdp'], help=('Start RDP connection over SSH.'),
                    action='store_true')
+        c.argument('use_cert_cache', options_list=['--use-cert-cache'], action='store_true',
+                   help=('Reuse an unexpired AAD certificate and key pair cached for the signed in account instead '
+                         'of requesting new ones for every connection. Certificates that are about to expire are '
+                         'renewed in the background.'))
         c.positional('ssh_args', nargs='*', help='Additional arguments passed to OpenSSH')
 
     with self.argument_context('ssh config') as c:
@@ -67,6 +71,10 @@ def load_arguments(self, _):
         c.argument('ssh_client_folder', options_list=['--ssh-client-folder'],
                    help='Folder path that contains ssh executables (ssh.exe, ssh-keygen.exe, etc). '
                    'Default to ssh pre-installed if not provided.')
+        c.argument('tag', options_list=['--tag'],
+                   help='Create entries for every Azure VM and Arc Server with this tag, in "key[=value]" format. '
+                   'Searches the whole subscription unless --resource-group is also given. When only '
+                   '--resource-group is given, entries are created for every machine in that resource group.')
 
     with self.argument_context('ssh cert') as c:
         c.argument('cert_path', options_list=['--file', '-f'],
@@ -103,4 +111,8 @@ def load_arguments(self, _):
                          'Default to .clientsshproxy folder in user\'s home directory if not provided.'))
         c.argument('winrdp', options_list=['--winrdp', '--rdp'], help=('Start RDP connection over SSH.'),
                    action='store_true')
+        c.argument('use_cert_cache', options_list=['--use-cert-cache'], action='store_true',
+                   help=('Reuse an unexpired AAD certificate and key pair cached for the signed in account instead '
+                         'of requesting new ones for every connection. Certificates that are about to expire are '
+                         'renewed in the background.'))
         c.positional('ssh_args', nargs='*', help='Additional arguments passed to OpenSSH')
@@ -0,0 +1,116 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from azure.cli.core import azclierror
+from azure.mgmt.resource import ResourceManagementClient
+from azure.cli.core.commands.client_factory import get_mgmt_service_client
+from msrestazure import tools
+from knack import log
+
+from . import ip_utils
+from . import connectivity_utils
+from . import ssh_info
+from . import constants as const
+
+logger = log.get_logger(__name__)
+
+
+def list_config_targets(cmd, resource_group_name, tag, resource_type):
+    # Returns (resource_group_name, vm_name, resource_type) for every machine that matches the filters.
+    resource_client = get_mgmt_service_client(cmd.cli_ctx, ResourceManagementClient)
+    resource_filter = None
+    if tag:
+        tag_name, _, tag_value = tag.partition('=')
+        resource_filter = f"tagName eq '{tag_name}'"
+        if tag_value:
+            resource_filter += f" and tagValue eq '{tag_value}'"
+    elif resource_type:
+        resource_filter = f"resourceType eq '{resource_type}'"
+
+    if resource_group_name:
+        resources = resource_client.resources.list_by_resource_group(resource_group_name, filter=resource_filter)
+    else:
+        resources = resource_client.resources.list(filter=resource_filter)
+
+    targets = []
+    for resource in resources:
+        target_type = resource.type.lower()
+        # ARM can't filter on tags and type at the same time, the type is filtered here instead.
+        if target_type not in const.BULK_CONFIG_SUPPORTED_RESOURCE_TYPES:
+            continue
+        if resource_type and target_type != resource_type.lower():
+            continue
+        targets.append((tools.parse_resource_id(resource.id)['resource_group'], resource.name,
+                        const.RESOURCE_TYPE_LOWER_CASE_TO_CORRECT_CASE[target_type]))
+    return sorted(targets, key=lambda target: (target[0].lower(), target[1].lower()))
+
+
+def resolve_config_sessions(cmd, targets, config_path, credentials, use_private_ip, port, credentials_folder,
+                            proxy_path, cert_lifetime):
+    # Resolves IP addresses and relay information of all targets concurrently.
+    # credentials is a (public_key_file, private_key_file, cert_file, local_user) tuple shared by every host.
+    # Returns the ConfigSessions that were resolved, in the order of targets, and a list of failures.
+    public_key_file, private_key_file, cert_file, local_user = credentials
+
+    def resolve(target):
+        resource_group_name, vm_name, resource_type = target
+        session = ssh_info.ConfigSession(config_path, resource_group_name, vm_name, None, public_key_file,
+                                         private_key_file, False, use_private_ip, local_user, cert_file, port,
+                                         resource_type, credentials_folder, None, None)
+        session.show_expiration_messages = False
+        if session.is_arc():
+            session.proxy_path = proxy_path
+            session.relay_info = connectivity_utils.get_relay_information(cmd, resource_group_name, vm_name,
+                                                                          resource_type, cert_lifetime, port)
+        else:
+            session.ip = ip_utils.get_ssh_ip(cmd, resource_group_name, vm_name, use_private_ip)
+            if not session.ip:
+                raise azclierror.ResourceNotFoundError(f"VM '{vm_name}' does not have an IP address to SSH to")
+        return session
+
+    sessions = {}
+    failures = []
+    with ThreadPoolExecutor(max_workers=const.BULK_CONFIG_MAX_WORKERS) as executor:
+        futures = {executor.submit(resolve, target): target for target in targets}
+        for future in as_completed(futures):
+            target = futures[future]
+            # pylint: disable=broad-except
+            try:
+                sessions[target] = future.result()
+            except Exception as e:
+                logger.debug("Couldn't resolve %s in %s. Error: %s", target[1], target[0], str(e))
+                failures.append((target, str(e)))
+
+    return [sessions[target] for target in targets if target in sessions], failures
+
+
+def write_config_entries(config_path, sessions, overwrite, is_aad):
+    # Relay information files are written first, then the whole config is swapped in with a single rename so
+    # that ssh never reads a partially written file.
+    entries = []
+    for session in sessions:
+        entries = entries + session.get_config_text(is_aad)
+
+    existing_text = ""
+    if not overwrite and os.path.isfile(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            existing_text = f.read()
+
+    config_folder = os.path.dirname(config_path)
+    fd, temp_path = tempfile.mkstemp(dir=config_folder, prefix=".az_ssh_config")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(existing_text + '\n'.join(entries))
+        if os.path.isfile(config_path):
+            os.chmod(temp_path, os.stat(config_path).st_mode)
+        os.replace(temp_path, config_path)
+    except Exception as e:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise azclierror.FileOperationError(f"Couldn't write SSH config to {config_path}. Error: {str(e)}") from e
@@ -0,0 +1,115 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import datetime
+import hashlib
+import threading
+
+from azure.cli.core import azclierror
+from knack import log
+
+from . import ssh_utils
+from . import file_utils
+from . import constants as const
+
+logger = log.get_logger(__name__)
+
+
+def get_cached_credentials(cmd, ssh_client_folder, get_certificate):
+    # Returns (public_key_file, private_key_file, cert_file, username) for the signed in account.
+    # A certificate is only requested when there is no cached one that is valid for long enough, and one that is
+    # about to expire is renewed in the background so that following connections don't have to wait for it.
+    # get_certificate(cmd, public_key_file, cert_file, ssh_client_folder) writes a new certificate to cert_file.
+    cache_folder = _get_cache_folder(cmd)
+    public_key_file, private_key_file, cert_file = _get_credential_paths(cache_folder)
+
+    parsed_cert = _get_valid_cert(cert_file, const.CERT_CACHE_MINIMUM_VALIDITY_IN_SECONDS)
+    if not parsed_cert:
+        with file_utils.file_lock(os.path.join(cache_folder, "lock")):
+            # Another process might have renewed the certificate while we were waiting for the lock.
+            parsed_cert = _get_valid_cert(cert_file, const.CERT_CACHE_MINIMUM_VALIDITY_IN_SECONDS)
+            if not parsed_cert:
+                logger.debug("No valid cached certificate found in %s. Requesting a new one.", cache_folder)
+                _renew_certificate(cmd, public_key_file, private_key_file, cert_file, ssh_client_folder,
+                                   get_certificate)
+                parsed_cert = ssh_utils.parse_ssh_cert(cert_file)
+                if not parsed_cert:
+                    raise azclierror.FileOperationError(f"Couldn't read cached certificate {cert_file}.")
+    elif not _get_valid_cert(cert_file, const.CERT_CACHE_REFRESH_WINDOW_IN_SECONDS):
+        logger.debug("Cached certificate %s is about to expire. Renewing it in the background.", cert_file)
+        refresh_thread = threading.Thread(target=_renew_certificate_in_background,
+                                          args=(cmd, cache_folder, public_key_file, private_key_file, cert_file,
+                                                ssh_client_folder, get_certificate))
+        refresh_thread.start()
+    else:
+        logger.debug("Using cached certificate %s", cert_file)
+
+    return public_key_file, private_key_file, cert_file, parsed_cert.principals[0].lower()
+
+
+def get_remaining_validity_in_seconds(cert_file):
+    parsed_cert = ssh_utils.parse_ssh_cert(cert_file)
+    if not parsed_cert:
+        return None
+    return (parsed_cert.get_validity_times()[1] - datetime.datetime.now()).total_seconds()
+
+
+def _get_cache_folder(cmd):
+    from azure.cli.core._profile import Profile
+    subscription = Profile(cli_ctx=cmd.cli_ctx).get_subscription()
+    # Certificates are issued to the signed in principal by its tenant, so those identify a cache entry.
+    identity = "|".join([cmd.cli_ctx.cloud.name.lower(), subscription["tenantId"].lower(),
+                         subscription["user"]["name"].lower()])
+    cache_key = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+    cache_folder = os.path.join(cmd.cli_ctx.config.config_dir, const.CERT_CACHE_FOLDER_NAME, cache_key)
+    if not os.path.isdir(cache_folder):
+        file_utils.mkdir_p(cache_folder)
+    return cache_folder
+
+
+def _get_credential_paths(cache_folder):
+    public_key_file = os.path.join(cache_folder, "id_rsa.pub")
+    private_key_file = os.path.join(cache_folder, "id_rsa")
+    cert_file = public_key_file + "-aadcert.pub"
+    return public_key_file, private_key_file, cert_file
+
+
+def _get_valid_cert(cert_file, minimum_validity_in_seconds):
+    parsed_cert = ssh_utils.parse_ssh_cert(cert_file)
+    if not parsed_cert or not parsed_cert.principals:
+        return None
+    end_time = parsed_cert.get_validity_times()[1]
+    if end_time - datetime.datetime.now() < datetime.timedelta(seconds=minimum_validity_in_seconds):
+        return None
+    return parsed_cert
+
+
+def _renew_certificate(cmd, public_key_file, private_key_file, cert_file, ssh_client_folder, get_certificate):
+    # The key pair is generated once and reused by every certificate issued for this cache entry.
+    if not os.path.isfile(private_key_file) or not os.path.isfile(public_key_file):
+        file_utils.delete_file(private_key_file, f"Couldn't delete incomplete key pair {private_key_file}. ")
+        file_utils.delete_file(public_key_file, f"Couldn't delete incomplete key pair {public_key_file}. ")
+        ssh_utils.create_ssh_keyfile(private_key_file, ssh_client_folder)
+
+    # Write to a temporary file and swap it in, so that concurrent readers never see a partial certificate.
+    temp_cert_file = cert_file + ".tmp"
+    get_certificate(cmd, public_key_file, temp_cert_file, ssh_client_folder)
+    os.replace(temp_cert_file, cert_file)
+
+
+def _renew_certificate_in_background(cmd, cache_folder, public_key_file, private_key_file, cert_file,
+                                     ssh_client_folder, get_certificate):
+    # pylint: disable=broad-except
+    try:
+        # If another process is already renewing this certificate, there is nothing left to do.
+        with file_utils.file_lock(os.path.join(cache_folder, "lock"), timeout=0):
+            if _get_valid_cert(cert_file, const.CERT_CACHE_REFRESH_WINDOW_IN_SECONDS):
+                return
+            _renew_certificate(cmd, public_key_file, private_key_file, cert_file, ssh_client_folder,
+                               get_certificate)
+            logger.debug("Renewed cached certificate %s", cert_file)
+    except Exception as e:
+        logger.debug("Couldn't renew cached certificate %s in the background. Error: %s", cert_file, str(e))
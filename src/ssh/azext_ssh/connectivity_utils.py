@@ -6,12 +6,15 @@
 import time
 import stat
 import os
+import hashlib
+import threading
 import urllib.request
 import json
 import base64
 from glob import glob
 
 import colorama
+import oschmod
 
 from azure.cli.core.style import Style, print_styled_text
 from azure.core.exceptions import ResourceNotFoundError
@@ -28,14 +31,51 @@ logger = log.get_logger(__name__)
 
 
 # Get the Access Details to connect to Arc Connectivity platform from the HybridConnectivity RP
-def get_relay_information(cmd, resource_group, vm_name, resource_type, certificate_validity_in_seconds):
-    from azext_ssh._client_factory import cf_endpoint
-    client = cf_endpoint(cmd.cli_ctx)
-
+def get_relay_information(cmd, resource_group, vm_name, resource_type, certificate_validity_in_seconds, port=None):
     if not certificate_validity_in_seconds or \
        certificate_validity_in_seconds > consts.RELAY_INFO_MAXIMUM_DURATION_IN_SECONDS:
         certificate_validity_in_seconds = consts.RELAY_INFO_MAXIMUM_DURATION_IN_SECONDS
 
+    # Relay information is reused until it is close to expiring, so that repeated connections to the same
+    # machine don't have to wait for the HybridConnectivity RP.
+    # pylint: disable=broad-except
+    try:
+        cache_path = _get_relay_info_cache_path(cmd, resource_group, vm_name, resource_type, port)
+    except Exception as e:
+        logger.debug("Couldn't determine relay information cache location. Error: %s", str(e))
+        return _request_relay_information(cmd, resource_group, vm_name, resource_type,
+                                          certificate_validity_in_seconds)
+
+    relay_info = _read_cached_relay_info(cache_path, consts.RELAY_INFO_CACHE_MINIMUM_VALIDITY_IN_SECONDS)
+    if not relay_info:
+        try:
+            with file_utils.file_lock(cache_path + ".lock"):
+                # Another process might have cached new relay information while we were waiting for the lock.
+                relay_info = _read_cached_relay_info(cache_path, consts.RELAY_INFO_CACHE_MINIMUM_VALIDITY_IN_SECONDS)
+                if not relay_info:
+                    relay_info = _request_relay_information(cmd, resource_group, vm_name, resource_type,
+                                                            certificate_validity_in_seconds)
+                    _write_cached_relay_info(cache_path, relay_info)
+        except azclierror.FileOperationError as e:
+            logger.debug("Couldn't lock relay information cache. Error: %s", str(e))
+            relay_info = _request_relay_information(cmd, resource_group, vm_name, resource_type,
+                                                    certificate_validity_in_seconds)
+    elif not _read_cached_relay_info(cache_path, consts.RELAY_INFO_CACHE_REFRESH_WINDOW_IN_SECONDS):
+        logger.debug("Cached relay information %s is about to expire. Renewing it in the background.", cache_path)
+        refresh_thread = threading.Thread(target=_renew_relay_info_in_background,
+                                          args=(cmd, cache_path, resource_group, vm_name, resource_type,
+                                                certificate_validity_in_seconds))
+        refresh_thread.start()
+    else:
+        logger.debug("Using cached relay information %s", cache_path)
+
+    return relay_info
+
+
+def _request_relay_information(cmd, resource_group, vm_name, resource_type, certificate_validity_in_seconds):
+    from azext_ssh._client_factory import cf_endpoint
+    client = cf_endpoint(cmd.cli_ctx)
+
     try:
         t0 = time.time()
         result = client.list_credentials(resource_group_name=resource_group, machine_name=vm_name,
@@ -60,6 +100,66 @@ def get_relay_information(cmd, resource_group, vm_name, resource_type, certifica
     return result
 
 
+def _get_relay_info_cache_path(cmd, resource_group, vm_name, resource_type, port):
+    from azure.cli.core._profile import Profile
+    subscription = Profile(cli_ctx=cmd.cli_ctx).get_subscription()
+    # Relay information is issued to the signed in principal for a single endpoint, so all of those are part of
+    # the cache key.
+    identity = "|".join([cmd.cli_ctx.cloud.name, subscription["id"], subscription["user"]["name"], resource_group,
+                         vm_name, resource_type, str(port or "")]).lower()
+    cache_key = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+    cache_folder = os.path.join(cmd.cli_ctx.config.config_dir, consts.RELAY_INFO_CACHE_FOLDER_NAME)
+    if not os.path.isdir(cache_folder):
+        file_utils.mkdir_p(cache_folder)
+    return os.path.join(cache_folder, cache_key + ".json")
+
+
+def _read_cached_relay_info(cache_path, minimum_validity_in_seconds):
+    from azext_ssh.vendored_sdks.hybridconnectivity.models import EndpointAccessResource
+    # pylint: disable=broad-except
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            relay_info = EndpointAccessResource.deserialize(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug("Couldn't read cached relay information %s. Error: %s", cache_path, str(e))
+        return None
+    if not relay_info.expires_on or relay_info.expires_on - time.time() < minimum_validity_in_seconds:
+        return None
+    return relay_info
+
+
+def _write_cached_relay_info(cache_path, relay_info):
+    # pylint: disable=broad-except
+    try:
+        # The access key is a secret, only the current user may read it. Write to a temporary file and swap it in,
+        # so that concurrent readers never see partial relay information.
+        temp_path = cache_path + ".tmp"
+        file_utils.write_to_file(temp_path, 'w', json.dumps(relay_info.serialize(keep_readonly=True)),
+                                 f"Couldn't write relay information to file {temp_path}.", 'utf-8')
+        oschmod.set_mode(temp_path, 0o600)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        logger.debug("Couldn't cache relay information in %s. Error: %s", cache_path, str(e))
+
+
+def _renew_relay_info_in_background(cmd, cache_path, resource_group, vm_name, resource_type,
+                                    certificate_validity_in_seconds):
+    # pylint: disable=broad-except
+    try:
+        # If another process is already renewing this relay information, there is nothing left to do.
+        with file_utils.file_lock(cache_path + ".lock", timeout=0):
+            if _read_cached_relay_info(cache_path, consts.RELAY_INFO_CACHE_REFRESH_WINDOW_IN_SECONDS):
+                return
+            relay_info = _request_relay_information(cmd, resource_group, vm_name, resource_type,
+                                                    certificate_validity_in_seconds)
+            _write_cached_relay_info(cache_path, relay_info)
+            logger.debug("Renewed cached relay information %s", cache_path)
+    except Exception as e:
+        logger.debug("Couldn't renew cached relay information %s in the background. Error: %s", cache_path, str(e))
+
+
 def _create_default_endpoint(cmd, resource_group, vm_name, resource_type, client):
     namespace = resource_type.split('/', 1)[0]
     arc_type = resource_type.split('/', 1)[1]
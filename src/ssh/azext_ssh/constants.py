@@ -18,6 +18,21 @@ RECOMMENDATION_SSH_CLIENT_NOT_FOUND = (Fore.YELLOW + "Ensure OpenSSH is installe
 RECOMMENDATION_RESOURCE_NOT_FOUND = (Fore.YELLOW + "Please ensure the active subscription is set properly "
                                      "and resource exists." + Style.RESET_ALL)
 RDP_TERMINATE_SSH_WAIT_TIME_IN_SECONDS = 30
+FILE_LOCK_TIMEOUT_IN_SECONDS = 60
+FILE_LOCK_STALE_AFTER_IN_SECONDS = 120
+FILE_LOCK_POLL_INTERVAL_IN_SECONDS = 0.1
+CERT_CACHE_FOLDER_NAME = "ssh_cert_cache"
+# A cached certificate is only used if it is valid for at least this long
+CERT_CACHE_MINIMUM_VALIDITY_IN_SECONDS = 120
+# A cached certificate that expires within this window is renewed in the background
+CERT_CACHE_REFRESH_WINDOW_IN_SECONDS = 900
+RELAY_INFO_CACHE_FOLDER_NAME = "ssh_relay_info_cache"
+# Cached relay information is only used if it is valid for at least this long
+RELAY_INFO_CACHE_MINIMUM_VALIDITY_IN_SECONDS = 300
+# Cached relay information that expires within this window is renewed in the background
+RELAY_INFO_CACHE_REFRESH_WINDOW_IN_SECONDS = 900
+BULK_CONFIG_MAX_WORKERS = 8
+BULK_CONFIG_TAGGED_FOLDER_NAME = "tagged_machines"
 
 ARC_RESOURCE_TYPE_PLACEHOLDER = "arc_resource_type_placeholder"
 
@@ -27,6 +42,11 @@ SUPPORTED_RESOURCE_TYPES = ["microsoft.hybridcompute/machines",
                             "microsoft.scvmm/virtualmachines",
                             "microsoft.azurestackhci/virtualmachines"]
 
+# Resource types that az ssh config can discover when generating entries for many machines at once.
+BULK_CONFIG_SUPPORTED_RESOURCE_TYPES = ["microsoft.compute/virtualmachines",
+                                        "microsoft.hybridcompute/machines",
+                                        "microsoft.connectedvmwarevsphere/virtualmachines"]
+
 # Old version incorrectly used resource providers instead of resource type.
 # Will continue to support to avoid breaking backwards compatibility.
 LEGACY_SUPPORTED_RESOURCE_TYPES = ["microsoft.hybridcompute",
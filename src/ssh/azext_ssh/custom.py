@@ -20,6 +20,8 @@ from . import ip_utils
 from . import rdp_utils
 from . import rsa_parser
 from . import ssh_utils
+from . import cert_cache_utils
+from . import bulk_config_utils
 from . import connectivity_utils
 from . import ssh_info
 from . import file_utils
@@ -33,12 +35,18 @@ logger = log.get_logger(__name__)
 def ssh_vm(cmd, resource_group_name=None, vm_name=None, ssh_ip=None, public_key_file=None,
            private_key_file=None, use_private_ip=False, local_user=None, cert_file=None, port=None,
            ssh_client_folder=None, delete_credentials=False, resource_type=None, ssh_proxy_folder=None,
-           winrdp=False, ssh_args=None):
+           winrdp=False, ssh_args=None, use_cert_cache=False):
 
     # delete_credentials can only be used by Azure Portal to provide one-click experience on CloudShell.
     if delete_credentials and os.environ.get("AZUREPS_HOST_ENVIRONMENT") != "cloud-shell/1.0":
         raise azclierror.ArgumentUsageError("Can't use --delete-private-key outside an Azure Cloud Shell session.")
 
+    # Cached credentials are owned by the extension, so they can't be combined with user provided credentials.
+    if use_cert_cache and (public_key_file or private_key_file or cert_file or local_user or delete_credentials):
+        raise azclierror.MutuallyExclusiveArgumentError(
+            "--use-cert-cache can't be used with --public-key-file, --private-key-file, --certificate-file, "
+            "--local-user or --delete-private-key.")
+
     # include openssh client logs to --debug output to make it easier to users to debug connection issued.
     if '--debug' in cmd.cli_ctx.data['safe_params'] and set(['-v', '-vv', '-vvv']).isdisjoint(ssh_args):
         ssh_args = ['-vvv'] if not ssh_args else ['-vvv'] + ssh_args
@@ -59,7 +67,7 @@ def ssh_vm(cmd, resource_group_name=None, vm_name=None, ssh_ip=None, public_key_
     ssh_session = ssh_info.SSHSession(resource_group_name, vm_name, ssh_ip, public_key_file,
                                       private_key_file, use_private_ip, local_user, cert_file, port,
                                       ssh_client_folder, ssh_args, delete_credentials, resource_type,
-                                      ssh_proxy_folder, credentials_folder, winrdp)
+                                      ssh_proxy_folder, credentials_folder, winrdp, use_cert_cache)
     ssh_session.resource_type = resource_type_utils.decide_resource_type(cmd, ssh_session)
     target_os_utils.handle_target_os_type(cmd, ssh_session)
 
@@ -69,12 +77,22 @@ def ssh_vm(cmd, resource_group_name=None, vm_name=None, ssh_ip=None, public_key_
 def ssh_config(cmd, config_path, resource_group_name=None, vm_name=None, ssh_ip=None,
                public_key_file=None, private_key_file=None, overwrite=False, use_private_ip=False,
                local_user=None, cert_file=None, port=None, resource_type=None, credentials_folder=None,
-               ssh_proxy_folder=None, ssh_client_folder=None):
+               ssh_proxy_folder=None, ssh_client_folder=None, tag=None):
 
     # If user provides their own key pair, certificate will be written in the same folder as public key.
     if (public_key_file or private_key_file) and credentials_folder:
         raise azclierror.ArgumentUsageError("--keys-destination-folder can't be used in conjunction with "
                                             "--public-key-file/-p or --private-key-file/-i.")
+
+    # Without a single target, generate entries for every machine in the resource group or with the tag.
+    if tag or (resource_group_name and not vm_name and not ssh_ip):
+        if vm_name or ssh_ip:
+            raise azclierror.MutuallyExclusiveArgumentError("--tag can't be used with --vm-name/--name or --ip.")
+        _do_bulk_ssh_config(cmd, config_path, resource_group_name, tag, public_key_file, private_key_file,
+                            overwrite, use_private_ip, local_user, cert_file, port, resource_type,
+                            credentials_folder, ssh_proxy_folder, ssh_client_folder)
+        return
+
     _assert_args(resource_group_name, vm_name, ssh_ip, resource_type, cert_file, local_user)
 
     config_session = ssh_info.ConfigSession(config_path, resource_group_name, vm_name, ssh_ip, public_key_file,
@@ -142,13 +160,14 @@ def ssh_cert(cmd, cert_path=None, public_key_file=None, ssh_client_folder=None):
 
 def ssh_arc(cmd, resource_group_name=None, vm_name=None, public_key_file=None, private_key_file=None,
             local_user=None, cert_file=None, port=None, resource_type=None, ssh_client_folder=None,
-            delete_credentials=False, ssh_proxy_folder=None, winrdp=False, ssh_args=None):
+            delete_credentials=False, ssh_proxy_folder=None, winrdp=False, ssh_args=None, use_cert_cache=False):
 
     if not resource_type:
         resource_type = const.ARC_RESOURCE_TYPE_PLACEHOLDER
 
     ssh_vm(cmd, resource_group_name, vm_name, None, public_key_file, private_key_file, False, local_user, cert_file,
-           port, ssh_client_folder, delete_credentials, resource_type, ssh_proxy_folder, winrdp, ssh_args)
+           port, ssh_client_folder, delete_credentials, resource_type, ssh_proxy_folder, winrdp, ssh_args,
+           use_cert_cache)
 
 
 def _do_ssh_op(cmd, op_info, op_call):
@@ -169,7 +188,14 @@ def _do_ssh_op(cmd, op_info, op_call):
     delete_cert = False
     cert_lifetime = None
     # If user provides a local user, use the provided credentials for authentication
-    if not op_info.local_user:
+    if not op_info.local_user and op_info.use_cert_cache:
+        # Cached credentials are reused by later connections, so they are never deleted.
+        op_info.public_key_file, op_info.private_key_file, op_info.cert_file, op_info.local_user = \
+            cert_cache_utils.get_cached_credentials(cmd, op_info.ssh_client_folder, _get_and_write_certificate)
+        if op_info.is_arc():
+            remaining_validity = cert_cache_utils.get_remaining_validity_in_seconds(op_info.cert_file)
+            cert_lifetime = int(remaining_validity) if remaining_validity else None
+    elif not op_info.local_user:
         delete_cert = True
         op_info.public_key_file, op_info.private_key_file, delete_keys = \
             _check_or_create_public_private_files(op_info.public_key_file, op_info.private_key_file,
@@ -189,7 +215,7 @@ def _do_ssh_op(cmd, op_info, op_call):
             op_info.proxy_path = connectivity_utils.get_client_side_proxy(op_info.ssh_proxy_folder)
             op_info.relay_info = connectivity_utils.get_relay_information(cmd, op_info.resource_group_name,
                                                                           op_info.vm_name, op_info.resource_type,
-                                                                          cert_lifetime)
+                                                                          cert_lifetime, op_info.port)
     except Exception as e:
         if delete_keys or delete_cert:
             logger.debug("An error occured before operation concluded. Deleting generated keys: %s %s %s",
@@ -203,6 +229,80 @@ def _do_ssh_op(cmd, op_info, op_call):
     op_call(op_info, delete_keys, delete_cert)
 
 
+def _do_bulk_ssh_config(cmd, config_path, resource_group_name, tag, public_key_file, private_key_file, overwrite,
+                        use_private_ip, local_user, cert_file, port, resource_type, credentials_folder,
+                        ssh_proxy_folder, ssh_client_folder):
+    # pylint: disable=too-many-locals
+    if resource_type and resource_type.lower() in const.RESOURCE_PROVIDER_TO_RESOURCE_TYPE:
+        resource_type = const.RESOURCE_PROVIDER_TO_RESOURCE_TYPE[resource_type.lower()]
+    if resource_type and resource_type.lower() not in const.BULK_CONFIG_SUPPORTED_RESOURCE_TYPES:
+        raise azclierror.InvalidArgumentValueError("--resource-type must be either "
+                                                   "\"Microsoft.Compute/virtualMachines\", "
+                                                   "\"Microsoft.HybridCompute/machines\", "
+                                                   "or \"Microsoft.ConnectedVMwarevSphere/virtualMachines\".")
+    if cert_file and not local_user:
+        raise azclierror.MutuallyExclusiveArgumentError(
+            "To authenticate with a certificate you need to provide a --local-user")
+    if cert_file and not os.path.isfile(cert_file):
+        raise azclierror.FileOperationError(f"Certificate file {cert_file} not found")
+
+    config_path = os.path.abspath(config_path)
+    config_folder = os.path.dirname(config_path)
+    if not os.path.isdir(config_folder):
+        raise azclierror.InvalidArgumentValueError(f"Config file destination folder {config_folder} "
+                                                   "does not exist.")
+    if not credentials_folder:
+        folder_name = resource_group_name if not tag else const.BULK_CONFIG_TAGGED_FOLDER_NAME
+        credentials_folder = os.path.join(config_folder, os.path.join("az_ssh_config", folder_name))
+    credentials_folder = os.path.abspath(credentials_folder)
+
+    targets = bulk_config_utils.list_config_targets(cmd, resource_group_name, tag, resource_type)
+    if not targets:
+        raise azclierror.ResourceNotFoundError("No Azure VMs or Arc servers matching the filters were found.",
+                                               const.RECOMMENDATION_RESOURCE_NOT_FOUND)
+    has_arc_targets = any(target[2].lower() != "microsoft.compute/virtualmachines" for target in targets)
+
+    # Every entry shares the same credentials, so the certificate is only requested once.
+    is_aad = not local_user
+    cert_lifetime = None
+    if is_aad:
+        public_key_file, private_key_file, _ = \
+            _check_or_create_public_private_files(public_key_file, private_key_file, credentials_folder,
+                                                  ssh_client_folder)
+        cert_file, local_user = _get_and_write_certificate(cmd, public_key_file, None, ssh_client_folder)
+        if has_arc_targets:
+            # pylint: disable=broad-except
+            try:
+                cert_lifetime = ssh_utils.get_certificate_lifetime(cert_file, ssh_client_folder).total_seconds()
+            except Exception as e:
+                logger.warning("Couldn't determine certificate expiration. Error: %s", str(e))
+
+    proxy_path = connectivity_utils.get_client_side_proxy(ssh_proxy_folder) if has_arc_targets else None
+    sessions, failures = bulk_config_utils.resolve_config_sessions(
+        cmd, targets, config_path, (public_key_file, private_key_file, cert_file, local_user), use_private_ip,
+        port, credentials_folder, proxy_path, cert_lifetime)
+    for (target_resource_group, target_name, _), error in failures:
+        logger.warning("Skipping %s in resource group %s. Error: %s", target_name, target_resource_group, error)
+    if not sessions:
+        raise azclierror.UnclassifiedUserFault("Couldn't generate a config entry for any of the matching machines.")
+
+    bulk_config_utils.write_config_entries(config_path, sessions, overwrite, is_aad)
+
+    if is_aad:
+        # pylint: disable=broad-except
+        try:
+            expiration = ssh_utils.get_certificate_start_and_end_times(cert_file, ssh_client_folder)[1]
+            expiration = expiration.strftime("%Y-%m-%d %I:%M:%S %p")
+            print_styled_text((Style.SUCCESS,
+                               f"Generated SSH certificate {cert_file} is valid until {expiration} in local time."))
+        except Exception as e:
+            logger.warning("Couldn't determine certificate expiration. Error: %s", str(e))
+    if is_aad or has_arc_targets:
+        logger.warning("%s contains sensitive information. Please delete it once you no longer "
+                       "need this config file.", credentials_folder)
+    print_styled_text((Style.SUCCESS, f"Added {len(sessions)} of {len(targets)} machines to {config_path}."))
+
+
 def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folder):
     cloudtoscope = {
         "azurecloud": "https://pas.windows.net/CheckMyAccess/Linux/.default",
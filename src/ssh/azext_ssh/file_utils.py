@@ -5,6 +5,8 @@
 
 import errno
 import os
+import time
+from contextlib import contextmanager
 from azure.cli.core import azclierror
 from knack import log
 from . import constants as const
@@ -84,3 +86,30 @@ def remove_invalid_characters_foldername(folder_name):
         if c not in const.WINDOWS_INVALID_FOLDERNAME_CHARS:
             new_foldername += c
     return new_foldername
+
+
+@contextmanager
+def file_lock(lock_path, timeout=const.FILE_LOCK_TIMEOUT_IN_SECONDS):
+    # Exclusively creating the lock file works the same way on every platform and across processes.
+    # Locks older than FILE_LOCK_STALE_AFTER_IN_SECONDS were left behind by a dead process and are taken over.
+    deadline = time.time() + timeout
+    while True:
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(lock_fd)
+            break
+        except FileExistsError as e:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > const.FILE_LOCK_STALE_AFTER_IN_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() >= deadline:
+                raise azclierror.FileOperationError(f"Couldn't acquire lock {lock_path}. If no other az ssh command "
+                                                    "is running, delete the file and try again.") from e
+            time.sleep(const.FILE_LOCK_POLL_INTERVAL_IN_SECONDS)
+    try:
+        yield
+    finally:
+        delete_file(lock_path, f"Couldn't delete lock file {lock_path}. ", True)
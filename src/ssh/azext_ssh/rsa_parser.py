@@ -4,9 +4,22 @@
 # --------------------------------------------------------------------------------------------
 
 import base64
+import datetime
 import struct
 
 
+def get_fields(data, big_endian=True):
+    # Splits the length prefixed fields of an OpenSSH key or certificate field
+    struct_format = (">" if big_endian else "<") + "L"
+    read = 0
+    while read < len(data):
+        length = struct.unpack(struct_format, data[read:read + 4])[0]
+        read = read + 4
+        field = data[read:read + length]
+        read = read + length
+        yield field
+
+
 class RSAParser():
     # pylint: disable=too-few-public-methods
     RSAAlgorithm = 'ssh-rsa'
@@ -47,14 +60,80 @@ class RSAParser():
         self.modulus = base64.urlsafe_b64encode(fields[2]).decode("ascii")
 
     def _get_fields(self, key_bytes):
-        read = 0
-        while read < len(key_bytes):
-            length = struct.unpack(self._get_struct_format(), key_bytes[read:read + 4])[0]
-            read = read + 4
-            data = key_bytes[read:read + length]
-            read = read + length
-            yield data
-
-    def _get_struct_format(self):
-        format_start = ">" if self._key_length_big_endian else "<"
-        return format_start + "L"
+        return get_fields(key_bytes, self._key_length_big_endian)
+
+
+class SSHCertificateParser():
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    RSACertificateAlgorithm = 'ssh-rsa-cert-v01@openssh.com'
+    # valid_before value OpenSSH uses for certificates that never expire
+    ValidForever = 0xFFFFFFFFFFFFFFFF
+
+    def __init__(self):
+        self.algorithm = ''
+        self.modulus = ''
+        self.exponent = ''
+        self.serial = 0
+        self.cert_type = 0
+        self.key_id = ''
+        self.principals = []
+        self.valid_after = 0
+        self.valid_before = 0
+        self._read = 0
+        self._cert_bytes = b''
+
+    def parse(self, certificate_text):
+        # Layout is described in PROTOCOL.certkeys of the OpenSSH source.
+        text_parts = certificate_text.split()
+
+        if len(text_parts) < 2:
+            error_str = ("Incorrectly formatted certificate. "
+                         "Certificate must be format '<algorithm> <base64_certificate>'")
+            raise ValueError(error_str)
+
+        algorithm = text_parts[0]
+        if algorithm != SSHCertificateParser.RSACertificateAlgorithm:
+            raise ValueError(f"Certificate is not {SSHCertificateParser.RSACertificateAlgorithm} ({algorithm})")
+
+        self._cert_bytes = base64.b64decode(text_parts[1])
+        self._read = 0
+
+        try:
+            encoded_algorithm = self._read_string().decode("ascii")
+            if encoded_algorithm != SSHCertificateParser.RSACertificateAlgorithm:
+                raise ValueError(f"Encoded certificate is not {SSHCertificateParser.RSACertificateAlgorithm} "
+                                 f"({encoded_algorithm})")
+            self.algorithm = encoded_algorithm
+            self._read_string()  # nonce
+            self.exponent = base64.urlsafe_b64encode(self._read_string()).decode("ascii")
+            self.modulus = base64.urlsafe_b64encode(self._read_string()).decode("ascii")
+            self.serial = self._read_uint("Q", 8)
+            self.cert_type = self._read_uint("L", 4)
+            self.key_id = self._read_string().decode("utf-8")
+            packed_principals = self._read_string()
+            self.valid_after = self._read_uint("Q", 8)
+            self.valid_before = self._read_uint("Q", 8)
+        except struct.error as e:
+            raise ValueError("Incorrectly encoded certificate. Certificate is truncated.") from e
+
+        self.principals = [principal.decode("utf-8") for principal in get_fields(packed_principals)]
+
+    def get_validity_times(self):
+        # Local naive datetimes, same as the ones printed by "ssh-keygen -L"
+        start = datetime.datetime.fromtimestamp(self.valid_after)
+        if self.valid_before == SSHCertificateParser.ValidForever:
+            return start, datetime.datetime.max
+        return start, datetime.datetime.fromtimestamp(self.valid_before)
+
+    def _read_string(self):
+        length = self._read_uint("L", 4)
+        if self._read + length > len(self._cert_bytes):
+            raise ValueError("Incorrectly encoded certificate. Certificate is truncated.")
+        data = self._cert_bytes[self._read:self._read + length]
+        self._read = self._read + length
+        return data
+
+    def _read_uint(self, struct_format, size):
+        value = struct.unpack(">" + struct_format, self._cert_bytes[self._read:self._read + size])[0]
+        self._read = self._read + size
+        return value
@@ -20,7 +20,8 @@ class SSHSession():
     # pylint: disable=too-many-instance-attributes
     def __init__(self, resource_group_name, vm_name, ssh_ip, public_key_file, private_key_file,
                  use_private_ip, local_user, cert_file, port, ssh_client_folder, ssh_args,
-                 delete_credentials, resource_type, ssh_proxy_folder, credentials_folder, winrdp):
+                 delete_credentials, resource_type, ssh_proxy_folder, credentials_folder, winrdp,
+                 use_cert_cache=False):
         self.resource_group_name = resource_group_name
         self.vm_name = vm_name
         self.ip = ssh_ip
@@ -31,6 +32,7 @@ class SSHSession():
         self.delete_credentials = delete_credentials
         self.resource_type = resource_type
         self.winrdp = winrdp
+        self.use_cert_cache = use_cert_cache
         self.proxy_path = None
         self.relay_info = None
         self.public_key_file = os.path.abspath(public_key_file) if public_key_file else None
@@ -92,6 +94,8 @@ class ConfigSession():
         self.local_user = local_user
         self.port = port
         self.resource_type = resource_type
+        self.use_cert_cache = False
+        self.show_expiration_messages = True
         self.proxy_path = None
         self.relay_info = None
         self.relay_info_path = None
@@ -188,6 +192,8 @@ class ConfigSession():
         file_utils.write_to_file(relay_info_path, 'w', connectivity_utils.format_relay_info_string(self.relay_info),
                                  f"Couldn't write relay information to file {relay_info_path}.", 'utf-8')
         oschmod.set_mode(relay_info_path, 0o644)
+        if not self.show_expiration_messages:
+            return relay_info_path
         # pylint: disable=broad-except
         try:
             expiration = datetime.datetime.fromtimestamp(self.relay_info.expires_on)
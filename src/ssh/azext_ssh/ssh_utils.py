@@ -18,6 +18,7 @@ from azure.cli.core.style import Style, print_styled_text
 
 from . import file_utils
 from . import connectivity_utils
+from . import rsa_parser
 from . import constants as const
 
 logger = log.get_logger(__name__)
@@ -170,7 +171,27 @@ def _get_ssh_cert_validity(cert_file, ssh_client_folder=None):
     return None
 
 
+def parse_ssh_cert(cert_file):
+    # Reading the certificate in-process avoids spawning ssh-keygen -L for every inspection.
+    # Returns None if the certificate can't be parsed, so callers can fall back to ssh-keygen.
+    # pylint: disable=broad-except
+    if not cert_file or not os.path.isfile(cert_file):
+        return None
+    try:
+        with open(cert_file, 'r', encoding='utf-8') as f:
+            parser = rsa_parser.SSHCertificateParser()
+            parser.parse(f.read())
+        return parser
+    except Exception as e:
+        logger.debug("Couldn't parse certificate %s natively. Error: %s", cert_file, str(e))
+        return None
+
+
 def get_certificate_start_and_end_times(cert_file, ssh_client_folder=None):
+    parsed_cert = parse_ssh_cert(cert_file)
+    if parsed_cert:
+        return parsed_cert.get_validity_times()
+
     validity_str = _get_ssh_cert_validity(cert_file, ssh_client_folder)
     times = None
     if validity_str and "Valid: from " in validity_str and " to " in validity_str:
@@ -190,6 +211,10 @@ def get_certificate_lifetime(cert_file, ssh_client_folder=None):
 
 
 def get_ssh_cert_principals(cert_file, ssh_client_folder=None):
+    parsed_cert = parse_ssh_cert(cert_file)
+    if parsed_cert:
+        return parsed_cert.principals
+
     info = get_ssh_cert_info(cert_file, ssh_client_folder)
     principals = []
     in_principal = False
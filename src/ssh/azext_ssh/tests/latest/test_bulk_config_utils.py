@@ -0,0 +1,93 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_ssh import bulk_config_utils
+
+
+class BulkConfigUtilsTest(unittest.TestCase):
+
+    def _mock_resource(self, resource_group, name, resource_type):
+        resource = mock.Mock()
+        resource.id = f"/subscriptions/sub/resourceGroups/{resource_group}/providers/{resource_type}/{name}"
+        resource.name = name
+        resource.type = resource_type
+        return resource
+
+    @mock.patch('azext_ssh.bulk_config_utils.get_mgmt_service_client')
+    def test_list_config_targets_by_tag(self, mock_client):
+        cmd = mock.Mock()
+        mock_client.return_value.resources.list.return_value = [
+            self._mock_resource("rg2", "vm", "Microsoft.Compute/virtualMachines"),
+            self._mock_resource("rg1", "disk", "Microsoft.Compute/disks"),
+            self._mock_resource("rg1", "arc", "microsoft.hybridcompute/machines")
+        ]
+
+        targets = bulk_config_utils.list_config_targets(cmd, None, "env=dev", None)
+
+        mock_client.return_value.resources.list.assert_called_once_with(
+            filter="tagName eq 'env' and tagValue eq 'dev'")
+        self.assertEqual([("rg1", "arc", "Microsoft.HybridCompute/machines"),
+                          ("rg2", "vm", "Microsoft.Compute/virtualMachines")], targets)
+
+    @mock.patch('azext_ssh.bulk_config_utils.get_mgmt_service_client')
+    def test_list_config_targets_by_resource_group_and_type(self, mock_client):
+        cmd = mock.Mock()
+        mock_client.return_value.resources.list_by_resource_group.return_value = [
+            self._mock_resource("rg", "vm", "Microsoft.Compute/virtualMachines")
+        ]
+
+        targets = bulk_config_utils.list_config_targets(cmd, "rg", None, "Microsoft.Compute/virtualMachines")
+
+        mock_client.return_value.resources.list_by_resource_group.assert_called_once_with(
+            "rg", filter="resourceType eq 'Microsoft.Compute/virtualMachines'")
+        self.assertEqual([("rg", "vm", "Microsoft.Compute/virtualMachines")], targets)
+
+    @mock.patch('azext_ssh.connectivity_utils.get_relay_information')
+    @mock.patch('azext_ssh.ip_utils.get_ssh_ip')
+    def test_resolve_config_sessions(self, mock_ip, mock_relay):
+        cmd = mock.Mock()
+        targets = [("rg", "arc", "Microsoft.HybridCompute/machines"),
+                   ("rg", "vm1", "Microsoft.Compute/virtualMachines"),
+                   ("rg", "vm2", "Microsoft.Compute/virtualMachines")]
+        mock_ip.side_effect = lambda _, __, vm_name, ___: "1.2.3.4" if vm_name == "vm1" else None
+        mock_relay.return_value = "relay"
+
+        sessions, failures = bulk_config_utils.resolve_config_sessions(
+            cmd, targets, "config", ("pub", "priv", "cert", "user"), False, "22", "creds", "proxy", 3600)
+
+        self.assertEqual(["arc", "vm1"], [session.vm_name for session in sessions])
+        self.assertEqual("relay", sessions[0].relay_info)
+        self.assertEqual("proxy", sessions[0].proxy_path)
+        self.assertEqual("1.2.3.4", sessions[1].ip)
+        self.assertEqual([targets[2]], [failure[0] for failure in failures])
+        mock_relay.assert_called_once_with(cmd, "rg", "arc", "Microsoft.HybridCompute/machines", 3600, "22")
+
+    def test_write_config_entries(self):
+        config_folder = tempfile.mkdtemp()
+        try:
+            config_path = os.path.join(config_folder, "config")
+            with open(config_path, 'w', encoding='utf-8') as f:
+                f.write("existing")
+            session = mock.Mock()
+            session.get_config_text.return_value = ["", "Host rg-vm"]
+
+            bulk_config_utils.write_config_entries(config_path, [session, session], False, True)
+
+            with open(config_path, 'r', encoding='utf-8') as f:
+                self.assertEqual("existing\nHost rg-vm\n\nHost rg-vm", f.read())
+            self.assertEqual(["config"], os.listdir(config_folder))
+            session.get_config_text.assert_called_with(True)
+        finally:
+            shutil.rmtree(config_folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
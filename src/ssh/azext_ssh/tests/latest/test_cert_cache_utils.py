@@ -0,0 +1,120 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_ssh import cert_cache_utils
+
+
+class CertCacheUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+        self.public_key_file = os.path.join(self.cache_folder, "id_rsa.pub")
+        self.private_key_file = os.path.join(self.cache_folder, "id_rsa")
+        self.cert_file = self.public_key_file + "-aadcert.pub"
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_folder, ignore_errors=True)
+
+    def _mock_cert(self, seconds_left):
+        cert = mock.Mock()
+        cert.principals = ["User@Contoso.com"]
+        now = datetime.datetime.now()
+        cert.get_validity_times.return_value = (now, now + datetime.timedelta(seconds=seconds_left))
+        return cert
+
+    @mock.patch('threading.Thread')
+    @mock.patch('azext_ssh.ssh_utils.parse_ssh_cert')
+    @mock.patch.object(cert_cache_utils, '_get_cache_folder')
+    def test_get_cached_credentials_valid_cert(self, mock_folder, mock_parse, mock_thread):
+        cmd = mock.Mock()
+        get_certificate = mock.Mock()
+        mock_folder.return_value = self.cache_folder
+        mock_parse.return_value = self._mock_cert(3600)
+
+        result = cert_cache_utils.get_cached_credentials(cmd, "client", get_certificate)
+
+        self.assertEqual((self.public_key_file, self.private_key_file, self.cert_file, "user@contoso.com"), result)
+        get_certificate.assert_not_called()
+        mock_thread.assert_not_called()
+
+    @mock.patch('threading.Thread')
+    @mock.patch('azext_ssh.ssh_utils.parse_ssh_cert')
+    @mock.patch.object(cert_cache_utils, '_get_cache_folder')
+    def test_get_cached_credentials_refresh_in_background(self, mock_folder, mock_parse, mock_thread):
+        cmd = mock.Mock()
+        get_certificate = mock.Mock()
+        mock_folder.return_value = self.cache_folder
+        mock_parse.return_value = self._mock_cert(300)
+
+        result = cert_cache_utils.get_cached_credentials(cmd, "client", get_certificate)
+
+        self.assertEqual(self.cert_file, result[2])
+        get_certificate.assert_not_called()
+        mock_thread.assert_called_once_with(target=cert_cache_utils._renew_certificate_in_background,
+                                            args=(cmd, self.cache_folder, self.public_key_file,
+                                                  self.private_key_file, self.cert_file, "client", get_certificate))
+        mock_thread.return_value.start.assert_called_once_with()
+
+    @mock.patch('azext_ssh.ssh_utils.create_ssh_keyfile')
+    @mock.patch('azext_ssh.ssh_utils.parse_ssh_cert')
+    @mock.patch.object(cert_cache_utils, '_get_cache_folder')
+    def test_get_cached_credentials_expired_cert(self, mock_folder, mock_parse, mock_create_keys):
+        cmd = mock.Mock()
+        mock_folder.return_value = self.cache_folder
+        mock_parse.side_effect = [self._mock_cert(60), self._mock_cert(60), self._mock_cert(3600)]
+
+        def create_keys(private_key_file, _):
+            for path in [private_key_file, private_key_file + ".pub"]:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write("key")
+
+        def get_certificate(_, public_key_file, cert_file, __):
+            with open(cert_file, 'w', encoding='utf-8') as f:
+                f.write("cert")
+
+        mock_create_keys.side_effect = create_keys
+
+        result = cert_cache_utils.get_cached_credentials(cmd, "client", get_certificate)
+
+        self.assertEqual((self.public_key_file, self.private_key_file, self.cert_file, "user@contoso.com"), result)
+        mock_create_keys.assert_called_once_with(self.private_key_file, "client")
+        self.assertTrue(os.path.isfile(self.cert_file))
+        self.assertFalse(os.path.isfile(self.cert_file + ".tmp"))
+        self.assertFalse(os.path.isfile(os.path.join(self.cache_folder, "lock")))
+
+    @mock.patch('azext_ssh.ssh_utils.create_ssh_keyfile')
+    def test_renew_certificate_reuses_key_pair(self, mock_create_keys):
+        for path in [self.private_key_file, self.public_key_file]:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("key")
+        get_certificate = mock.Mock()
+        get_certificate.side_effect = lambda _, __, cert_file, ___: open(cert_file, 'w', encoding='utf-8').close()
+
+        cert_cache_utils._renew_certificate("cmd", self.public_key_file, self.private_key_file, self.cert_file,
+                                            "client", get_certificate)
+
+        mock_create_keys.assert_not_called()
+        get_certificate.assert_called_once_with("cmd", self.public_key_file, self.cert_file + ".tmp", "client")
+        self.assertTrue(os.path.isfile(self.cert_file))
+
+    @mock.patch.object(cert_cache_utils, '_renew_certificate')
+    def test_renew_certificate_in_background_skips_when_locked(self, mock_renew):
+        with open(os.path.join(self.cache_folder, "lock"), 'w', encoding='utf-8'):
+            pass
+
+        cert_cache_utils._renew_certificate_in_background("cmd", self.cache_folder, self.public_key_file,
+                                                          self.private_key_file, self.cert_file, "client", None)
+
+        mock_renew.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from azext_ssh import connectivity_utils
+from azext_ssh.vendored_sdks.hybridconnectivity.models import EndpointAccessResource
+
+
+class ConnectivityUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.cache_folder, "relay.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_folder, ignore_errors=True)
+
+    def _relay_info(self, seconds_left):
+        return EndpointAccessResource.deserialize({"relay": {"namespaceName": "namespace",
+                                                             "namespaceNameSuffix": "suffix",
+                                                             "hybridConnectionName": "connection",
+                                                             "accessKey": "key",
+                                                             "expiresOn": int(time.time()) + seconds_left}})
+
+    @mock.patch('threading.Thread')
+    @mock.patch.object(connectivity_utils, '_request_relay_information')
+    @mock.patch.object(connectivity_utils, '_get_relay_info_cache_path')
+    def test_get_relay_information_cache_miss(self, mock_path, mock_request, mock_thread):
+        cmd = mock.Mock()
+        mock_path.return_value = self.cache_path
+        mock_request.return_value = self._relay_info(3600)
+
+        relay_info = connectivity_utils.get_relay_information(cmd, "rg", "vm", "type", 1800, "22")
+
+        self.assertEqual("key", relay_info.access_key)
+        mock_path.assert_called_once_with(cmd, "rg", "vm", "type", "22")
+        mock_request.assert_called_once_with(cmd, "rg", "vm", "type", 1800)
+        mock_thread.assert_not_called()
+        self.assertEqual(["relay.json"], os.listdir(self.cache_folder))
+
+    @mock.patch('threading.Thread')
+    @mock.patch.object(connectivity_utils, '_request_relay_information')
+    @mock.patch.object(connectivity_utils, '_get_relay_info_cache_path')
+    def test_get_relay_information_cache_hit(self, mock_path, mock_request, mock_thread):
+        mock_path.return_value = self.cache_path
+        connectivity_utils._write_cached_relay_info(self.cache_path, self._relay_info(3600))
+
+        relay_info = connectivity_utils.get_relay_information(mock.Mock(), "rg", "vm", "type", None)
+
+        self.assertEqual("key", relay_info.access_key)
+        self.assertEqual("namespace", relay_info.namespace_name)
+        mock_request.assert_not_called()
+        mock_thread.assert_not_called()
+
+    @mock.patch('threading.Thread')
+    @mock.patch.object(connectivity_utils, '_request_relay_information')
+    @mock.patch.object(connectivity_utils, '_get_relay_info_cache_path')
+    def test_get_relay_information_refresh_in_background(self, mock_path, mock_request, mock_thread):
+        cmd = mock.Mock()
+        mock_path.return_value = self.cache_path
+        connectivity_utils._write_cached_relay_info(self.cache_path, self._relay_info(600))
+
+        connectivity_utils.get_relay_information(cmd, "rg", "vm", "type", 7200)
+
+        mock_request.assert_not_called()
+        mock_thread.assert_called_once_with(target=connectivity_utils._renew_relay_info_in_background,
+                                            args=(cmd, self.cache_path, "rg", "vm", "type", 3600))
+        mock_thread.return_value.start.assert_called_once_with()
+
+    def test_read_cached_relay_info_expired(self):
+        connectivity_utils._write_cached_relay_info(self.cache_path, self._relay_info(60))
+
+        self.assertIsNone(connectivity_utils._read_cached_relay_info(self.cache_path, 300))
+        self.assertIsNone(connectivity_utils._read_cached_relay_info(os.path.join(self.cache_folder, "none"), 300))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 import io
+import os
 import unittest
 from unittest import mock
 from azext_ssh import custom
@@ -28,7 +29,7 @@ class SshCustomCommandTest(unittest.TestCase):
         
         custom.ssh_vm(cmd, "rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", False, "type", "proxy", False, ['-vvv'])
 
-        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", ['-vvv'], False, "type", "proxy", None, False)
+        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", ['-vvv'], False, "type", "proxy", None, False, False)
         mock_assert.assert_called_once_with("rg", "vm", "ip", "type", "cert", "username")
         mock_type.assert_called_once_with(cmd, ssh_info)
         mock_do_op.assert_called_once_with(cmd, ssh_info, ssh_utils.start_ssh_connection)
@@ -48,7 +49,7 @@ class SshCustomCommandTest(unittest.TestCase):
         
         custom.ssh_vm(cmd, "rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", False, "type", "proxy", True, ['-vvv'])
 
-        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", ['-vvv'], False, "type", "proxy", None, True)
+        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", ['-vvv'], False, "type", "proxy", None, True, False)
         mock_assert.assert_called_once_with("rg", "vm", "ip", "type", "cert", "username")
         mock_type.assert_called_once_with(cmd, ssh_info)
         mock_do_op.assert_called_once_with(cmd, ssh_info, rdp_utils.start_rdp_connection)
@@ -66,7 +67,7 @@ class SshCustomCommandTest(unittest.TestCase):
         
         custom.ssh_vm(cmd, "rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", False, "type", "proxy", False, [])
 
-        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", ['-vvv'], False, "type", "proxy", None, False)
+        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", ['-vvv'], False, "type", "proxy", None, False, False)
         mock_assert.assert_called_once_with("rg", "vm", "ip", "type", "cert", "username")
         mock_type.assert_called_once_with(cmd, ssh_info)
         mock_do_op.assert_called_once_with(cmd, ssh_info, ssh_utils.start_ssh_connection)
@@ -85,7 +86,7 @@ class SshCustomCommandTest(unittest.TestCase):
 
         custom.ssh_vm(cmd, "rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", True, "type", "proxy", False, [])
 
-        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", [], True, "type", "proxy", None, False)
+        mock_info.assert_called_once_with("rg", "vm", "ip", "public", "private", False, "username", "cert", "port", "ssh_folder", [], True, "type", "proxy", None, False, False)
         mock_assert.assert_called_once_with("rg", "vm", "ip", "type", "cert", "username")
         mock_type.assert_called_once_with(cmd, ssh_info)
         mock_op.assert_called_once_with(cmd, ssh_info, ssh_utils.start_ssh_connection)
@@ -97,6 +98,11 @@ class SshCustomCommandTest(unittest.TestCase):
         self.assertRaises(
             azclierror.ArgumentUsageError, custom.ssh_vm, cmd, 'rg', 'vm', 'ip', 'pub', 'priv', False, 'user', 'cert', 'port', 'client', True, 'type', 'proxy', False, [])
 
+    def test_ssh_vm_cert_cache_with_user_keys(self):
+        cmd = mock.Mock()
+        self.assertRaises(
+            azclierror.MutuallyExclusiveArgumentError, custom.ssh_vm, cmd, 'rg', 'vm', None, 'pub', None, False, None, None, None, None, False, None, None, False, [], True)
+
     @mock.patch('azext_ssh.custom._assert_args')
     @mock.patch('azext_ssh.custom._do_ssh_op')
     @mock.patch('azext_ssh.resource_type_utils.decide_resource_type')
@@ -158,12 +164,61 @@ class SshCustomCommandTest(unittest.TestCase):
             azclierror.ArgumentUsageError, custom.ssh_config, cmd, 'path', 'rg', 'vm', 'ip', 'pub', 'priv', True, False, 'user', 'cert', 'port', 'type', 'cred', 'proxy', 'client'
         )
 
+    @mock.patch('azext_ssh.custom._assert_args')
+    @mock.patch('azext_ssh.custom._do_bulk_ssh_config')
+    def test_ssh_config_resource_group_only(self, mock_bulk, mock_assert):
+        cmd = mock.Mock()
+
+        custom.ssh_config(cmd, "config", "rg", None, None, None, None, True, False, None, None, None, None, None, "proxy", "client")
+
+        mock_bulk.assert_called_once_with(cmd, "config", "rg", None, None, None, True, False, None, None, None, None, None, "proxy", "client")
+        mock_assert.assert_not_called()
+
+    def test_ssh_config_tag_with_vm_name(self):
+        cmd = mock.Mock()
+        self.assertRaises(
+            azclierror.MutuallyExclusiveArgumentError, custom.ssh_config, cmd, 'config', 'rg', 'vm', None, None, None, False, False, None, None, None, None, None, None, None, 'env=dev'
+        )
+
+    @mock.patch('azext_ssh.bulk_config_utils.write_config_entries')
+    @mock.patch('azext_ssh.bulk_config_utils.resolve_config_sessions')
+    @mock.patch('azext_ssh.bulk_config_utils.list_config_targets')
+    @mock.patch('azext_ssh.connectivity_utils.get_client_side_proxy')
+    @mock.patch('azext_ssh.ssh_utils.get_certificate_start_and_end_times')
+    @mock.patch('azext_ssh.ssh_utils.get_certificate_lifetime')
+    @mock.patch('azext_ssh.custom._get_and_write_certificate')
+    @mock.patch('azext_ssh.custom._check_or_create_public_private_files')
+    @mock.patch('os.path.isdir')
+    def test_do_bulk_ssh_config(self, mock_isdir, mock_check_files, mock_get_cert, mock_lifetime, mock_times, mock_proxy, mock_targets, mock_resolve, mock_write):
+        cmd = mock.Mock()
+        mock_isdir.return_value = True
+        mock_check_files.return_value = "pub", "priv", True
+        mock_get_cert.return_value = "cert", "user"
+        mock_lifetime.return_value = mock.Mock()
+        mock_lifetime.return_value.total_seconds.return_value = 3600
+        mock_proxy.return_value = "proxy_path"
+        targets = [("rg", "arc", "Microsoft.HybridCompute/machines"), ("rg", "vm", "Microsoft.Compute/virtualMachines")]
+        mock_targets.return_value = targets
+        sessions = [mock.Mock(), mock.Mock()]
+        mock_resolve.return_value = sessions, []
+        config_path = os.path.abspath("config")
+        credentials_folder = os.path.join(os.path.dirname(config_path), "az_ssh_config", "tagged_machines")
+
+        custom._do_bulk_ssh_config(cmd, "config", None, "env=dev", None, None, False, False, None, None, "22", None, None, "proxy", "client")
+
+        mock_targets.assert_called_once_with(cmd, None, "env=dev", None)
+        mock_check_files.assert_called_once_with(None, None, credentials_folder, "client")
+        mock_get_cert.assert_called_once_with(cmd, "pub", None, "client")
+        mock_proxy.assert_called_once_with("proxy")
+        mock_resolve.assert_called_once_with(cmd, targets, config_path, ("pub", "priv", "cert", "user"), False, "22", credentials_folder, "proxy_path", 3600)
+        mock_write.assert_called_once_with(config_path, sessions, False, True)
+
     @mock.patch('azext_ssh.custom.ssh_vm')
     def test_ssh_arc(self, mock_vm):
         cmd = mock.Mock()
         custom.ssh_arc(cmd, "rg", "vm", "pub", "priv", "user", "cert", "port", None, "client", False, "proxy", False, [])
 
-        mock_vm.assert_called_once_with(cmd, "rg", "vm", None, "pub", "priv", False, "user", "cert", "port", "client", False, 'arc_resource_type_placeholder', "proxy", False, [])
+        mock_vm.assert_called_once_with(cmd, "rg", "vm", None, "pub", "priv", False, "user", "cert", "port", "client", False, 'arc_resource_type_placeholder', "proxy", False, [], False)
 
     def test_ssh_cert_no_args(self):
         cmd = mock.Mock()
@@ -435,7 +490,7 @@ class SshCustomCommandTest(unittest.TestCase):
         custom._do_ssh_op(cmd, op_info, mock_op)
         
         mock_get_proxy.assert_called_once_with('proxy')
-        mock_get_relay_info.assert_called_once_with(cmd, 'rg', 'vm', 'Microsoft.HybridCompute/machines', None)
+        mock_get_relay_info.assert_called_once_with(cmd, 'rg', 'vm', 'Microsoft.HybridCompute/machines', None, 'port')
         mock_op.assert_called_once_with(op_info, False, False)
         mock_get_cert.assert_not_called()
         mock_check_keys.assert_not_called()
@@ -486,8 +541,29 @@ class SshCustomCommandTest(unittest.TestCase):
         mock_get_mod_exp.assert_called_once_with("public")
         mock_write_cert.assert_called_once_with("certificate", "public-aadcert.pub")
         mock_get_proxy.assert_called_once_with('proxy')
-        mock_get_relay_info.assert_called_once_with(cmd, 'rg', 'vm', 'Microsoft.HybridCompute/machines', 3600)
+        mock_get_relay_info.assert_called_once_with(cmd, 'rg', 'vm', 'Microsoft.HybridCompute/machines', 3600, 'port')
         mock_op.assert_called_once_with(op_info, False, True)
     
+    @mock.patch('azext_ssh.connectivity_utils.get_client_side_proxy')
+    @mock.patch('azext_ssh.connectivity_utils.get_relay_information')
+    @mock.patch('azext_ssh.custom._check_or_create_public_private_files')
+    @mock.patch('azext_ssh.cert_cache_utils.get_remaining_validity_in_seconds')
+    @mock.patch('azext_ssh.cert_cache_utils.get_cached_credentials')
+    def test_do_ssh_arc_op_cert_cache(self, mock_cached, mock_remaining, mock_check_files, mock_get_relay_info, mock_get_proxy):
+        cmd = mock.Mock()
+        mock_op = mock.Mock()
+        mock_cached.return_value = "public", "private", "cert", "username"
+        mock_remaining.return_value = 1800.5
+
+        op_info = ssh_info.SSHSession("rg", "vm", None, None, None, False, None, None, None, "client", [], False, "Microsoft.HybridCompute/machines", "proxy", None, False, True)
+
+        custom._do_ssh_op(cmd, op_info, mock_op)
+
+        self.assertEqual(("public", "private", "cert", "username"), (op_info.public_key_file, op_info.private_key_file, op_info.cert_file, op_info.local_user))
+        mock_cached.assert_called_once_with(cmd, op_info.ssh_client_folder, custom._get_and_write_certificate)
+        mock_check_files.assert_not_called()
+        mock_get_relay_info.assert_called_once_with(cmd, 'rg', 'vm', 'Microsoft.HybridCompute/machines', 1800, None)
+        mock_op.assert_called_once_with(op_info, False, False)
+
     if __name__ == '__main__':
         unittest.main()
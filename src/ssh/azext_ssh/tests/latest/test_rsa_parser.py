@@ -3,6 +3,9 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import base64
+import datetime
+import struct
 import unittest
 from unittest import mock
 
@@ -82,5 +85,62 @@ class RSAParserTest(unittest.TestCase):
         return "AQAB"
 
 
+class SSHCertificateParserTest(unittest.TestCase):
+    def test_certificate_parser_success(self):
+        certificate_text = 'ssh-rsa-cert-v01@openssh.com ' + self._build_certificate(
+            ['user@contoso.com', 'other'], 1672531200, 1672534800)
+        parser = rsa_parser.SSHCertificateParser()
+
+        parser.parse(certificate_text)
+
+        self.assertEqual('ssh-rsa-cert-v01@openssh.com', parser.algorithm)
+        self.assertEqual(42, parser.serial)
+        self.assertEqual(1, parser.cert_type)
+        self.assertEqual('keyid', parser.key_id)
+        self.assertEqual(['user@contoso.com', 'other'], parser.principals)
+        self.assertEqual('AQAB', parser.exponent)
+        self.assertEqual(1672531200, parser.valid_after)
+        self.assertEqual(1672534800, parser.valid_before)
+        self.assertEqual((datetime.datetime.fromtimestamp(1672531200), datetime.datetime.fromtimestamp(1672534800)),
+                         parser.get_validity_times())
+
+    def test_certificate_parser_valid_forever(self):
+        certificate_text = 'ssh-rsa-cert-v01@openssh.com ' + self._build_certificate(
+            ['user'], 0, rsa_parser.SSHCertificateParser.ValidForever)
+        parser = rsa_parser.SSHCertificateParser()
+
+        parser.parse(certificate_text)
+
+        self.assertEqual(datetime.datetime.max, parser.get_validity_times()[1])
+
+    def test_certificate_parser_wrong_algorithm(self):
+        parser = rsa_parser.SSHCertificateParser()
+
+        self.assertRaises(ValueError, parser.parse, 'ssh-rsa ' + self._build_certificate(['user'], 0, 1))
+
+    def test_certificate_parser_too_few_text_fields(self):
+        parser = rsa_parser.SSHCertificateParser()
+
+        self.assertRaises(ValueError, parser.parse, 'ssh-rsa-cert-v01@openssh.com')
+
+    def test_certificate_parser_truncated(self):
+        certificate = base64.b64decode(self._build_certificate(['user'], 0, 1))
+        truncated = base64.b64encode(certificate[:60]).decode('ascii')
+        parser = rsa_parser.SSHCertificateParser()
+
+        self.assertRaises(ValueError, parser.parse, 'ssh-rsa-cert-v01@openssh.com ' + truncated)
+
+    def _build_certificate(self, principals, valid_after, valid_before):
+        def string(data):
+            return struct.pack('>L', len(data)) + data
+
+        packed_principals = b''.join(string(principal.encode('utf-8')) for principal in principals)
+        certificate = (string(b'ssh-rsa-cert-v01@openssh.com') + string(b'nonce') + string(b'\x01\x00\x01') +
+                       string(b'\x00modulus') + struct.pack('>Q', 42) + struct.pack('>L', 1) + string(b'keyid') +
+                       string(packed_principals) + struct.pack('>Q', valid_after) + struct.pack('>Q', valid_before) +
+                       string(b'') + string(b'') + string(b'') + string(b'signaturekey') + string(b'signature'))
+        return base64.b64encode(certificate).decode('ascii')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,12 +5,43 @@
 
 from azure.cli.core import azclierror
 from unittest import mock
+import datetime
 import unittest
 from azext_ssh import ssh_utils
 from azext_ssh import ssh_info
 
 
 class SSHUtilsTests(unittest.TestCase): 
+    @mock.patch.object(ssh_utils, 'get_ssh_cert_info')
+    @mock.patch.object(ssh_utils, 'parse_ssh_cert')
+    def test_get_ssh_cert_principals_native(self, mock_parse, mock_info):
+        mock_parse.return_value = mock.Mock(principals=['user@contoso.com'])
+
+        self.assertEqual(['user@contoso.com'], ssh_utils.get_ssh_cert_principals('cert', 'client'))
+
+        mock_parse.assert_called_once_with('cert')
+        mock_info.assert_not_called()
+
+    @mock.patch.object(ssh_utils, 'get_ssh_cert_info')
+    @mock.patch.object(ssh_utils, 'parse_ssh_cert')
+    def test_get_ssh_cert_principals_fallback_to_ssh_keygen(self, mock_parse, mock_info):
+        mock_parse.return_value = None
+        mock_info.return_value = ['Principals:', '        user@contoso.com', 'Critical Options: (none)']
+
+        self.assertEqual(['user@contoso.com'], ssh_utils.get_ssh_cert_principals('cert', 'client'))
+
+        mock_info.assert_called_once_with('cert', 'client')
+
+    @mock.patch.object(ssh_utils, 'get_ssh_cert_info')
+    @mock.patch.object(ssh_utils, 'parse_ssh_cert')
+    def test_get_certificate_start_and_end_times_native(self, mock_parse, mock_info):
+        times = (datetime.datetime(2023, 1, 1, 0, 0), datetime.datetime(2023, 1, 1, 1, 0))
+        mock_parse.return_value.get_validity_times.return_value = times
+
+        self.assertEqual(times, ssh_utils.get_certificate_start_and_end_times('cert', 'client'))
+
+        mock_info.assert_not_called()
+
     @mock.patch.object(ssh_utils, 'do_cleanup')
     @mock.patch.object(ssh_utils, '_read_ssh_logs')
     @mock.patch.object(ssh_utils, 'get_ssh_client_path')
@@ -7,7 +7,7 @@
 
 from setuptools import setup, find_packages
 
-VERSION = "1.1.6"
+VERSION = "1.1.7"
 
 CLASSIFIERS = [
     'Development Status :: 4 - Beta',
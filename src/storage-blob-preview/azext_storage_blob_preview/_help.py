@@ -76,6 +76,19 @@ parameters:
     short-summary: >
             The expression to find blobs whose tags matches the specified condition.
             eg. ""yourtagname"='firsttag' and "yourtagname2"='secondtag'"
+examples:
+  - name: List the blobs of two containers whose tags match the expression.
+    text: |
+        az storage blob filter --tag-filter "\"project\"='contoso'" --container-name container1 container2 --account-name MyAccount
+  - name: Stream the matched blobs of every container as lines of JSON. --output and --query don't apply to the streamed lines.
+    text: |
+        az storage blob filter --tag-filter "\"project\"='contoso'" --container-name '*' --stream --account-name MyAccount
+  - name: Move the matched blobs to the Archive tier while the query is running.
+    text: |
+        az storage blob filter --tag-filter "\"status\"='processed'" --action set-tier --tier Archive --account-name MyAccount
+  - name: Delete the matched blobs of every container, with up to 16 batch requests in parallel.
+    text: |
+        az storage blob filter --tag-filter "\"expired\"='true'" --container-name '*' --action delete --max-concurrency 16 --account-name MyAccount
 """
 
 helps['storage blob tag'] = """
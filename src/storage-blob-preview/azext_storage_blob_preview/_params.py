@@ -158,8 +158,26 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
 
     with self.argument_context('storage blob filter') as c:
         c.argument('filter_expression', options_list=['--tag-filter'])
-        c.argument('container_name', container_name_type,
-                   help='Used when you want to list blobs under a specified container')
+        c.argument('container_name', container_name_type, nargs='+',
+                   help='Used when you want to list blobs under the specified containers. Specify \'*\' to query '
+                   'every container in the account in parallel.')
+        c.argument('stream', action='store_true', is_preview=True,
+                   help='Write each matched blob to stdout as a line of JSON as soon as its page arrives, instead of '
+                   'collecting all results before printing. The lines are written directly, --output and --query '
+                   'are not applied to them.')
+        c.argument('action', arg_type=get_enum_type(['delete', 'set-tier', 'set-tags']), is_preview=True,
+                   arg_group='Bulk Action',
+                   help='Apply an action to the matched blobs while the query is still running. Delete and set-tier '
+                   'are sent as blob batch requests of up to 256 blobs, and delete also deletes the snapshots of '
+                   'the blobs. Returns the number of blobs matched, succeeded and failed.')
+        c.argument('tier', arg_type=get_enum_type(t_blob_tier), arg_group='Bulk Action',
+                   help='The tier to set the matched block blobs to, used with --action set-tier.')
+        c.argument('rehydrate_priority', rehydrate_priority_type, arg_group='Bulk Action')
+        c.argument('tags', tags_type, arg_group='Bulk Action',
+                   help='The tags to set on the matched blobs, used with --action set-tags. space-separated tags: '
+                   'key[=value] [key[=value] ...].')
+        c.argument('max_concurrency', type=int, is_preview=True,
+                   help='The maximum number of containers queried and batch requests sent in parallel. Default: 8.')
 
     with self.argument_context('storage blob generate-sas') as c:
         from .completers import get_storage_acl_name_completion_list
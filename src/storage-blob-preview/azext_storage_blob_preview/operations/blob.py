@@ -5,9 +5,15 @@
 
 from __future__ import print_function
 
+import json
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from azure.cli.core.profiles import get_sdk
+from azure.core.exceptions import HttpResponseError
 from knack.log import get_logger
 from knack.util import CLIError
 
@@ -16,6 +22,10 @@ from ..profiles import CUSTOM_DATA_STORAGE_BLOB
 
 logger = get_logger(__name__)
 
+# Blob batch requests are limited to 256 sub-requests.
+FILTER_BATCH_SIZE = 256
+FILTER_MAX_CONCURRENCY = 8
+
 
 def set_blob_tier(client, container_name, blob_name, tier, blob_type='block', timeout=None):
     if blob_type == 'block':
@@ -219,7 +229,171 @@ def set_blob_tier_v2(client, blob_type='block', rehydrate_priority=None, **kwarg
     raise ValueError('Blob tier is only applicable to block or page blob.')
 
 
-def find_blobs_by_tags(client, filter_expression, container_name=None):
-    if container_name:
-        client = client.get_container_client(container_name)
-    return client.find_blobs_by_tags(filter_expression=filter_expression)
+def find_blobs_by_tags(cmd, client, filter_expression, container_name=None, stream=False, action=None, tier=None,
+                       tags=None, rehydrate_priority=None, max_concurrency=None):
+    """
+    Find the blobs whose tags match filter_expression, in the whole account or in the given containers.
+    When '*' is the only container name, every container in the account is queried in parallel and the matched
+    blobs of all the containers are returned as one list. With --stream each blob is written to stdout as a line of JSON as soon as its page arrives, bypassing --output
+    and --query, and with --action the matched blobs are handed over to blob batch requests while the query is still
+    running.
+    """
+    if action == 'set-tier' and not tier:
+        raise CLIError('incorrect usage: --tier is required when --action set-tier is used')
+    if action == 'set-tags' and tags is None:
+        raise CLIError('incorrect usage: --tags is required when --action set-tags is used')
+    if action != 'set-tier' and (tier or rehydrate_priority):
+        raise CLIError('incorrect usage: --tier and --rehydrate-priority are only used with --action set-tier')
+    if action != 'set-tags' and tags is not None:
+        raise CLIError('incorrect usage: --tags is only used with --action set-tags')
+
+    containers = container_name or []
+    if containers == ['*']:
+        containers = [container.name for container in client.list_containers()]
+    if not stream and not action and len(containers) <= 1:
+        if containers:
+            client = client.get_container_client(containers[0])
+        return client.find_blobs_by_tags(filter_expression=filter_expression)
+
+    max_concurrency = max_concurrency or FILTER_MAX_CONCURRENCY
+    blobs = _iter_filtered_blobs(client, filter_expression, containers, max_concurrency)
+    if action:
+        return _run_filtered_blob_action(cmd, client, blobs, stream, action, tier, tags, rehydrate_priority,
+                                         max_concurrency)
+    if not stream:
+        return list(blobs)
+    for blob in blobs:
+        _write_filtered_blob(blob)
+    return None
+
+
+def _write_filtered_blob(blob):
+    from azure.cli.core.util import todict
+    sys.stdout.write(json.dumps(todict(blob)) + '\n')
+    sys.stdout.flush()
+
+
+def _iter_filtered_blobs(client, filter_expression, containers, max_concurrency):
+    # Yields the matched blobs page by page. Containers are queried by a pool of workers which hand their pages
+    # over through a bounded queue, so that a slow consumer holds back the queries instead of buffering millions
+    # of blobs in memory.
+    if not containers:
+        for page in client.find_blobs_by_tags(filter_expression=filter_expression).by_page():
+            yield from page
+        return
+
+    pages = queue.Queue(maxsize=max_concurrency * 2)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def query(container):
+        # pylint: disable=broad-except
+        try:
+            container_client = client.get_container_client(container)
+            for page in container_client.find_blobs_by_tags(filter_expression=filter_expression).by_page():
+                if stopped.is_set():
+                    return
+                put(list(page))
+            put(done)
+        except Exception as ex:
+            put(ex)
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(containers))) as executor:
+        try:
+            for container in containers:
+                executor.submit(query, container)
+            remaining = len(containers)
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            stopped.set()
+
+
+def _run_filtered_blob_action(cmd, client, blobs, stream, action, tier, tags, rehydrate_priority, max_concurrency):
+    # Matched blobs are grouped per container into batches of FILTER_BATCH_SIZE, which are sent while the query
+    # keeps going. The semaphore bounds the batches in flight so the query can't run too far ahead of them.
+    summary = {'matched': 0, 'succeeded': 0, 'failed': 0}
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_concurrency * 2)
+    hook = cmd.cli_ctx.get_progress_controller(det=False)
+
+    def run_batch(container, names):
+        # pylint: disable=broad-except
+        try:
+            try:
+                failed = _apply_blob_batch(client.get_container_client(container), action, names, tier, tags,
+                                           rehydrate_priority)
+            except Exception as ex:
+                logger.warning("Failed to %s %d blobs in container '%s'. Error: %s", action, len(names), container,
+                               ex)
+                failed = len(names)
+            with lock:
+                summary['succeeded'] += len(names) - failed
+                summary['failed'] += failed
+                hook.add(message='{} succeeded, {} failed'.format(summary['succeeded'], summary['failed']))
+        finally:
+            slots.release()
+
+    def submit(executor, container, names):
+        slots.acquire()
+        executor.submit(run_batch, container, names)
+
+    batches = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for blob in blobs:
+                if stream:
+                    _write_filtered_blob(blob)
+                summary['matched'] += 1
+                names = batches.setdefault(blob.container_name, [])
+                names.append(blob.name)
+                if len(names) == FILTER_BATCH_SIZE:
+                    submit(executor, blob.container_name, batches.pop(blob.container_name))
+            for container, names in batches.items():
+                submit(executor, container, names)
+    finally:
+        hook.end()
+    return summary
+
+
+def _apply_blob_batch(container_client, action, names, tier, tags, rehydrate_priority):
+    # Returns the number of blobs the action failed on.
+    if action == 'set-tags':
+        # Blob batch doesn't support setting tags, so these are sent one by one.
+        failed = 0
+        for name in names:
+            try:
+                container_client.get_blob_client(name).set_blob_tags(tags)
+            except HttpResponseError as ex:
+                logger.warning("Failed to set tags on blob '%s' in container '%s'. Error: %s",
+                               name, container_client.container_name, ex.message)
+                failed += 1
+        return failed
+
+    if action == 'delete':
+        # Blobs with snapshots can only be deleted together with their snapshots
+        responses = container_client.delete_blobs(*names, delete_snapshots='include', raise_on_any_failure=False)
+    else:
+        responses = container_client.set_standard_blob_tier_blobs(tier, *names, rehydrate_priority=rehydrate_priority,
+                                                                  raise_on_any_failure=False)
+    failed = 0
+    for name, response in zip(names, responses):
+        if response.status_code >= 300:
+            logger.warning("Failed to %s blob '%s' in container '%s'. Status: %d %s", action, name,
+                           container_client.container_name, response.status_code, response.reason)
+            failed += 1
+    return failed
@@ -0,0 +1,157 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError
+from knack.util import CLIError
+
+from ...operations import blob as blob_module
+from ...operations.blob import find_blobs_by_tags
+
+
+class FakeContainerClient(object):
+    def __init__(self, service, container_name):
+        self.service = service
+        self.container_name = container_name
+
+    def find_blobs_by_tags(self, filter_expression):
+        pages = self.service.pages[self.container_name]
+        if isinstance(pages, Exception):
+            raise pages
+        return mock.Mock(by_page=mock.Mock(return_value=iter(pages)))
+
+    def delete_blobs(self, *names, **kwargs):
+        return self.service.record('delete', self.container_name, names, kwargs)
+
+    def set_standard_blob_tier_blobs(self, tier, *names, **kwargs):
+        return self.service.record('set-tier', self.container_name, names, dict(kwargs, tier=tier))
+
+    def get_blob_client(self, name):
+        def set_blob_tags(tags):
+            if name in self.service.failing:
+                raise HttpResponseError(message='Conflict')
+            self.service.record('set-tags', self.container_name, (name,), {'tags': tags})
+        return SimpleNamespace(set_blob_tags=set_blob_tags)
+
+
+class FakeServiceClient(object):
+    def __init__(self, pages):
+        # container name -> list of pages of blob names, or an exception raised by the query
+        self.pages = {container: [[SimpleNamespace(name=name, container_name=container) for name in page]
+                                  for page in container_pages] if isinstance(container_pages, list)
+                      else container_pages for container, container_pages in pages.items()}
+        self.requests = []
+        self.failing = set()
+        self.lock = threading.Lock()
+
+    def list_containers(self):
+        return [SimpleNamespace(name=container) for container in self.pages]
+
+    def get_container_client(self, container_name):
+        return FakeContainerClient(self, container_name)
+
+    def record(self, action, container, names, kwargs):
+        with self.lock:
+            self.requests.append((action, container, names, kwargs))
+        return iter(SimpleNamespace(status_code=409 if name in self.failing else 202, reason='Conflict')
+                    for name in names)
+
+
+class FindBlobsByTagsTest(unittest.TestCase):
+    def setUp(self):
+        self.cmd = mock.Mock()
+        self.client = FakeServiceClient({'c1': [['a', 'b'], ['c']], 'c2': [], 'c3': [['d', 'e', 'f', 'g', 'h']]})
+
+    def _stream(self, **kwargs):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            result = find_blobs_by_tags(self.cmd, self.client, '"project"=\'contoso\'', container_name=['*'],
+                                        **kwargs)
+        return result, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_single_container_is_not_fanned_out(self):
+        client = mock.Mock()
+        result = find_blobs_by_tags(self.cmd, client, 'filter', container_name=['c1'])
+        self.assertEqual(result, client.get_container_client.return_value.find_blobs_by_tags.return_value)
+        client.get_container_client.assert_called_once_with('c1')
+
+        result = find_blobs_by_tags(self.cmd, client, 'filter')
+        self.assertEqual(result, client.find_blobs_by_tags.return_value)
+
+    def test_stream_every_container(self):
+        result, lines = self._stream(stream=True)
+
+        self.assertIsNone(result)
+        self.assertEqual(sorted((line['containerName'], line['name']) for line in lines),
+                         [('c1', 'a'), ('c1', 'b'), ('c1', 'c')] + [('c3', name) for name in 'defgh'])
+        # The pages of a container keep their order
+        self.assertEqual([line['name'] for line in lines if line['containerName'] == 'c1'], ['a', 'b', 'c'])
+
+    def test_every_container_without_stream_is_formatted(self):
+        result, lines = self._stream()
+
+        # The blobs are returned to the CLI formatter instead of being written to stdout
+        self.assertEqual(lines, [])
+        self.assertEqual(sorted((blob.container_name, blob.name) for blob in result),
+                         [('c1', 'a'), ('c1', 'b'), ('c1', 'c')] + [('c3', name) for name in 'defgh'])
+
+        result = find_blobs_by_tags(self.cmd, self.client, 'filter', container_name=['c1', 'c2'])
+        self.assertEqual([blob.name for blob in result], ['a', 'b', 'c'])
+
+    def test_failed_container_query_is_raised(self):
+        self.client.pages['c2'] = HttpResponseError(message='AuthorizationFailure')
+        with self.assertRaises(HttpResponseError):
+            self._stream(stream=True)
+
+    @mock.patch.object(blob_module, 'FILTER_BATCH_SIZE', 2)
+    def test_delete_in_batches(self):
+        self.client.failing = {'e'}
+
+        result, lines = self._stream(action='delete')
+
+        self.assertEqual(lines, [])
+        self.assertEqual(result, {'matched': 8, 'succeeded': 7, 'failed': 1})
+        batches = sorted((container, names) for _, container, names, _ in self.client.requests)
+        self.assertEqual(batches, [('c1', ('a', 'b')), ('c1', ('c',)), ('c3', ('d', 'e')), ('c3', ('f', 'g')),
+                                   ('c3', ('h',))])
+        # Blobs with snapshots can't be deleted without their snapshots
+        self.assertTrue(all(kwargs == {'delete_snapshots': 'include', 'raise_on_any_failure': False}
+                            for _, _, _, kwargs in self.client.requests))
+
+    def test_set_tier_while_streaming(self):
+        result, lines = self._stream(stream=True, action='set-tier', tier='Cool', rehydrate_priority='High')
+
+        self.assertEqual(len(lines), 8)
+        self.assertEqual(result, {'matched': 8, 'succeeded': 8, 'failed': 0})
+        self.assertEqual(sorted((container, names) for _, container, names, _ in self.client.requests),
+                         [('c1', ('a', 'b', 'c')), ('c3', tuple('defgh'))])
+        self.assertEqual(self.client.requests[0][3], {'tier': 'Cool', 'rehydrate_priority': 'High',
+                                                      'raise_on_any_failure': False})
+
+    def test_set_tags_per_blob(self):
+        self.client.failing = {'b'}
+
+        result, _ = self._stream(action='set-tags', tags={'status': 'processed'})
+
+        self.assertEqual(result, {'matched': 8, 'succeeded': 7, 'failed': 1})
+        self.assertEqual(len(self.client.requests), 7)
+        self.assertTrue(all(request[0] == 'set-tags' and request[3] == {'tags': {'status': 'processed'}}
+                            for request in self.client.requests))
+
+    def test_action_arguments_are_validated(self):
+        for kwargs in [{'action': 'set-tier'}, {'action': 'set-tags'}, {'action': 'delete', 'tier': 'Cool'},
+                       {'tags': {'a': 'b'}}, {'rehydrate_priority': 'High'}]:
+            with self.assertRaises(CLIError):
+                find_blobs_by_tags(self.cmd, self.client, 'filter', **kwargs)
+        self.assertEqual(self.client.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
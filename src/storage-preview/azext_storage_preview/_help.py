@@ -167,6 +167,8 @@ helps['storage azcopy blob upload'] = """
           text: az storage azcopy blob upload -c MyContainer --account-name MyStorageAccount -s "path/to/directory" --recursive
         - name: Upload the contents of a directory to a container.
           text: az storage azcopy blob upload -c MyContainer --account-name MyStorageAccount -s "path/to/directory/*" --recursive
+        - name: Upload a directory to a container without AzCopy, using 32 parallel connections.
+          text: az storage azcopy blob upload -c MyContainer --account-name MyStorageAccount -s "path/to/directory" --recursive --engine native --max-concurrency 32
 """
 
 helps['storage azcopy blob download'] = """
@@ -179,6 +181,8 @@ helps['storage azcopy blob download'] = """
           text: az storage azcopy blob download -c MyContainer --account-name MyStorageAccount -s "path/to/virtual_directory" -d "download/path" --recursive
         - name: Download the contents of a container onto a local file system.
           text: az storage azcopy blob download -c MyContainer --account-name MyStorageAccount -s * -d "download/path" --recursive
+        - name: Download a virtual directory from a container without AzCopy. Run the same command again to resume an interrupted download.
+          text: az storage azcopy blob download -c MyContainer --account-name MyStorageAccount -s "path/to/virtual_directory" -d "download/path" --recursive --engine native
 """
 
 helps['storage azcopy blob delete'] = """
@@ -203,6 +207,8 @@ helps['storage azcopy blob sync'] = """
           text: az storage azcopy blob sync -c MyContainer --account-name MyStorageAccount -s "path/to/file" -d NewBlob
         - name: Sync a directory to a container.
           text: az storage azcopy blob sync -c MyContainer --account-name MyStorageAccount -s "path/to/directory"
+        - name: Sync a directory to a container without AzCopy.
+          text: az storage azcopy blob sync -c MyContainer --account-name MyStorageAccount -s "path/to/directory" --engine native
 """
 
 helps['storage azcopy run-command'] = """
@@ -311,6 +317,8 @@ helps['storage blob directory delete'] = """
     examples:
         - name: Delete a storage blob directory in a storage container.
           text: az storage blob directory delete -c MyContainer -d MyDirectoryPath --account-name MyStorageAccount
+        - name: Delete a storage blob directory with millions of blobs in an account without hierarchical namespace.
+          text: az storage blob directory delete -c MyContainer -d MyDirectoryPath --account-name MyStorageAccount --parallel
 """
 
 helps['storage blob directory download'] = """
@@ -375,6 +383,8 @@ helps['storage blob directory move'] = """
           text: az storage blob directory move -c MyContainer -d my-new-directory -s dir --account-name MyStorageAccount
         - name: Move a storage subdirectory to another storage blob directory in a storage container.
           text: az storage blob directory move -c MyContainer -d my-new-directory -s dir/subdirectory --account-name MyStorageAccount
+        - name: Move a storage directory with millions of blobs in an account without hierarchical namespace.
+          text: az storage blob directory move -c MyContainer -d my-new-directory -s dir --account-name MyStorageAccount --parallel
 """
 
 helps['storage blob directory show'] = """
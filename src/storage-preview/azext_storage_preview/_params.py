@@ -469,6 +469,18 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                    help='The source file path to sync from.')
         c.ignore('destination')
 
+    for scope in ['storage azcopy blob upload', 'storage azcopy blob download', 'storage azcopy blob sync',
+                  'storage blob directory upload', 'storage blob directory download']:
+        with self.argument_context(scope) as c:
+            c.argument('engine', arg_type=get_enum_type(['azcopy', 'native']), default='azcopy',
+                       help='The transfer engine. `native` transfers blobs within the CLI process with the Azure '
+                            'Storage SDK, showing progress and resuming interrupted transfers when run again, '
+                            'instead of running the bundled AzCopy.')
+            c.argument('max_concurrency', type=int, arg_group='Native Engine',
+                       help='The maximum number of parallel connections. Default: 16.')
+            c.argument('block_size', type=int, arg_group='Native Engine',
+                       help='The size in MiB of the blocks that large files are uploaded in. Default: 8.')
+
     with self.argument_context('storage azcopy run-command') as c:
         c.positional('command_args', help='Command to run using azcopy. Please start commands with "azcopy ".')
 
@@ -553,6 +565,16 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
     with self.argument_context('storage blob directory metadata') as c:
         c.argument('blob_name', directory_path_type)
 
+    for scope in ['storage blob directory delete', 'storage blob directory move']:
+        with self.argument_context(scope) as c:
+            c.argument('parallel', action='store_true', is_preview=True,
+                       help='For accounts without hierarchical namespace, process the blobs under the directory in '
+                            'parallel, partitioned by subdirectory, instead of one page after another. Running the '
+                            'same command again resumes an interrupted operation. Blob snapshots are deleted along '
+                            'with their blob, they are not moved.')
+            c.argument('max_concurrency', type=int,
+                       help='The maximum number of parallel requests with --parallel. Default: 16.')
+
     with self.argument_context('storage blob directory move') as c:
         from ._validators import validate_move_directory
         c.argument('new_path', options_list=['--destination-path', '-d'],
@@ -97,7 +97,7 @@ def load_command_table(self, _):  # pylint: disable=too-many-locals, too-many-st
         from ._format import transform_blob_output
         from ._transformers import (transform_storage_list_output, create_boolean_result_output_transformer)
         g.storage_command_oauth('create', 'create_directory')
-        g.storage_command_oauth('delete', 'delete_directory')
+        g.storage_custom_command_oauth('delete', 'delete_directory')
         g.storage_custom_command_oauth('move', 'rename_directory')
         g.storage_custom_command_oauth('show', 'show_directory', table_transformer=transform_blob_output,
                                        exception_handler=show_exception_handler)
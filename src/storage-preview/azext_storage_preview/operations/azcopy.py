@@ -4,9 +4,16 @@
 # --------------------------------------------------------------------------------------------
 
 from __future__ import print_function
-# from knack.util import CLIError
+import os
+
+from knack.log import get_logger
+from knack.util import CLIError
 from ..azcopy.util import AzCopy, blob_client_auth_for_azcopy, login_auth_for_azcopy
 
+logger = get_logger(__name__)
+
+NATIVE_ENGINE = 'native'
+
 
 def storage_blob_copy(azcopy, source, destination, recursive=None):
     flags = []
@@ -15,12 +22,21 @@ def storage_blob_copy(azcopy, source, destination, recursive=None):
     azcopy.copy(source, destination, flags=flags)
 
 
-def storage_blob_upload(cmd, client, source, destination, recursive=None):
+def storage_blob_upload(cmd, client, source, destination, recursive=None, engine=None, max_concurrency=None,
+                        block_size=None):
+    if engine == NATIVE_ENGINE:
+        return _native_transfer(cmd, client, 'upload', source, destination, max_concurrency, block_size,
+                                lambda transfer, blob_path: transfer.upload(source, blob_path, recursive=recursive))
     azcopy = _azcopy_blob_client(cmd, client)
     storage_blob_copy(azcopy, source, _add_url_sas(destination, azcopy.creds.sas_token), recursive=recursive)
 
 
-def storage_blob_download(cmd, client, source, destination, recursive=None):
+def storage_blob_download(cmd, client, source, destination, recursive=None, engine=None, max_concurrency=None,
+                          block_size=None):
+    if engine == NATIVE_ENGINE:
+        return _native_transfer(cmd, client, 'download', destination, source, max_concurrency, block_size,
+                                lambda transfer, blob_path: transfer.download(blob_path, destination,
+                                                                              recursive=recursive))
     azcopy = _azcopy_blob_client(cmd, client)
     storage_blob_copy(azcopy, _add_url_sas(source, azcopy.creds.sas_token), destination, recursive=recursive)
 
@@ -43,7 +59,10 @@ def storage_blob_remove(cmd, client, target, recursive=None):
     azcopy.remove(_add_url_sas(target, azcopy.creds.sas_token), flags=flags)
 
 
-def storage_blob_sync(cmd, client, source, destination):
+def storage_blob_sync(cmd, client, source, destination, engine=None, max_concurrency=None, block_size=None):
+    if engine == NATIVE_ENGINE:
+        return _native_transfer(cmd, client, 'sync', source, destination, max_concurrency, block_size,
+                                lambda transfer, blob_path: transfer.sync(source, blob_path))
     azcopy = _azcopy_blob_client(cmd, client)
     azcopy.sync(source, _add_url_sas(destination, azcopy.creds.sas_token), flags=['--delete-destination=true'])
 
@@ -61,6 +80,44 @@ def _add_url_sas(url, sas):
     return '{}?{}'.format(url, sas)
 
 
+def _native_transfer(cmd, client, operation, local_path, url, max_concurrency, block_size, run):
+    from ..transfer.engine import BlobTransferEngine, TransferCheckpoint
+    container_client, blob_path = _native_container_client(cmd, client, url)
+
+    # Running the same transfer again resumes it from its checkpoint
+    checkpoint_dir = os.path.join(cmd.cli_ctx.config.config_dir, 'storage_transfer_checkpoints')
+    job_key = '{} {} {}'.format(operation, os.path.abspath(local_path), url.split('?')[0])
+    hook = cmd.cli_ctx.get_progress_controller(det=True)
+    transfer = BlobTransferEngine(
+        container_client,
+        max_concurrency=max_concurrency,
+        block_size=block_size * 1024 * 1024 if block_size else None,
+        checkpoint=TransferCheckpoint(checkpoint_dir, job_key),
+        progress_callback=lambda current, total: hook.add(message='Alive', value=current, total_val=total))
+    try:
+        summary = run(transfer, blob_path)
+    finally:
+        hook.end()
+
+    if summary['failed']:
+        for failure in summary['failed']:
+            logger.error("%s: %s", failure['name'], failure['error'])
+        raise CLIError('{} of {} files failed to transfer. Run the command again to resume the transfer.'.format(
+            len(summary['failed']), len(summary['failed']) + summary['transferred'] + summary['skipped']))
+    return summary
+
+
+def _native_container_client(cmd, client, url):
+    from six.moves.urllib.parse import unquote
+    from ..track2_util import get_track2_account_url, get_track2_container_client
+
+    account_url = get_track2_account_url(client)
+    if not url.startswith(account_url + '/'):
+        raise CLIError('usage error: {} is not a blob url of account {}'.format(url, client.account_name))
+    container_name, _, blob_path = url[len(account_url) + 1:].partition('/')
+    return get_track2_container_client(cmd, client, unquote(container_name)), unquote(blob_path)
+
+
 def _azcopy_blob_client(cmd, client):
     return AzCopy(creds=blob_client_auth_for_azcopy(cmd, client))
 
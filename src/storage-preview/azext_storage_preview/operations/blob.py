@@ -23,19 +23,68 @@ def show_directory(client, container_name, directory_name, snapshot=None, lease_
 
 
 # pylint: disable=unused-variable,logging-format-interpolation
-def delete_directory(client, container_name, directory_name):
+def delete_directory(cmd, client, container_name, directory_path, fail_not_exist=False, recursive=False, marker=None,
+                     lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                     if_none_match=None, timeout=None, parallel=False, max_concurrency=None):
+    """
+    Delete a directory. This operation's behavior is different depending on whether Hierarchical Namespace
+    is enabled; if yes, then the delete operation can be atomic and instantaneous;
+    if not, the operation is performed in batches and a continuation token could be returned.
 
-    deleted, marker = client.delete_directory(container_name, directory_name, recursive=True)
+    :param str container_name:
+        Name of existing container.
+    :param str directory_path:
+        Path of the directory to be deleted. Ex: 'dirfoo/dirbar'.
+    :param fail_not_exist:
+        Specify whether to throw an exception when the directory doesn't exist.
+    :param recursive:
+        If "true", all paths beneath the directory will be deleted.
+        If "false" and the directory is non-empty, an error occurs.
+    :param marker:
+        Optional. When deleting a directory without the Hierarchical Namespace,
+        the number of paths that are deleted with each invocation is limited.
+        If the number of paths to be deleted exceeds this limit,
+        a continuation token is returned. When a continuation token is returned,
+        it must be specified in a subsequent invocation of the delete operation to continue deleting the directory.
+    :param str lease_id:
+        Required if the directory has an active lease.
+    :param datetime if_modified_since:
+        A DateTime value. Specify this header to perform the operation only
+        if the resource has been modified since the specified time.
+    :param datetime if_unmodified_since:
+        A DateTime value. Specify this header to perform the operation only if
+        the resource has not been modified since the specified date/time.
+    :param str if_match:
+        An ETag value, or the wildcard character (*). Specify this header to perform
+        the operation only if the resource's ETag matches the value specified.
+    :param str if_none_match:
+        An ETag value, or the wildcard character (*). Specify this header
+        to perform the operation only if the resource's ETag does not match
+        the value specified.
+    :param int timeout:
+        The timeout parameter is expressed in seconds.
+    :param bool parallel:
+        Optional. Delete the directory recursively. If HNS is not enabled and the directory can't be deleted in a
+        single call, delete the rest of the paths with parallel blob batch requests instead of following the marker.
+    :param int max_concurrency:
+        Optional. The maximum number of parallel requests in parallel mode.
+    """
+    result = client.delete_directory(container_name, directory_path, fail_not_exist=fail_not_exist,
+                                     recursive=recursive or parallel, marker=marker, lease_id=lease_id,
+                                     if_modified_since=if_modified_since, if_unmodified_since=if_unmodified_since,
+                                     if_match=if_match, if_none_match=if_none_match, timeout=timeout)
+    if not parallel:
+        return result
 
     # if HNS is enabled, the delete operation is atomic and no marker is returned
     # if HNS is not enabled, and there are too more files/subdirectories in the directories to be deleted
-    # in a single call, the service returns a marker, so that we can follow it and finish deleting
-    # the rest of the files/subdirectories
-    count = 1
-    while marker is not None:
-        deleted, marker = client.delete_directory(container_name, directory_name, marker=marker, recursive=True)
-        count += 1
-    logger.info("Took {} call(s) to finish moving.".format(count))
+    # in a single call, the service returns a marker, the rest of the files/subdirectories are then deleted
+    # in parallel instead of following it
+    deleted, marker = result
+    if marker is None:
+        return None
+    return _run_directory_batch_operation(cmd, client, container_name, 'delete', directory_path,
+                                          max_concurrency, lambda operation: operation.delete(directory_path))
 
 
 def list_directory(client, container_name, directory_path, prefix=None, num_results=None, include='mc',
@@ -74,10 +123,11 @@ def list_directory(client, container_name, directory_path, prefix=None, num_resu
                              delimiter, marker, timeout)
 
 
-def rename_directory(client, container_name, new_path, source_path,
+def rename_directory(cmd, client, container_name, new_path, source_path,
                      mode=None, lease_id=None, source_lease_id=None,
                      source_if_modified_since=None, source_if_unmodified_since=None,
-                     source_if_match=None, source_if_none_match=None, timeout=None):
+                     source_if_match=None, source_if_none_match=None, timeout=None,
+                     parallel=False, max_concurrency=None):
     """
      Rename a directory(which can contain other directories or blobs).
 
@@ -119,10 +169,16 @@ def rename_directory(client, container_name, new_path, source_path,
          only if the source's ETag does not match the value specified.
      :param int timeout:
          The timeout parameter is expressed in seconds.
+     :param bool parallel:
+         Optional. If HNS is not enabled and the directory can't be moved in a single call, move the rest of the
+         files/subdirectories by copying and deleting them in parallel instead of following the marker.
+     :param int max_concurrency:
+         Optional. The maximum number of parallel requests in parallel mode.
 
      """
 
     # In order to find the required blob, `x-ms-rename-source` in header needs to encode the special character in URL.
+    unquoted_source_path = source_path
     source_path = quote(source_path)
 
     marker = client.rename_path(container_name, new_path, source_path,
@@ -137,8 +193,43 @@ def rename_directory(client, container_name, new_path, source_path,
     # in a single call, the service returns a marker, so that we can follow it and finish renaming
     # the rest of the files/subdirectories
 
+    if parallel and marker is not None:
+        return _run_directory_batch_operation(
+            cmd, client, container_name, 'move', unquoted_source_path, max_concurrency,
+            lambda operation: operation.move(unquoted_source_path, new_path))
+
     count = 1
     while marker is not None:
         marker = client.rename_path(container_name, new_path, source_path, marker=marker)
         count += 1
     logger.info("Took {} call(s) to finish moving.".format(count))
+
+
+def _run_directory_batch_operation(cmd, client, container_name, operation_name, directory_path, max_concurrency,
+                                   run):
+    import os
+    from knack.util import CLIError
+    from ..track2_util import get_track2_container_client
+    from ..transfer.directory import DirectoryBatchOperation
+    from ..transfer.engine import TransferCheckpoint
+
+    container_client = get_track2_container_client(cmd, client, container_name)
+    # Running the same operation again resumes it from its checkpoint
+    checkpoint = TransferCheckpoint(os.path.join(cmd.cli_ctx.config.config_dir, 'storage_transfer_checkpoints'),
+                                    '{} {} {}'.format(operation_name, container_client.url, directory_path))
+    hook = cmd.cli_ctx.get_progress_controller()
+    operation = DirectoryBatchOperation(
+        container_client, max_concurrency=max_concurrency, checkpoint=checkpoint,
+        progress_callback=lambda processed: hook.add(message='{} blobs processed'.format(processed)))
+    try:
+        summary = run(operation)
+    finally:
+        hook.end()
+
+    if summary['failed']:
+        for failure in summary['failed']:
+            logger.error("%s: %s", failure['name'], failure['error'])
+        raise CLIError('{} blobs failed to {}. Run the command again to resume.'.format(
+            len(summary['failed']), operation_name))
+    logger.info("Processed {} blobs in parallel.".format(summary['processed']))
+    return None
@@ -0,0 +1,161 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from ...transfer import directory
+from ...transfer.directory import DirectoryBatchOperation
+from ...transfer.engine import TransferCheckpoint
+from ...vendored_sdks.blob import BlobPrefix
+
+
+class FakeBlobClient(object):
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+        self.url = 'https://account.blob.core.windows.net/container/' + name
+
+    def get_blob_properties(self):
+        if self.name not in self.container.blobs:
+            raise ResourceNotFoundError('not found')
+        with self.container.lock:
+            self.container.polls.append(self.name)
+            polls = self.container.pending.get(self.name, 0)
+            self.container.pending[self.name] = polls - 1
+        status = 'pending' if polls > 1 else 'success'
+        return SimpleNamespace(name=self.name, copy=SimpleNamespace(status=status, status_description=None))
+
+    def start_copy_from_url(self, source_url):
+        source = source_url[len('https://account.blob.core.windows.net/container/'):]
+        if source not in self.container.blobs:
+            raise ResourceNotFoundError('not found')
+        self.container.blobs[self.name] = self.container.blobs[source]
+        return {'copy_status': 'pending' if self.container.pending.get(self.name) else 'success'}
+
+
+class FakeContainerClient(object):
+    def __init__(self, names):
+        self.blobs = {name: name for name in names}
+        self.batches = []
+        self.failing = set()
+        # destination name -> number of status polls until the copy completes
+        self.pending = {}
+        self.polls = []
+        self.delete_options = []
+        self.lock = threading.Lock()
+
+    def get_blob_client(self, name):
+        return FakeBlobClient(self, name)
+
+    def walk_blobs(self, name_starts_with, delimiter):
+        prefixes = set()
+        for name in sorted(self.blobs):
+            if not name.startswith(name_starts_with):
+                continue
+            rest = name[len(name_starts_with):]
+            if delimiter in rest:
+                prefixes.add(name_starts_with + rest.split(delimiter)[0] + delimiter)
+            else:
+                yield SimpleNamespace(name=name)
+        for prefix in sorted(prefixes):
+            yield BlobPrefix(prefix=prefix, name=prefix)
+
+    def list_blobs(self, name_starts_with):
+        return [SimpleNamespace(name=name) for name in sorted(self.blobs) if name.startswith(name_starts_with)]
+
+    def delete_blobs(self, *names, **kwargs):
+        with self.lock:
+            self.batches.append(names)
+            self.delete_options.append(kwargs.get('delete_snapshots'))
+        responses = []
+        for name in names:
+            if name in self.failing:
+                responses.append(SimpleNamespace(status_code=409, reason='Conflict'))
+            elif self.blobs.pop(name, None) is None:
+                responses.append(SimpleNamespace(status_code=404, reason='Not Found'))
+            else:
+                responses.append(SimpleNamespace(status_code=202, reason='Accepted'))
+        return iter(responses)
+
+    def delete_blob(self, name):
+        if self.blobs.pop(name, None) is None:
+            raise ResourceNotFoundError('not found')
+
+
+class DirectoryBatchOperationTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        names = ['dir', 'dir/a', 'dir/sub1', 'dir/sub2', 'other/c']
+        names += ['dir/sub1/{}'.format(index) for index in range(10)]
+        names += ['dir/sub2/deep/{}'.format(index) for index in range(5)]
+        self.container = FakeContainerClient(names)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _operation(self):
+        return DirectoryBatchOperation(self.container, max_concurrency=4,
+                                       checkpoint=TransferCheckpoint(self.folder, 'job'))
+
+    @mock.patch.object(directory, 'BATCH_SIZE', 4)
+    def test_delete(self):
+        progress = []
+        operation = self._operation()
+        operation.progress_callback = progress.append
+
+        summary = operation.delete('dir')
+
+        self.assertEqual(summary, {'processed': 18, 'skipped_partitions': 0, 'failed': []})
+        self.assertEqual(list(self.container.blobs), ['other/c'])
+        self.assertTrue(all(len(batch) <= 4 for batch in self.container.batches))
+        self.assertEqual(max(progress), 18)
+
+    @mock.patch.object(directory, 'BATCH_SIZE', 4)
+    def test_delete_resumes_from_checkpoint(self):
+        self.container.failing = {'dir/sub2/deep/3'}
+        summary = self._operation().delete('dir')
+        self.assertEqual(summary['failed'], [{'name': 'dir/sub2/deep/3', 'error': '409 Conflict'}])
+        self.assertIn('dir', self.container.blobs)
+
+        self.container.failing = set()
+        self.container.batches = []
+        summary = self._operation().delete('dir')
+        self.assertEqual((summary['processed'], summary['skipped_partitions'], summary['failed']), (1, 1, []))
+        self.assertEqual(self.container.batches, [('dir/sub2/deep/3',)])
+        self.assertEqual(list(self.container.blobs), ['other/c'])
+        self.assertFalse(os.listdir(self.folder))
+
+    def test_move(self):
+        summary = self._operation().move('dir', 'new/dir')
+
+        self.assertEqual(summary['failed'], [])
+        self.assertEqual(sorted(name for name in self.container.blobs if name.startswith('dir')), [])
+        self.assertEqual(self.container.blobs['new/dir/sub2/deep/4'], 'dir/sub2/deep/4')
+        self.assertIn('new/dir', self.container.blobs)
+        self.assertEqual(len(self.container.blobs), 20)
+        # Sources are deleted with their snapshots, as when deleting the directory
+        self.assertEqual(set(self.container.delete_options), {'include'})
+
+    @mock.patch.object(directory, 'COPY_POLL_INTERVAL', 0)
+    def test_move_polls_pending_copies_together(self):
+        self.container.pending = {'new/dir/sub1/{}'.format(index): 3 for index in range(10)}
+        self.container.pending['new/dir/sub1/4'] = 1
+
+        with mock.patch.object(directory.time, 'sleep') as sleep:
+            summary = self._operation().move('dir', 'new/dir')
+
+        self.assertEqual(summary['failed'], [])
+        self.assertFalse([name for name in self.container.blobs if name.startswith('dir')])
+        # The copies of a batch are waited for in rounds, not one after another
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(len([name for name in self.container.polls if name.startswith('new/dir/sub1/')]), 28)
@@ -0,0 +1,247 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from ...transfer import engine
+from ...transfer.engine import BlobTransferEngine, TransferCheckpoint
+from ...vendored_sdks.blob import BlobBlock, ContainerClient, ContentSettings
+
+
+class FakeBlobClient(object):
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+
+    def upload_blob(self, data, overwrite=False, content_settings=None, **_):
+        self.container.put(self.name, bytes(data), content_settings)
+
+    def stage_block(self, block_id, data, **_):
+        self.container.stage_calls.append((self.name, block_id))
+        if (self.name, block_id[-6:]) in self.container.failing_blocks:
+            raise IOError('connection reset')
+        self.container.staged.setdefault(self.name, {})[block_id] = bytes(data)
+
+    def get_block_list(self, block_list_type):
+        if self.name not in self.container.staged and self.name not in self.container.blobs:
+            raise ResourceNotFoundError('not found')
+        uncommitted = []
+        for block_id, data in self.container.staged.get(self.name, {}).items():
+            block = BlobBlock(block_id=block_id)
+            block.size = len(data)
+            uncommitted.append(block)
+        return [], uncommitted
+
+    def commit_block_list(self, block_list, content_settings=None):
+        staged = self.container.staged.pop(self.name)
+        self.container.put(self.name, b''.join(staged[block.id] for block in block_list), content_settings)
+
+    def get_blob_properties(self):
+        if self.name not in self.container.blobs:
+            raise ResourceNotFoundError('not found')
+        return self.container.blobs[self.name]
+
+    def download_blob(self, offset=None, length=None, etag=None, **_):
+        blob = self.get_blob_properties()
+        self.container.download_calls.append((self.name, offset))
+        if (self.name, offset) in self.container.failing_ranges:
+            raise IOError('connection reset')
+        self.container.assert_etag(blob, etag)
+        return SimpleNamespace(readall=lambda: blob.data[offset:offset + length])
+
+
+class FakeContainerClient(object):
+    def __init__(self):
+        self.container_name = 'container'
+        self.blobs = {}
+        self.staged = {}
+        self.stage_calls = []
+        self.download_calls = []
+        self.failing_blocks = set()
+        self.failing_ranges = set()
+
+    def put(self, name, data, content_settings, last_modified=None):
+        self.blobs[name] = SimpleNamespace(
+            name=name, data=data, size=len(data), etag=uuid.uuid4().hex, content_settings=content_settings,
+            last_modified=last_modified or datetime.datetime.now(datetime.timezone.utc))
+
+    @staticmethod
+    def assert_etag(blob, etag):
+        assert etag == blob.etag
+
+    def get_blob_client(self, name):
+        return FakeBlobClient(self, name)
+
+    def list_blobs(self, name_starts_with=None):
+        return [blob for name, blob in sorted(self.blobs.items()) if name.startswith(name_starts_with or '')]
+
+    def delete_blob(self, name):
+        del self.blobs[name]
+
+
+class BlobTransferEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.checkpoint_dir = os.path.join(self.folder, 'checkpoints')
+        self.container = FakeContainerClient()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _engine(self, **kwargs):
+        return BlobTransferEngine(self.container, max_concurrency=4, block_size=1024,
+                                  checkpoint=TransferCheckpoint(self.checkpoint_dir, 'job'), **kwargs)
+
+    def _write(self, relative, data):
+        path = os.path.join(self.folder, 'data', relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_upload_directory(self):
+        small = os.urandom(100)
+        large = os.urandom(5000)
+        self._write('a.txt', small)
+        self._write(os.path.join('sub', 'b.bin'), large)
+        progress = []
+
+        summary = self._engine(progress_callback=lambda current, total: progress.append((current, total))).upload(
+            os.path.join(self.folder, 'data'), 'dir/', recursive=True)
+
+        self.assertEqual(summary, {'transferred': 2, 'skipped': 0, 'deleted': 0, 'bytes': 5100, 'failed': []})
+        self.assertEqual(sorted(self.container.blobs), ['dir/data/a.txt', 'dir/data/sub/b.bin'])
+        blob = self.container.blobs['dir/data/sub/b.bin']
+        self.assertEqual(blob.data, large)
+        self.assertEqual(bytes(blob.content_settings.content_md5), hashlib.md5(large).digest())
+        self.assertEqual(self.container.blobs['dir/data/a.txt'].content_settings.content_type, 'text/plain')
+        self.assertEqual(len(self.container.stage_calls), 5)
+        self.assertEqual(progress[-1], (5100, 5100))
+
+        self._engine().upload(os.path.join(self.folder, 'data', '*'), '', recursive=True)
+        self.assertIn('sub/b.bin', self.container.blobs)
+
+    def test_upload_resumes_from_checkpoint(self):
+        self._write('a.txt', os.urandom(100))
+        large = os.urandom(5000)
+        self._write('b.bin', large)
+        self.container.failing_blocks = {('b.bin', '000003')}
+
+        summary = self._engine().upload(os.path.join(self.folder, 'data', '*'), '')
+        self.assertEqual(summary['transferred'], 1)
+        self.assertEqual([failure['name'] for failure in summary['failed']], ['b.bin'])
+        self.assertNotIn('b.bin', self.container.blobs)
+
+        self.container.failing_blocks = set()
+        self.container.stage_calls = []
+        summary = self._engine().upload(os.path.join(self.folder, 'data', '*'), '')
+        self.assertEqual((summary['transferred'], summary['skipped'], summary['failed']), (1, 1, []))
+        self.assertEqual([block_id[-6:] for _, block_id in self.container.stage_calls], ['000003'])
+        self.assertEqual(self.container.blobs['b.bin'].data, large)
+        self.assertFalse(os.listdir(self.checkpoint_dir))
+
+    def test_upload_invalid_source(self):
+        with self.assertRaises(ValueError):
+            self._engine().upload(os.path.join(self.folder, 'missing'), '')
+        os.makedirs(os.path.join(self.folder, 'data'))
+        with self.assertRaises(ValueError):
+            self._engine().upload(os.path.join(self.folder, 'data'), '')
+
+    @mock.patch.object(engine, 'DOWNLOAD_CHUNK_SIZE', 1024)
+    def test_download_resumes_from_checkpoint(self):
+        large = os.urandom(5000)
+        self.container.put('dir/sub/b.bin', large, ContentSettings(content_md5=bytearray(hashlib.md5(large).digest())))
+        self.container.put('dir/a.txt', b'a', None)
+        self.container.put('other.txt', b'o', None)
+        self.container.failing_ranges = {('dir/sub/b.bin', 2048)}
+        destination = os.path.join(self.folder, 'download')
+
+        summary = self._engine().download('dir', destination, recursive=True)
+        self.assertEqual([failure['name'] for failure in summary['failed']], ['dir/sub/b.bin'])
+        self.assertFalse(os.path.exists(os.path.join(destination, 'dir', 'sub', 'b.bin')))
+
+        self.container.failing_ranges = set()
+        self.container.download_calls = []
+        summary = self._engine().download('dir', destination, recursive=True)
+        self.assertEqual((summary['transferred'], summary['skipped'], summary['failed']), (1, 1, []))
+        self.assertEqual(self.container.download_calls, [('dir/sub/b.bin', 2048)])
+        with open(os.path.join(destination, 'dir', 'sub', 'b.bin'), 'rb') as f:
+            self.assertEqual(f.read(), large)
+        self.assertEqual(sorted(os.listdir(os.path.join(destination, 'dir'))), ['a.txt', 'sub'])
+
+        self._engine().download('dir/a.txt', destination)
+        self.assertTrue(os.path.isfile(os.path.join(destination, 'a.txt')))
+
+    def test_download_md5_mismatch(self):
+        self.container.put('a.txt', b'a', ContentSettings(content_md5=bytearray(hashlib.md5(b'b').digest())))
+        destination = os.path.join(self.folder, 'a.txt')
+
+        summary = self._engine().download('a.txt', destination)
+        self.assertIn('MD5 mismatch', summary['failed'][0]['error'])
+        self.assertEqual(os.listdir(self.folder), ['checkpoints'])
+
+    def test_sync(self):
+        self._write('new.txt', b'new')
+        self._write('changed.txt', b'changed')
+        self._write(os.path.join('sub', 'same.txt'), b'same')
+        hour = datetime.timedelta(hours=1)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.container.put('dir/changed.txt', b'old', None, last_modified=now - hour)
+        self.container.put('dir/sub/same.txt', b'same', None, last_modified=now + hour)
+        self.container.put('dir/deleted.txt', b'deleted', None)
+        self.container.put('other/kept.txt', b'kept', None)
+
+        summary = self._engine().sync(os.path.join(self.folder, 'data'), 'dir')
+
+        self.assertEqual((summary['transferred'], summary['skipped'], summary['deleted']), (2, 1, 1))
+        self.assertEqual(sorted(self.container.blobs),
+                         ['dir/changed.txt', 'dir/new.txt', 'dir/sub/same.txt', 'other/kept.txt'])
+        self.assertEqual(self.container.blobs['dir/changed.txt'].data, b'changed')
+
+
+@unittest.skipUnless(os.environ.get('AZURITE_CONNECTION_STRING'),
+                     'set AZURITE_CONNECTION_STRING to benchmark the native engine against Azurite')
+class BlobTransferEngineBenchmark(unittest.TestCase):
+    # Uploads and downloads a directory of files with different degrees of concurrency, e.g. against Azurite
+    # started with `azurite-blob --loose`.
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.container = ContainerClient.from_connection_string(os.environ['AZURITE_CONNECTION_STRING'],
+                                                                'benchmark{}'.format(uuid.uuid4().hex[:8]))
+        self.container.create_container()
+        os.makedirs(os.path.join(self.folder, 'data', 'sub'))
+        for index in range(16):
+            with open(os.path.join(self.folder, 'data', 'sub' if index % 2 else '', str(index)), 'wb') as f:
+                f.write(os.urandom(4 * 1024 * 1024 if index % 4 else 20 * 1024 * 1024))
+
+    def tearDown(self):
+        self.container.delete_container()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_benchmark(self):
+        report = {}
+        for concurrency in [1, 16]:
+            transfer = BlobTransferEngine(self.container, max_concurrency=concurrency)
+            start = time.perf_counter()
+            summary = transfer.upload(os.path.join(self.folder, 'data'), str(concurrency) + '/', recursive=True)
+            upload_time = time.perf_counter() - start
+            start = time.perf_counter()
+            transfer.download(str(concurrency) + '/data', os.path.join(self.folder, str(concurrency)), recursive=True)
+            download_time = time.perf_counter() - start
+            report[concurrency] = (summary['bytes'] / upload_time / 2 ** 20, summary['bytes'] / download_time / 2 ** 20)
+        print('MiB/s (upload, download) by concurrency: {}'.format(report))
+        self.assertEqual(summary['failed'], [])
@@ -46,3 +46,25 @@ def list_generator(pages, num_results):
         result += page
 
     return result
+
+
+def get_track2_account_url(client):
+    """Returns the blob service url of the account of the given track1 blob service client."""
+    # The endpoint of emulator accounts contains the account name as well
+    return '{}://{}'.format(client.protocol, client.primary_endpoint)
+
+
+def get_track2_container_client(cmd, client, container_name):
+    """Returns a ContainerClient of the vendored track2 blob SDK that uses the same account and credentials as the
+    given track1 blob service client."""
+    from .vendored_sdks.blob import ContainerClient
+
+    account_url = get_track2_account_url(client)
+    if client.sas_token:
+        credential = client.sas_token
+    elif client.account_key:
+        credential = {'account_name': client.account_name, 'account_key': client.account_key}
+    else:
+        from azure.cli.core._profile import Profile
+        credential = Profile(cli_ctx=cmd.cli_ctx).get_login_credentials()[0]
+    return ContainerClient(account_url, container_name, credential=credential)
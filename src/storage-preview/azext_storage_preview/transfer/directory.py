@@ -0,0 +1,222 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Parallel delete and move of blob directories on accounts without hierarchical namespace, where the service
+# only processes a directory one page of blobs at a time.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import ResourceNotFoundError
+from knack.log import get_logger
+
+from ..vendored_sdks.blob import BlobPrefix
+from .engine import DEFAULT_MAX_CONCURRENCY, TransferCheckpoint
+
+logger = get_logger(__name__)
+
+# The maximum number of sub-requests in a blob batch request
+BATCH_SIZE = 256
+COPY_POLL_INTERVAL = 1
+
+
+class DirectoryBatchOperation(object):
+    """Deletes or moves all blobs under a virtual directory.
+
+    The directory is split into partitions, one per sub-directory plus one for the blobs directly under it, which
+    are listed in parallel. Listed blobs are deleted with blob batch requests, or copied and then batch deleted when
+    moving, by a second pool. Snapshots are deleted with their blob, they aren't moved. Completed partitions are journaled so that running the operation again after an
+    interruption skips them.
+    """
+
+    def __init__(self, container_client, max_concurrency=None, checkpoint=None, progress_callback=None):
+        self.container_client = container_client
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.checkpoint = checkpoint or TransferCheckpoint()
+        self.progress_callback = progress_callback
+        # Limits the number of listed batches waiting to be processed
+        self._batch_slots = threading.BoundedSemaphore(self.max_concurrency * 2)
+        self._progress_lock = threading.Lock()
+        self._processed = 0
+
+    def delete(self, directory_path):
+        summary = self._run(directory_path, self._delete_batch)
+        if not summary['failed']:
+            self._delete_blob(directory_path)
+        return summary
+
+    def move(self, source_path, new_path):
+        source_path, new_path = source_path.rstrip('/'), new_path.rstrip('/')
+
+        def move_batch(names):
+            return self._move_batch(names, source_path, new_path)
+
+        # The directory itself is a blob, move it first so that the destination directory exists
+        if self._blob_exists(source_path):
+            self._copy_blob(source_path, new_path)
+        summary = self._run(source_path, move_batch)
+        if not summary['failed']:
+            self._delete_blob(source_path)
+        return summary
+
+    def _run(self, directory_path, process_batch):
+        prefix = directory_path.rstrip('/') + '/'
+        sub_directories, blobs = [], []
+        for item in self.container_client.walk_blobs(name_starts_with=prefix, delimiter='/'):
+            if isinstance(item, BlobPrefix):
+                sub_directories.append(item.name)
+            else:
+                blobs.append(item.name)
+        partitions = [(sub_directory, None) for sub_directory in sub_directories] + [(prefix, blobs)]
+
+        summary = {'processed': 0, 'skipped_partitions': 0, 'failed': []}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as batch_pool, \
+                ThreadPoolExecutor(max_workers=self.max_concurrency) as partition_pool:
+            futures = []
+            for partition, partition_blobs in partitions:
+                if ('partition', partition) in self.checkpoint:
+                    summary['skipped_partitions'] += 1
+                    continue
+                futures.append(partition_pool.submit(self._process_partition, partition, partition_blobs,
+                                                     process_batch, batch_pool))
+            for future in futures:
+                summary['failed'].extend(future.result())
+
+        summary['processed'] = self._processed
+        if not summary['failed']:
+            self.checkpoint.clear()
+        return summary
+
+    def _process_partition(self, partition, blobs, process_batch, batch_pool):
+        if blobs is None:
+            # Blobs are listed by name, so deleting the listed blobs doesn't affect the following pages
+            blobs = (blob.name for blob in self.container_client.list_blobs(name_starts_with=partition))
+
+        futures = []
+        try:
+            for batch in _batches(blobs, BATCH_SIZE):
+                self._batch_slots.acquire()
+                try:
+                    futures.append(batch_pool.submit(self._process_batch, process_batch, batch))
+                except BaseException:
+                    self._batch_slots.release()
+                    raise
+        except Exception as ex:  # pylint: disable=broad-except
+            failed = [{'name': partition, 'error': str(ex)}]
+        else:
+            failed = []
+        for future in futures:
+            failed.extend(future.result())
+
+        if not failed:
+            self.checkpoint.add('partition', partition)
+        return failed
+
+    def _process_batch(self, process_batch, names):
+        try:
+            failed = process_batch(names)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.debug("Batch starting with %s failed: %s", names[0], ex)
+            failed = [{'name': name, 'error': str(ex)} for name in names]
+        finally:
+            self._batch_slots.release()
+        with self._progress_lock:
+            self._processed += len(names) - len(failed)
+            processed = self._processed
+        if self.progress_callback:
+            self.progress_callback(processed)
+        return failed
+
+    def _delete_batch(self, names):
+        responses = self.container_client.delete_blobs(*names, delete_snapshots='include',
+                                                       raise_on_any_failure=False)
+        # Blobs that are already gone were deleted by an earlier, interrupted run
+        return [{'name': name, 'error': '{} {}'.format(response.status_code, response.reason)}
+                for name, response in zip(names, responses) if response.status_code not in (202, 404)]
+
+    def _move_batch(self, names, source_path, new_path):
+        copied, failed = self._copy_blobs({name: new_path + name[len(source_path):] for name in names})
+        if copied:
+            # Snapshots aren't copied, they are deleted along with the source blob as when deleting the directory
+            responses = self.container_client.delete_blobs(*copied, delete_snapshots='include',
+                                                           raise_on_any_failure=False)
+            failed.extend({'name': name, 'error': '{} {}'.format(response.status_code, response.reason)}
+                          for name, response in zip(copied, responses) if response.status_code not in (202, 404))
+        return failed
+
+    def _copy_blob(self, source_name, destination_name):
+        _, failed = self._copy_blobs({source_name: destination_name})
+        if failed:
+            raise ValueError(failed[0]['error'])
+
+    def _copy_blobs(self, copies):
+        """Copies each source blob to its destination. All copies are started before waiting for the pending ones,
+        which are then polled together. Returns the names of the copied sources and the failures. Sources that are
+        gone were moved by an earlier run and are neither copied nor failed."""
+        copied, failed, pending = [], [], {}
+        for source_name, destination_name in copies.items():
+            source = self.container_client.get_blob_client(source_name)
+            destination = self.container_client.get_blob_client(destination_name)
+            try:
+                copy = destination.start_copy_from_url(source.url)
+            except ResourceNotFoundError:
+                continue
+            except Exception as ex:  # pylint: disable=broad-except
+                failed.append({'name': source_name, 'error': str(ex)})
+                continue
+            # Copies within an account usually complete synchronously
+            if copy['copy_status'] == 'pending':
+                pending[source_name] = destination
+            else:
+                self._add_copy_result(copied, failed, source_name, destination_name, copy['copy_status'],
+                                      copy.get('copy_status_description'))
+
+        while pending:
+            time.sleep(COPY_POLL_INTERVAL)
+            for source_name, destination in list(pending.items()):
+                try:
+                    properties = destination.get_blob_properties().copy
+                except Exception as ex:  # pylint: disable=broad-except
+                    del pending[source_name]
+                    failed.append({'name': source_name, 'error': str(ex)})
+                    continue
+                if properties.status != 'pending':
+                    del pending[source_name]
+                    self._add_copy_result(copied, failed, source_name, copies[source_name], properties.status,
+                                          properties.status_description)
+        return copied, failed
+
+    @staticmethod
+    def _add_copy_result(copied, failed, source_name, destination_name, status, status_description):
+        if status == 'success':
+            copied.append(source_name)
+        else:
+            failed.append({'name': source_name, 'error': "Copy of '{}' to '{}' {}: {}".format(
+                source_name, destination_name, status, status_description)})
+
+    def _blob_exists(self, name):
+        try:
+            self.container_client.get_blob_client(name).get_blob_properties()
+            return True
+        except ResourceNotFoundError:
+            return False
+
+    def _delete_blob(self, name):
+        try:
+            self.container_client.delete_blob(name)
+        except ResourceNotFoundError:
+            pass
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
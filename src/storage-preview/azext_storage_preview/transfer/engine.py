@@ -0,0 +1,371 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Blob transfers that run in the CLI process on top of the vendored track2 blob SDK, used by the azcopy commands
+# with `--engine native` instead of spawning the bundled AzCopy binary.
+
+import datetime
+import functools
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotFoundError
+from knack.log import get_logger
+
+from ..vendored_sdks.blob import BlobBlock, ContentSettings
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+# The service only returns a transactional MD5 for ranges of up to 4MiB
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+PARTIAL_DOWNLOAD_SUFFIX = '.azpartial'
+
+
+class TransferCheckpoint(object):
+    """Journal of the files and download ranges a transfer has completed, so that running the same transfer again
+    after an interruption skips them. The journal is removed once the transfer succeeds."""
+
+    def __init__(self, checkpoint_dir=None, job_key=None):
+        self.path = None
+        self._entries = set()
+        self._lock = threading.Lock()
+        if not checkpoint_dir:
+            return
+        self.path = os.path.join(checkpoint_dir, hashlib.sha1(job_key.encode('utf-8')).hexdigest() + '.jsonl')
+        if os.path.isfile(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._entries.add(tuple(json.loads(line)))
+                    except ValueError:
+                        pass  # a line cut short by the interruption
+            logger.warning("Resuming the transfer, %d completed items will be skipped.", len(self._entries))
+
+    def __contains__(self, entry):
+        return entry in self._entries
+
+    def add(self, *entry):
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._entries.add(entry)
+
+    def clear(self):
+        if self.path and os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class BlobTransferEngine(object):
+    """Transfers files between the local file system and a blob container.
+
+    Files are enumerated lazily and handed to a pool of file workers as they are found. Large files are split into
+    blocks (uploads) or ranges (downloads) that are transferred by a second pool, so a single big file uses every
+    connection. Every transfer returns a summary of the files transferred, skipped, deleted and failed.
+    """
+
+    def __init__(self, container_client, max_concurrency=None, block_size=None, checkpoint=None,
+                 progress_callback=None):
+        self.container_client = container_client
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.block_size = block_size or DEFAULT_BLOCK_SIZE
+        self.checkpoint = checkpoint or TransferCheckpoint()
+        self.progress_callback = progress_callback
+        self._block_pool = None
+        # Limits the number of blocks read into memory and waiting to be uploaded across all files
+        self._block_slots = threading.BoundedSemaphore(self.max_concurrency * 2)
+        self._progress_lock = threading.Lock()
+        self._bytes_done = 0
+        self._bytes_total = 0
+
+    def upload(self, source, blob_path, recursive=False):
+        return self._run(self._upload_tasks(source, blob_path, recursive))
+
+    def download(self, blob_path, destination, recursive=False):
+        return self._run(self._download_tasks(blob_path, destination, recursive))
+
+    def sync(self, source, blob_path, delete_destination=True):
+        return self._run(self._sync_tasks(source, blob_path, delete_destination))
+
+    def _run(self, tasks):
+        summary = {'transferred': 0, 'skipped': 0, 'deleted': 0, 'bytes': 0, 'failed': []}
+        pending = {}
+
+        def collect(futures):
+            for future in futures:
+                name = pending.pop(future)
+                try:
+                    summary[future.result()] += 1
+                except Exception as ex:  # pylint: disable=broad-except
+                    logger.debug("Failed to transfer %s: %s", name, ex)
+                    summary['failed'].append({'name': name, 'error': str(ex)})
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as block_pool, \
+                ThreadPoolExecutor(max_workers=self.max_concurrency) as file_pool:
+            self._block_pool = block_pool
+            for name, size, func in tasks:
+                self._add_progress(total=size)
+                pending[file_pool.submit(func)] = name
+                # Keep enumerating only as fast as files are transferred
+                if len(pending) >= self.max_concurrency * 4:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            collect(list(pending))
+
+        summary['bytes'] = self._bytes_done
+        if not summary['failed']:
+            self.checkpoint.clear()
+        return summary
+
+    def _add_progress(self, done=0, total=0):
+        with self._progress_lock:
+            self._bytes_done += done
+            self._bytes_total += total
+            current, total = self._bytes_done, self._bytes_total
+        if self.progress_callback:
+            self.progress_callback(current, total)
+
+    # Uploads
+
+    def _upload_tasks(self, source, blob_path, recursive):
+        for path, blob_name in _list_upload_sources(source, blob_path, recursive):
+            yield blob_name, os.path.getsize(path), functools.partial(self._upload_file, path, blob_name)
+
+    def _upload_file(self, path, blob_name):
+        stat = os.stat(path)
+        entry = ('upload', blob_name, stat.st_size, stat.st_mtime_ns)
+        if entry in self.checkpoint:
+            self._add_progress(done=stat.st_size)
+            return 'skipped'
+
+        blob_client = self.container_client.get_blob_client(blob_name)
+        content_settings = ContentSettings(content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        if stat.st_size <= self.block_size:
+            with open(path, 'rb') as f:
+                data = f.read()
+            content_settings.content_md5 = bytearray(hashlib.md5(data).digest())
+            blob_client.upload_blob(data, overwrite=True, content_settings=content_settings, validate_content=True)
+            self._add_progress(done=len(data))
+        else:
+            self._upload_blocks(blob_client, path, stat, content_settings)
+        self.checkpoint.add(*entry)
+        return 'transferred'
+
+    def _upload_blocks(self, blob_client, path, stat, content_settings):
+        # Block ids are derived from the file's size and modification time, so the blocks staged by an interrupted
+        # upload of the same file, which the service keeps for a week, don't have to be uploaded again.
+        fingerprint = hashlib.sha1('{}:{}:{}'.format(stat.st_size, stat.st_mtime_ns, self.block_size)
+                                   .encode('utf-8')).hexdigest()[:16]
+        block_count = (stat.st_size + self.block_size - 1) // self.block_size
+        block_ids = ['{}-{:06d}'.format(fingerprint, index) for index in range(block_count)]
+        staged = _get_uncommitted_blocks(blob_client)
+
+        md5 = hashlib.md5()
+        futures = []
+        try:
+            with open(path, 'rb') as f:
+                for block_id in block_ids:
+                    self._block_slots.acquire()
+                    try:
+                        data = f.read(self.block_size)
+                        md5.update(data)
+                        if staged.get(block_id) == len(data):
+                            self._block_slots.release()
+                            self._add_progress(done=len(data))
+                            continue
+                        futures.append(self._block_pool.submit(self._stage_block, blob_client, block_id, data))
+                    except BaseException:
+                        self._block_slots.release()
+                        raise
+        finally:
+            for future in futures:
+                future.result()
+
+        content_settings.content_md5 = bytearray(md5.digest())
+        blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids],
+                                      content_settings=content_settings)
+
+    def _stage_block(self, blob_client, block_id, data):
+        try:
+            blob_client.stage_block(block_id, data, length=len(data), validate_content=True)
+        finally:
+            self._block_slots.release()
+        self._add_progress(done=len(data))
+
+    # Downloads
+
+    def _download_tasks(self, blob_path, destination, recursive):
+        contents_only = blob_path == '*' or blob_path.endswith('/*')
+        blob_path = blob_path.rstrip('*').rstrip('/')
+        if not recursive and not contents_only:
+            blob = self.container_client.get_blob_client(blob_path).get_blob_properties()
+            target = os.path.join(destination, blob_path.rsplit('/', 1)[-1]) \
+                if os.path.isdir(destination) else destination
+            yield blob.name, blob.size, functools.partial(self._download_blob, blob, target)
+            return
+
+        prefix = blob_path + '/' if blob_path else ''
+        local_root = os.path.abspath(destination if contents_only else
+                                     os.path.join(destination, blob_path.rsplit('/', 1)[-1] or
+                                                  self.container_client.container_name))
+        for blob in self.container_client.list_blobs(name_starts_with=prefix or None):
+            relative = blob.name[len(prefix):]
+            if not relative or relative.endswith('/') or (not recursive and '/' in relative):
+                continue
+            target = os.path.abspath(os.path.join(local_root, *relative.split('/')))
+            if not target.startswith(local_root + os.sep):
+                logger.warning("Skipping blob '%s' as it would be downloaded outside of %s.", blob.name, local_root)
+                continue
+            yield blob.name, blob.size, functools.partial(self._download_blob, blob, target)
+
+    def _download_blob(self, blob, target):
+        entry = ('download', blob.name, blob.etag)
+        if entry in self.checkpoint and os.path.isfile(target):
+            self._add_progress(done=blob.size)
+            return 'skipped'
+
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        partial_path = target + PARTIAL_DOWNLOAD_SUFFIX
+        chunk_count = (blob.size + DOWNLOAD_CHUNK_SIZE - 1) // DOWNLOAD_CHUNK_SIZE
+        completed = set()
+        if os.path.isfile(partial_path):
+            completed = {index for index in range(chunk_count)
+                         if ('chunk', blob.name, blob.etag, index) in self.checkpoint}
+        with open(partial_path, 'r+b' if completed else 'wb') as f:
+            f.truncate(blob.size)
+        self._add_progress(done=sum(_chunk_length(blob.size, index) for index in completed))
+
+        blob_client = self.container_client.get_blob_client(blob.name)
+        futures = [self._block_pool.submit(self._download_chunk, blob_client, blob, partial_path, index)
+                   for index in range(chunk_count) if index not in completed]
+        for future in futures:
+            future.result()
+
+        content_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+        if content_md5 and _file_md5(partial_path) != bytes(content_md5):
+            os.remove(partial_path)
+            raise ValueError("MD5 mismatch, the downloaded content of '{}' doesn't match the blob's Content-MD5."
+                             .format(blob.name))
+        os.replace(partial_path, target)
+        self.checkpoint.add(*entry)
+        return 'transferred'
+
+    def _download_chunk(self, blob_client, blob, partial_path, index):
+        offset = index * DOWNLOAD_CHUNK_SIZE
+        length = _chunk_length(blob.size, index)
+        # The etag makes sure all ranges come from the same version of the blob
+        data = blob_client.download_blob(offset=offset, length=length, etag=blob.etag,
+                                         match_condition=MatchConditions.IfNotModified,
+                                         validate_content=True).readall()
+        with open(partial_path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+        self.checkpoint.add('chunk', blob.name, blob.etag, index)
+        self._add_progress(done=len(data))
+
+    # Sync
+
+    def _sync_tasks(self, source, blob_path, delete_destination):
+        # Like azcopy sync, a file is uploaded when it's missing from the container or was modified after the blob
+        if os.path.isfile(source):
+            blob_name = _upload_blob_name(source, blob_path)
+            sources = [(source, blob_name)]
+            try:
+                existing = {blob_name: self.container_client.get_blob_client(blob_name)
+                            .get_blob_properties().last_modified}
+            except ResourceNotFoundError:
+                existing = {}
+        else:
+            sources = _list_upload_sources(os.path.join(source.rstrip('*'), '*'), blob_path, recursive=True)
+            prefix = blob_path.rstrip('/') + '/' if blob_path.rstrip('/') else None
+            existing = {blob.name: blob.last_modified
+                        for blob in self.container_client.list_blobs(name_starts_with=prefix)
+                        if not blob.name.endswith('/')}
+
+        for path, blob_name in sources:
+            stat = os.stat(path)
+            last_modified = existing.pop(blob_name, None)
+            modified = datetime.datetime.fromtimestamp(stat.st_mtime, tz=datetime.timezone.utc)
+            if last_modified and last_modified >= modified:
+                yield blob_name, stat.st_size, functools.partial(self._skip, stat.st_size)
+            else:
+                yield blob_name, stat.st_size, functools.partial(self._upload_file, path, blob_name)
+
+        if delete_destination:
+            for blob_name in existing:
+                yield blob_name, 0, functools.partial(self._delete_blob, blob_name)
+
+    def _skip(self, size):
+        self._add_progress(done=size)
+        return 'skipped'
+
+    def _delete_blob(self, blob_name):
+        try:
+            self.container_client.delete_blob(blob_name)
+        except ResourceNotFoundError:
+            pass
+        return 'deleted'
+
+
+def _list_upload_sources(source, blob_path, recursive):
+    # Yields (local path, blob name) pairs following azcopy's rules: a directory is uploaded into a virtual
+    # directory of the same name, while 'directory/*' uploads its contents.
+    contents_only = source.endswith('*')
+    source = source.rstrip('*')
+    if os.path.isfile(source) and not contents_only:
+        yield source, _upload_blob_name(source, blob_path)
+        return
+    if not os.path.isdir(source or '.'):
+        raise ValueError('incorrect usage: source {} does not exist'.format(source))
+    if not recursive and not contents_only:
+        raise ValueError('incorrect usage: --recursive is required to upload a directory')
+
+    source = source or '.'
+    prefix = blob_path.rstrip('/') + '/' if blob_path.rstrip('/') else ''
+    if not contents_only:
+        prefix += os.path.basename(os.path.normpath(os.path.abspath(source))) + '/'
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        relative_root = os.path.relpath(root, source)
+        for name in sorted(files):
+            relative = name if relative_root == '.' else os.path.join(relative_root, name)
+            yield os.path.join(root, name), prefix + relative.replace(os.sep, '/')
+        if not recursive:
+            break
+
+
+def _upload_blob_name(path, blob_path):
+    # A single file keeps its name when it's uploaded to the root of the container or to a virtual directory
+    if not blob_path or blob_path.endswith('/'):
+        return blob_path + os.path.basename(path)
+    return blob_path
+
+
+def _get_uncommitted_blocks(blob_client):
+    try:
+        _, uncommitted = blob_client.get_block_list('uncommitted')
+    except ResourceNotFoundError:
+        return {}
+    return {block.id: block.size for block in uncommitted}
+
+
+def _chunk_length(size, index):
+    return min(DOWNLOAD_CHUNK_SIZE, size - index * DOWNLOAD_CHUNK_SIZE)
+
+
+def _file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(DEFAULT_BLOCK_SIZE), b''):
+            md5.update(data)
+    return md5.digest()
@@ -10,6 +10,7 @@ helps['vm repair'] = """
     short-summary: Auto repair commands to fix VMs.
     long-summary: |
         VM repair command will enable Azure users to self-repair non-bootable VMs by copying the source VM's OS disk and attaching it to a newly created repair VM.
+        The az commands the repair commands depend on are run within the same process. To run each of them in a new az process instead, use `az config set vm_repair.command_runner=subprocess`.
 """
 
 helps['vm repair create'] = """
@@ -58,11 +59,20 @@ helps['vm repair run'] = """
         - name: Run unverified script from your fork of https://github.com/Azure/repair-script-library
           text: >
             az vm repair run -g MyResourceGroup -n MySourceWinVM --preview "https://github.com/haagha/repair-script-library/blob/master/map.json" --run-id test
+        - name: Run the script with <run-id> on many VMs concurrently.
+          text: >
+            az vm repair run --ids $(az vm list -g MyResourceGroup --query "[?storageProfile.osDisk.osType=='Windows'].id" -o tsv) --run-id win-hello-world
+        - name: Run the script with <run-id> using the cached list of scripts, without fetching it from GitHub.
+          text: >
+            az vm repair run -g MyResourceGroup -n MySourceWinVM --run-id win-hello-world --offline
 """
 
 helps['vm repair list-scripts'] = """
     type: command
     short-summary: List available scripts. Located https://github.com/Azure/repair-script-library
+    long-summary: >
+        The list of scripts is cached and fetched again from GitHub once it is an hour old, or after the number of seconds
+        set with `az config set vm_repair.script_map_ttl=<seconds>`. The cached list is used when GitHub can't be reached.
     examples:
         - name: List scripts
           text: >
@@ -76,6 +86,9 @@ helps['vm repair list-scripts'] = """
         - name: List unverified script from your fork of https://github.com/Azure/repair-script-library
           text: >
             az vm repair list-scripts --preview "https://github.com/haagha/repair-script-library/blob/master/map.json"
+        - name: List the cached scripts without fetching them from GitHub.
+          text: >
+            az vm repair list-scripts --offline
 """
 
 helps['vm repair reset-nic'] = """
@@ -46,9 +46,11 @@ def load_arguments(self, _):
         c.argument('parameters', nargs='+', help="Space-separated parameters in the format of '[name=]value'. Positional for bash scripts.")
         c.argument('run_on_repair', help="Script will be run on the linked repair VM.")
         c.argument('preview', help="URL of forked repair script library's map.json https://github.com/{user}/repair-script-library/blob/master/map.json")
+        c.argument('offline', help="Use the cached list of scripts instead of fetching it from GitHub.")
 
     with self.argument_context('vm repair list-scripts') as c:
         c.argument('preview', help="URL of forked repair script library's map.json https://github.com/{user}/repair-script-library/blob/master/map.json")
+        c.argument('offline', help="Use the cached list of scripts instead of fetching it from GitHub.")
 
     with self.argument_context('vm repair reset-nic') as c:
         c.argument('subscriptionid', help='Subscription id to default subscription using `az account set -s NAME_OR_ID`.')
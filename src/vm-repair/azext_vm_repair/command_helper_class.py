@@ -14,7 +14,7 @@ from azure.cli.core.commands.client_factory import get_subscription_id
 
 from .telemetry import _track_command_telemetry, _track_run_command_telemetry
 
-from .repair_utils import _get_function_param_dict
+from .repair_utils import _get_function_param_dict, _set_command_runner, COMMAND_RUNNER_IN_PROCESS
 
 STATUS_SUCCESS = 'SUCCESS'
 STATUS_ERROR = 'ERROR'
@@ -44,6 +44,9 @@ class command_helper:
         # CLI cmd object
         self.cmd = cmd
 
+        # Run the az commands of this command in-process unless the subprocess runner is configured
+        _set_command_runner(cmd.cli_ctx.config.get('vm_repair', 'command_runner', fallback=COMMAND_RUNNER_IN_PROCESS))
+
         # Command name
         self.command_name = command_name
 
@@ -43,9 +43,11 @@ from .repair_utils import (
     _unlock_encrypted_vm_run,
     _create_repair_vm,
     _check_n_start_vm,
-    _check_existing_rg
+    _check_existing_rg,
+    _run_in_parallel,
+    _get_run_script_map_cache_settings
 )
-from .exceptions import AzCommandError, SkuNotAvailableError, UnmanagedDiskCopyError, WindowsOsNotAvailableError, RunScriptNotFoundForIdError, SkuDoesNotSupportHyperV, ScriptReturnsError, SupportingResourceNotFoundError, CommandCanceledByUserError
+from .exceptions import AzCommandError, SkuNotAvailableError, UnmanagedDiskCopyError, WindowsOsNotAvailableError, RunScriptNotFoundForIdError, ScriptMapNotCachedError, SkuDoesNotSupportHyperV, ScriptReturnsError, SupportingResourceNotFoundError, CommandCanceledByUserError
 logger = get_logger(__name__)
 
 
@@ -89,8 +91,18 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
             create_repair_vm_command = 'az vm create -g {g} -n {n} --tag {tag} --image {image} --admin-username {username} --admin-password {password} --public-ip-address {option}' \
                 .format(g=repair_group_name, n=repair_vm_name, tag=resource_tag, image=os_image_urn, username=repair_username, password=repair_password, option=associate_public_ip)
 
-        # Fetch VM size of repair VM
-        sku = _fetch_compatible_sku(source_vm, enable_nested)
+        def create_resource_group():
+            if not _check_existing_rg(repair_group_name):
+                create_resource_group_command = 'az group create -l {loc} -n {group_name}' \
+                                                .format(loc=source_vm.location, group_name=repair_group_name)
+                logger.info('Creating resource group for repair VM and its resources...')
+                _call_az_command(create_resource_group_command)
+
+        # Fetch VM size of repair VM, create new resource group and fetch OS disk info in parallel
+        sku, _, disk_info = _run_in_parallel(
+            lambda: _fetch_compatible_sku(source_vm, enable_nested),
+            create_resource_group,
+            lambda: _fetch_disk_info(resource_group_name, target_disk_name) if is_managed else None)
         if not sku:
             raise SkuNotAvailableError('Failed to find compatible VM size for source VM\'s OS disk within given region and subscription.')
         create_repair_vm_command += ' --size {sku}'.format(sku=sku)
@@ -100,19 +112,12 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
             zone = source_vm.zones[0]
             create_repair_vm_command += ' --zone {zone}'.format(zone=zone)
 
-        # Create new resource group
-        if not _check_existing_rg(repair_group_name):
-            create_resource_group_command = 'az group create -l {loc} -n {group_name}' \
-                                            .format(loc=source_vm.location, group_name=repair_group_name)
-            logger.info('Creating resource group for repair VM and its resources...')
-            _call_az_command(create_resource_group_command)
-
         # MANAGED DISK
         if is_managed:
             logger.info('Source VM uses managed disks. Creating repair VM with managed disks.\n')
 
             # Copy OS disk command
-            disk_sku, location, os_type, hyperV_generation = _fetch_disk_info(resource_group_name, target_disk_name)
+            disk_sku, location, os_type, hyperV_generation = disk_info
             copy_disk_command = 'az disk create -g {g} -n {n} --source {s} --sku {sku} --location {loc} --os-type {os_type} --query id -o tsv' \
                                 .format(g=resource_group_name, n=copy_disk_name, s=target_disk_name, sku=disk_sku, loc=location, os_type=os_type)
 
@@ -128,7 +133,14 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
                 copy_disk_command += ' --zone {zone}'.format(zone=zone)
             # Copy OS Disk
             logger.info('Copying OS disk of source VM...')
-            copy_disk_id = _call_az_command(copy_disk_command).strip('\n')
+            if is_linux and (not unlock_encrypted_vm):
+                # The repair VM is created without the copied disk, so both are done in parallel
+                logger.info('Creating repair VM while disk copy is in progress...')
+                copy_disk_id, _ = _run_in_parallel(
+                    lambda: _call_az_command(copy_disk_command).strip('\n'),
+                    lambda: _create_repair_vm(None, create_repair_vm_command, repair_password, repair_username, fix_uuid=True))
+            else:
+                copy_disk_id = _call_az_command(copy_disk_command).strip('\n')
 
             # Create VM according to the two conditions: is_linux, unlock_encrypted_vm
             # Only in the case of a Linux VM without encryption the data-disk gets attached after VM creation.
@@ -148,8 +160,7 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
                 _unlock_encrypted_vm_run(repair_vm_name, repair_group_name, is_linux)
 
             if is_linux and (not unlock_encrypted_vm):
-                # linux without encryption
-                _create_repair_vm(copy_disk_id, create_repair_vm_command, repair_password, repair_username, fix_uuid=True)
+                # linux without encryption, the repair VM was created along with the disk copy
                 logger.info('Attaching copied disk to repair VM as data disk...')
                 attach_disk_command = "az vm disk attach -g {g} --name {disk_id} --vm-name {vm_name} ".format(g=repair_group_name, disk_id=copy_disk_id, vm_name=repair_vm_name)
                 _call_az_command(attach_disk_command)
@@ -377,7 +388,7 @@ def restore(cmd, vm_name, resource_group_name, disk_name=None, repair_vm_id=None
     return return_dict
 
 
-def run(cmd, vm_name, resource_group_name, run_id=None, repair_vm_id=None, custom_script_file=None, parameters=None, run_on_repair=False, preview=None):
+def run(cmd, vm_name, resource_group_name, run_id=None, repair_vm_id=None, custom_script_file=None, parameters=None, run_on_repair=False, preview=None, offline=False):
 
     # Init command helper object
     command = command_helper(logger, cmd, 'vm repair run')
@@ -406,8 +417,9 @@ def run(cmd, vm_name, resource_group_name, run_id=None, repair_vm_id=None, custo
 
         # Normal scenario with run id
         if not custom_script_file:
-            # Fetch run path from GitHub
-            repair_script_path = _fetch_run_script_path(run_id)
+            # Fetch run path from GitHub or the cached script list
+            cache_dir, ttl = _get_run_script_map_cache_settings(cmd)
+            repair_script_path = _fetch_run_script_path(run_id, cache_dir, ttl, offline)
             run_command_params.append('script_path="./{}"'.format(repair_script_path))
 
         # Custom script scenario for script testers
@@ -477,6 +489,10 @@ def run(cmd, vm_name, resource_group_name, run_id=None, repair_vm_id=None, custo
         command.error_stack_trace = traceback.format_exc()
         command.error_message = str(exception)
         command.message = "Failed to fetch run script data from GitHub. Please check this repository is reachable: https://github.com/Azure/repair-script-library"
+    except ScriptMapNotCachedError as exception:
+        command.error_stack_trace = traceback.format_exc()
+        command.error_message = str(exception)
+        command.message = "Failed to load the cached run script data."
     except RunScriptNotFoundForIdError as exception:
         command.error_stack_trace = traceback.format_exc()
         command.error_message = str(exception)
@@ -506,7 +522,7 @@ def run(cmd, vm_name, resource_group_name, run_id=None, repair_vm_id=None, custo
     return return_dict
 
 
-def list_scripts(cmd, preview=None):
+def list_scripts(cmd, preview=None, offline=False):
 
     # Init command helper object
     command = command_helper(logger, cmd, 'vm repair list-scripts')
@@ -514,12 +530,17 @@ def list_scripts(cmd, preview=None):
         _set_repair_map_url(preview)
 
     try:
-        run_map = _fetch_run_script_map()
+        cache_dir, ttl = _get_run_script_map_cache_settings(cmd)
+        run_map = _fetch_run_script_map(cache_dir, ttl, offline)
         command.set_status_success()
     except requests.exceptions.RequestException as exception:
         command.error_stack_trace = traceback.format_exc()
         command.error_message = str(exception)
         command.message = "Failed to fetch run script data from GitHub. Please check this repository is reachable: https://github.com/Azure/repair-script-library"
+    except ScriptMapNotCachedError as exception:
+        command.error_stack_trace = traceback.format_exc()
+        command.error_message = str(exception)
+        command.message = "Failed to load the cached run script data."
     except Exception as exception:
         command.error_stack_trace = traceback.format_exc()
         command.error_message = str(exception)
@@ -24,6 +24,10 @@ class RunScriptNotFoundForIdError(Exception):
     """Raised when the run-id is not found in the repair-script-library"""
 
 
+class ScriptMapNotCachedError(Exception):
+    """Raised when the repair-script-library map is needed offline but has not been cached"""
+
+
 class SkuDoesNotSupportHyperV(Exception):
     """Raised when the SKU size does not end with v3"""
 
@@ -4,11 +4,20 @@
 # --------------------------------------------------------------------------------------------
 # pylint: disable=line-too-long, deprecated-method, global-statement
 # from logging import Logger  # , log
+import copy
+import io
+import logging
 import subprocess
 import shlex
 import os
 import re
-from json import loads
+import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from json import dump, load, loads
 import pkgutil
 import requests
 
@@ -16,10 +25,32 @@ from knack.log import get_logger
 from knack.prompting import prompt_y_n, NoTTYException
 
 from .encryption_types import Encryption
-from .exceptions import (AzCommandError, WindowsOsNotAvailableError, RunScriptNotFoundForIdError, SkuDoesNotSupportHyperV, SuseNotAvailableError)
+from .exceptions import (AzCommandError, WindowsOsNotAvailableError, RunScriptNotFoundForIdError, ScriptMapNotCachedError, SkuDoesNotSupportHyperV, SuseNotAvailableError)
 
 REPAIR_MAP_URL = 'https://raw.githubusercontent.com/Azure/repair-script-library/master/map.json'
 
+# map.json is cached in the CLI config folder and only downloaded again once it is older than the TTL in seconds,
+# set with `az config set vm_repair.script_map_ttl=<seconds>`. The download is conditional on the cached ETag.
+REPAIR_MAP_CACHE_FOLDER_NAME = 'vm_repair'
+REPAIR_MAP_CACHE_TTL = 3600
+REPAIR_MAP_TIMEOUT = 30
+# Serializes the map fetches of the VMs of an `az vm repair run --ids` invocation, so the map is downloaded once
+_repair_map_lock = threading.Lock()
+
+# How az commands are run: 'in-process' runs them with the CLI invoker of the current process, 'subprocess' spawns a
+# new az process for every command. Set with `az config set vm_repair.command_runner=subprocess`.
+COMMAND_RUNNER_IN_PROCESS = 'in-process'
+COMMAND_RUNNER_SUBPROCESS = 'subprocess'
+COMMAND_RUNNER = COMMAND_RUNNER_IN_PROCESS
+# The CLI invoker keeps the state of the running command in globals, such as its telemetry, so the commands run
+# within the current process are run one at a time. Steps run by _run_in_parallel spawn a new az process instead.
+_in_process_lock = threading.Lock()
+_parallel_step = threading.local()
+# Telemetry of the outer command that the commands run within the current process would overwrite
+TELEMETRY_SESSION_ATTRIBUTES = ['command', 'raw_command', 'output_type', 'parameters', 'extension_name',
+                                'extension_version', 'result', 'result_summary', 'error_type', 'exception_name',
+                                'exceptions']
+
 logger = get_logger(__name__)
 
 
@@ -58,10 +89,16 @@ def _is_gen2(vm):
     return 1
 
 
+def _set_command_runner(runner):
+    global COMMAND_RUNNER
+    COMMAND_RUNNER = runner
+
+
 def _call_az_command(command_string, run_async=False, secure_params=None):
     """
-    Uses subprocess to run a command string. To hide sensitive parameters from logs, add the
-    parameter in secure_params. If run_async is False then function returns the stdout.
+    Runs an az command string, within the current process unless the 'subprocess' command runner is configured,
+    run_async is True or it is run by a step of _run_in_parallel. To hide sensitive parameters from logs, add the parameter in secure_params.
+    If run_async is False then function returns the stdout.
     Raises AzCommandError if command fails.
     """
 
@@ -70,17 +107,21 @@ def _call_az_command(command_string, run_async=False, secure_params=None):
     # If command does not start with 'az' then raise exception
     if not tokenized_command or tokenized_command[0] != 'az':
         raise AzCommandError("The command string is not an 'az' command!")
+
+    # Hide sensitive data such as passwords from logs
+    secure_params = [param for param in secure_params or [] if param]
+    for param in secure_params:
+        command_string = command_string.replace(param, '********')
+    logger.debug("Calling: %s", command_string)
+
+    if COMMAND_RUNNER != COMMAND_RUNNER_SUBPROCESS and not run_async and not getattr(_parallel_step, 'active', False):
+        return _call_az_command_in_process(tokenized_command[1:], secure_params)
+
     # If run on windows, add 'cmd /c'
     windows_os_name = 'nt'
     if os.name == windows_os_name:
         tokenized_command = ['cmd', '/c'] + tokenized_command
 
-    # Hide sensitive data such as passwords from logs
-    if secure_params:
-        for param in secure_params:
-            if param:
-                command_string = command_string.replace(param, '********')
-    logger.debug("Calling: %s", command_string)
     process = subprocess.Popen(tokenized_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
 
     # Wait for process to terminate and fetch stdout and stderror
@@ -95,6 +136,101 @@ def _call_az_command(command_string, run_async=False, secure_params=None):
     return None
 
 
+class _SecureParamsFilter(logging.Filter):
+    """ Masks the secure parameters in the log records of a command run within the current process. """
+
+    def __init__(self, secure_params):
+        super().__init__()
+        self.secure_params = secure_params
+
+    def filter(self, record):
+        message = record.getMessage()
+        if any(param in message for param in self.secure_params):
+            for param in self.secure_params:
+                message = message.replace(param, '********')
+            record.msg, record.args = message, None
+        return True
+
+
+def _call_az_command_in_process(args, secure_params):
+    """
+    Runs the az command with the CLI invoker of the current process and returns its output as the az process would
+    have printed it. Errors aren't printed but raised as AzCommandError, like the stderr of a failed az process.
+    """
+    from azure.cli.core import get_default_cli
+
+    if '--only-show-errors' not in args:
+        args = args + ['--only-show-errors']
+    cli = get_default_cli()
+    # The error is raised from cli.result instead of being printed by the exception handler
+    cli.exception_handler = lambda ex: 1
+
+    handlers = logging.getLogger().handlers + logging.getLogger('cli').handlers
+    log_filter = _SecureParamsFilter(secure_params)
+    for handler in handlers:
+        handler.addFilter(log_filter)
+    out_file = io.StringIO()
+    try:
+        with _in_process_lock, _preserve_telemetry():
+            exit_code = cli.invoke(args, out_file=out_file)
+    except SystemExit as ex:
+        # Raised for invalid arguments, after the parser printed its error
+        exit_code = ex.code
+    finally:
+        for handler in handlers:
+            handler.removeFilter(log_filter)
+
+    if exit_code != 0:
+        error = cli.result.error if cli.result is not None else None
+        if isinstance(error, KeyboardInterrupt):
+            raise error
+        if error is None or isinstance(error, SystemExit):
+            message = 'The command failed with exit code {}'.format(exit_code)
+        else:
+            message = str(error)
+        for param in secure_params:
+            message = message.replace(param, '********')
+        raise AzCommandError(message)
+
+    logger.debug('Success.\n')
+
+    return out_file.getvalue()
+
+
+@contextmanager
+def _preserve_telemetry():
+    """ Restores the telemetry of the outer command once a command run within the current process is done. """
+    from azure.cli.core import telemetry
+
+    session = telemetry._session  # pylint: disable=protected-access
+    saved = {name: copy.copy(getattr(session, name, None)) for name in TELEMETRY_SESSION_ATTRIBUTES}
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(session, name, value)
+
+
+def _run_in_parallel(*steps):
+    """
+    Runs independent steps concurrently and returns their results in order.
+    The az commands of the steps are run in new az processes, as the CLI invoker isn't thread-safe.
+    All the steps are waited for before the error of the first failed step is raised, so no step is still running
+    while resources get cleaned up.
+    """
+    def run_step(step):
+        _parallel_step.active = True
+        try:
+            return step()
+        finally:
+            _parallel_step.active = False
+
+    with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+        futures = [executor.submit(run_step, step) for step in steps]
+        wait(futures)
+    return [future.result() for future in futures]
+
+
 def _invoke_run_command(script_name, vm_name, rg_name, is_linux, parameters=None, additional_custom_scripts=None):
     """
     Use azure run command to run the scripts within the vm-repair/scripts file and return stdout, stderr.
@@ -596,19 +732,83 @@ def _resolve_api_version(rcf, resource_provider_namespace, parent_resource_path,
         .format(resource_type))
 
 
-def _fetch_run_script_map():
-
-    # Fetch map.json from GitHub
-    response = requests.get(url=REPAIR_MAP_URL)
+def _fetch_run_script_map(cache_dir=None, ttl=REPAIR_MAP_CACHE_TTL, offline=False):
+    """
+    Returns the map.json of the repair script library. With a cache_dir, the map is cached there and downloaded again
+    only when the cache is older than ttl seconds and its ETag has changed. If offline is True or GitHub can't be
+    reached, the cached map is used however old it is.
+    """
+    if not cache_dir:
+        return _download_run_script_map()[0]
+
+    with _repair_map_lock:
+        cache_file = os.path.join(cache_dir, 'script_map_{}.json'.format(hashlib.sha256(REPAIR_MAP_URL.encode('utf-8')).hexdigest()[:16]))
+        cache = _read_run_script_map_cache(cache_file)
+        if offline:
+            if cache is None:
+                raise ScriptMapNotCachedError('The repair script list has not been cached yet. Please run the command once without --offline.')
+            logger.info('Using cached repair script list from %s', cache_file)
+            return cache['map']
+        if cache is not None and time.time() - cache['fetched_at'] < ttl:
+            logger.info('Using cached repair script list from %s', cache_file)
+            return cache['map']
+
+        try:
+            run_map, etag = _download_run_script_map(cache['etag'] if cache else None)
+        except requests.exceptions.RequestException as exception:
+            if cache is None:
+                raise
+            logger.warning('Failed to fetch the repair script list from GitHub, using the cached list. Error: %s', exception)
+            return cache['map']
+
+        if run_map is None:
+            logger.info('Cached repair script list is up to date.')
+            run_map = cache['map']
+        _write_run_script_map_cache(cache_file, {'url': REPAIR_MAP_URL, 'etag': etag, 'fetched_at': time.time(), 'map': run_map})
+        return run_map
+
+
+def _download_run_script_map(etag=None):
+    """
+    Downloads map.json from GitHub and returns it with its ETag. The map is None when it matches the given ETag.
+    """
+    headers = {'If-None-Match': etag} if etag else None
+    response = requests.get(url=REPAIR_MAP_URL, headers=headers, timeout=REPAIR_MAP_TIMEOUT)
+    if response.status_code == 304:
+        return None, etag
     # Raise exception when request fails
     response.raise_for_status()
 
-    return response.json()
+    return response.json(), response.headers.get('ETag')
+
+
+def _read_run_script_map_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = load(f)
+        if cache.get('url') == REPAIR_MAP_URL and 'map' in cache:
+            return cache
+    except (OSError, ValueError, AttributeError) as exception:
+        if os.path.exists(cache_file):
+            logger.debug('Ignoring invalid repair script list cache %s: %s', cache_file, exception)
+    return None
+
+
+def _write_run_script_map_cache(cache_file, cache):
+    # Written to a temporary file that replaces the cache, so a concurrent or interrupted command never reads half of it
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), prefix='.script_map')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            dump(cache, f)
+        os.replace(temp_file, cache_file)
+    except OSError as exception:
+        logger.debug('Failed to cache the repair script list in %s: %s', cache_file, exception)
 
 
-def _fetch_run_script_path(run_id):
+def _fetch_run_script_path(run_id, cache_dir=None, ttl=REPAIR_MAP_CACHE_TTL, offline=False):
 
-    map_json = _fetch_run_script_map()
+    map_json = _fetch_run_script_map(cache_dir, ttl, offline)
     repair_script_path = [script['path'] for script in map_json if script['id'] == run_id]
     if repair_script_path:
         return repair_script_path[0]
@@ -616,6 +816,15 @@ def _fetch_run_script_path(run_id):
     raise RunScriptNotFoundForIdError('Run-script not found for id: {}. Please validate if the id is correct.'.format(run_id))
 
 
+def _get_run_script_map_cache_settings(cmd):
+    """
+    Returns the cache folder and the TTL of the repair script list.
+    """
+    cache_dir = os.path.join(cmd.cli_ctx.config.config_dir, REPAIR_MAP_CACHE_FOLDER_NAME)
+    ttl = cmd.cli_ctx.config.getint('vm_repair', 'script_map_ttl', fallback=REPAIR_MAP_CACHE_TTL)
+    return cache_dir, ttl
+
+
 def _process_ps_parameters(parameters):
     """
     Returns a ps script formatted parameter string from a list of parameters.
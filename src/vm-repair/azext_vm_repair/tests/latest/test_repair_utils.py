@@ -0,0 +1,193 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# pylint: disable=protected-access
+import logging
+import logging.handlers
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from azext_vm_repair import repair_utils
+from azext_vm_repair.exceptions import AzCommandError, ScriptMapNotCachedError
+
+
+class FakeCli:
+
+    def __init__(self, exit_code=0, output='', error=None, log=None):
+        self.exit_code = exit_code
+        self.output = output
+        self.error = error
+        self.log = log
+        self.result = None
+        self.args = None
+
+    def invoke(self, args, out_file=None):
+        self.args = args
+        if self.log:
+            logging.getLogger('cli.azure.cli.core').debug(self.log)
+        out_file.write(self.output)
+        self.result = mock.Mock(error=self.error)
+        return self.exit_code
+
+
+class CallAzCommandTest(unittest.TestCase):
+
+    def setUp(self):
+        repair_utils._set_command_runner(repair_utils.COMMAND_RUNNER_IN_PROCESS)
+
+    @mock.patch('azure.cli.core.get_default_cli')
+    def test_call_az_command_in_process(self, get_default_cli):
+        cli = FakeCli(output='disk-id\n')
+        get_default_cli.return_value = cli
+        self.assertEqual(repair_utils._call_az_command('az disk create -g rg -n "my disk" --query id -o tsv'),
+                         'disk-id\n')
+        self.assertEqual(cli.args, ['disk', 'create', '-g', 'rg', '-n', 'my disk', '--query', 'id', '-o', 'tsv',
+                                    '--only-show-errors'])
+
+    @mock.patch('azure.cli.core.get_default_cli')
+    def test_call_az_command_in_process_masks_secure_params(self, get_default_cli):
+        handler = logging.handlers.BufferingHandler(100)
+        cli_logger = logging.getLogger('cli')
+        cli_logger.addHandler(handler)
+        cli_logger.setLevel(logging.DEBUG)
+        try:
+            get_default_cli.return_value = FakeCli(log='Command arguments: --admin-password Secret0!',
+                                                   exit_code=1, error=ValueError('Secret0! is not valid'))
+            with self.assertRaises(AzCommandError) as error:
+                repair_utils._call_az_command('az vm create --admin-password Secret0!', secure_params=['Secret0!', None])
+        finally:
+            cli_logger.removeHandler(handler)
+
+        self.assertEqual(str(error.exception), '******** is not valid')
+        messages = [record.getMessage() for record in handler.buffer]
+        self.assertIn('Command arguments: --admin-password ********', messages)
+        self.assertFalse(any('Secret0!' in message for message in messages))
+        self.assertEqual(handler.filters, [])
+
+    @mock.patch('azure.cli.core.get_default_cli')
+    @mock.patch('subprocess.Popen')
+    def test_call_az_command_subprocess(self, popen, get_default_cli):
+        repair_utils._set_command_runner(repair_utils.COMMAND_RUNNER_SUBPROCESS)
+        popen.return_value.communicate.return_value = ('', 'ResourceGroupNotFound')
+        popen.return_value.returncode = 1
+        with self.assertRaisesRegex(AzCommandError, 'ResourceGroupNotFound'):
+            repair_utils._call_az_command('az group show -n rg')
+        get_default_cli.assert_not_called()
+
+    @mock.patch('azure.cli.core.get_default_cli')
+    def test_call_az_command_in_process_keeps_outer_telemetry(self, get_default_cli):
+        from azure.cli.core import telemetry
+        session = telemetry._session
+        saved = {name: getattr(session, name, None) for name in repair_utils.TELEMETRY_SESSION_ATTRIBUTES}
+        self.addCleanup(lambda: [setattr(session, name, value) for name, value in saved.items()])
+        telemetry.set_raw_command_name('vm repair create')
+        telemetry.set_command_details('vm repair create', 'json', ['--name', '--resource-group'], 'vm-repair', '0.6.0')
+
+        cli = FakeCli(exit_code=1, error=ValueError('ResourceGroupNotFound'))
+
+        def invoke(args, out_file=None):
+            telemetry.set_raw_command_name('group show')
+            telemetry.set_command_details('group show', 'json', ['--name'])
+            telemetry.set_failure(summary='ResourceGroupNotFound')
+            return FakeCli.invoke(cli, args, out_file)
+        cli.invoke = invoke
+        get_default_cli.return_value = cli
+
+        with self.assertRaises(AzCommandError):
+            repair_utils._call_az_command('az group show -n rg')
+
+        self.assertEqual((session.raw_command, session.command, session.parameters, session.extension_name),
+                         ('vm repair create', 'vm repair create', ['--name', '--resource-group'], 'vm-repair'))
+        self.assertEqual(session.result, saved['result'])
+
+    @mock.patch('azure.cli.core.get_default_cli')
+    @mock.patch('subprocess.Popen')
+    def test_parallel_steps_call_az_command_in_subprocess(self, popen, get_default_cli):
+        get_default_cli.return_value = FakeCli(output='in-process\n')
+        popen.return_value.communicate.return_value = ('subprocess\n', '')
+        popen.return_value.returncode = 0
+
+        results = repair_utils._run_in_parallel(lambda: repair_utils._call_az_command('az group show -n rg1'),
+                                                lambda: repair_utils._call_az_command('az group show -n rg2'))
+
+        self.assertEqual(results, ['subprocess\n', 'subprocess\n'])
+        get_default_cli.assert_not_called()
+        self.assertEqual(repair_utils._call_az_command('az group show -n rg3'), 'in-process\n')
+
+    def test_call_az_command_rejects_other_commands(self):
+        with self.assertRaises(AzCommandError):
+            repair_utils._call_az_command('rm -rf /')
+
+    def test_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def step(value):
+            barrier.wait()
+            return value
+        self.assertEqual(repair_utils._run_in_parallel(lambda: step(1), lambda: step(2)), [1, 2])
+
+        finished = []
+
+        def slow_step():
+            barrier.wait()
+            finished.append(True)
+
+        def failing_step():
+            barrier.wait()
+            raise AzCommandError('failed')
+        with self.assertRaises(AzCommandError):
+            repair_utils._run_in_parallel(failing_step, slow_step)
+        self.assertEqual(finished, [True])
+
+
+class FetchRunScriptMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    @staticmethod
+    def _response(status_code=200, body=None, etag='"v1"'):
+        response = mock.Mock(status_code=status_code, headers={'ETag': etag})
+        response.json.return_value = body
+        return response
+
+    @mock.patch('requests.get')
+    def test_fetch_run_script_map_cached(self, get):
+        run_map = [{'id': 'win-hello-world', 'path': 'src/windows/win-hello-world.ps1'}]
+        get.return_value = self._response(body=run_map)
+        self.assertEqual(repair_utils._fetch_run_script_map(self.cache_dir), run_map)
+        self.assertEqual(repair_utils._fetch_run_script_path('win-hello-world', self.cache_dir),
+                         'src/windows/win-hello-world.ps1')
+        self.assertEqual(get.call_count, 1)
+
+        # Once the cache expired, the map is only downloaded again when its ETag changed
+        get.return_value = self._response(status_code=304)
+        self.assertEqual(repair_utils._fetch_run_script_map(self.cache_dir, ttl=0), run_map)
+        self.assertEqual(get.call_args[1]['headers'], {'If-None-Match': '"v1"'})
+
+        get.side_effect = requests.exceptions.ConnectionError('offline')
+        self.assertEqual(repair_utils._fetch_run_script_map(self.cache_dir, ttl=0), run_map)
+        self.assertEqual(repair_utils._fetch_run_script_map(self.cache_dir, offline=True), run_map)
+        self.assertTrue(all(f.startswith('script_map_') for f in os.listdir(self.cache_dir)))
+
+    @mock.patch('requests.get')
+    def test_fetch_run_script_map_not_cached(self, get):
+        with self.assertRaises(ScriptMapNotCachedError):
+            repair_utils._fetch_run_script_map(self.cache_dir, offline=True)
+        get.side_effect = requests.exceptions.ConnectionError('offline')
+        with self.assertRaises(requests.exceptions.RequestException):
+            repair_utils._fetch_run_script_map(self.cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,7 @@
 from codecs import open
 from setuptools import setup, find_packages
 
-VERSION = "0.5.1"
+VERSION = "0.6.0"
 
 CLASSIFIERS = [
     'Development Status :: 4 - Beta',
@@ -187,6 +187,19 @@ helps['webpubsub client start'] = """
     short-summary: Start a interactive client connection.
 """
 
+helps['webpubsub client benchmark'] = """
+    type: command
+    short-summary: Measure the message throughput and latency of a hub.
+    long-summary: |
+        Opens many client connections, spreads them across groups and publishes messages to the groups at a fixed
+        rate, each message from the next connection. Reports the number of messages sent and received, the
+        throughput and the end-to-end latency percentiles of the messages received by the connections.
+    examples:
+      - name: Publish 100 messages per second for a minute between 1000 connections in 10 groups
+        text: >
+            az webpubsub client benchmark -n MyWebPubSub -g MyResourceGroup --hub-name MyHub --connections 1000 --groups 10 --message-rate 100 --duration 60
+"""
+
 helps['webpubsub service broadcast'] = """
     type: command
     short-summary: Broadcast messages to hub. Error throws if operation fails.
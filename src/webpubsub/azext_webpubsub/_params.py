@@ -67,6 +67,14 @@ def load_arguments(self, _):
     with self.argument_context('webpubsub client') as c:
         c.argument('hub_name', help='The hub which client connects to')
 
+    with self.argument_context('webpubsub client benchmark') as c:
+        c.argument('connections', type=int, help='The number of client connections to open.')
+        c.argument('groups', type=int, help='The number of groups the connections are spread across.')
+        c.argument('message_rate', type=float, help='The number of messages published per second, across all connections.')
+        c.argument('duration', type=float, help='The number of seconds to publish messages for.')
+        c.argument('message_size', type=int, help='The number of padding characters added to every message.')
+        c.argument('user_id', help='The prefix of the user id of the connections. The connections are numbered after it.')
+
     with self.argument_context('webpubsub service') as c:
         c.argument('hub_name', help='The hub to manage.')
 
@@ -0,0 +1,212 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# pylint: disable=line-too-long
+
+import asyncio
+import json
+import math
+import sys
+import time
+import websockets
+from azure.cli.core.azclierror import AzureConnectionError, InvalidArgumentValueError
+
+SUBPROTOCOL = 'json.webpubsub.azure.v1'
+GROUP_NAME_PREFIX = 'benchmark-'
+CONNECT_CONCURRENCY = 50
+ACK_TIMEOUT = 30
+DRAIN_TIMEOUT = 5
+
+
+class BenchmarkStats:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.sent = 0
+        self.expected = 0
+        self.received = 0
+        self.send_errors = 0
+        self.connection_errors = 0
+        self.disconnected = 0
+        self.latencies = []
+
+    def report(self, connections, groups, publish_duration, total_duration):
+        latencies = sorted(self.latencies)
+        return {
+            'connections': connections,
+            'connectionErrors': self.connection_errors,
+            'disconnected': self.disconnected,
+            'groups': groups,
+            'duration': round(publish_duration, 3),
+            'messagesSent': self.sent,
+            'sendErrors': self.send_errors,
+            'messagesExpected': self.expected,
+            'messagesReceived': self.received,
+            'sendRate': round(self.sent / publish_duration, 2) if publish_duration else 0,
+            'receiveRate': round(self.received / total_duration, 2) if total_duration else 0,
+            'latencyMs': {
+                'min': _to_ms(latencies[0]) if latencies else None,
+                'mean': _to_ms(sum(latencies) / len(latencies)) if latencies else None,
+                'p50': _to_ms(percentile(latencies, 50)),
+                'p95': _to_ms(percentile(latencies, 95)),
+                'p99': _to_ms(percentile(latencies, 99)),
+                'max': _to_ms(latencies[-1]) if latencies else None
+            }
+        }
+
+
+class BenchmarkClient:
+    """
+    A client connection of the benchmark. A single task reads everything the connection receives: acks complete
+    the pending requests and the messages published by the benchmark are timed.
+    """
+
+    def __init__(self, url, group, stats):
+        self.url = url
+        self.group = group
+        self.stats = stats
+        self.ws = None
+        self.closing = False
+        self._acks = {}
+        self._ack_id = 0
+        self._reader = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=[SUBPROTOCOL])
+        self._reader = asyncio.ensure_future(self._receive())
+        await self.request({'type': 'joinGroup', 'group': self.group})
+
+    async def request(self, payload):
+        # Sends the payload with an ack id and waits for the service to ack it
+        self._ack_id = self._ack_id + 1
+        payload['ackId'] = self._ack_id
+        ack = asyncio.get_running_loop().create_future()
+        self._acks[self._ack_id] = ack
+        await self.ws.send(json.dumps(payload))
+        message = await asyncio.wait_for(ack, ACK_TIMEOUT)
+        if not message.get('success', True):
+            raise AzureConnectionError('{} failed: {}'.format(payload['type'], message.get('error')))
+
+    async def publish(self, sequence, padding):
+        await self.ws.send(json.dumps({
+            'type': 'sendToGroup',
+            'group': self.group,
+            'dataType': 'json',
+            'data': {'sequence': sequence, 'sent': time.perf_counter(), 'padding': padding}
+        }))
+
+    async def close(self):
+        self.closing = True
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _receive(self):
+        try:
+            async for raw in self.ws:
+                received = time.perf_counter()
+                message = json.loads(raw)
+                if message.get('type') == 'ack':
+                    ack = self._acks.pop(message.get('ackId'), None)
+                    if ack is not None and not ack.done():
+                        ack.set_result(message)
+                elif message.get('type') == 'message' and isinstance(message.get('data'), dict) and 'sent' in message['data']:
+                    self.stats.received += 1
+                    self.stats.latencies.append(received - message['data']['sent'])
+        except websockets.ConnectionClosed:
+            pass
+        if not self.closing:
+            self.stats.disconnected += 1
+        for ack in self._acks.values():
+            if not ack.done():
+                ack.set_exception(AzureConnectionError('The connection was closed'))
+
+
+async def run_benchmark(get_url, connections=10, groups=1, message_rate=10, duration=10, message_size=64, drain_timeout=DRAIN_TIMEOUT):
+    """
+    Opens the client connections on the running loop, joins connection i to group i % groups and publishes
+    message_rate messages per second to the groups for duration seconds, each one from the next connection to
+    the group it joined. get_url(i) returns the url of connection i.
+    """
+    if connections < 1 or groups < 1 or message_rate <= 0 or duration <= 0 or message_size < 0:
+        raise InvalidArgumentValueError('--connections, --groups, --message-rate and --duration must be positive.')
+    groups = min(groups, connections)
+
+    stats = BenchmarkStats()
+    clients = [BenchmarkClient(get_url(i), GROUP_NAME_PREFIX + str(i % groups), stats) for i in range(connections)]
+    connected = await _connect_all(clients, stats)
+    try:
+        if not connected:
+            raise AzureConnectionError('None of the {} connections could be opened.'.format(connections))
+        eprint('{} connections joined {} groups, publishing {} messages per second for {} seconds'.format(len(connected), groups, message_rate, duration))
+
+        group_sizes = {}
+        for client in connected:
+            group_sizes[client.group] = group_sizes.get(client.group, 0) + 1
+
+        start = time.perf_counter()
+        await _publish(connected, group_sizes, stats, message_rate, duration, 'x' * message_size)
+        publish_duration = time.perf_counter() - start
+
+        # Wait for the messages still on their way
+        drain_end = time.perf_counter() + drain_timeout
+        while stats.received < stats.expected and time.perf_counter() < drain_end:
+            await asyncio.sleep(0.05)
+        total_duration = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(client.close() for client in connected), return_exceptions=True)
+
+    return stats.report(len(connected), len(group_sizes), publish_duration, total_duration)
+
+
+async def _connect_all(clients, stats):
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect(client):
+        async with semaphore:
+            try:
+                await client.connect()
+                return True
+            except Exception as ex:  # pylint: disable=broad-except
+                stats.connection_errors += 1
+                eprint('Failed to connect: {}'.format(ex))
+                await client.close()
+                return False
+
+    results = await asyncio.gather(*(connect(client) for client in clients))
+    return [client for client, connected in zip(clients, results) if connected]
+
+
+async def _publish(clients, group_sizes, stats, message_rate, duration, padding):
+    # Message k is due at start + k / message_rate. When the loop falls behind, the late messages are sent right away
+    # instead of being skipped, so the requested number of messages is always published.
+    start = time.perf_counter()
+    count = int(math.ceil(duration * message_rate))
+    for sequence in range(count):
+        delay = start + sequence / message_rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        client = clients[sequence % len(clients)]
+        try:
+            await client.publish(sequence, padding)
+        except websockets.ConnectionClosed:
+            stats.send_errors += 1
+            continue
+        stats.sent += 1
+        stats.expected += group_sizes[client.group]
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = int(math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def _to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def eprint(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
@@ -9,6 +9,7 @@ import sys
 import threading
 import json
 import websockets
+from .benchmark import run_benchmark
 from .vendored_sdks.azure_messaging_webpubsubservice import (
     build_authentication_token
 )
@@ -43,7 +44,7 @@ async def connect(url):
     async with websockets.connect(url, subprotocols=['json.webpubsub.azure.v1']) as ws:
 
         eprint(HELP_MESSAGE)
-        publisher = Publisher(ws)
+        publisher = Publisher(ws, asyncio.get_running_loop())
         publisher.daemon = True
         publisher.start()
         while True:
@@ -58,22 +59,33 @@ def start_client(client, resource_group_name, webpubsub_name, hub_name, user_id=
     asyncio.get_event_loop().run_until_complete(connect(token['url']))
 
 
+def start_benchmark(client, resource_group_name, webpubsub_name, hub_name, connections=10, groups=1, message_rate=10, duration=10, message_size=64, user_id=None):
+    keys = client.list_keys(resource_group_name, webpubsub_name)
+    connection_string = keys.primary_connection_string
+
+    def get_url(index):
+        token = build_authentication_token(connection_string, hub_name, roles=['webpubsub.sendToGroup', 'webpubsub.joinLeaveGroup'], user='{}-{}'.format(user_id or 'benchmark', index))
+        return token['url']
+
+    return asyncio.get_event_loop().run_until_complete(run_benchmark(get_url, connections, groups, message_rate, duration, message_size))
+
+
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
 class Publisher(threading.Thread):
-    def __init__(self, ws):
+    def __init__(self, ws, loop):
         threading.Thread.__init__(self)
         self.ws = ws
+        self.loop = loop
         self.id = 0
 
     def run(self):
-        new_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(new_loop)
+        # The websocket belongs to the loop of the connection, so the input is sent from that loop
         while True:
             input_line = sys.stdin.readline().strip()
-            asyncio.get_event_loop().run_until_complete(self._parse(input_line))
+            asyncio.run_coroutine_threadsafe(self._parse(input_line), self.loop).result()
 
     def join(self, timeout=None):
         super().join()
@@ -0,0 +1,80 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import json
+import unittest
+
+import websockets
+from azure.cli.core.azclierror import AzureConnectionError
+
+from azext_webpubsub.benchmark import percentile, run_benchmark
+
+
+class StandInService:
+    # A local stand-in for the json.webpubsub.azure.v1 protocol of a hub: acks joinGroup and fans sendToGroup out
+    # to the connections of the group. Joins to the groups listed in forbidden_groups are rejected.
+
+    def __init__(self, forbidden_groups=()):
+        self.groups = {}
+        self.forbidden_groups = forbidden_groups
+
+    async def handler(self, ws, path=None):  # pylint: disable=unused-argument
+        async for raw in ws:
+            message = json.loads(raw)
+            if message['type'] == 'joinGroup':
+                success = message['group'] not in self.forbidden_groups
+                if success:
+                    self.groups.setdefault(message['group'], set()).add(ws)
+                await ws.send(json.dumps({'type': 'ack', 'ackId': message['ackId'], 'success': success}))
+            elif message['type'] == 'sendToGroup':
+                payload = json.dumps({'type': 'message', 'from': 'group', 'group': message['group'],
+                                      'dataType': message['dataType'], 'data': message['data']})
+                for member in list(self.groups.get(message['group'], ())):
+                    await member.send(payload)
+
+
+class WebpubsubBenchmarkTest(unittest.TestCase):
+
+    def _run(self, service, **kwargs):
+        async def run():
+            async with websockets.serve(service.handler, 'localhost', 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                return await run_benchmark(lambda index: 'ws://localhost:{}'.format(port), drain_timeout=2, **kwargs)
+        return asyncio.new_event_loop().run_until_complete(run())
+
+    def test_benchmark(self):
+        report = self._run(StandInService(), connections=6, groups=2, message_rate=50, duration=0.4, message_size=16)
+
+        self.assertEqual(report['connections'], 6)
+        self.assertEqual(report['groups'], 2)
+        self.assertEqual(report['messagesSent'], 20)
+        # Every message reaches the 3 connections of its group, the sender included
+        self.assertEqual(report['messagesExpected'], 60)
+        self.assertEqual(report['messagesReceived'], 60)
+        latency = report['latencyMs']
+        self.assertTrue(0 <= latency['min'] <= latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max'])
+
+    def test_benchmark_reports_failed_connections(self):
+        report = self._run(StandInService(forbidden_groups=['benchmark-1']), connections=4, groups=2,
+                           message_rate=20, duration=0.2)
+        self.assertEqual(report['connections'], 2)
+        self.assertEqual(report['connectionErrors'], 2)
+        self.assertEqual(report['messagesReceived'], report['messagesSent'] * 2)
+
+        with self.assertRaises(AzureConnectionError):
+            self._run(StandInService(forbidden_groups=['benchmark-0']), connections=1, duration=0.1)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+if __name__ == '__main__':
+    unittest.main()